@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+End-to-end Benchmarks
+
+Times the main code paths on synthetic libraries of increasing size:
+- import: adding images and embeddings to a database
+- fts_search / filter_search: full-text and metadata filter queries
+- semantic_search / hybrid_search: vector index load and scoring
+- stats: the statistics shown by the web app
+- extraction / thumbnail: per-file metadata extraction and thumbnailing
+
+Results are written as JSON, one record per scenario, operation and
+scale, so runs on different commits or machines can be compared with
+``--compare``.
+
+Usage:
+    python benchmarks/run_benchmarks.py --scales 1k,10k --output results.json
+    python benchmarks/run_benchmarks.py --scales 10k --compare baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Allow running from a checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic_library  # noqa: E402
+from wheresmy.core.database import ImageDatabase  # noqa: E402
+from wheresmy.search import search as search_utils  # noqa: E402
+from wheresmy.search import stats as stats_utils  # noqa: E402
+
+# Version of the results format
+RESULTS_VERSION = 1
+
+SCALE_PRESETS = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+SCENARIOS = (
+    "import",
+    "fts_search",
+    "filter_search",
+    "semantic_search",
+    "hybrid_search",
+    "stats",
+    "extraction",
+    "thumbnail",
+)
+
+# Scenarios that work on image files and do not depend on the library size
+FILE_SCENARIOS = ("extraction", "thumbnail")
+
+TEXT_QUERIES = ["beach", "mountain sunset", "dog", "city street night", "lake boats"]
+
+# Default p50 slowdown reported as a regression by --compare
+DEFAULT_REGRESSION_THRESHOLD = 1.2
+
+
+def parse_scale(text: str) -> int:
+    """Parse a library size such as 10000, 10k or 1m."""
+    text = text.strip().lower()
+    if text in SCALE_PRESETS:
+        return SCALE_PRESETS[text]
+    return int(text)
+
+
+def summarize(samples: List[float], items: float = 1) -> Dict[str, Any]:
+    """
+    Summarize the latencies of repeated operations.
+
+    Args:
+        samples: Duration of each operation in seconds
+        items: Mean number of items processed by each operation
+
+    Returns:
+        Count, total, mean, percentiles and throughput
+    """
+    values = np.asarray(samples, dtype=np.float64)
+    total = float(values.sum())
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+    return {
+        "count": len(samples),
+        "total_s": round(total, 6),
+        "mean_ms": round(float(values.mean()) * 1000, 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "min_ms": round(float(values.min()) * 1000, 4),
+        "max_ms": round(float(values.max()) * 1000, 4),
+        "items_per_s": round(len(samples) * items / total, 2) if total else None,
+    }
+
+
+def measure(
+    operation: Callable[[Any], Any],
+    arguments: List[Any],
+    repeat: int = 1,
+    warmup: int = 1,
+) -> List[float]:
+    """
+    Time an operation on each argument.
+
+    Args:
+        operation: Function of one argument
+        arguments: Arguments to time the operation on
+        repeat: Number of passes over the arguments
+        warmup: Untimed calls before timing, to fill caches
+
+    Returns:
+        Duration of each timed call in seconds
+    """
+    for argument in arguments[:warmup]:
+        operation(argument)
+
+    samples = []
+    for _ in range(repeat):
+        for argument in arguments:
+            start = time.perf_counter()
+            operation(argument)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def environment() -> Dict[str, Any]:
+    """Describe the machine and commit the benchmarks ran on."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    commit = None
+    dirty = None
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"],
+                cwd=root,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        pass
+
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "hostname": socket.gethostname(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+class BenchmarkRunner:
+    """Run benchmark scenarios and collect their results."""
+
+    def __init__(
+        self,
+        work_dir: str,
+        seed: int = synthetic_library.DEFAULT_SEED,
+        repeat: int = 5,
+        files: int = 200,
+        embedding_size: int = synthetic_library.DEFAULT_EMBEDDING_SIZE,
+    ):
+        """
+        Initialize the runner.
+
+        Args:
+            work_dir: Directory of generated databases and files, reused
+                      between runs with the same seed
+            seed: Library seed
+            repeat: Number of passes over each scenario's queries
+            files: Number of image files for the file scenarios
+            embedding_size: Dimensionality of the random embeddings
+        """
+        self.work_dir = work_dir
+        self.seed = seed
+        self.repeat = repeat
+        self.files = files
+        self.embedding_size = embedding_size
+        self.model_name = synthetic_library.DEFAULT_EMBEDDING_MODEL
+        self.results: List[Dict[str, Any]] = []
+
+    def record(
+        self,
+        scenario: str,
+        operation: str,
+        scale: Optional[int],
+        samples: List[float],
+        items: float = 1,
+    ) -> None:
+        """Add the summary of an operation's samples to the results."""
+        result = {"scenario": scenario, "operation": operation, "scale": scale}
+        result.update(summarize(samples, items))
+        self.results.append(result)
+        print(
+            f"{scenario}/{operation} @ {scale or '-'}: "
+            f"p50 {result['p50_ms']:.3f} ms, p99 {result['p99_ms']:.3f} ms",
+            file=sys.stderr,
+        )
+
+    def library(self, scale: int, scenarios: List[str]) -> ImageDatabase:
+        """
+        Get the database of a library, generating it if it does not exist yet.
+
+        Args:
+            scale: Number of images in the library
+            scenarios: Scenarios being run; the generation is recorded as the
+                       import scenario if it is one of them
+
+        Returns:
+            ImageDatabase of the library
+        """
+        path = os.path.join(self.work_dir, f"library_{scale}_{self.seed}.db")
+        if os.path.exists(path):
+            db = ImageDatabase(path)
+            if db.get_stats()["total_images"] == scale:
+                return db
+            os.remove(path)
+
+        db = ImageDatabase(path)
+        db.enable_wal()
+        batch_size = synthetic_library.POPULATE_BATCH_SIZE
+        samples = []
+        for start in range(0, scale, batch_size):
+            count = min(batch_size, scale - start)
+            begin = time.perf_counter()
+            synthetic_library.add_batch(
+                db, start, count, self.seed, self.embedding_size, self.model_name
+            )
+            samples.append(time.perf_counter() - begin)
+        if "import" in scenarios:
+            self.record("import", "add_batch", scale, samples, scale / len(samples))
+        return db
+
+    def image_files(self) -> List[str]:
+        """Get the image files of the file scenarios, writing them if needed."""
+        directory = os.path.join(self.work_dir, f"images_{self.seed}")
+        paths = []
+        if os.path.isdir(directory):
+            paths = sorted(
+                os.path.join(directory, name) for name in os.listdir(directory)
+            )
+        if len(paths) != self.files:
+            shutil.rmtree(directory, ignore_errors=True)
+            paths = synthetic_library.write_image_files(
+                directory, self.files, seed=self.seed
+            )
+        return paths
+
+    def query_vectors(self, count: int = 20) -> List[np.ndarray]:
+        """Random query vectors, distinct from the stored embeddings."""
+        vectors = synthetic_library.random_embeddings(
+            count, self.embedding_size, seed=self.seed + 7_919
+        )
+        return list(vectors)
+
+    def run_scale(self, scale: int, scenarios: List[str]) -> None:
+        """Run the library scenarios at one library size."""
+        db = self.library(scale, scenarios)
+
+        if "fts_search" in scenarios:
+            samples = measure(
+                lambda query: search_utils.search_images(
+                    db, text_query=query, limit=20
+                ),
+                TEXT_QUERIES,
+                self.repeat,
+            )
+            self.record("fts_search", "search_images", scale, samples)
+
+        if "filter_search" in scenarios:
+            filters = [
+                {"camera_make": "Apple"},
+                {"date_start": "2015-01-01", "date_end": "2015-12-31"},
+                {"min_width": 5000, "min_height": 3000},
+                {"camera_make": "Canon", "text_query": "beach"},
+                {"date_start": "2020-06-01", "date_end": "2020-06-30"},
+            ]
+            samples = measure(
+                lambda kwargs: search_utils.search_images(db, limit=20, **kwargs),
+                filters,
+                self.repeat,
+            )
+            self.record("filter_search", "search_images", scale, samples)
+
+        vectors = self.query_vectors()
+        if "semantic_search" in scenarios or "hybrid_search" in scenarios:
+            samples = measure(
+                lambda _: db.load_vector_index(self.model_name), [None], 1, warmup=0
+            )
+            self.record("semantic_search", "load_vector_index", scale, samples)
+
+        if "semantic_search" in scenarios:
+            samples = measure(
+                lambda vector: db.semantic_search(
+                    vector, limit=20, model_name=self.model_name
+                ),
+                vectors,
+                self.repeat,
+            )
+            self.record("semantic_search", "semantic_search", scale, samples)
+
+        if "hybrid_search" in scenarios:
+            pairs = list(zip(TEXT_QUERIES * 4, vectors))
+            samples = measure(
+                lambda pair: db.hybrid_search(
+                    pair[0], pair[1], limit=20, model_name=self.model_name
+                ),
+                pairs,
+                self.repeat,
+            )
+            self.record("hybrid_search", "hybrid_search", scale, samples)
+
+        if "stats" in scenarios:
+            samples = measure(
+                lambda _: stats_utils.get_all_statistics(db), [None], self.repeat
+            )
+            self.record("stats", "get_all_statistics", scale, samples)
+
+    def run_files(self, scenarios: List[str]) -> None:
+        """Run the per-file scenarios."""
+        paths = self.image_files()
+
+        if "extraction" in scenarios:
+            from wheresmy.core.metadata_extractor import extract_metadata
+
+            samples = measure(extract_metadata, paths, 1)
+            self.record("extraction", "extract_metadata", None, samples)
+
+        if "thumbnail" in scenarios:
+            from wheresmy.utils.thumbnail import create_thumbnail
+
+            output_dir = tempfile.mkdtemp(dir=self.work_dir)
+            try:
+                # Thumbnails that exist are skipped, so time a single pass
+                samples = measure(
+                    lambda path: create_thumbnail(path, output_dir),
+                    paths,
+                    1,
+                    warmup=0,
+                )
+                self.record("thumbnail", "create_thumbnail", None, samples)
+            finally:
+                shutil.rmtree(output_dir)
+
+
+def compare_results(
+    current: List[Dict[str, Any]],
+    baseline: List[Dict[str, Any]],
+    threshold: float = DEFAULT_REGRESSION_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """
+    Compare results with a baseline run.
+
+    Args:
+        current: Results of this run
+        baseline: Results of the baseline run
+        threshold: p50 ratio above which an operation counts as a regression
+
+    Returns:
+        One comparison per operation present in both runs
+    """
+
+    def key(result):
+        return result["scenario"], result["operation"], result["scale"]
+
+    baseline_by_key = {key(result): result for result in baseline}
+    comparisons = []
+    for result in current:
+        previous = baseline_by_key.get(key(result))
+        if not previous or not previous["p50_ms"]:
+            continue
+        ratio = result["p50_ms"] / previous["p50_ms"]
+        comparisons.append(
+            {
+                "scenario": result["scenario"],
+                "operation": result["operation"],
+                "scale": result["scale"],
+                "baseline_p50_ms": previous["p50_ms"],
+                "p50_ms": result["p50_ms"],
+                "ratio": round(ratio, 3),
+                "regression": ratio > threshold,
+            }
+        )
+    return comparisons
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    """Print results as a table."""
+    print(
+        f"{'scenario':<16} {'operation':<20} {'scale':>9} {'count':>6} "
+        f"{'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'items/s':>12}"
+    )
+    for result in results:
+        print(
+            f"{result['scenario']:<16} {result['operation']:<20} "
+            f"{result['scale'] or '-':>9} {result['count']:>6} "
+            f"{result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} "
+            f"{result['p99_ms']:>10.3f} {result['items_per_s'] or 0:>12.1f}"
+        )
+
+
+def main():
+    """Main function to run the benchmarks."""
+    parser = argparse.ArgumentParser(description="Run wheresmy benchmarks")
+    parser.add_argument(
+        "--scales",
+        default="1k",
+        help="Comma-separated library sizes, e.g. 1k,10k,100k,1m (default: 1k)",
+    )
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"Comma-separated scenarios (default: all of {', '.join(SCENARIOS)})",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Passes over each scenario's queries (default: 5)",
+    )
+    parser.add_argument(
+        "--files",
+        type=int,
+        default=200,
+        help="Image files for extraction and thumbnails (default: 200)",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=synthetic_library.DEFAULT_SEED, help="Library seed"
+    )
+    parser.add_argument(
+        "--work-dir",
+        help="Keep generated libraries here and reuse them (default: temporary)",
+    )
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Compare with the JSON results of a run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_REGRESSION_THRESHOLD,
+        help="p50 slowdown ratio reported as a regression (default: 1.2)",
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Exit with status 1 if --compare finds a regression",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Show INFO logging")
+    args = parser.parse_args()
+
+    scales = [parse_scale(scale) for scale in args.scales.split(",") if scale]
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(",")]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Search and import log every query at INFO
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        force=True,
+    )
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    # Time the queries, not the result cache
+    search_utils.configure_cache(enabled=False)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="wheresmy_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    runner = BenchmarkRunner(
+        work_dir, seed=args.seed, repeat=args.repeat, files=args.files
+    )
+    try:
+        for scale in scales:
+            runner.run_scale(scale, scenarios)
+        if any(scenario in FILE_SCENARIOS for scenario in scenarios):
+            runner.run_files(scenarios)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir)
+
+    report = {
+        "version": RESULTS_VERSION,
+        "environment": environment(),
+        "config": {
+            "scales": scales,
+            "scenarios": scenarios,
+            "repeat": args.repeat,
+            "files": args.files,
+            "seed": args.seed,
+            "embedding_size": runner.embedding_size,
+        },
+        "results": runner.results,
+    }
+
+    print_results(runner.results)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        comparisons = compare_results(
+            runner.results, baseline["results"], threshold=args.threshold
+        )
+        report["comparison"] = {
+            "baseline_commit": baseline.get("environment", {}).get("commit"),
+            "threshold": args.threshold,
+            "operations": comparisons,
+        }
+        print(f"\nCompared with {args.compare}:")
+        for comparison in comparisons:
+            marker = "  REGRESSION" if comparison["regression"] else ""
+            print(
+                f"{comparison['scenario']:<16} {comparison['operation']:<20} "
+                f"{comparison['scale'] or '-':>9} {comparison['ratio']:>8.2f}x{marker}"
+            )
+        if args.fail_on_regression and any(c["regression"] for c in comparisons):
+            exit_code = 1
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Synthetic Photo Library Generator
+
+Generates reproducible photo libraries for benchmarking:
+- Metadata records in the extractor's format (EXIF, GPS, Apple MakerNote,
+  VLM descriptions) for a mix of iPhone HEIC and camera JPEG images
+- Databases populated with those records and random unit embeddings
+- Small JPEG files with matching EXIF for extraction and thumbnail timing
+
+Every record is derived from the seed and its index, so the same library
+can be regenerated on any machine.
+
+Usage:
+    python benchmarks/synthetic_library.py --count 10000 --db library.db
+    python benchmarks/synthetic_library.py --count 100 --images-dir photos/
+"""
+
+import os
+import sys
+import uuid
+import random
+import argparse
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+import piexif
+from PIL import Image
+
+# Allow running from a checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wheresmy.core.database import ImageDatabase  # noqa: E402
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEED = 42
+DEFAULT_EMBEDDING_SIZE = 384
+DEFAULT_EMBEDDING_MODEL = "synthetic-random"
+
+# Share of images that are iPhone HEIC files (the rest are camera JPEGs)
+HEIC_RATIO = 0.6
+# Share of images with GPS coordinates
+GPS_RATIO = 0.7
+# Share of images with a VLM description
+DESCRIPTION_RATIO = 0.9
+
+# Images added and embedded per batch when populating a database
+POPULATE_BATCH_SIZE = 1000
+
+# (make, model, format) of simulated cameras, most common first
+CAMERAS = [
+    ("Apple", "iPhone 12 Pro", "HEIC"),
+    ("Apple", "iPhone 8", "HEIC"),
+    ("Apple", "iPhone 15", "HEIC"),
+    ("Canon", "Canon EOS 5D Mark IV", "JPEG"),
+    ("NIKON CORPORATION", "NIKON D750", "JPEG"),
+    ("SONY", "ILCE-7M3", "JPEG"),
+    ("FUJIFILM", "X-T4", "JPEG"),
+    ("samsung", "SM-G991B", "JPEG"),
+]
+
+# (latitude, longitude) of places photos cluster around
+PLACES = [
+    (52.52, 13.405),  # Berlin
+    (48.8566, 2.3522),  # Paris
+    (40.7128, -74.006),  # New York
+    (35.6762, 139.6503),  # Tokyo
+    (-33.8688, 151.2093),  # Sydney
+    (37.7749, -122.4194),  # San Francisco
+    (64.1466, -21.9426),  # Reykjavik
+    (-22.9068, -43.1729),  # Rio de Janeiro
+]
+
+SUBJECTS = [
+    "beach",
+    "mountain",
+    "city street",
+    "dog",
+    "cat",
+    "birthday cake",
+    "family dinner",
+    "sunset",
+    "forest trail",
+    "lake",
+    "museum",
+    "concert",
+    "bicycle",
+    "garden",
+    "snowy field",
+    "harbor",
+]
+DETAILS = [
+    "with palm trees",
+    "with people walking",
+    "under a cloudy sky",
+    "at night with street lights",
+    "covered in snow",
+    "with boats in the water",
+    "with colorful flowers",
+    "next to an old building",
+    "with children playing",
+    "in warm evening light",
+]
+STYLES = ["A wide shot of", "A close-up of", "A photo of", "A blurry picture of"]
+
+LIBRARY_START = datetime(2010, 1, 1)
+LIBRARY_DAYS = 15 * 365
+
+
+def generate_description(rng: random.Random) -> str:
+    """Generate a VLM-style description of a synthetic photo."""
+    subject = rng.choice(SUBJECTS)
+    return (
+        f"{rng.choice(STYLES)} a {subject} {rng.choice(DETAILS)}. "
+        f"The scene shows a {rng.choice(SUBJECTS)} in the background "
+        f"and the image is {rng.choice(['bright', 'dark', 'vivid', 'muted'])}."
+    )
+
+
+def generate_metadata(index: int, seed: int = DEFAULT_SEED) -> Dict[str, Any]:
+    """
+    Generate the metadata record of one synthetic image.
+
+    Args:
+        index: Index of the image in the library
+        seed: Library seed
+
+    Returns:
+        Metadata in the format produced by the metadata extractor
+    """
+    rng = random.Random(seed * 1_000_003 + index)
+
+    make, model, image_format = CAMERAS[
+        min(int(rng.expovariate(0.5)), len(CAMERAS) - 1)
+    ]
+    if rng.random() >= HEIC_RATIO and image_format == "HEIC":
+        image_format = "JPEG"
+    extension = "heic" if image_format == "HEIC" else "jpg"
+    filename = f"IMG_{index:07d}.{extension}"
+
+    width, height = rng.choice([(4032, 3024), (6000, 4000), (3024, 4032)])
+    taken = LIBRARY_START + timedelta(
+        days=rng.randrange(LIBRARY_DAYS), seconds=rng.randrange(86400)
+    )
+
+    exif = {
+        "Make": make,
+        "Model": model,
+        "DateTimeOriginal": taken.strftime("%Y-%m-%dT%H:%M:%S"),
+        "DateTime": taken.strftime("%Y-%m-%dT%H:%M:%S"),
+        "ExposureTime": str(1 / rng.choice([30, 60, 125, 250, 1000])),
+        "FNumber": str(rng.choice([1.8, 2.8, 4.0, 8.0])),
+        "ISOSpeedRatings": rng.choice([32, 100, 400, 1600]),
+        "FocalLength": str(rng.choice([4.2, 24.0, 50.0, 85.0])),
+        "Orientation": 6 if height > width else 1,
+    }
+    if rng.random() < GPS_RATIO:
+        lat, lon = rng.choice(PLACES)
+        exif["GPS"] = {
+            "latitude": lat + rng.gauss(0, 0.05),
+            "longitude": lon + rng.gauss(0, 0.05),
+            "altitude": rng.uniform(0, 300),
+        }
+
+    metadata = {
+        "file_path": f"/photos/{taken.year}/{filename}",
+        "filename": filename,
+        "format": image_format,
+        "mode": "RGB",
+        "size": [width, height],
+        "width": width,
+        "height": height,
+        "exif": exif,
+    }
+
+    if make == "Apple":
+        metadata["apple_makernote"] = {
+            "type": "Apple iOS MakerNote",
+            "device": {"uuid": str(uuid.UUID(int=rng.getrandbits(128))).upper()},
+            "metadata": {
+                "camera_settings": {"iso": exif["ISOSpeedRatings"]},
+                "location": {},
+            },
+        }
+
+    if rng.random() < DESCRIPTION_RATIO:
+        metadata["vlm_description"] = {
+            "description": generate_description(rng),
+            "model": "HuggingFaceTB/SmolVLM-Instruct",
+            "processing_time": rng.uniform(2, 6),
+        }
+
+    return metadata
+
+
+def generate_library(
+    count: int, seed: int = DEFAULT_SEED, start: int = 0
+) -> Iterator[Dict[str, Any]]:
+    """
+    Generate metadata records of a synthetic library.
+
+    Args:
+        count: Number of images
+        seed: Library seed
+        start: Index of the first image
+
+    Yields:
+        Metadata records
+    """
+    for index in range(start, start + count):
+        yield generate_metadata(index, seed)
+
+
+def random_embeddings(
+    count: int, embedding_size: int = DEFAULT_EMBEDDING_SIZE, seed: int = DEFAULT_SEED
+) -> np.ndarray:
+    """
+    Generate random unit-length embeddings.
+
+    Args:
+        count: Number of embeddings
+        embedding_size: Dimensionality of the embeddings
+        seed: Random seed
+
+    Returns:
+        Float32 array of shape (count, embedding_size)
+    """
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((count, embedding_size), dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
+
+
+def add_batch(
+    db: ImageDatabase,
+    start: int,
+    count: int,
+    seed: int = DEFAULT_SEED,
+    embedding_size: int = DEFAULT_EMBEDDING_SIZE,
+    model_name: str = DEFAULT_EMBEDDING_MODEL,
+) -> int:
+    """
+    Add one batch of a synthetic library to a database.
+
+    Images are added like the importer adds them, and described images get
+    a random embedding, stored in one transaction.
+
+    Args:
+        db: ImageDatabase instance
+        start: Index of the first image
+        count: Number of images
+        seed: Library seed
+        embedding_size: Dimensionality of the embeddings (0 for none)
+        model_name: Name the embeddings are stored under
+
+    Returns:
+        Number of embeddings stored
+    """
+    embeddings = (
+        random_embeddings(count, embedding_size, seed + start)
+        if embedding_size
+        else None
+    )
+
+    pending = {}
+    for offset, metadata in enumerate(generate_library(count, seed, start)):
+        image_id = db.add_image(metadata)
+        if embeddings is not None and "vlm_description" in metadata:
+            pending[image_id] = {
+                "embedding": embeddings[offset],
+                "text": metadata["vlm_description"]["description"],
+                "model": model_name,
+            }
+
+    if pending:
+        db.batch_add_embeddings(pending)
+    return len(pending)
+
+
+def populate_database(
+    db: ImageDatabase,
+    count: int,
+    seed: int = DEFAULT_SEED,
+    embedding_size: int = DEFAULT_EMBEDDING_SIZE,
+    model_name: str = DEFAULT_EMBEDDING_MODEL,
+    batch_size: int = POPULATE_BATCH_SIZE,
+) -> int:
+    """
+    Add a synthetic library to a database in batches.
+
+    Args:
+        db: ImageDatabase instance
+        count: Number of images
+        seed: Library seed
+        embedding_size: Dimensionality of the embeddings (0 for none)
+        model_name: Name the embeddings are stored under
+        batch_size: Number of images per batch
+
+    Returns:
+        Number of embeddings stored
+    """
+    embedded = 0
+    for start in range(0, count, batch_size):
+        batch_count = min(batch_size, count - start)
+        embedded += add_batch(db, start, batch_count, seed, embedding_size, model_name)
+        logger.info(f"Added {start + batch_count} of {count} images")
+    return embedded
+
+
+def write_image_file(
+    metadata: Dict[str, Any], directory: str, size: int = 640
+) -> Optional[str]:
+    """
+    Write a small JPEG file carrying an image's EXIF data.
+
+    HEIC images are written as JPEG, since Pillow cannot encode HEIC; their
+    EXIF, including the Apple MakerNote, is the same.
+
+    Args:
+        metadata: Synthetic metadata record
+        directory: Output directory
+        size: Longest side of the written image in pixels
+
+    Returns:
+        Path to the written file
+    """
+    exif = metadata["exif"]
+    rng = random.Random(metadata["filename"])
+    width, height = metadata["width"], metadata["height"]
+    scale = size / max(width, height)
+    pixels = (max(1, int(width * scale)), max(1, int(height * scale)))
+
+    # A gradient with noise compresses like a photo, unlike a flat color
+    gradient = np.linspace(0, 255, pixels[0], dtype=np.float32)
+    array = np.empty((pixels[1], pixels[0], 3), dtype=np.uint8)
+    noise = np.random.default_rng(rng.getrandbits(32)).integers(
+        0, 40, (pixels[1], pixels[0], 3)
+    )
+    for channel in range(3):
+        array[:, :, channel] = np.clip(
+            gradient * rng.random() + noise[:, :, channel], 0, 255
+        )
+
+    date = exif["DateTimeOriginal"].replace("-", ":").replace("T", " ")
+    exif_dict = {
+        "0th": {
+            piexif.ImageIFD.Make: exif["Make"].encode(),
+            piexif.ImageIFD.Model: exif["Model"].encode(),
+            piexif.ImageIFD.DateTime: date.encode(),
+            piexif.ImageIFD.Orientation: exif["Orientation"],
+        },
+        "Exif": {
+            piexif.ExifIFD.DateTimeOriginal: date.encode(),
+            piexif.ExifIFD.ISOSpeedRatings: exif["ISOSpeedRatings"],
+        },
+        "GPS": {},
+    }
+    if "apple_makernote" in metadata:
+        device = metadata["apple_makernote"]["device"]["uuid"]
+        exif_dict["Exif"][piexif.ExifIFD.MakerNote] = (
+            b"Apple iOS\x00\x00\x01MM" + device.encode() + bytes(64)
+        )
+    if "GPS" in exif:
+        exif_dict["GPS"] = _gps_ifd(exif["GPS"]["latitude"], exif["GPS"]["longitude"])
+
+    path = os.path.join(directory, os.path.splitext(metadata["filename"])[0] + ".jpg")
+    Image.fromarray(array).save(path, "JPEG", quality=85, exif=piexif.dump(exif_dict))
+    return path
+
+
+def _gps_ifd(latitude: float, longitude: float) -> Dict[int, Any]:
+    """Build a piexif GPS IFD for decimal coordinates."""
+
+    def to_rational(value):
+        value = abs(value)
+        degrees = int(value)
+        minutes = int((value - degrees) * 60)
+        seconds = round(((value - degrees) * 60 - minutes) * 60 * 100)
+        return ((degrees, 1), (minutes, 1), (seconds, 100))
+
+    return {
+        piexif.GPSIFD.GPSLatitudeRef: b"N" if latitude >= 0 else b"S",
+        piexif.GPSIFD.GPSLatitude: to_rational(latitude),
+        piexif.GPSIFD.GPSLongitudeRef: b"E" if longitude >= 0 else b"W",
+        piexif.GPSIFD.GPSLongitude: to_rational(longitude),
+    }
+
+
+def write_image_files(
+    directory: str, count: int, seed: int = DEFAULT_SEED, size: int = 640
+) -> list:
+    """
+    Write JPEG files for the first images of a synthetic library.
+
+    Args:
+        directory: Output directory
+        count: Number of files
+        seed: Library seed
+        size: Longest side of the written images in pixels
+
+    Returns:
+        Paths of the written files
+    """
+    os.makedirs(directory, exist_ok=True)
+    return [
+        write_image_file(metadata, directory, size)
+        for metadata in generate_library(count, seed)
+    ]
+
+
+def main():
+    """Main function to generate a synthetic library."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic photo library")
+    parser.add_argument(
+        "--count", type=int, default=1000, help="Number of images (default: 1000)"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=DEFAULT_SEED, help="Library seed (default: 42)"
+    )
+    parser.add_argument("--db", help="Populate this database with the library")
+    parser.add_argument(
+        "--embedding-size",
+        type=int,
+        default=DEFAULT_EMBEDDING_SIZE,
+        help=f"Random embedding dimensions (default: {DEFAULT_EMBEDDING_SIZE}, 0 for none)",
+    )
+    parser.add_argument("--images-dir", help="Write JPEG files to this directory")
+    parser.add_argument(
+        "--image-size",
+        type=int,
+        default=640,
+        help="Longest side of written images in pixels (default: 640)",
+    )
+    args = parser.parse_args()
+
+    if not args.db and not args.images_dir:
+        parser.error("Specify --db and/or --images-dir")
+
+    if args.db:
+        db = ImageDatabase(args.db)
+        embedded = populate_database(
+            db, args.count, seed=args.seed, embedding_size=args.embedding_size
+        )
+        print(f"Added {args.count} images and {embedded} embeddings to {args.db}")
+
+    if args.images_dir:
+        paths = write_image_files(
+            args.images_dir, args.count, seed=args.seed, size=args.image_size
+        )
+        print(f"Wrote {len(paths)} images to {args.images_dir}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
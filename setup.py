@@ -13,7 +13,7 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     install_requires=[
-        "flask",
+        "flask[async]",
         "flask-cors",
         "pillow",
         "piexif",
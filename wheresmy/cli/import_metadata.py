@@ -11,9 +11,11 @@ import logging
 
 # from pathlib import Path
 
+from wheresmy.core import duplicates
 from wheresmy.core.database import ImageDatabase
 from wheresmy.utils.thumbnail import create_thumbnail
 from wheresmy.core.text_embeddings import TextEmbeddingGenerator
+from wheresmy.utils import metrics
 
 # Configure logging
 logging.basicConfig(
@@ -23,16 +25,101 @@ logger = logging.getLogger(__name__)
 
 # Constants
 THUMBNAIL_DIR = os.path.join("wheresmy", "static", "images", "thumbnails")
+EMBEDDING_BATCH_SIZE = 256
 
 
-def import_metadata(json_path, db_path, generate_embeddings=True):
+def add_thumbnail_hash(metadata, thumbnail_file):
+    """
+    Add the perceptual hash of a thumbnail to metadata extracted without one.
+
+    Args:
+        metadata: Image metadata
+        thumbnail_file: Path to the thumbnail of the image
+    """
+    if metadata.get("phash"):
+        return
+    phash = duplicates.image_hash(thumbnail_file)
+    if phash is not None:
+        metadata["phash"] = duplicates.format_hash(phash)
+
+
+def get_description_text(metadata):
+    """Return the VLM description of an image's metadata, or None."""
+    vlm = metadata.get("vlm_description")
+    if isinstance(vlm, dict) and vlm.get("description"):
+        return vlm["description"]
+    return None
+
+
+def flush_embeddings(db, embedding_generator, pending, encode_batch_size=None):
+    """
+    Encode pending descriptions and store them in a single transaction.
+
+    Args:
+        db: ImageDatabase instance
+        embedding_generator: TextEmbeddingGenerator instance
+        pending: List of (image_id, description_text) tuples; cleared on return
+        encode_batch_size: Optional number of texts per model forward pass
+
+    Returns:
+        Number of embeddings stored
+    """
+    if not pending:
+        return 0
+
+    image_ids = [image_id for image_id, _ in pending]
+    texts = [text for _, text in pending]
+    pending.clear()
+
+    logger.info(f"Generating embeddings for {len(texts)} descriptions")
+    # The database doubles as the embedding cache, so descriptions that
+    # were embedded by an earlier import are not re-encoded
+    kwargs = {"cache": db}
+    if encode_batch_size:
+        kwargs["batch_size"] = encode_batch_size
+    embedding_results = embedding_generator.generate_embeddings(texts, **kwargs)
+
+    embeddings_dict = {}
+    for image_id, embedding_result in zip(image_ids, embedding_results):
+        if "error" in embedding_result:
+            logger.error(
+                f"Error generating embedding for image ID {image_id}: "
+                f"{embedding_result.get('error')}"
+            )
+            continue
+        embeddings_dict[image_id] = embedding_result
+
+    try:
+        results = db.batch_add_embeddings(embeddings_dict)
+    except Exception as e:
+        logger.error(f"Error storing embeddings: {str(e)}")
+        return 0
+
+    stored = sum(1 for embedding_id in results.values() if embedding_id is not None)
+    logger.info(f"Stored {stored} embeddings")
+    return stored
+
+
+def import_metadata(
+    json_path,
+    db_path,
+    generate_embeddings=True,
+    batch_size=EMBEDDING_BATCH_SIZE,
+    encode_batch_size=None,
+):
     """
     Import metadata from a JSON file into the database.
 
+    Descriptions are collected into batches of ``batch_size`` images, each
+    batch is encoded with a single model call and written to the database in
+    one transaction.
+
     Args:
         json_path: Path to the JSON metadata file
         db_path: Path to the database file
         generate_embeddings: Whether to generate embeddings for VLM descriptions
+        batch_size: Number of descriptions to accumulate before embedding them
+        encode_batch_size: Optional number of texts per model forward pass
     """
     # Check if the file exists
     if not os.path.exists(json_path):
@@ -73,6 +160,9 @@ def import_metadata(json_path, db_path, generate_embeddings=True):
     thumbnail_path = os.path.join(project_root, THUMBNAIL_DIR)
     os.makedirs(thumbnail_path, exist_ok=True)
 
+    # (image_id, description) pairs waiting to be embedded
+    pending_embeddings = []
+
     # Check if it's a single image or a directory
     if isinstance(metadata, dict) and "filename" in metadata:
         # Single image
@@ -96,39 +186,15 @@ def import_metadata(json_path, db_path, generate_embeddings=True):
                 metadata["thumbnail"] = os.path.join(
                     "static", "images", "thumbnails", thumbnail
                 )
+                add_thumbnail_hash(metadata, os.path.join(thumbnail_path, thumbnail))
 
         # Add to database
         image_id = db.add_image(metadata)
 
-        # Generate and store embeddings if VLM description exists
-        if (
-            embedding_generator
-            and "vlm_description" in metadata
-            and "description" in metadata["vlm_description"]
-        ):
-            try:
-                description_text = metadata["vlm_description"]["description"]
-                logger.info(
-                    f"Generating embedding for description: {description_text[:50]}..."
-                )
-
-                # Generate the embedding
-                embedding_result = embedding_generator.generate_embedding(
-                    description_text
-                )
-
-                # Store the embedding in the database
-                if "error" not in embedding_result:
-                    db.add_embedding(image_id, embedding_result)
-                    logger.info(
-                        f"Embedding stored successfully for image ID {image_id}"
-                    )
-                else:
-                    logger.error(
-                        f"Error generating embedding: {embedding_result.get('error')}"
-                    )
-            except Exception as e:
-                logger.error(f"Error processing embedding: {str(e)}")
+        # Queue the VLM description for embedding
+        description_text = get_description_text(metadata)
+        if embedding_generator and description_text:
+            pending_embeddings.append((image_id, description_text))
 
         count = 1
     elif isinstance(metadata, dict):
@@ -152,40 +218,22 @@ def import_metadata(json_path, db_path, generate_embeddings=True):
                     img_metadata["thumbnail"] = os.path.join(
                         "static", "images", "thumbnails", thumbnail
                     )
+                    add_thumbnail_hash(
+                        img_metadata, os.path.join(thumbnail_path, thumbnail)
+                    )
 
             # Add to database
             image_id = db.add_image(img_metadata)
 
-            # Generate and store embeddings if VLM description exists
-            if (
-                embedding_generator
-                and "vlm_description" in img_metadata
-                and "description" in img_metadata["vlm_description"]
-            ):
-                try:
-                    description_text = img_metadata["vlm_description"]["description"]
-                    logger.info(
-                        f"Generating embedding for description: {description_text[:50]}..."
+            # Queue the VLM description for embedding, flushing full batches
+            description_text = get_description_text(img_metadata)
+            if embedding_generator and description_text:
+                pending_embeddings.append((image_id, description_text))
+                if len(pending_embeddings) >= batch_size:
+                    flush_embeddings(
+                        db, embedding_generator, pending_embeddings, encode_batch_size
                     )
 
-                    # Generate the embedding
-                    embedding_result = embedding_generator.generate_embedding(
-                        description_text
-                    )
-
-                    # Store the embedding in the database
-                    if "error" not in embedding_result:
-                        db.add_embedding(image_id, embedding_result)
-                        logger.info(
-                            f"Embedding stored successfully for image ID {image_id}"
-                        )
-                    else:
-                        logger.error(
-                            f"Error generating embedding: {embedding_result.get('error')}"
-                        )
-                except Exception as e:
-                    logger.error(f"Error processing embedding: {str(e)}")
-
             count += 1
 
             # Log progress
@@ -195,6 +243,13 @@ def import_metadata(json_path, db_path, generate_embeddings=True):
         logger.error("Unsupported metadata format")
         return False
 
+    # Embed any remaining descriptions
+    if embedding_generator:
+        flush_embeddings(db, embedding_generator, pending_embeddings, encode_batch_size)
+
+    # Merge the index segments written image by image
+    db.optimize_search_index()
+
     # Get stats
     stats = db.get_stats()
     logger.info(f"Successfully imported {count} images")
@@ -215,15 +270,37 @@ def main():
         action="store_true",
         help="Disable automatic generation of text embeddings for VLM descriptions",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=EMBEDDING_BATCH_SIZE,
+        help="Number of descriptions to embed and store per transaction "
+        f"(default: {EMBEDDING_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--encode-batch-size",
+        type=int,
+        help="Number of texts per embedding model forward pass",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a latency breakdown per stage to stderr",
+    )
 
     args = parser.parse_args()
 
     # Generate embeddings by default, unless explicitly disabled with --no-embeddings
     generate_embeddings = not args.no_embeddings
 
-    success = import_metadata(
-        args.json_path, args.db, generate_embeddings=generate_embeddings
-    )
+    with metrics.profiling(args.profile):
+        success = import_metadata(
+            args.json_path,
+            args.db,
+            generate_embeddings=generate_embeddings,
+            batch_size=max(1, args.batch_size),
+            encode_batch_size=args.encode_batch_size,
+        )
     return 0 if success else 1
 
 
@@ -10,8 +10,10 @@ import logging
 
 # from pathlib import Path
 
-from wheresmy.web_app import app
-from wheresmy.core.database import ImageDatabase
+from wheresmy.web_app import create_app, create_placeholder_image, get_db
+from wheresmy.server import SERVERS, DEFAULT_THREADS, serve
+from wheresmy.search import search as search_utils
+from wheresmy.responses import precompress_static
 
 # Configure logging
 logging.basicConfig(
@@ -32,36 +34,139 @@ def main():
     )
     parser.add_argument("--debug", action="store_true", help="Run in debug mode")
 
-    args = parser.parse_args()
+    # Production serving options
+    server_group = parser.add_argument_group("Server Options")
+    server_group.add_argument(
+        "--server",
+        choices=("auto",) + SERVERS,
+        default="auto",
+        help="WSGI server to use (default: gunicorn, then waitress, then dev)",
+    )
+    server_group.add_argument(
+        "--workers", type=int, help="Number of worker processes (gunicorn)"
+    )
+    server_group.add_argument(
+        "--threads",
+        type=int,
+        default=DEFAULT_THREADS,
+        help=f"Number of request threads per worker (default: {DEFAULT_THREADS})",
+    )
+    server_group.add_argument(
+        "--no-preload",
+        action="store_true",
+        help="Do not load the embedding model and vectors before serving",
+    )
+    server_group.add_argument("--model", help="Embedding model to preload")
+    server_group.add_argument(
+        "--quantize",
+        action="store_true",
+        help="Use dynamic int8 quantization for CPU query embedding",
+    )
+    server_group.add_argument(
+        "--inference-threads",
+        type=int,
+        help="Number of CPU threads per worker for query embedding",
+    )
 
-    # Set database path in web_app module
-    import wheresmy.web_app
+    server_group.add_argument(
+        "--cache-dir",
+        help="Directory of an on-disk search result cache shared by workers",
+    )
+    server_group.add_argument(
+        "--cache-size",
+        type=int,
+        default=search_utils.DEFAULT_CACHE_ENTRIES,
+        help="Number of search results kept in memory per worker "
+        f"(default: {search_utils.DEFAULT_CACHE_ENTRIES}, 0 disables caching)",
+    )
 
-    wheresmy.web_app.db = ImageDatabase(args.db)
+    server_group.add_argument(
+        "--x-sendfile",
+        action="store_true",
+        help="Let a front-end web server (nginx, Apache) send image files",
+    )
+    server_group.add_argument(
+        "--no-compress",
+        action="store_true",
+        help="Do not compress responses (e.g. when a reverse proxy does)",
+    )
+    server_group.add_argument(
+        "--slow-query-ms",
+        type=float,
+        help="Log database queries slower than this with their query plans",
+    )
+    server_group.add_argument(
+        "--slow-query-log",
+        help="Append slow queries to this file as JSON lines (for db-analyze)",
+    )
+
+    args = parser.parse_args()
 
     # Make sure templates and static directories exist
     os.makedirs("templates", exist_ok=True)
     os.makedirs("static/css", exist_ok=True)
     os.makedirs("static/js", exist_ok=True)
 
-    # Get database stats
+    # Create placeholder image for missing thumbnails
+    create_placeholder_image()
+
+    # Create the application; the debug server reloads, so skip preloading
     try:
-        stats = wheresmy.web_app.db.get_stats()
+        app = create_app(
+            args.db,
+            preload=not (args.no_preload or args.debug),
+            embedding_model=args.model,
+            inference_options={
+                "quantize": args.quantize or None,
+                "num_threads": args.inference_threads,
+            },
+            cache_options={
+                "enabled": args.cache_size > 0,
+                "max_entries": args.cache_size,
+                "directory": args.cache_dir,
+            },
+            compress_responses=not args.no_compress,
+        )
+        app.config["USE_X_SENDFILE"] = args.x_sendfile
+        if args.slow_query_ms is not None:
+            app.config["IMAGE_DB"].enable_slow_query_log(
+                args.slow_query_ms, log_path=args.slow_query_log
+            )
+        with app.app_context():
+            stats = get_db().get_stats()
         logger.info(f"Starting web app with {stats['total_images']} images in database")
     except Exception as e:
         logger.error(f"Error accessing database: {str(e)}")
         return 1
 
+    # Precompressed static files are an optimization; serve without them
+    # if the static folder is read-only
+    if not args.no_compress:
+        try:
+            precompress_static(app.static_folder)
+        except OSError as e:
+            logger.warning(f"Could not precompress static files: {str(e)}")
+
     # Print URL
-    url = f"http://{'localhost' if args.host in ['0.0.0.0', '127.0.0.1']
-                    else args.host}:{args.port}"
+    display_host = "localhost" if args.host in ["0.0.0.0", "127.0.0.1"] else args.host
+    url = f"http://{display_host}:{args.port}"
     print("\nWhere's My Photo is running!")
     print(f"Open your browser and navigate to: {url}")
     print("\nPress Ctrl+C to stop the server...\n")
 
     try:
         # Run the application
-        app.run(host=args.host, port=args.port, debug=args.debug)
+        if args.debug:
+            app.run(host=args.host, port=args.port, debug=True)
+        else:
+            serve(
+                app,
+                host=args.host,
+                port=args.port,
+                server=args.server,
+                workers=args.workers,
+                threads=args.threads,
+            )
         return 0
     except KeyboardInterrupt:
         print("\nWeb app stopped by user")
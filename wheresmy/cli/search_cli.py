@@ -7,19 +7,18 @@ requiring the web interface. It demonstrates how to use the search_utils and
 stats_utils modules.
 """
 
-# import os
+import os
 import sys
 import json
+import signal
 import argparse
 import logging
-
-# from typing import Any
-
-from wheresmy.core.database import ImageDatabase
+from typing import Any, Dict, List, Optional, Tuple
 
 # from wheresmy.core.text_embeddings import TextEmbeddingGenerator
-from wheresmy.search import search as search_utils
-from wheresmy.search import stats as stats_utils
+from wheresmy.core import geo
+from wheresmy.search import daemon
+from wheresmy.utils import metrics
 
 # Configure logging
 logging.basicConfig(
@@ -27,6 +26,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Radius of --gps searches given as latitude,longitude only
+DEFAULT_GPS_RADIUS_KM = 1.0
+
+# Search options the daemon cannot apply per request; searches using them
+# run in-process
+IN_PROCESS_OPTIONS = (
+    "no_cache",
+    "cache_dir",
+    "quantize",
+    "threads",
+    "max_seq_length",
+    "backend",
+)
+
 
 def print_command_help():
     """Print helpful usage information."""
@@ -41,6 +54,13 @@ def print_command_help():
     )
     print("  stats   - Show database statistics")
     print("  image   - Show detailed information about a specific image by ID")
+    print("  models  - List embedding models or change the default model")
+    print("  reembed - Generate embeddings of a new model for all images")
+    print("  export  - Export the catalogue to JSONL, CSV, Parquet or npz")
+    print("  serve   - Keep the embedding model loaded for fast searches")
+    print("  geocode - Add place names to geotagged images from a local gazetteer")
+    print("  duplicates - List groups of duplicate and near-duplicate images")
+    print("  db-analyze - Update planner statistics and suggest missing indexes")
     print("\nExamples:")
     print("  # Search for all images taken in 2018")
     print("  wheresmy_search search --year 2018")
@@ -48,6 +68,13 @@ def print_command_help():
     print("  wheresmy_search search --camera-make Apple")
     print("  # Search for high-resolution images")
     print("  wheresmy_search search --min-width 3000 --min-height 2000")
+    print("  # Search for images taken within 2 km of a location")
+    print("  wheresmy_search search --gps 48.8584,2.2945,2")
+    print("  # Name the places of geotagged photos, then search by place")
+    print("  wheresmy_search geocode cities1000.zip")
+    print("  wheresmy_search search --place Paris")
+    print("  # List burst shots and re-uploaded copies")
+    print("  wheresmy_search duplicates")
     print("  # Search by image content (using VLM descriptions)")
     print('  wheresmy_search search --content "beach sunset"')
     print("  # Semantic search (using embeddings)")
@@ -60,10 +87,487 @@ def print_command_help():
     print("  wheresmy_search stats")
     print("  # Show details for a specific image")
     print("  wheresmy_search image 123")
+    print("  # Migrate to a new embedding model, then make it the default")
+    print("  wheresmy_search reembed all-mpnet-base-v2")
+    print("  # Export the catalogue with embeddings for analysis")
+    print("  wheresmy_search export catalogue.parquet")
+    print("  # Keep the model loaded; later searches connect to it automatically")
+    print("  wheresmy_search serve &")
+    print("  # Log queries slower than 50 ms, then check their plans")
+    print(
+        "  wheresmy_search --slow-query-ms 50 --slow-query-log slow.jsonl search --year 2018"
+    )
+    print("  wheresmy_search db-analyze --slow-log slow.jsonl")
     print("\nFor complete command details, use: wheresmy_search <command> --help")
     print("")
 
 
+def add_daemon_arguments(parser: Any) -> None:
+    """Add the options selecting the search daemon to a parser or group."""
+    parser.add_argument(
+        "--socket",
+        help="Search daemon socket (default: derived from the database path)",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Search in this process even if a search daemon is running",
+    )
+
+
+def add_filter_arguments(
+    context_group: argparse._ArgumentGroup, props_group: argparse._ArgumentGroup
+) -> None:
+    """
+    Add the filter options shared by the search and export commands.
+
+    Args:
+        context_group: Group of the camera and date filters
+        props_group: Group of the size and location filters
+    """
+    context_group.add_argument("--camera-make", help="Filter by camera manufacturer")
+    context_group.add_argument("--camera-model", help="Filter by camera model")
+    context_group.add_argument("--date-start", help="Filter by start date (YYYY-MM-DD)")
+    context_group.add_argument("--date-end", help="Filter by end date (YYYY-MM-DD)")
+    context_group.add_argument("--year", type=int, help="Filter by specific year")
+    context_group.add_argument(
+        "--month", type=int, help="Filter by specific month (1-12)"
+    )
+
+    props_group.add_argument("--min-width", type=int, help="Filter by minimum width")
+    props_group.add_argument("--min-height", type=int, help="Filter by minimum height")
+    props_group.add_argument(
+        "--gps",
+        help="Filter by GPS location (latitude,longitude[,radius_km]); "
+        f"the radius defaults to {DEFAULT_GPS_RADIUS_KM:g} km",
+    )
+    props_group.add_argument(
+        "--place", help="Filter by city, region or country (see the geocode command)"
+    )
+    props_group.add_argument(
+        "--bbox",
+        help="Filter by bounding box (min_lat,min_lon,max_lat,max_lon)",
+    )
+
+
+def build_filters(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Translate the filter arguments of the search and export commands.
+
+    Args:
+        args: Parsed arguments with the options of add_filter_arguments
+
+    Returns:
+        Keyword arguments of search_images and ImageDatabase.iter_images
+    """
+    # Process date arguments
+    date_start = args.date_start
+    date_end = args.date_end
+
+    # Handle year/month arguments
+    if args.year:
+        if not date_start:
+            date_start = f"{args.year}-01-01"
+        if not date_end:
+            date_end = f"{args.year}-12-31"
+
+        # Add month constraint if specified
+        if args.month and 1 <= args.month <= 12:
+            month_str = f"{args.month:02d}"
+            date_start = f"{args.year}-{month_str}-01"
+
+            # Determine last day of month (simplified)
+            last_day = 30
+            if args.month in [1, 3, 5, 7, 8, 10, 12]:
+                last_day = 31
+            elif args.month == 2:
+                last_day = 29 if args.year % 4 == 0 else 28
+
+            date_end = f"{args.year}-{month_str}-{last_day}"
+
+    # Process GPS coordinates if provided
+    near = None
+    if args.gps:
+        try:
+            parts = args.gps.split(",")
+            if len(parts) == 2:
+                parts.append(DEFAULT_GPS_RADIUS_KM)
+            near = geo.parse_near(parts)
+        except ValueError:
+            logger.warning(
+                "Invalid GPS coordinates format. Use latitude,longitude[,radius_km]"
+            )
+
+    bbox = None
+    if args.bbox:
+        try:
+            bbox = geo.parse_bbox(args.bbox.split(","))
+        except ValueError as e:
+            logger.warning(f"Invalid bounding box: {e}")
+
+    return {
+        "text_query": args.query,
+        "camera_make": args.camera_make,
+        "camera_model": args.camera_model,
+        "date_start": date_start,
+        "date_end": date_end,
+        "min_width": args.min_width,
+        "min_height": args.min_height,
+        "bbox": bbox,
+        "near": near,
+        "place": args.place,
+    }
+
+
+def build_search_request(args: argparse.Namespace) -> Tuple[str, Dict[str, Any]]:
+    """
+    Translate search arguments into a search function and its parameters.
+
+    Args:
+        args: Parsed arguments of the search command
+
+    Returns:
+        Tuple of the search_utils function name and its keyword arguments
+    """
+    if args.semantic:
+        logger.info(f"Performing semantic search with query: {args.semantic}")
+        return "semantic_search", {
+            "query": args.semantic,
+            "embedding_model": args.model,
+            "limit": args.limit,
+        }
+
+    if args.hybrid:
+        logger.info(f"Performing hybrid search with query: {args.hybrid}")
+
+        # Validate weight is between 0 and 1
+        weight = max(0.0, min(1.0, args.weight))
+        if weight != args.weight:
+            logger.warning(f"Weight value {args.weight} out of range, using {weight}")
+
+        return "hybrid_search", {
+            "query": args.hybrid,
+            "embedding_model": args.model,
+            "text_weight": weight,
+            "limit": args.limit,
+        }
+
+    filters = build_filters(args)
+    if args.content:
+        if filters["text_query"]:
+            filters["text_query"] = f"{filters['text_query']} {args.content}"
+        else:
+            filters["text_query"] = args.content
+
+    return "search_images", {**filters, "limit": args.limit, "offset": args.offset}
+
+
+def call_daemon(
+    args: argparse.Namespace, method: str, **params: Any
+) -> Tuple[bool, Any]:
+    """
+    Run a search function in the search daemon serving the database.
+
+    Args:
+        args: Parsed arguments with the database and socket paths
+        method: Name of the search_utils function
+        **params: Keyword arguments of the function
+
+    Returns:
+        Tuple of whether a daemon handled the call, and its result
+    """
+    # Profiles and slow query logs describe queries run in this process, and
+    # the daemon answers with its own inference and result cache settings
+    if args.no_daemon or args.profile or args.slow_query_ms is not None:
+        return False, None
+    if any(getattr(args, option, None) for option in IN_PROCESS_OPTIONS):
+        return False, None
+
+    client = daemon.connect(args.db, socket_path=args.socket)
+    if client is None:
+        return False, None
+
+    try:
+        return True, client.call(method, **params)
+    except OSError as e:
+        logger.warning(f"Search daemon unavailable, searching in-process: {str(e)}")
+        return False, None
+
+
+def serve_daemon(args: argparse.Namespace) -> int:
+    """
+    Run the search daemon until it is interrupted or terminated.
+
+    Args:
+        args: Parsed arguments of the serve command
+
+    Returns:
+        Exit code
+    """
+    if not daemon.daemon_supported():
+        logger.error("The search daemon requires Unix domain sockets")
+        return 1
+
+    from wheresmy.search import search as search_utils
+
+    search_utils.configure_inference(
+        quantize=args.quantize or None,
+        num_threads=args.threads,
+        max_seq_length=args.max_seq_length,
+        backend=args.backend,
+    )
+    search_utils.configure_cache(
+        enabled=args.cache_size > 0,
+        max_entries=args.cache_size,
+        directory=args.cache_dir,
+    )
+
+    # Exit through serve_forever's cleanup, which removes the socket
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        search_daemon = daemon.SearchDaemon(
+            args.db, socket_path=args.socket, embedding_model=args.model
+        )
+        enable_slow_query_log(search_daemon.db, args)
+        print(f"Search daemon listening on {search_daemon.socket_path}")
+        search_daemon.serve_forever()
+        return 0
+    except KeyboardInterrupt:
+        print("\nSearch daemon stopped by user")
+        return 0
+    except Exception as e:
+        logger.error(f"Error running search daemon: {str(e)}")
+        return 1
+
+
+def enable_slow_query_log(db: Any, args: argparse.Namespace) -> None:
+    """
+    Enable the slow query log of a database if --slow-query-ms was given.
+
+    Args:
+        db: ImageDatabase
+        args: Parsed arguments with the slow query options
+    """
+    if args.slow_query_ms is not None:
+        db.enable_slow_query_log(args.slow_query_ms, log_path=args.slow_query_log)
+
+
+def print_analysis(report: Dict[str, Any], args: argparse.Namespace) -> int:
+    """
+    Print a database analysis report.
+
+    Args:
+        report: Report from query_analysis.analyze_database()
+        args: Parsed arguments with the output options
+
+    Returns:
+        Exit code
+    """
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+        return 0
+
+    print(f"ANALYZE completed in {report['analyze_seconds']:.2f} seconds")
+
+    print("\nTables:")
+    for table in report["tables"]:
+        print(f"  {table['name']}: {table['rows']} rows")
+
+    print("\nIndexes (used by N of the checked queries):")
+    for index in report["indexes"]:
+        columns = ", ".join(index["columns"])
+        stat = f", stat {index['stat']}" if index["stat"] else ""
+        print(
+            f"  {index['name']} ON {index['table']}({columns}): "
+            f"{index['used_by']}{stat}"
+        )
+
+    print("\nQuery plans:")
+    for query in report["queries"]:
+        print(f"  {query['name']}")
+        for step in query["plan"] or ["(no plan)"]:
+            print(f"    {step}")
+
+    print("\nSuggestions:")
+    if not report["suggestions"]:
+        print("  None; the checked queries use indexes")
+    for suggestion in report["suggestions"]:
+        print(f"  {suggestion['reason']}")
+        print(f"    {suggestion.get('sql') or suggestion.get('note')}")
+    return 0
+
+
+def print_search_results(
+    results: List[Dict[str, Any]], args: argparse.Namespace
+) -> int:
+    """
+    Print search results as JSON or text.
+
+    Args:
+        results: Search results
+        args: Parsed arguments of the search command
+
+    Returns:
+        Exit code
+    """
+    if args.ndjson:
+        for result in results:
+            sys.stdout.write(json.dumps(result, default=str) + "\n")
+        sys.stdout.flush()
+        return 0
+
+    if args.json:
+        print(json.dumps(results, indent=2, default=str))
+        return 0
+
+    if not results:
+        print("No results found")
+        return 0
+
+    print(f"Found {len(results)} results:")
+    for result in results:
+        print(f"\nID: {result.get('id')}")
+        print(f"Filename: {result.get('filename')}")
+        print(f"Path: {result.get('file_path')}")
+        print(f"Size: {result.get('width')}x{result.get('height')}")
+
+        if result.get("capture_date"):
+            print(f"Date: {result.get('capture_date')}")
+
+        if result.get("camera_make") or result.get("camera_model"):
+            camera = []
+            if result.get("camera_make"):
+                camera.append(result["camera_make"])
+            if result.get("camera_model"):
+                camera.append(result["camera_model"])
+            print(f"Camera: {' '.join(camera)}")
+
+        # Show GPS coordinates if available
+        if result.get("gps_lat") and result.get("gps_lon"):
+            print(f"Location: {result.get('gps_lat')}, {result.get('gps_lon')}")
+
+        place = format_place(result)
+        if place:
+            print(f"Place: {place}")
+
+        # Show content description
+        if result.get("description"):
+            desc = result["description"]
+            if len(desc) > 80 and not args.full_desc:
+                desc = desc[:80] + "..."
+            print(f"Content: {desc}")
+
+        # Show similarity score for semantic search results
+        if result.get("similarity") is not None:
+            print(f"Similarity: {result['similarity']:.4f}")
+
+        # Show combined score for hybrid search results
+        if result.get("combined_score") is not None:
+            print(f"Combined Score: {result['combined_score']:.4f}")
+
+    return 0
+
+
+def format_place(image: Dict[str, Any]) -> str:
+    """
+    Format the place name of an image.
+
+    Args:
+        image: Image data
+
+    Returns:
+        Comma-separated city, region and country, or an empty string
+    """
+    names = (image.get(f"place_{part}") for part in ("city", "region", "country"))
+    return ", ".join(name for name in names if name)
+
+
+def print_image(image: Optional[Dict[str, Any]], args: argparse.Namespace) -> int:
+    """
+    Print the details of an image as JSON or text.
+
+    Args:
+        image: Image data, or None if the image was not found
+        args: Parsed arguments of the image command
+
+    Returns:
+        Exit code
+    """
+    if not image:
+        print(f"Image with ID {args.id} not found")
+        return 1
+
+    if args.json:
+        print(json.dumps(image, indent=2, default=str))
+        return 0
+
+    print(f"ID: {image.get('id')}")
+    print(f"Filename: {image.get('filename')}")
+    print(f"Path: {image.get('file_path')}")
+    print(f"Size: {image.get('width')}x{image.get('height')}")
+    print(f"Format: {image.get('format')}")
+
+    if image.get("capture_date"):
+        print(f"Date: {image.get('capture_date')}")
+
+    if image.get("camera_make") or image.get("camera_model"):
+        camera = []
+        if image.get("camera_make"):
+            camera.append(image["camera_make"])
+        if image.get("camera_model"):
+            camera.append(image["camera_model"])
+        print(f"Camera: {' '.join(camera)}")
+
+    if image.get("description"):
+        print("\nDescription:")
+        print(image["description"])
+
+    if image.get("gps_lat") and image.get("gps_lon"):
+        print(f"\nGPS: {image['gps_lat']}, {image['gps_lon']}")
+
+    place = format_place(image)
+    if place:
+        print(f"Place: {place}")
+
+    return 0
+
+
+def print_duplicates(
+    groups: List[List[Dict[str, Any]]], args: argparse.Namespace
+) -> int:
+    """
+    Print groups of duplicate images as JSON or text.
+
+    Args:
+        groups: Groups of images, as returned by find_duplicates
+        args: Parsed arguments of the duplicates command
+
+    Returns:
+        Exit code
+    """
+    if args.json:
+        print(json.dumps(groups, indent=2, default=str))
+        return 0
+
+    if not groups:
+        print("No duplicates found")
+        return 0
+
+    for i, group in enumerate(groups, 1):
+        print(f"\nGroup {i} ({len(group)} images):")
+        for image in group:
+            print(
+                f"  [{image['id']}] {image.get('file_path')} "
+                f"(distance {image['distance']})"
+            )
+
+    print(
+        f"\n{sum(len(group) - 1 for group in groups)} duplicates in {len(groups)} groups"
+    )
+    return 0
+
+
 def main():
     """Main function to parse command-line arguments and execute commands."""
     parser = argparse.ArgumentParser(description="Search and retrieve image metadata")
@@ -73,6 +577,20 @@ def main():
     parser.add_argument(
         "--help-examples", action="store_true", help="Show usage examples"
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Search in-process and print a latency breakdown per stage to stderr",
+    )
+    parser.add_argument(
+        "--slow-query-ms",
+        type=float,
+        help="Search in-process and log queries slower than this with their plans",
+    )
+    parser.add_argument(
+        "--slow-query-log",
+        help="Append slow queries to this file as JSON lines (for db-analyze)",
+    )
 
     # Create subparsers for commands
     subparsers = parser.add_subparsers(dest="command", help="Command to execute")
@@ -104,24 +622,27 @@ def main():
     semantic_group.add_argument(
         "--model", help="Embedding model to use (default: all-MiniLM-L6-v2)"
     )
-
-    # Context search
-    context_group = search_parser.add_argument_group("Context Search")
-    context_group.add_argument("--camera-make", help="Filter by camera manufacturer")
-    context_group.add_argument("--camera-model", help="Filter by camera model")
-    context_group.add_argument("--date-start", help="Filter by start date (YYYY-MM-DD)")
-    context_group.add_argument("--date-end", help="Filter by end date (YYYY-MM-DD)")
-    context_group.add_argument("--year", type=int, help="Filter by specific year")
-    context_group.add_argument(
-        "--month", type=int, help="Filter by specific month (1-12)"
+    semantic_group.add_argument(
+        "--quantize",
+        action="store_true",
+        help="Use dynamic int8 quantization for CPU query embedding",
+    )
+    semantic_group.add_argument(
+        "--threads", type=int, help="Number of CPU threads for query embedding"
+    )
+    semantic_group.add_argument(
+        "--max-seq-length", type=int, help="Maximum tokens per query embedding"
+    )
+    semantic_group.add_argument(
+        "--backend",
+        choices=["torch", "onnx"],
+        help="Inference backend for query embedding (default: torch)",
     )
 
-    # Image properties
-    props_group = search_parser.add_argument_group("Image Properties")
-    props_group.add_argument("--min-width", type=int, help="Filter by minimum width")
-    props_group.add_argument("--min-height", type=int, help="Filter by minimum height")
-    props_group.add_argument(
-        "--gps", help="Filter by GPS location (latitude,longitude,radius_km)"
+    # Context search and image properties
+    add_filter_arguments(
+        search_parser.add_argument_group("Context Search"),
+        search_parser.add_argument_group("Image Properties"),
     )
 
     # Output options
@@ -141,10 +662,29 @@ def main():
     output_group.add_argument(
         "--json", action="store_true", help="Output in JSON format"
     )
+    output_group.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="Stream results as one JSON object per line (--limit 0 for all)",
+    )
     output_group.add_argument(
         "--full-desc", action="store_true", help="Show full descriptions"
     )
 
+    # Result cache options
+    cache_group = search_parser.add_argument_group("Result Cache")
+    cache_group.add_argument(
+        "--cache-dir",
+        help="Directory of an on-disk result cache shared between runs",
+    )
+    cache_group.add_argument(
+        "--no-cache", action="store_true", help="Do not use cached results"
+    )
+
+    # Search daemon options
+    daemon_group = search_parser.add_argument_group("Search Daemon")
+    add_daemon_arguments(daemon_group)
+
     # Stats command
     stats_parser = subparsers.add_parser("stats", help="Show database statistics")
     stats_parser.add_argument(
@@ -165,163 +705,244 @@ def main():
     image_parser.add_argument(
         "--json", action="store_true", help="Output in JSON format"
     )
+    add_daemon_arguments(image_parser)
+
+    # Models command
+    models_parser = subparsers.add_parser(
+        "models", help="List embedding models or change the default model"
+    )
+    models_parser.add_argument(
+        "--set-default", metavar="MODEL", help="Make MODEL the default model"
+    )
+    models_parser.add_argument(
+        "--json", action="store_true", help="Output in JSON format"
+    )
+
+    # Re-embed command
+    reembed_parser = subparsers.add_parser(
+        "reembed", help="Generate embeddings of a new model for all images"
+    )
+    reembed_parser.add_argument("model", help="Sentence-transformers model name")
+    reembed_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=256,
+        help="Number of descriptions embedded per batch (default: 256)",
+    )
+    reembed_parser.add_argument(
+        "--no-switch",
+        action="store_true",
+        help="Do not make the model the default once all images are embedded",
+    )
+
+    # Export command
+    export_parser = subparsers.add_parser(
+        "export", help="Export the catalogue to JSONL, CSV, Parquet or npz"
+    )
+    export_parser.add_argument(
+        "output", help="Output file, or - for JSONL/CSV on standard output"
+    )
+    export_parser.add_argument(
+        "--format",
+        choices=["jsonl", "csv", "parquet", "npz"],
+        help="Export format (default: from the output file extension, else jsonl)",
+    )
+    export_parser.add_argument("--query", help="Only export images matching TEXT")
+    filter_group = export_parser.add_argument_group("Filters")
+    add_filter_arguments(filter_group, filter_group)
+    export_parser.add_argument(
+        "--after-id",
+        type=int,
+        default=0,
+        help="Only export images with a greater ID (to resume an export)",
+    )
+    export_parser.add_argument(
+        "--model", help="Embedding model to export (default: the default model)"
+    )
+    export_parser.add_argument(
+        "--no-embeddings",
+        action="store_true",
+        help="Do not include embeddings in Parquet exports",
+    )
+
+    # Serve command
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run a search daemon that keeps the embedding model loaded"
+    )
+    serve_parser.add_argument(
+        "--socket", help="Unix socket path (default: derived from the database path)"
+    )
+    serve_parser.add_argument("--model", help="Embedding model to preload")
+    serve_parser.add_argument(
+        "--quantize",
+        action="store_true",
+        help="Use dynamic int8 quantization for CPU query embedding",
+    )
+    serve_parser.add_argument(
+        "--threads", type=int, help="Number of CPU threads for query embedding"
+    )
+    serve_parser.add_argument(
+        "--max-seq-length", type=int, help="Maximum tokens per query embedding"
+    )
+    serve_parser.add_argument(
+        "--backend",
+        choices=["torch", "onnx"],
+        help="Inference backend for query embedding (default: torch)",
+    )
+    serve_parser.add_argument(
+        "--cache-dir",
+        help="Directory of an on-disk result cache shared between runs",
+    )
+    serve_parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=1024,
+        help="Number of search results kept in memory (default: 1024, 0 disables)",
+    )
+
+    # Reverse geocoding command
+    geocode_parser = subparsers.add_parser(
+        "geocode", help="Add place names to geotagged images from a local gazetteer"
+    )
+    geocode_parser.add_argument(
+        "gazetteer", help="GeoNames table of places, e.g. cities1000.txt or .zip"
+    )
+    geocode_parser.add_argument(
+        "--max-distance",
+        type=float,
+        default=50.0,
+        help="Maximum distance in km from an image to its place (default: 50)",
+    )
+    geocode_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Also geocode images that already have a place",
+    )
+
+    # Duplicates command
+    duplicates_parser = subparsers.add_parser(
+        "duplicates", help="List groups of duplicate and near-duplicate images"
+    )
+    duplicates_parser.add_argument(
+        "--id", type=int, help="Only list the duplicates of the image with this ID"
+    )
+    duplicates_parser.add_argument(
+        "--max-distance",
+        type=int,
+        default=3,
+        choices=range(4),
+        help="Maximum number of differing perceptual hash bits (default: 3)",
+    )
+    duplicates_parser.add_argument(
+        "--json", action="store_true", help="Output in JSON format"
+    )
+
+    # Database analysis command
+    analyze_parser = subparsers.add_parser(
+        "db-analyze",
+        help="Update planner statistics, report index usage and suggest indexes",
+    )
+    analyze_parser.add_argument(
+        "--slow-log",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="Also check the queries of a slow query log (repeatable)",
+    )
+    analyze_parser.add_argument(
+        "--json", action="store_true", help="Output the report in JSON format"
+    )
 
     # Parse arguments
     args = parser.parse_args()
 
+    with metrics.profiling(args.profile):
+        return run_command(args, parser)
+
+
+def run_command(args: argparse.Namespace, parser: argparse.ArgumentParser) -> int:
+    """
+    Execute a parsed command.
+
+    Args:
+        args: Parsed command-line arguments
+        parser: Parser, used to print help for unknown commands
+
+    Returns:
+        Exit status
+    """
     # Show usage examples if requested
     if args.help_examples or not args.command:
         print_command_help()
         return 0
 
+    # Start the search daemon
+    if args.command == "serve":
+        return serve_daemon(args)
+
+    # A running search daemon answers searches and image lookups without
+    # loading the database or the embedding model in this process
+    search_request = None
+    try:
+        if args.command == "search" and not args.ndjson:
+            search_request = build_search_request(args)
+            method, params = search_request
+            handled, results = call_daemon(args, method, **params)
+            if handled:
+                return print_search_results(results, args)
+        elif args.command == "image":
+            handled, image = call_daemon(args, "get_image_by_id", image_id=args.id)
+            if handled:
+                return print_image(image, args)
+    except Exception as e:
+        logger.error(f"Error performing search: {str(e)}")
+        return 1
+
+    # Imported here, so commands answered by the daemon start quickly
+    from wheresmy.core.database import ImageDatabase
+    from wheresmy.search import search as search_utils
+    from wheresmy.search import stats as stats_utils
+
     # Initialize database
     try:
         db = ImageDatabase(args.db)
     except Exception as e:
         logger.error(f"Error connecting to database: {str(e)}")
         return 1
+    enable_slow_query_log(db, args)
 
     # Execute command
     if args.command == "search":
         try:
-            # Process date arguments
-            date_start = args.date_start
-            date_end = args.date_end
-
-            # Handle year/month arguments
-            if args.year:
-                if not date_start:
-                    date_start = f"{args.year}-01-01"
-                if not date_end:
-                    date_end = f"{args.year}-12-31"
-
-                # Add month constraint if specified
-                if args.month and 1 <= args.month <= 12:
-                    month_str = f"{args.month:02d}"
-                    date_start = f"{args.year}-{month_str}-01"
-
-                    # Determine last day of month (simplified)
-                    last_day = 30
-                    if args.month in [1, 3, 5, 7, 8, 10, 12]:
-                        last_day = 31
-                    elif args.month == 2:
-                        last_day = 29 if args.year % 4 == 0 else 28
-
-                    date_end = f"{args.year}-{month_str}-{last_day}"
-
-            # Process GPS coordinates if provided
-            # TODO: use these
-            # gps_lat = None
-            # gps_lon = None
-            if args.gps:
-                try:
-                    parts = args.gps.split(",")
-                    if len(parts) >= 2:
-                        # TODO: use these
-                        # gps_lat = float(parts[0])
-                        # gps_lon = float(parts[1])
-                        pass
-                except (ValueError, IndexError):
-                    logger.warning(
-                        "Invalid GPS coordinates format. Use latitude,longitude"
-                    )
+            method, params = search_request or build_search_request(args)
 
-            # Set up text query - combine query and content arguments
-            text_query = args.query
-            if args.content:
-                if text_query:
-                    text_query = f"{text_query} {args.content}"
-                else:
-                    text_query = args.content
-
-            # Determine which search method to use
-            if args.semantic:
-                logger.info(f"Performing semantic search with query: {args.semantic}")
-                results = search_utils.semantic_search(
-                    db,
-                    query=args.semantic,
-                    embedding_model=args.model,
-                    limit=args.limit,
-                )
-            elif args.hybrid:
-                logger.info(f"Performing hybrid search with query: {args.hybrid}")
-
-                # Validate weight is between 0 and 1
-                weight = max(0.0, min(1.0, args.weight))
-                if weight != args.weight:
-                    logger.warning(
-                        f"Weight value {args.weight} out of range, using {weight}"
-                    )
+            # Configure query embedding inference
+            search_utils.configure_inference(
+                quantize=args.quantize or None,
+                num_threads=args.threads,
+                max_seq_length=args.max_seq_length,
+                backend=args.backend,
+            )
 
-                results = search_utils.hybrid_search(
-                    db,
-                    query=args.hybrid,
-                    embedding_model=args.model,
-                    text_weight=weight,
-                    limit=args.limit,
-                )
-            else:
-                # Execute regular search
-                results = search_utils.search_images(
-                    db,
-                    text_query=text_query,
-                    camera_make=args.camera_make,
-                    camera_model=args.camera_model,
-                    date_start=date_start,
-                    date_end=date_end,
-                    min_width=args.min_width,
-                    min_height=args.min_height,
-                    limit=args.limit,
-                    offset=args.offset,
-                )
+            # Configure the result cache
+            search_utils.configure_cache(
+                enabled=not args.no_cache, directory=args.cache_dir
+            )
 
-            if args.json:
-                print(json.dumps(results, indent=2, default=str))
-            else:
-                if not results:
-                    print("No results found")
-                    return 0
-
-                print(f"Found {len(results)} results:")
-                for result in results:
-                    print(f"\nID: {result.get('id')}")
-                    print(f"Filename: {result.get('filename')}")
-                    print(f"Path: {result.get('file_path')}")
-                    print(f"Size: {result.get('width')}x{result.get('height')}")
-
-                    if result.get("capture_date"):
-                        print(f"Date: {result.get('capture_date')}")
-
-                    if result.get("camera_make") or result.get("camera_model"):
-                        camera = []
-                        if result.get("camera_make"):
-                            camera.append(result["camera_make"])
-                        if result.get("camera_model"):
-                            camera.append(result["camera_model"])
-                        print(f"Camera: {' '.join(camera)}")
-
-                    # Show GPS coordinates if available
-                    if result.get("gps_lat") and result.get("gps_lon"):
-                        print(
-                            f"Location: {result.get('gps_lat')}, {result.get('gps_lon')}"
-                        )
-
-                    # Show content description
-                    if result.get("description"):
-                        desc = result["description"]
-                        if len(desc) > 80 and not args.full_desc:
-                            desc = desc[:80] + "..."
-                        print(f"Content: {desc}")
-
-                    # Show similarity score for semantic search results
-                    if result.get("similarity") is not None:
-                        print(f"Similarity: {result['similarity']:.4f}")
-
-                    # Show combined score for hybrid search results
-                    if result.get("combined_score") is not None:
-                        print(f"Combined Score: {result['combined_score']:.4f}")
+            if method == "search_images" and args.ndjson:
+                # Stream rows from the database instead of loading them all
+                params["limit"] = args.limit or None
+                results = search_utils.iter_search_images(db, **params)
+                for i, result in enumerate(results):
+                    sys.stdout.write(json.dumps(result, default=str) + "\n")
+                    # Flush the first result at once, then every few lines
+                    if i % 100 == 0:
+                        sys.stdout.flush()
+                sys.stdout.flush()
+                return 0
 
-            return 0
+            results = getattr(search_utils, method)(db, **params)
+            return print_search_results(results, args)
         except Exception as e:
             logger.error(f"Error performing search: {str(e)}")
             return 1
@@ -362,42 +983,125 @@ def main():
     elif args.command == "image":
         try:
             image = search_utils.get_image_by_id(db, args.id)
+            return print_image(image, args)
+        except Exception as e:
+            logger.error(f"Error retrieving image: {str(e)}")
+            return 1
+    elif args.command == "models":
+        try:
+            if args.set_default:
+                db.set_default_embedding_model(args.set_default)
 
-            if not image:
-                print(f"Image with ID {args.id} not found")
-                return 1
-
+            models = db.get_embedding_models()
             if args.json:
-                print(json.dumps(image, indent=2, default=str))
+                print(json.dumps(models, indent=2, default=str))
+            elif not models:
+                print("No embedding models registered")
             else:
-                print(f"ID: {image.get('id')}")
-                print(f"Filename: {image.get('filename')}")
-                print(f"Path: {image.get('file_path')}")
-                print(f"Size: {image.get('width')}x{image.get('height')}")
-                print(f"Format: {image.get('format')}")
-
-                if image.get("capture_date"):
-                    print(f"Date: {image.get('capture_date')}")
-
-                if image.get("camera_make") or image.get("camera_model"):
-                    camera = []
-                    if image.get("camera_make"):
-                        camera.append(image["camera_make"])
-                    if image.get("camera_model"):
-                        camera.append(image["camera_model"])
-                    print(f"Camera: {' '.join(camera)}")
-
-                if image.get("description"):
-                    print("\nDescription:")
-                    print(image["description"])
-
-                if image.get("gps_lat") and image.get("gps_lon"):
-                    print(f"\nGPS: {image['gps_lat']}, {image['gps_lon']}")
+                print("Embedding Models:")
+                for model in models:
+                    marker = " (default)" if model["default"] else ""
+                    print(
+                        f"  {model['model']}{marker}: {model['embedding_size']} "
+                        f"dimensions, {model['count']} embeddings"
+                    )
 
             return 0
         except Exception as e:
-            logger.error(f"Error retrieving image: {str(e)}")
+            logger.error(f"Error managing embedding models: {str(e)}")
             return 1
+
+    elif args.command == "reembed":
+        from wheresmy.core.reembedding import ReembeddingJob
+
+        job = ReembeddingJob(
+            db,
+            args.model,
+            batch_size=args.batch_size,
+            make_default=not args.no_switch,
+        )
+        if not job.run():
+            logger.error(job.error or f"{job.failed} images could not be embedded")
+            return 1
+
+        print(f"Embedded {job.processed} images with {args.model}")
+        return 0
+
+    elif args.command == "geocode":
+        from wheresmy.core import geocoding
+
+        try:
+            geocoder = geocoding.ReverseGeocoder(
+                geocoding.Gazetteer.load(args.gazetteer),
+                max_distance_km=args.max_distance,
+            )
+            found = geocoding.geocode_images(db, geocoder, overwrite=args.all)
+        except Exception as e:
+            logger.error(f"Error geocoding images: {str(e)}")
+            return 1
+
+        print(f"Found places for {found} images")
+        return 0
+
+    elif args.command == "duplicates":
+        try:
+            groups = db.find_duplicates(
+                max_distance=args.max_distance, image_id=args.id
+            )
+            return print_duplicates(groups, args)
+        except Exception as e:
+            logger.error(f"Error finding duplicates: {str(e)}")
+            return 1
+
+    elif args.command == "db-analyze":
+        from wheresmy.core import query_analysis
+
+        try:
+            slow_queries = []
+            for path in args.slow_log:
+                slow_queries.extend(query_analysis.read_slow_query_log(path))
+            report = query_analysis.analyze_database(db, slow_queries)
+            return print_analysis(report, args)
+        except Exception as e:
+            logger.error(f"Error analyzing database: {str(e)}")
+            return 1
+
+    elif args.command == "export":
+        from wheresmy.core import export
+
+        export_format = args.format
+        if not export_format:
+            extension = os.path.splitext(args.output)[1].lstrip(".").lower()
+            export_format = extension if extension in export.EXPORT_FORMATS else "jsonl"
+
+        filters = build_filters(args)
+        try:
+            if args.output == "-":
+                if export_format not in export.TEXT_FORMATS:
+                    logger.error(f"Cannot write {export_format} to standard output")
+                    return 1
+                for chunk in export.iter_export(
+                    db, export_format, after_id=args.after_id, **filters
+                ):
+                    sys.stdout.write(chunk)
+                sys.stdout.flush()
+                return 0
+
+            count = export.export_images(
+                db,
+                args.output,
+                export_format,
+                embedding_model=args.model,
+                include_embeddings=not args.no_embeddings,
+                after_id=args.after_id,
+                **filters,
+            )
+            print(f"Exported {count} records to {args.output}")
+            return 0
+        except Exception as e:
+            logger.error(f"Error exporting catalogue: {str(e)}")
+            return 1
+
     else:
         parser.print_help()
         return 0
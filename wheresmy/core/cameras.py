@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Camera Names Module
+
+This module normalizes the camera make and model strings found in EXIF
+data, which vary between manufacturers and firmware versions (e.g.
+"NIKON CORPORATION" / "NIKON D750", "Canon" / "Canon EOS 5D"):
+- normalize_name() lowercases and collapses whitespace
+- canonical_make() strips corporate suffixes ("nikon")
+- canonical_model() strips a repeated make prefix ("d750")
+- camera_aliases() lists the names a camera can be found by
+
+ImageDatabase stores each distinct make/model pair once in its cameras
+table, with these aliases indexed for camera filters.
+"""
+
+import re
+from typing import Optional, Set, Tuple
+
+# Trailing words of company names that are not part of the brand
+CORPORATE_SUFFIXES = {
+    "co",
+    "company",
+    "corp",
+    "corporation",
+    "imaging",
+    "inc",
+    "ltd",
+    "optical",
+}
+
+# Brands whose EXIF make differs from the name people use
+MAKE_ALIASES = {
+    "eastman kodak": "kodak",
+    "lg electronics": "lg",
+    "samsung techwin": "samsung",
+}
+
+# Upper bound appended to a prefix for index range scans; sorts after any
+# other character in SQLite's binary collation
+PREFIX_END = "\U0010ffff"
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """
+    Normalize a camera make or model for matching.
+
+    Args:
+        name: Make or model as stored in EXIF data
+
+    Returns:
+        Lowercase name with NUL padding removed and whitespace collapsed
+    """
+    if not name:
+        return ""
+    return " ".join(str(name).replace("\x00", " ").lower().split())
+
+
+def canonical_make(make: Optional[str]) -> str:
+    """
+    Get the brand name of a camera make.
+
+    Args:
+        make: Make as stored in EXIF data, e.g. "OLYMPUS IMAGING CORP."
+
+    Returns:
+        Normalized brand name, e.g. "olympus"
+    """
+    words = re.sub(r"[.,]", " ", normalize_name(make)).split()
+    while len(words) > 1 and words[-1] in CORPORATE_SUFFIXES:
+        words.pop()
+    name = " ".join(words)
+    return MAKE_ALIASES.get(name, name)
+
+
+def canonical_model(make: Optional[str], model: Optional[str]) -> str:
+    """
+    Get a camera model name without a repeated make.
+
+    Args:
+        make: Make as stored in EXIF data, e.g. "Canon"
+        model: Model as stored in EXIF data, e.g. "Canon EOS 5D"
+
+    Returns:
+        Normalized model name, e.g. "eos 5d"
+    """
+    name = normalize_name(model)
+    for prefix in (normalize_name(make), canonical_make(make)):
+        if prefix and name.startswith(prefix + " "):
+            return name[len(prefix) + 1 :]
+    return name
+
+
+def camera_aliases(make: Optional[str], model: Optional[str]) -> Set[Tuple[str, str]]:
+    """
+    Get the names a camera can be found by.
+
+    Args:
+        make: Make as stored in EXIF data
+        model: Model as stored in EXIF data
+
+    Returns:
+        Set of (field, alias) pairs, where field is "make" or "model"
+    """
+    aliases = {
+        ("make", normalize_name(make)),
+        ("make", canonical_make(make)),
+        ("model", normalize_name(model)),
+        ("model", canonical_model(make, model)),
+    }
+    full_name = f"{canonical_make(make)} {canonical_model(make, model)}".strip()
+    aliases.add(("model", full_name))
+    return {(field, alias) for field, alias in aliases if alias}
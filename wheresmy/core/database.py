@@ -9,15 +9,23 @@ capabilities for image metadata.
 
 import os
 import json
+import hashlib
 import logging
+import time
 import sqlite3
+import re
+import difflib
+import threading
 
 # import time
 import numpy as np
 from datetime import datetime, timezone
 
 # from pathlib import Path
-from typing import Dict, List, Optional, Any  # Union, Any, Tuple
+from typing import Dict, Iterator, List, Optional, Any, Set, Tuple
+
+from wheresmy.core import cameras, duplicates, geo, query_analysis
+from wheresmy.utils import metrics
 
 # Configure logging
 logging.basicConfig(
@@ -25,8 +33,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Latency of the public query methods, labelled by method name
+DB_QUERY_SECONDS = metrics.histogram(
+    "db_query_seconds", "Latency of ImageDatabase methods in seconds", ("method",)
+)
+
+# Time spent decoding the JSON columns of image rows
+JSON_DECODE_SECONDS = metrics.histogram(
+    "json_decode_seconds", "Time spent decoding image row JSON in seconds"
+)
+
+# Time spent scoring a query against an in-memory vector index
+VECTOR_SCORING_SECONDS = metrics.histogram(
+    "vector_scoring_seconds",
+    "Time spent scoring and ranking embeddings in seconds",
+    ("model",),
+)
+
 # Constants
-DB_VERSION = 2
+DB_VERSION = 13
+
+# Maximum number of bound parameters used in a single IN (...) clause
+MAX_QUERY_PARAMS = 900
+
+# Number of rows fetched at a time when streaming results
+STREAM_BATCH_SIZE = 500
+
 CREATE_IMAGES_TABLE = """
 CREATE TABLE IF NOT EXISTS images (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -41,6 +73,11 @@ CREATE TABLE IF NOT EXISTS images (
     capture_date TEXT,
     camera_make TEXT,
     camera_model TEXT,
+    camera_id INTEGER REFERENCES cameras(id),
+    place_city TEXT,
+    place_region TEXT,
+    place_country TEXT,
+    phash INTEGER,
     description TEXT,
     description_model TEXT,
     thumbnail TEXT,
@@ -50,6 +87,242 @@ CREATE TABLE IF NOT EXISTS images (
 );
 """
 
+# Each distinct EXIF make/model pair, with normalized names (see cameras.py);
+# missing makes or models are stored as '' so the pair is unique
+CREATE_CAMERAS_TABLE = """
+CREATE TABLE IF NOT EXISTS cameras (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    make TEXT NOT NULL,
+    model TEXT NOT NULL,
+    canonical_make TEXT NOT NULL,
+    canonical_model TEXT NOT NULL,
+    UNIQUE (make, model)
+);
+"""
+
+# Normalized names cameras can be found by; camera filters resolve the
+# user's input to camera IDs with prefix range scans of the primary key
+CREATE_CAMERA_ALIASES_TABLE = """
+CREATE TABLE IF NOT EXISTS camera_aliases (
+    field TEXT NOT NULL,
+    alias TEXT NOT NULL,
+    camera_id INTEGER NOT NULL,
+    PRIMARY KEY (field, alias, camera_id),
+    FOREIGN KEY (camera_id) REFERENCES cameras(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+"""
+
+# Camera-filtered searches are index lookups, ordered by date within a camera
+CREATE_IMAGE_CAMERA_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_images_camera_id ON images(camera_id, capture_date);
+"""
+
+# Maximum number of aliases a fuzzy camera match may resolve to, and the
+# minimum similarity ratio (see difflib) of a fuzzy match; fuzzy matches
+# must also have the same numbers ("iphone 13" never matches "iphone 12")
+MAX_FUZZY_CAMERA_MATCHES = 5
+FUZZY_CAMERA_CUTOFF = 0.8
+
+# R*Tree of the coordinates of geotagged images, kept in sync with images by
+# triggers; each image is a point (min = max)
+CREATE_LOCATION_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS image_locations
+USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+"""
+
+CREATE_LOCATION_TRIGGER_INSERT = """
+CREATE TRIGGER IF NOT EXISTS image_location_insert_trigger
+AFTER INSERT ON images
+WHEN new.gps_lat IS NOT NULL AND new.gps_lon IS NOT NULL
+BEGIN
+    INSERT INTO image_locations VALUES
+        (new.id, new.gps_lat, new.gps_lat, new.gps_lon, new.gps_lon);
+END;
+"""
+
+CREATE_LOCATION_TRIGGER_UPDATE = """
+CREATE TRIGGER IF NOT EXISTS image_location_update_trigger
+AFTER UPDATE OF gps_lat, gps_lon ON images
+BEGIN
+    DELETE FROM image_locations WHERE id = old.id;
+    INSERT INTO image_locations
+    SELECT new.id, new.gps_lat, new.gps_lat, new.gps_lon, new.gps_lon
+    WHERE new.gps_lat IS NOT NULL AND new.gps_lon IS NOT NULL;
+END;
+"""
+
+CREATE_LOCATION_TRIGGER_DELETE = """
+CREATE TRIGGER IF NOT EXISTS image_location_delete_trigger
+AFTER DELETE ON images
+BEGIN
+    DELETE FROM image_locations WHERE id = old.id;
+END;
+"""
+
+# Map clustering grid: level z splits the world into 2^z by 2^z cells
+# (see geo.grid_cell); clusters for map zoom z are read from level
+# z + CLUSTER_CELL_BITS, i.e. 8x8 cells per map tile
+MAX_CLUSTER_LEVEL = 16
+CLUSTER_CELL_BITS = 3
+
+# Maximum number of images returned individually when zoomed in beyond the
+# deepest grid level
+MAX_CLUSTER_POINTS = 5000
+
+CREATE_CLUSTER_LEVELS_TABLE = """
+CREATE TABLE IF NOT EXISTS cluster_levels (level INTEGER PRIMARY KEY);
+"""
+
+# Image count, coordinate sums (for the centroid) and a representative
+# image of each non-empty grid cell, kept up to date by triggers
+CREATE_LOCATION_CLUSTERS_TABLE = """
+CREATE TABLE IF NOT EXISTS location_clusters (
+    level INTEGER NOT NULL,
+    cell_x INTEGER NOT NULL,
+    cell_y INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    sum_lat REAL NOT NULL,
+    sum_lon REAL NOT NULL,
+    image_id INTEGER,
+    PRIMARY KEY (level, cell_x, cell_y)
+) WITHOUT ROWID;
+"""
+
+# Grid cell of the new or old row of images at each level, as in geo.grid_cell
+CLUSTER_CELL = """
+    max(0, min(CAST(({row}.gps_lon + 180.0) * (1 << level) / 360.0 AS INTEGER),
+               (1 << level) - 1)),
+    max(0, min(CAST((90.0 - {row}.gps_lat) * (1 << level) / 180.0 AS INTEGER),
+               (1 << level) - 1))"""
+
+CLUSTER_ADD = """
+    INSERT INTO location_clusters
+        (level, cell_x, cell_y, count, sum_lat, sum_lon, image_id)
+    SELECT level, {cell}, 1, new.gps_lat, new.gps_lon, new.id
+    FROM cluster_levels
+    WHERE new.gps_lat IS NOT NULL AND new.gps_lon IS NOT NULL
+    ON CONFLICT (level, cell_x, cell_y) DO UPDATE SET
+        count = count + 1,
+        sum_lat = sum_lat + excluded.sum_lat,
+        sum_lon = sum_lon + excluded.sum_lon,
+        image_id = coalesce(image_id, excluded.image_id);
+""".format(
+    cell=CLUSTER_CELL.format(row="new")
+)
+
+# Removing the representative image picks another one in the cell from the
+# R*Tree; cells left empty are deleted
+CLUSTER_REMOVE = """
+    UPDATE location_clusters SET
+        count = count - 1,
+        sum_lat = sum_lat - old.gps_lat,
+        sum_lon = sum_lon - old.gps_lon,
+        image_id = CASE WHEN image_id = old.id THEN (
+            SELECT id FROM image_locations
+            WHERE id != old.id
+            AND min_lon >= cell_x * 360.0 / (1 << level) - 180.0
+            AND max_lon <= (cell_x + 1) * 360.0 / (1 << level) - 180.0
+            AND max_lat <= 90.0 - cell_y * 180.0 / (1 << level)
+            AND min_lat >= 90.0 - (cell_y + 1) * 180.0 / (1 << level)
+            LIMIT 1
+        ) ELSE image_id END
+    WHERE (level, cell_x, cell_y) IN (SELECT level, {cell} FROM cluster_levels);
+    DELETE FROM location_clusters
+    WHERE count <= 0
+    AND (level, cell_x, cell_y) IN (SELECT level, {cell} FROM cluster_levels);
+""".format(
+    cell=CLUSTER_CELL.format(row="old")
+)
+
+CREATE_CLUSTER_TRIGGER_INSERT = f"""
+CREATE TRIGGER IF NOT EXISTS image_cluster_insert_trigger
+AFTER INSERT ON images
+BEGIN
+{CLUSTER_ADD}
+END;
+"""
+
+CREATE_CLUSTER_TRIGGER_UPDATE = f"""
+CREATE TRIGGER IF NOT EXISTS image_cluster_update_trigger
+AFTER UPDATE OF gps_lat, gps_lon ON images
+WHEN old.gps_lat IS NOT new.gps_lat OR old.gps_lon IS NOT new.gps_lon
+BEGIN
+{CLUSTER_REMOVE}
+{CLUSTER_ADD}
+END;
+"""
+
+CREATE_CLUSTER_TRIGGER_DELETE = f"""
+CREATE TRIGGER IF NOT EXISTS image_cluster_delete_trigger
+AFTER DELETE ON images
+BEGIN
+{CLUSTER_REMOVE}
+END;
+"""
+
+# Bands of the perceptual hash of each image (see duplicates.py), kept in
+# sync with images.phash by triggers; near-duplicates share a band
+CREATE_HASH_BANDS_TABLE = """
+CREATE TABLE IF NOT EXISTS image_hash_bands (
+    band INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    image_id INTEGER NOT NULL,
+    PRIMARY KEY (band, value, image_id)
+) WITHOUT ROWID;
+"""
+
+# (band, value, image_id) rows of the new row of images, as in
+# duplicates.hash_bands
+HASH_BANDS_ADD = """
+    INSERT OR IGNORE INTO image_hash_bands (band, value, image_id)
+    SELECT * FROM (VALUES {rows})
+    WHERE new.phash IS NOT NULL;
+""".format(
+    rows=", ".join(
+        f"({band}, (new.phash >> {band * duplicates.BAND_BITS}) & "
+        f"{duplicates.BAND_MASK}, new.id)"
+        for band in range(duplicates.HASH_BANDS)
+    )
+)
+
+# Spelled out as ORed key lookups; SQLite scans the table for row values
+# IN a VALUES list
+HASH_BANDS_REMOVE = """
+    DELETE FROM image_hash_bands WHERE {conditions};
+""".format(
+    conditions=" OR ".join(
+        f"(band = {band} AND value = (old.phash >> {band * duplicates.BAND_BITS}) & "
+        f"{duplicates.BAND_MASK} AND image_id = old.id)"
+        for band in range(duplicates.HASH_BANDS)
+    )
+)
+
+CREATE_HASH_TRIGGER_INSERT = f"""
+CREATE TRIGGER IF NOT EXISTS image_hash_insert_trigger
+AFTER INSERT ON images
+BEGIN
+{HASH_BANDS_ADD}
+END;
+"""
+
+CREATE_HASH_TRIGGER_UPDATE = f"""
+CREATE TRIGGER IF NOT EXISTS image_hash_update_trigger
+AFTER UPDATE OF phash ON images
+WHEN old.phash IS NOT new.phash
+BEGIN
+{HASH_BANDS_REMOVE}
+{HASH_BANDS_ADD}
+END;
+"""
+
+CREATE_HASH_TRIGGER_DELETE = f"""
+CREATE TRIGGER IF NOT EXISTS image_hash_delete_trigger
+AFTER DELETE ON images
+BEGIN
+{HASH_BANDS_REMOVE}
+END;
+"""
+
 CREATE_EMBEDDINGS_TABLE = """
 CREATE TABLE IF NOT EXISTS text_embeddings (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -63,55 +336,222 @@ CREATE TABLE IF NOT EXISTS text_embeddings (
 );
 """
 
-# Index on the image_id for quick lookups of embeddings by image
+# One embedding per image and model; also serves lookups of embeddings by image
 CREATE_EMBEDDING_INDEX = """
-CREATE INDEX IF NOT EXISTS idx_embedding_image_id ON text_embeddings(image_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_embedding_image_model
+ON text_embeddings(image_id, model_name);
+"""
+
+UPSERT_EMBEDDING = """
+INSERT INTO text_embeddings (
+    image_id, text, model_name, embedding_size, embedding, added_date
+) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(image_id, model_name) DO UPDATE SET
+    text = excluded.text,
+    embedding_size = excluded.embedding_size,
+    embedding = excluded.embedding,
+    added_date = excluded.added_date
+"""
+
+# Embeddings keyed by model and a hash of the embedded text, so unchanged
+# descriptions never need to be re-encoded
+CREATE_EMBEDDING_CACHE_TABLE = """
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    model_name TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    embedding_size INTEGER NOT NULL,
+    embedding BLOB NOT NULL,
+    added_date TEXT NOT NULL,
+    PRIMARY KEY (model_name, text_hash)
+) WITHOUT ROWID;
+"""
+
+# Registry of embedding models; the generation counter is bumped on every
+# write so in-memory vector indexes know when to reload, and the rewrites
+# counter on writes that changed existing embeddings, so indexes can
+# append the new rows of writes that did not
+CREATE_EMBEDDING_MODELS_TABLE = """
+CREATE TABLE IF NOT EXISTS embedding_models (
+    model_name TEXT PRIMARY KEY,
+    embedding_size INTEGER NOT NULL,
+    generation INTEGER NOT NULL DEFAULT 0,
+    added_date TEXT NOT NULL,
+    rewrites INTEGER NOT NULL DEFAULT 0
+);
 """
 
-CREATE_SEARCH_INDEX = """
+CREATE_SETTINGS_TABLE = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Settings key of the embedding model used when none is requested
+DEFAULT_EMBEDDING_MODEL_KEY = "default_embedding_model"
+
+# Settings key of the counter bumped by every write that can change search
+# results, used to invalidate cached results
+DATA_GENERATION_KEY = "data_generation"
+
+# Columns of images indexed for full-text search, with their bm25 weights:
+# matches in descriptions rank highest, then filenames and place names,
+# then camera names
+SEARCH_COLUMN_WEIGHTS = {
+    "filename": 5.0,
+    "description": 10.0,
+    "camera_make": 1.0,
+    "camera_model": 1.0,
+    "place_city": 2.0,
+    "place_region": 2.0,
+    "place_country": 2.0,
+}
+SEARCH_COLUMNS = tuple(SEARCH_COLUMN_WEIGHTS)
+
+# Ranking function stored in the index configuration, so every
+# ORDER BY rank query uses the column weights
+SEARCH_RANK = "bm25({})".format(
+    ", ".join(str(weight) for weight in SEARCH_COLUMN_WEIGHTS.values())
+)
+
+# A prefix index answers queries such as "bea*" without scanning every
+# matching term; two-character prefixes match too many terms to be worth
+# indexing. Term positions are kept (detail=full): phrase and NEAR queries
+# need them, and ranking without them was measured to be three times slower
+CREATE_SEARCH_INDEX = f"""
 CREATE VIRTUAL TABLE IF NOT EXISTS image_search
 USING fts5(
-    id,
-    filename,
-    description,
-    camera_make,
-    camera_model,
+    {", ".join(SEARCH_COLUMNS)},
     content='images',
     content_rowid='id',
-    tokenize='porter unicode61'
+    tokenize='porter unicode61',
+    prefix='3'
 );
 """
 
-CREATE_TRIGGER_INSERT = """
+# image_search has external content, so rows are removed with the 'delete'
+# command and the values that were indexed
+SEARCH_INSERT = """
+    INSERT INTO image_search(rowid, {columns})
+    VALUES (new.id, {new_values});
+"""
+
+SEARCH_DELETE = """
+    INSERT INTO image_search(image_search, rowid, {columns})
+    VALUES ('delete', old.id, {old_values});
+"""
+
+_search_columns = {
+    "columns": ", ".join(SEARCH_COLUMNS),
+    "new_values": ", ".join(f"new.{column}" for column in SEARCH_COLUMNS),
+    "old_values": ", ".join(f"old.{column}" for column in SEARCH_COLUMNS),
+}
+
+CREATE_TRIGGER_INSERT = f"""
 CREATE TRIGGER IF NOT EXISTS image_insert_trigger
 AFTER INSERT ON images
 BEGIN
-    INSERT INTO image_search(rowid, filename, description, camera_make, camera_model)
-    VALUES (new.id, new.filename, new.description, new.camera_make, new.camera_model);
+{SEARCH_INSERT.format(**_search_columns)}
 END;
 """
 
-CREATE_TRIGGER_UPDATE = """
+CREATE_TRIGGER_UPDATE = f"""
 CREATE TRIGGER IF NOT EXISTS image_update_trigger
-AFTER UPDATE ON images
+AFTER UPDATE OF {_search_columns["columns"]} ON images
 BEGIN
-    UPDATE image_search
-    SET filename = new.filename,
-        description = new.description,
-        camera_make = new.camera_make,
-        camera_model = new.camera_model
-    WHERE rowid = new.id;
+{SEARCH_DELETE.format(**_search_columns)}
+{SEARCH_INSERT.format(**_search_columns)}
 END;
 """
 
-CREATE_TRIGGER_DELETE = """
+CREATE_TRIGGER_DELETE = f"""
 CREATE TRIGGER IF NOT EXISTS image_delete_trigger
 AFTER DELETE ON images
 BEGIN
-    DELETE FROM image_search WHERE rowid = old.id;
+{SEARCH_DELETE.format(**_search_columns)}
+END;
+"""
+
+# Words of image descriptions as written (image_search holds stemmed
+# terms), for type-ahead suggestions; only which images contain a word is
+# kept (detail=none), and fts5vocab reads the words with their image counts
+CREATE_TERMS_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS image_terms
+USING fts5(
+    description,
+    content='images',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    detail=none
+);
+"""
+
+CREATE_TERMS_VOCAB = """
+CREATE VIRTUAL TABLE IF NOT EXISTS image_terms_vocab
+USING fts5vocab(image_terms, row);
+"""
+
+TERMS_INSERT = """
+    INSERT INTO image_terms(rowid, description) VALUES (new.id, new.description);
+"""
+
+TERMS_DELETE = """
+    INSERT INTO image_terms(image_terms, rowid, description)
+    VALUES ('delete', old.id, old.description);
+"""
+
+CREATE_TERMS_TRIGGER_INSERT = f"""
+CREATE TRIGGER IF NOT EXISTS image_terms_insert_trigger
+AFTER INSERT ON images
+BEGIN
+{TERMS_INSERT}
+END;
+"""
+
+CREATE_TERMS_TRIGGER_UPDATE = f"""
+CREATE TRIGGER IF NOT EXISTS image_terms_update_trigger
+AFTER UPDATE OF description ON images
+WHEN old.description IS NOT new.description
+BEGIN
+{TERMS_DELETE}
+{TERMS_INSERT}
+END;
+"""
+
+CREATE_TERMS_TRIGGER_DELETE = f"""
+CREATE TRIGGER IF NOT EXISTS image_terms_delete_trigger
+AFTER DELETE ON images
+BEGIN
+{TERMS_DELETE}
 END;
 """
 
+# Place name columns filled in by reverse geocoding (see geocoding.py),
+# indexed for case-insensitive place filters
+PLACE_COLUMNS = ("place_city", "place_region", "place_country")
+
+
+def text_hash(text: str) -> str:
+    """
+    Hash a text for embedding cache lookups.
+
+    Whitespace is normalized first so descriptions that differ only in
+    spacing share a cache entry.
+
+    Args:
+        text: Text to hash
+
+    Returns:
+        Hex digest identifying the text
+    """
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _timed_query(func):
+    """Record the latency of a database method, labelled by its name."""
+    return DB_QUERY_SECONDS.timed(method=func.__name__)(func)
+
 
 class ImageDatabase:
     """Database for storing and searching image metadata."""
@@ -124,11 +564,80 @@ class ImageDatabase:
             db_path: Path to the SQLite database file
         """
         self.db_path = db_path
+
+        # Writes through this instance that bumped the data generation, so
+        # callers caching the generation notice them without a query
+        self.write_count = 0
+
+        # Per-model in-memory vector indexes for semantic search, each
+        # loaded under its own lock so reloads only hold up its own queries
+        self._vector_indexes: Dict[str, Dict[str, Any]] = {}
+        self._vector_index_locks: Dict[str, threading.Lock] = {}
+        self._vector_index_lock = threading.Lock()
+
+        # Optional log of slow queries; $WHERESMY_SLOW_QUERY_MS enables it
+        # for processes started by servers, e.g. web workers
+        self.slow_query_log: Optional[query_analysis.SlowQueryLog] = None
+        if os.environ.get("WHERESMY_SLOW_QUERY_MS"):
+            self.enable_slow_query_log(
+                float(os.environ["WHERESMY_SLOW_QUERY_MS"]),
+                log_path=os.environ.get("WHERESMY_SLOW_QUERY_LOG"),
+            )
+
         self._initialize_db()
 
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection, tracing its queries if the slow query log is on."""
+        if self.slow_query_log is None:
+            conn = sqlite3.connect(self.db_path)
+        else:
+            conn = sqlite3.connect(
+                self.db_path, factory=query_analysis.TracingConnection
+            )
+            conn.slow_query_log = self.slow_query_log
+        geo.register_functions(conn)
+        duplicates.register_functions(conn)
+        return conn
+
+    def enable_slow_query_log(
+        self, threshold_ms: float = 100.0, log_path: Optional[str] = None
+    ) -> query_analysis.SlowQueryLog:
+        """
+        Record queries slower than a threshold with their query plans.
+
+        Durations include fetching the rows of a query. Recent records are
+        kept in memory (see get_slow_queries()) and logged as warnings.
+
+        Args:
+            threshold_ms: Queries taking at least this long are recorded
+            log_path: Optional file that records are appended to as JSON
+                      lines, e.g. for db-analyze
+
+        Returns:
+            The slow query log
+        """
+        self.slow_query_log = query_analysis.SlowQueryLog(threshold_ms, log_path)
+        return self.slow_query_log
+
+    def disable_slow_query_log(self) -> None:
+        """Stop recording slow queries."""
+        self.slow_query_log = None
+
+    def get_slow_queries(self) -> List[Dict[str, Any]]:
+        """
+        Get the slow queries recorded by this database object.
+
+        Returns:
+            Records with the SQL, parameters, duration in milliseconds and
+            query plan of each slow query, oldest first
+        """
+        if self.slow_query_log is None:
+            return []
+        return self.slow_query_log.entries()
+
     def _initialize_db(self) -> None:
         """Initialize the database schema if it doesn't exist."""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         try:
             cursor = conn.cursor()
 
@@ -142,13 +651,23 @@ class ImageDatabase:
                 cursor.execute("INSERT INTO db_version VALUES (?)", (DB_VERSION,))
 
                 # Create tables and indexes
+                cursor.execute(CREATE_CAMERAS_TABLE)
+                cursor.execute(CREATE_CAMERA_ALIASES_TABLE)
                 cursor.execute(CREATE_IMAGES_TABLE)
-                cursor.execute(CREATE_SEARCH_INDEX)
-                cursor.execute(CREATE_TRIGGER_INSERT)
-                cursor.execute(CREATE_TRIGGER_UPDATE)
-                cursor.execute(CREATE_TRIGGER_DELETE)
+                cursor.execute(CREATE_IMAGE_CAMERA_INDEX)
+                self._create_search_index(cursor)
+                self._create_terms_index(cursor)
+                cursor.execute(CREATE_LOCATION_INDEX)
+                cursor.execute(CREATE_LOCATION_TRIGGER_INSERT)
+                cursor.execute(CREATE_LOCATION_TRIGGER_UPDATE)
+                cursor.execute(CREATE_LOCATION_TRIGGER_DELETE)
+                self._create_location_clusters(cursor)
+                self._create_hash_bands(cursor)
                 cursor.execute(CREATE_EMBEDDINGS_TABLE)
                 cursor.execute(CREATE_EMBEDDING_INDEX)
+                cursor.execute(CREATE_EMBEDDING_CACHE_TABLE)
+                cursor.execute(CREATE_EMBEDDING_MODELS_TABLE)
+                cursor.execute(CREATE_SETTINGS_TABLE)
 
                 # Create indexes for common search fields
                 cursor.execute(
@@ -157,8 +676,13 @@ class ImageDatabase:
                 cursor.execute(
                     "CREATE INDEX IF NOT EXISTS idx_camera ON images(camera_make, camera_model);"
                 )
+                self._create_place_indexes(cursor)
+
+                # Start the data generation from the clock, so results cached
+                # for a deleted database at the same path are never reused
                 cursor.execute(
-                    "CREATE INDEX IF NOT EXISTS idx_gps ON images(gps_lat, gps_lon);"
+                    "INSERT INTO settings (key, value) VALUES (?, ?)",
+                    (DATA_GENERATION_KEY, time.time_ns()),
                 )
 
                 conn.commit()
@@ -172,13 +696,198 @@ class ImageDatabase:
                     )
 
                     # Version 1 to 2: Add text embeddings support
-                    if current_version == 1 and DB_VERSION >= 2:
+                    if current_version < 2:
                         logger.info(
                             "Upgrading database schema: Adding text embeddings tables"
                         )
                         cursor.execute(CREATE_EMBEDDINGS_TABLE)
                         cursor.execute(CREATE_EMBEDDING_INDEX)
 
+                    # Version 2 to 3: One embedding per (image, model) pair
+                    if current_version < 3:
+                        logger.info(
+                            "Upgrading database schema: Adding unique embedding index"
+                        )
+                        # Keep only the most recent embedding of any duplicates
+                        cursor.execute(
+                            """
+                            DELETE FROM text_embeddings WHERE id NOT IN (
+                                SELECT MAX(id) FROM text_embeddings
+                                GROUP BY image_id, model_name
+                            )
+                        """
+                        )
+                        cursor.execute("DROP INDEX IF EXISTS idx_embedding_image_id")
+                        cursor.execute(CREATE_EMBEDDING_INDEX)
+
+                    # Version 3 to 4: Embedding cache keyed by text hash
+                    if current_version < 4:
+                        logger.info(
+                            "Upgrading database schema: Adding embedding cache table"
+                        )
+                        cursor.execute(CREATE_EMBEDDING_CACHE_TABLE)
+                        # Seed the cache from the embeddings already stored
+                        cursor.execute(
+                            """
+                            SELECT model_name, text, embedding_size, embedding, added_date
+                            FROM text_embeddings
+                        """
+                        )
+                        cursor.executemany(
+                            """
+                            INSERT OR REPLACE INTO embedding_cache (
+                                model_name, text_hash, embedding_size, embedding, added_date
+                            ) VALUES (?, ?, ?, ?, ?)
+                        """,
+                            [
+                                (row[0], text_hash(row[1]), row[2], row[3], row[4])
+                                for row in cursor.fetchall()
+                            ],
+                        )
+
+                    # Version 4 to 5: Embedding model registry and settings
+                    if current_version < 5:
+                        logger.info(
+                            "Upgrading database schema: Adding embedding model registry"
+                        )
+                        cursor.execute(CREATE_EMBEDDING_MODELS_TABLE)
+                        cursor.execute(CREATE_SETTINGS_TABLE)
+                        cursor.execute(
+                            """
+                            INSERT OR IGNORE INTO embedding_models (
+                                model_name, embedding_size, generation, added_date
+                            )
+                            SELECT model_name, MAX(embedding_size), 0, MIN(added_date)
+                            FROM text_embeddings GROUP BY model_name
+                        """
+                        )
+                        # The most widely used model becomes the default
+                        cursor.execute(
+                            """
+                            INSERT OR IGNORE INTO settings (key, value)
+                            SELECT ?, model_name FROM text_embeddings
+                            GROUP BY model_name ORDER BY COUNT(*) DESC LIMIT 1
+                        """,
+                            (DEFAULT_EMBEDDING_MODEL_KEY,),
+                        )
+
+                    # Version 5 to 6: Normalized camera dimension table
+                    if current_version < 6:
+                        logger.info("Upgrading database schema: Adding cameras table")
+                        cursor.execute(CREATE_CAMERAS_TABLE)
+                        cursor.execute(CREATE_CAMERA_ALIASES_TABLE)
+                        cursor.execute("PRAGMA table_info(images)")
+                        if "camera_id" not in [row[1] for row in cursor.fetchall()]:
+                            cursor.execute(
+                                "ALTER TABLE images ADD COLUMN camera_id INTEGER "
+                                "REFERENCES cameras(id)"
+                            )
+                        cursor.execute(
+                            """
+                            SELECT DISTINCT camera_make, camera_model FROM images
+                            WHERE camera_make IS NOT NULL OR camera_model IS NOT NULL
+                        """
+                        )
+                        camera_names = cursor.fetchall()
+
+                        # camera_id is not in the full-text index, so the
+                        # backfill need not rewrite image_search rows
+                        cursor.execute("DROP TRIGGER IF EXISTS image_update_trigger")
+                        for make, model in camera_names:
+                            cursor.execute(
+                                """
+                                UPDATE images SET camera_id = ?
+                                WHERE camera_make IS ? AND camera_model IS ?
+                            """,
+                                (self._get_camera_id(cursor, make, model), make, model),
+                            )
+                        cursor.execute(CREATE_TRIGGER_UPDATE)
+                        cursor.execute(CREATE_IMAGE_CAMERA_INDEX)
+
+                    # Version 6 to 7: R*Tree location index replacing idx_gps
+                    if current_version < 7:
+                        logger.info("Upgrading database schema: Adding location index")
+                        cursor.execute(CREATE_LOCATION_INDEX)
+                        cursor.execute(
+                            """
+                            INSERT OR REPLACE INTO image_locations
+                            SELECT id, gps_lat, gps_lat, gps_lon, gps_lon FROM images
+                            WHERE gps_lat IS NOT NULL AND gps_lon IS NOT NULL
+                        """
+                        )
+                        cursor.execute(CREATE_LOCATION_TRIGGER_INSERT)
+                        cursor.execute(CREATE_LOCATION_TRIGGER_UPDATE)
+                        cursor.execute(CREATE_LOCATION_TRIGGER_DELETE)
+                        cursor.execute("DROP INDEX IF EXISTS idx_gps")
+
+                    # Version 7 to 8: Map clustering grid
+                    if current_version < 8:
+                        logger.info("Upgrading database schema: Adding map clusters")
+                        self._create_location_clusters(cursor)
+
+                    # Version 8 to 9: Place names, added to the full-text
+                    # index when it is rebuilt below
+                    if current_version < 9:
+                        logger.info("Upgrading database schema: Adding place names")
+                        cursor.execute("PRAGMA table_info(images)")
+                        columns = [row[1] for row in cursor.fetchall()]
+                        for column in PLACE_COLUMNS:
+                            if column not in columns:
+                                cursor.execute(
+                                    f"ALTER TABLE images ADD COLUMN {column} TEXT"
+                                )
+                        self._create_place_indexes(cursor)
+
+                    # Version 9 to 10: Perceptual hashes for duplicate
+                    # detection; existing images get one when re-imported
+                    if current_version < 10:
+                        logger.info("Upgrading database schema: Adding image hashes")
+                        cursor.execute("PRAGMA table_info(images)")
+                        if "phash" not in [row[1] for row in cursor.fetchall()]:
+                            cursor.execute(
+                                "ALTER TABLE images ADD COLUMN phash INTEGER"
+                            )
+                        self._create_hash_bands(cursor)
+
+                    # Version 10 to 11: Full-text index without the id
+                    # column, with prefix indexes and column weights; the
+                    # rebuilt triggers also maintain the external content
+                    # index correctly on updates, which earlier ones did not
+                    if current_version < 11:
+                        logger.info(
+                            "Upgrading database schema: Rebuilding search index"
+                        )
+                        for trigger in ("insert", "update", "delete"):
+                            cursor.execute(
+                                f"DROP TRIGGER IF EXISTS image_{trigger}_trigger"
+                            )
+                        cursor.execute("DROP TABLE IF EXISTS image_search")
+                        self._create_search_index(cursor)
+                        cursor.execute(
+                            "INSERT INTO image_search(image_search) VALUES ('optimize')"
+                        )
+
+                    # Version 11 to 12: Description words for type-ahead
+                    # suggestions
+                    if current_version < 12:
+                        logger.info(
+                            "Upgrading database schema: Adding suggestion terms"
+                        )
+                        self._create_terms_index(cursor)
+
+                    # Version 12 to 13: Count of rewritten embeddings, so
+                    # vector indexes can append new embeddings
+                    if current_version < 13:
+                        logger.info(
+                            "Upgrading database schema: Adding embedding rewrites"
+                        )
+                        cursor.execute("PRAGMA table_info(embedding_models)")
+                        if "rewrites" not in [row[1] for row in cursor.fetchall()]:
+                            cursor.execute(
+                                "ALTER TABLE embedding_models ADD COLUMN "
+                                "rewrites INTEGER NOT NULL DEFAULT 0"
+                            )
+
                     # Update version
                     cursor.execute("UPDATE db_version SET version = ?", (DB_VERSION,))
                     conn.commit()
@@ -187,6 +896,107 @@ class ImageDatabase:
         finally:
             conn.close()
 
+    @staticmethod
+    def _create_search_index(cursor: sqlite3.Cursor) -> None:
+        """Create the full-text index and fill it from existing images."""
+        cursor.execute(CREATE_SEARCH_INDEX)
+        cursor.execute(
+            "INSERT INTO image_search(image_search, rank) VALUES ('rank', ?)",
+            (SEARCH_RANK,),
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO image_search(rowid, {_search_columns["columns"]})
+            SELECT id, {_search_columns["columns"]} FROM images
+        """
+        )
+        cursor.execute(CREATE_TRIGGER_INSERT)
+        cursor.execute(CREATE_TRIGGER_UPDATE)
+        cursor.execute(CREATE_TRIGGER_DELETE)
+
+    @staticmethod
+    def _create_terms_index(cursor: sqlite3.Cursor) -> None:
+        """Create the description words index and fill it from existing images."""
+        cursor.execute(CREATE_TERMS_INDEX)
+        cursor.execute(CREATE_TERMS_VOCAB)
+        cursor.execute(
+            """
+            INSERT INTO image_terms(rowid, description)
+            SELECT id, description FROM images WHERE description IS NOT NULL
+        """
+        )
+        cursor.execute(CREATE_TERMS_TRIGGER_INSERT)
+        cursor.execute(CREATE_TERMS_TRIGGER_UPDATE)
+        cursor.execute(CREATE_TERMS_TRIGGER_DELETE)
+
+    @staticmethod
+    def _create_place_indexes(cursor: sqlite3.Cursor) -> None:
+        """Create the case-insensitive indexes of the place name columns."""
+        for column in PLACE_COLUMNS:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{column} "
+                f"ON images({column} COLLATE NOCASE);"
+            )
+
+    @staticmethod
+    def _create_location_clusters(cursor: sqlite3.Cursor) -> None:
+        """Create the map clustering grid and fill it from existing images."""
+        cursor.execute(CREATE_CLUSTER_LEVELS_TABLE)
+        cursor.executemany(
+            "INSERT OR IGNORE INTO cluster_levels (level) VALUES (?)",
+            [(level,) for level in range(MAX_CLUSTER_LEVEL + 1)],
+        )
+        cursor.execute(CREATE_LOCATION_CLUSTERS_TABLE)
+        cursor.execute(
+            f"""
+            INSERT INTO location_clusters
+                (level, cell_x, cell_y, count, sum_lat, sum_lon, image_id)
+            SELECT level, {CLUSTER_CELL.format(row="i")},
+                   COUNT(*), SUM(i.gps_lat), SUM(i.gps_lon), MIN(i.id)
+            FROM images i, cluster_levels
+            WHERE i.gps_lat IS NOT NULL AND i.gps_lon IS NOT NULL
+            GROUP BY 1, 2, 3
+        """
+        )
+        cursor.execute(CREATE_CLUSTER_TRIGGER_INSERT)
+        cursor.execute(CREATE_CLUSTER_TRIGGER_UPDATE)
+        cursor.execute(CREATE_CLUSTER_TRIGGER_DELETE)
+
+    @staticmethod
+    def _create_hash_bands(cursor: sqlite3.Cursor) -> None:
+        """Create the perceptual hash band index and fill it from existing images."""
+        cursor.execute(CREATE_HASH_BANDS_TABLE)
+        cursor.executemany(
+            "INSERT OR IGNORE INTO image_hash_bands (band, value, image_id) VALUES (?, ?, ?)",
+            [
+                (band, value, image_id)
+                for image_id, phash in cursor.execute(
+                    "SELECT id, phash FROM images WHERE phash IS NOT NULL"
+                ).fetchall()
+                for band, value in duplicates.hash_bands(phash)
+            ],
+        )
+        cursor.execute(CREATE_HASH_TRIGGER_INSERT)
+        cursor.execute(CREATE_HASH_TRIGGER_UPDATE)
+        cursor.execute(CREATE_HASH_TRIGGER_DELETE)
+
+    def enable_wal(self) -> None:
+        """
+        Switch the database to write-ahead logging.
+
+        WAL lets many reader processes (e.g. web server workers) query the
+        database while a writer such as an import is running. The setting is
+        stored in the database file.
+        """
+        conn = self._connect()
+        try:
+            mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            if mode.lower() != "wal":
+                logger.warning(f"Could not enable WAL, journal mode is {mode}")
+        finally:
+            conn.close()
+
+    @_timed_query
     def add_image(self, metadata: Dict[str, Any]) -> int:
         """
         Add an image to the database.
@@ -238,13 +1048,20 @@ class ImageDatabase:
             vlm = metadata["vlm_description"]
             description = vlm.get("description")
             description_model = vlm.get("model")
+        elif metadata.get("description"):
+            # Plain description supplied without a VLM result
+            description = metadata["description"]
+
+        # Perceptual hash computed during extraction or import
+        phash = duplicates.parse_hash(metadata.get("phash"))
 
         # Store full metadata as JSON blob
         metadata_blob = json.dumps(metadata, default=str)
 
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         try:
             cursor = conn.cursor()
+            camera_id = self._get_camera_id(cursor, camera_make, camera_model)
 
             # Check if file already exists in the database
             cursor.execute("SELECT id FROM images WHERE file_path = ?", (file_path,))
@@ -268,6 +1085,8 @@ class ImageDatabase:
                         capture_date = ?,
                         camera_make = ?,
                         camera_model = ?,
+                        camera_id = ?,
+                        phash = ?,
                         description = ?,
                         description_model = ?,
                         thumbnail = ?,
@@ -286,6 +1105,8 @@ class ImageDatabase:
                         capture_date,
                         camera_make,
                         camera_model,
+                        camera_id,
+                        phash,
                         description,
                         description_model,
                         thumbnail,
@@ -295,6 +1116,7 @@ class ImageDatabase:
                     ),
                 )
 
+                self._bump_data_generation(cursor)
                 conn.commit()
                 return existing_id[0]
             else:
@@ -307,9 +1129,9 @@ class ImageDatabase:
                     INSERT INTO images (
                         file_path, filename, format, width, height,
                         exif, gps_lat, gps_lon, capture_date,
-                        camera_make, camera_model, description,
+                        camera_make, camera_model, camera_id, phash, description,
                         description_model, thumbnail, added_date, last_modified, metadata
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                     (
                         file_path,
@@ -323,6 +1145,8 @@ class ImageDatabase:
                         capture_date,
                         camera_make,
                         camera_model,
+                        camera_id,
+                        phash,
                         description,
                         description_model,
                         thumbnail,
@@ -333,6 +1157,7 @@ class ImageDatabase:
                 )
 
                 new_id = cursor.lastrowid
+                self._bump_data_generation(cursor)
                 conn.commit()
                 return new_id
 
@@ -343,6 +1168,24 @@ class ImageDatabase:
         finally:
             conn.close()
 
+    @_timed_query
+    def optimize_search_index(self) -> None:
+        """
+        Merge the full-text indexes into a single segment each.
+
+        Every write transaction adds a segment to an index that text
+        searches must read until background merges combine it with others.
+        Call this after bulk imports and updates.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("INSERT INTO image_search(image_search) VALUES ('optimize')")
+            conn.execute("INSERT INTO image_terms(image_terms) VALUES ('optimize')")
+            conn.commit()
+        finally:
+            conn.close()
+
+    @_timed_query
     def batch_add_images(
         self, metadata_dict: Dict[str, Dict[str, Any]], progress_callback=None
     ) -> Dict[str, int]:
@@ -375,8 +1218,12 @@ class ImageDatabase:
             if progress_callback and callable(progress_callback):
                 progress_callback(i + 1, total)
 
+        if total:
+            self.optimize_search_index()
+
         return results
 
+    @_timed_query
     def search(
         self, query: str, limit: int = 100, offset: int = 0
     ) -> List[Dict[str, Any]]:
@@ -391,7 +1238,7 @@ class ImageDatabase:
         Returns:
             List of matching image metadata
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         try:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
@@ -408,144 +1255,518 @@ class ImageDatabase:
                 (query, limit, offset),
             )
 
-            results = []
-            for row in cursor.fetchall():
-                image_data = dict(row)
-
-                # Parse JSON fields
-                try:
-                    if image_data["metadata"]:
-                        metadata_obj = json.loads(image_data["metadata"])
-                        image_data["metadata"] = metadata_obj
-
-                        # Extract VLM description from metadata if available
-                        if "vlm_description" in metadata_obj:
-                            image_data["vlm_description"] = metadata_obj[
-                                "vlm_description"
-                            ]
-
-                    if image_data["exif"]:
-                        image_data["exif"] = json.loads(image_data["exif"])
-                except json.JSONDecodeError:
-                    logger.warning(
-                        f"Could not parse JSON for image ID {image_data['id']}"
-                    )
-
-                results.append(image_data)
-
-            return results
+            return [self._parse_image_row(dict(row)) for row in cursor.fetchall()]
 
         finally:
             conn.close()
 
-    def filter_search(
-        self,
-        text_query: Optional[str] = None,
-        camera_make: Optional[str] = None,
-        camera_model: Optional[str] = None,
-        date_start: Optional[str] = None,
-        date_end: Optional[str] = None,
-        min_width: Optional[int] = None,
-        min_height: Optional[int] = None,
-        limit: int = 100,
-        offset: int = 0,
-    ) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _get_camera_id(
+        cursor: sqlite3.Cursor, make: Optional[str], model: Optional[str]
+    ) -> Optional[int]:
         """
-        Search for images with filters.
+        Get the ID of a camera, adding it and its aliases if it is new.
 
         Args:
-            text_query: Optional text to search for
-            camera_make: Optional camera manufacturer
-            camera_model: Optional camera model
-            date_start: Optional start date (ISO format)
-            date_end: Optional end date (ISO format)
-            min_width: Optional minimum image width
-            min_height: Optional minimum image height
-            limit: Maximum number of results to return
-            offset: Number of results to skip
+            cursor: Cursor of the connection to write to
+            make: Camera make as stored in EXIF data
+            model: Camera model as stored in EXIF data
 
         Returns:
-            List of matching image metadata
+            ID of the camera, or None if neither make nor model is known
         """
-        conn = sqlite3.connect(self.db_path)
-        try:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            query_parts = []
-            params = []
-
-            # Build the query conditions
-            if text_query:
-                query_parts.append(
-                    "i.id IN (SELECT rowid FROM image_search WHERE image_search MATCH ?)"
-                )
-                params.append(text_query)
-
-            if camera_make:
-                query_parts.append("i.camera_make LIKE ?")
-                params.append(f"%{camera_make}%")
+        if not make and not model:
+            return None
 
-            if camera_model:
-                query_parts.append("i.camera_model LIKE ?")
-                params.append(f"%{camera_model}%")
+        make = make or ""
+        model = model or ""
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO cameras (make, model, canonical_make, canonical_model)
+            VALUES (?, ?, ?, ?)
+        """,
+            (
+                make,
+                model,
+                cameras.canonical_make(make),
+                cameras.canonical_model(make, model),
+            ),
+        )
+        if not cursor.rowcount:
+            cursor.execute(
+                "SELECT id FROM cameras WHERE make = ? AND model = ?", (make, model)
+            )
+            return cursor.fetchone()[0]
+
+        camera_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT OR IGNORE INTO camera_aliases (field, alias, camera_id) VALUES (?, ?, ?)",
+            [
+                (field, alias, camera_id)
+                for field, alias in cameras.camera_aliases(make, model)
+            ],
+        )
+        return camera_id
+
+    @staticmethod
+    def _match_camera_alias(cursor: sqlite3.Cursor, field: str, name: str) -> Set[int]:
+        """
+        Find the cameras with a make or model alias matching a name.
+
+        Prefix matches are range scans of the alias index. Names that are
+        not a prefix of any alias fall back to substring matches, then to
+        close matches for misspellings; both read only the alias table,
+        which has a few rows per distinct camera. Close matches must have
+        the same numbers as the name, so a misspelled make or model is
+        corrected but another model of the same line is not returned.
+
+        Args:
+            cursor: Cursor of the connection to read from
+            field: "make" or "model"
+            name: Normalized name to match
+
+        Returns:
+            Set of camera IDs
+        """
+        cursor.execute(
+            """
+            SELECT camera_id FROM camera_aliases
+            WHERE field = ? AND alias >= ? AND alias < ?
+        """,
+            (field, name, name + cameras.PREFIX_END),
+        )
+        camera_ids = {row[0] for row in cursor.fetchall()}
+        if camera_ids:
+            return camera_ids
+
+        cursor.execute(
+            "SELECT alias, camera_id FROM camera_aliases WHERE field = ?", (field,)
+        )
+        aliases: Dict[str, Set[int]] = {}
+        for alias, camera_id in cursor.fetchall():
+            aliases.setdefault(alias, set()).add(camera_id)
+
+        camera_ids = {
+            camera_id
+            for alias, ids in aliases.items()
+            if name in alias
+            for camera_id in ids
+        }
+        if camera_ids:
+            return camera_ids
+
+        numbers = re.findall(r"\d+", name)
+        candidates = [
+            alias for alias in aliases if re.findall(r"\d+", alias) == numbers
+        ]
+        for alias in difflib.get_close_matches(
+            name, candidates, n=MAX_FUZZY_CAMERA_MATCHES, cutoff=FUZZY_CAMERA_CUTOFF
+        ):
+            camera_ids |= aliases[alias]
+        return camera_ids
+
+    def _resolve_cameras(
+        self,
+        cursor: sqlite3.Cursor,
+        camera_make: Optional[str],
+        camera_model: Optional[str],
+    ) -> Optional[List[int]]:
+        """Resolve camera filters to camera IDs with the given cursor."""
+        camera_ids = None
+        for field, name in (
+            ("make", cameras.canonical_make(camera_make)),
+            ("model", cameras.normalize_name(camera_model)),
+        ):
+            if not name:
+                continue
+            matches = self._match_camera_alias(cursor, field, name)
+            camera_ids = matches if camera_ids is None else camera_ids & matches
+        return None if camera_ids is None else sorted(camera_ids)
+
+    @_timed_query
+    def resolve_cameras(
+        self, camera_make: Optional[str] = None, camera_model: Optional[str] = None
+    ) -> Optional[List[int]]:
+        """
+        Resolve camera make and model filters to camera IDs.
+
+        Names are matched case-insensitively against each camera's aliases,
+        e.g. "nikon" matches the make "NIKON CORPORATION" and "eos 5d" the
+        model "Canon EOS 5D"; see _match_camera_alias for the matching order.
+
+        Args:
+            camera_make: Optional camera manufacturer
+            camera_model: Optional camera model
+
+        Returns:
+            IDs of the matching cameras, or None if no camera filter is given
+        """
+        conn = self._connect()
+        try:
+            return self._resolve_cameras(conn.cursor(), camera_make, camera_model)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _location_candidates(boxes: List[geo.BBox], params: List[Any]) -> str:
+        """
+        Build the condition selecting images in bounding boxes.
+
+        Args:
+            boxes: Bounding boxes with min_lon <= max_lon
+            params: Query parameters, extended with those of the condition
+
+        Returns:
+            SQL condition on i.id, answered from the R*Tree
+        """
+        selects = []
+        for min_lat, min_lon, max_lat, max_lon in boxes:
+            selects.append(
+                "SELECT id FROM image_locations "
+                "WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?"
+            )
+            params.extend([min_lat, max_lat, min_lon, max_lon])
+        return f"i.id IN ({' UNION ALL '.join(selects)})"
+
+    @staticmethod
+    def _build_filter_query(
+        text_query: Optional[str] = None,
+        camera_ids: Optional[List[int]] = None,
+        date_start: Optional[str] = None,
+        date_end: Optional[str] = None,
+        min_width: Optional[int] = None,
+        min_height: Optional[int] = None,
+        bbox: Optional[geo.BBox] = None,
+        near: Optional[geo.Near] = None,
+        place: Optional[str] = None,
+        limit: Optional[int] = 100,
+        offset: int = 0,
+        after_id: Optional[int] = None,
+        order_by: str = "capture_date DESC",
+    ) -> Tuple[str, List[Any]]:
+        """Build the SQL query and parameters of a filtered search."""
+        query_parts = []
+        params: List[Any] = []
+
+        # Build the query conditions
+        if text_query:
+            query_parts.append(
+                "i.id IN (SELECT rowid FROM image_search WHERE image_search MATCH ?)"
+            )
+            params.append(text_query)
+
+        # Camera filters are resolved to IDs up front; an empty list of
+        # IDs matches nothing
+        if camera_ids is not None:
+            query_parts.append(f"i.camera_id IN ({', '.join('?' * len(camera_ids))})")
+            params.extend(camera_ids)
+
+        if date_start:
+            query_parts.append("i.capture_date >= ?")
+            params.append(date_start)
+
+        if date_end:
+            query_parts.append("i.capture_date <= ?")
+            params.append(date_end)
+
+        if min_width:
+            query_parts.append("i.width >= ?")
+            params.append(min_width)
+
+        if min_height:
+            query_parts.append("i.height >= ?")
+            params.append(min_height)
+
+        # Location filters select candidates from the R*Tree, then check the
+        # exact coordinates, as the R*Tree stores rounded 32-bit floats
+        if bbox:
+            min_lat, min_lon, max_lat, max_lon = bbox = geo.parse_bbox(bbox)
+            boxes = geo.split_bbox(bbox)
+            query_parts.append(ImageDatabase._location_candidates(boxes, params))
+            query_parts.append("i.gps_lat BETWEEN ? AND ?")
+            params.extend([min_lat, max_lat])
+            query_parts.append(
+                "i.gps_lon BETWEEN ? AND ?"
+                if min_lon <= max_lon
+                else "(i.gps_lon >= ? OR i.gps_lon <= ?)"
+            )
+            params.extend([min_lon, max_lon])
+
+        if near:
+            lat, lon, radius_km = geo.parse_near(near)
+            boxes = geo.radius_bboxes(lat, lon, radius_km)
+            query_parts.append(ImageDatabase._location_candidates(boxes, params))
+            query_parts.append("haversine_km(i.gps_lat, i.gps_lon, ?, ?) <= ?")
+            params.extend([lat, lon, radius_km])
+
+        if place:
+            query_parts.append(
+                "("
+                + " OR ".join(
+                    f"i.{column} = ? COLLATE NOCASE" for column in PLACE_COLUMNS
+                )
+                + ")"
+            )
+            params.extend([place] * len(PLACE_COLUMNS))
+
+        if after_id:
+            query_parts.append("i.id > ?")
+            params.append(after_id)
 
-            if date_start:
-                query_parts.append("i.capture_date >= ?")
-                params.append(date_start)
+        # Build the full query; a negative limit means no limit in SQLite
+        query = "SELECT * FROM images i"
+        if query_parts:
+            query += " WHERE " + " AND ".join(query_parts)
 
-            if date_end:
-                query_parts.append("i.capture_date <= ?")
-                params.append(date_end)
+        query += f" ORDER BY {order_by} LIMIT ? OFFSET ?"
+        params.extend([-1 if limit is None else limit, offset])
 
-            if min_width:
-                query_parts.append("i.width >= ?")
-                params.append(min_width)
+        return query, params
 
-            if min_height:
-                query_parts.append("i.height >= ?")
-                params.append(min_height)
+    @_timed_query
+    def filter_search(
+        self,
+        text_query: Optional[str] = None,
+        camera_make: Optional[str] = None,
+        camera_model: Optional[str] = None,
+        date_start: Optional[str] = None,
+        date_end: Optional[str] = None,
+        min_width: Optional[int] = None,
+        min_height: Optional[int] = None,
+        bbox: Optional[geo.BBox] = None,
+        near: Optional[geo.Near] = None,
+        place: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for images with filters.
 
-            # Build the full query
-            query = "SELECT * FROM images i"
-            if query_parts:
-                query += " WHERE " + " AND ".join(query_parts)
+        Args:
+            text_query: Optional text to search for
+            camera_make: Optional camera manufacturer
+            camera_model: Optional camera model
+            date_start: Optional start date (ISO format)
+            date_end: Optional end date (ISO format)
+            min_width: Optional minimum image width
+            min_height: Optional minimum image height
+            bbox: Optional bounding box (min_lat, min_lon, max_lat, max_lon);
+                  min_lon > max_lon selects a box crossing the antimeridian
+            near: Optional (lat, lon, radius_km) of a radius search
+            place: Optional city, region or country name (see set_places)
+            limit: Maximum number of results to return
+            offset: Number of results to skip
 
-            query += " ORDER BY capture_date DESC LIMIT ? OFFSET ?"
-            params.extend([limit, offset])
+        Returns:
+            List of matching image metadata
+        """
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
 
+            query, params = self._build_filter_query(
+                text_query=text_query,
+                camera_ids=self._resolve_cameras(cursor, camera_make, camera_model),
+                date_start=date_start,
+                date_end=date_end,
+                min_width=min_width,
+                min_height=min_height,
+                bbox=bbox,
+                near=near,
+                place=place,
+                limit=limit,
+                offset=offset,
+            )
             cursor.execute(query, params)
 
-            results = []
-            for row in cursor.fetchall():
-                image_data = dict(row)
+            return [self._parse_image_row(dict(row)) for row in cursor.fetchall()]
 
-                # Parse JSON fields
-                try:
-                    if image_data["metadata"]:
-                        metadata_obj = json.loads(image_data["metadata"])
-                        image_data["metadata"] = metadata_obj
-
-                        # Extract VLM description from metadata if available
-                        if "vlm_description" in metadata_obj:
-                            image_data["vlm_description"] = metadata_obj[
-                                "vlm_description"
-                            ]
-
-                    if image_data["exif"]:
-                        image_data["exif"] = json.loads(image_data["exif"])
-                except json.JSONDecodeError:
-                    logger.warning(
-                        f"Could not parse JSON for image ID {image_data['id']}"
-                    )
+        finally:
+            conn.close()
 
-                results.append(image_data)
+    def iter_filter_search(
+        self,
+        text_query: Optional[str] = None,
+        camera_make: Optional[str] = None,
+        camera_model: Optional[str] = None,
+        date_start: Optional[str] = None,
+        date_end: Optional[str] = None,
+        min_width: Optional[int] = None,
+        min_height: Optional[int] = None,
+        bbox: Optional[geo.BBox] = None,
+        near: Optional[geo.Near] = None,
+        place: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        batch_size: int = STREAM_BATCH_SIZE,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Search for images with filters, yielding results as they are read.
 
-            return results
+        Rows are fetched from the cursor in batches, so memory use does not
+        grow with the number of results. The connection stays open until
+        the generator is exhausted or closed.
+
+        Args:
+            text_query: Optional text to search for
+            camera_make: Optional camera manufacturer
+            camera_model: Optional camera model
+            date_start: Optional start date (ISO format)
+            date_end: Optional end date (ISO format)
+            min_width: Optional minimum image width
+            min_height: Optional minimum image height
+            bbox: Optional bounding box (min_lat, min_lon, max_lat, max_lon);
+                  min_lon > max_lon selects a box crossing the antimeridian
+            near: Optional (lat, lon, radius_km) of a radius search
+            place: Optional city, region or country name (see set_places)
+            limit: Maximum number of results, or None for all matches
+            offset: Number of results to skip
+            batch_size: Number of rows fetched from the cursor at a time
+
+        Yields:
+            Matching image metadata
+        """
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+
+            query, params = self._build_filter_query(
+                text_query=text_query,
+                camera_ids=self._resolve_cameras(cursor, camera_make, camera_model),
+                date_start=date_start,
+                date_end=date_end,
+                min_width=min_width,
+                min_height=min_height,
+                bbox=bbox,
+                near=near,
+                place=place,
+                limit=limit,
+                offset=offset,
+            )
+            cursor.execute(query, params)
+
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._parse_image_row(dict(row))
+
+        finally:
+            conn.close()
+
+    def iter_images(
+        self,
+        text_query: Optional[str] = None,
+        camera_make: Optional[str] = None,
+        camera_model: Optional[str] = None,
+        date_start: Optional[str] = None,
+        date_end: Optional[str] = None,
+        min_width: Optional[int] = None,
+        min_height: Optional[int] = None,
+        bbox: Optional[geo.BBox] = None,
+        near: Optional[geo.Near] = None,
+        place: Optional[str] = None,
+        after_id: int = 0,
+        batch_size: int = STREAM_BATCH_SIZE,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the catalogue, or a filtered subset, in ID order.
+
+        A single cursor is read in batches, so exporting the whole catalogue
+        uses constant memory. Exports can be resumed with after_id.
+
+        Args:
+            text_query: Optional text to search for
+            camera_make: Optional camera manufacturer
+            camera_model: Optional camera model
+            date_start: Optional start date (ISO format)
+            date_end: Optional end date (ISO format)
+            min_width: Optional minimum image width
+            min_height: Optional minimum image height
+            bbox: Optional bounding box (min_lat, min_lon, max_lat, max_lon);
+                  min_lon > max_lon selects a box crossing the antimeridian
+            near: Optional (lat, lon, radius_km) of a radius search
+            place: Optional city, region or country name (see set_places)
+            after_id: Only return images with a greater ID
+            batch_size: Number of rows fetched from the cursor at a time
+
+        Yields:
+            Image data, in increasing ID order
+        """
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+
+            query, params = self._build_filter_query(
+                text_query=text_query,
+                camera_ids=self._resolve_cameras(cursor, camera_make, camera_model),
+                date_start=date_start,
+                date_end=date_end,
+                min_width=min_width,
+                min_height=min_height,
+                bbox=bbox,
+                near=near,
+                place=place,
+                limit=None,
+                after_id=after_id,
+                order_by="i.id",
+            )
+            cursor.execute(query, params)
+
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._parse_image_row(dict(row))
+
+        finally:
+            conn.close()
+
+    def iter_embeddings(
+        self,
+        model_name: str,
+        after_id: int = 0,
+        batch_size: int = STREAM_BATCH_SIZE,
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Iterate over the embeddings of a model in image ID order.
+
+        Args:
+            model_name: Name of the embedding model
+            after_id: Only return embeddings of images with a greater ID
+            batch_size: Number of rows fetched from the cursor at a time
+
+        Yields:
+            Tuples of (image_id, float32 embedding vector)
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT image_id, embedding FROM text_embeddings
+                WHERE model_name = ? AND image_id > ?
+                ORDER BY image_id
+            """,
+                (model_name, after_id),
+            )
+
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for image_id, embedding_blob in rows:
+                    yield image_id, np.frombuffer(embedding_blob, dtype=np.float32)
 
         finally:
             conn.close()
 
+    @_timed_query
     def get_camera_stats(self) -> List[Dict[str, Any]]:
         """
         Get statistics about cameras in the collection.
@@ -553,7 +1774,7 @@ class ImageDatabase:
         Returns:
             List of camera models and image counts
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         try:
             cursor = conn.cursor()
 
@@ -576,6 +1797,7 @@ class ImageDatabase:
         finally:
             conn.close()
 
+    @_timed_query
     def get_date_stats(self, by: str = "month") -> List[Dict[str, Any]]:
         """
         Get statistics about image dates.
@@ -586,7 +1808,7 @@ class ImageDatabase:
         Returns:
             List of dates and image counts
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         try:
             cursor = conn.cursor()
 
@@ -615,6 +1837,302 @@ class ImageDatabase:
         finally:
             conn.close()
 
+    @_timed_query
+    def get_location_clusters(
+        self, zoom: int, bbox: Optional[geo.BBox] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get clusters of geotagged images for a map view.
+
+        Clusters are read from the precomputed grid level matching the zoom,
+        so the cost depends on the number of cells in view rather than the
+        number of images. Beyond the deepest level, images in the bounding
+        box are returned individually, as clusters of one.
+
+        Args:
+            zoom: Map zoom level (0 shows the whole world in one tile)
+            bbox: Optional viewport (min_lat, min_lon, max_lat, max_lon)
+
+        Returns:
+            List of clusters with the centroid (lat, lon), image count and
+            the ID of a representative image
+        """
+        level = max(0, zoom + CLUSTER_CELL_BITS)
+        boxes = geo.split_bbox(geo.parse_bbox(bbox)) if bbox else None
+
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+
+            if level > MAX_CLUSTER_LEVEL and boxes:
+                params: List[Any] = []
+                cursor.execute(
+                    f"""
+                    SELECT id, gps_lat, gps_lon FROM images i
+                    WHERE {self._location_candidates(boxes, params)}
+                    LIMIT ?
+                """,
+                    params + [MAX_CLUSTER_POINTS],
+                )
+                return [
+                    {"lat": lat, "lon": lon, "count": 1, "image_id": image_id}
+                    for image_id, lat, lon in cursor.fetchall()
+                ]
+
+            level = min(level, MAX_CLUSTER_LEVEL)
+            ranges = [(None, None)]
+            if boxes:
+                ranges = [
+                    (
+                        geo.grid_cell(max_lat, min_lon, level),
+                        geo.grid_cell(min_lat, max_lon, level),
+                    )
+                    for min_lat, min_lon, max_lat, max_lon in boxes
+                ]
+
+            clusters = []
+            for start, end in ranges:
+                query = """
+                    SELECT count, sum_lat, sum_lon, image_id FROM location_clusters
+                    WHERE level = ?
+                """
+                params = [level]
+                if start:
+                    query += " AND cell_x BETWEEN ? AND ? AND cell_y BETWEEN ? AND ?"
+                    params.extend([start[0], end[0], start[1], end[1]])
+                cursor.execute(query, params)
+                clusters.extend(
+                    {
+                        "lat": sum_lat / count,
+                        "lon": sum_lon / count,
+                        "count": count,
+                        "image_id": image_id,
+                    }
+                    for count, sum_lat, sum_lon, image_id in cursor.fetchall()
+                )
+            return clusters
+
+        finally:
+            conn.close()
+
+    @_timed_query
+    def get_locations_to_geocode(
+        self, overwrite: bool = False
+    ) -> List[Tuple[int, float, float]]:
+        """
+        Get the coordinates of geotagged images for reverse geocoding.
+
+        Args:
+            overwrite: Whether to include images that already have a place
+
+        Returns:
+            List of (image_id, lat, lon) tuples in image ID order
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            query = """
+                SELECT id, gps_lat, gps_lon FROM images
+                WHERE gps_lat IS NOT NULL AND gps_lon IS NOT NULL
+            """
+            if not overwrite:
+                query += " AND place_city IS NULL AND place_country IS NULL"
+            cursor.execute(query + " ORDER BY id")
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    @_timed_query
+    def get_suggestion_terms(self) -> Dict[str, List[Tuple[Any, ...]]]:
+        """
+        Get the words and names type-ahead suggestions complete to.
+
+        Every query is answered from an index: description words from the
+        image_terms vocabulary, the others from column indexes.
+
+        Returns:
+            Dictionary with lists of (word, image count) rows for "terms",
+            (make, model, image count) rows for "cameras", (name, image
+            count) rows for "places" and (year, image count) rows for "years"
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            terms = cursor.execute("SELECT term, doc FROM image_terms_vocab").fetchall()
+            cameras = cursor.execute(
+                """
+                SELECT camera_make, camera_model, COUNT(*) FROM images
+                WHERE camera_make IS NOT NULL AND camera_model IS NOT NULL
+                GROUP BY camera_make, camera_model
+            """
+            ).fetchall()
+            places = []
+            for column in PLACE_COLUMNS:
+                places.extend(
+                    cursor.execute(
+                        f"""
+                        SELECT {column}, COUNT(*) FROM images
+                        WHERE {column} IS NOT NULL
+                        GROUP BY {column}
+                    """
+                    ).fetchall()
+                )
+            years = cursor.execute(
+                """
+                SELECT substr(capture_date, 1, 4) AS year, COUNT(*) FROM images
+                WHERE capture_date IS NOT NULL
+                GROUP BY year
+            """
+            ).fetchall()
+            return {
+                "terms": terms,
+                "cameras": cameras,
+                "places": places,
+                "years": years,
+            }
+        finally:
+            conn.close()
+
+    @_timed_query
+    def set_places(
+        self,
+        places: List[Tuple[int, Optional[geo.Place]]],
+    ) -> None:
+        """
+        Store the place names of images in a single transaction.
+
+        Args:
+            places: List of (image_id, place) tuples, where place is a
+                    (city, region, country) tuple, or None to clear it
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(
+                """
+                UPDATE images SET place_city = ?, place_region = ?, place_country = ?
+                WHERE id = ?
+            """,
+                [
+                    (*(place or (None, None, None)), image_id)
+                    for image_id, place in places
+                ],
+            )
+            self._bump_data_generation(cursor)
+            conn.commit()
+        finally:
+            conn.close()
+
+    @_timed_query
+    def find_duplicates(
+        self,
+        max_distance: int = duplicates.MAX_DUPLICATE_DISTANCE,
+        image_id: Optional[int] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Find groups of duplicate and near-duplicate images.
+
+        Candidates are images sharing a band of their perceptual hashes,
+        found with index lookups, and are then compared by Hamming distance.
+        Matches are grouped transitively, so images at the ends of a burst
+        can be further apart than max_distance.
+
+        Args:
+            max_distance: Maximum number of bits the hashes of duplicates
+                          differ in (at most duplicates.MAX_DUPLICATE_DISTANCE)
+            image_id: Optional ID of an image to find the duplicates of
+
+        Returns:
+            Groups of at least two images ordered by ID, each image with the
+            "distance" of its hash from that of the first image of the group
+
+        Raises:
+            ValueError: If max_distance is out of range
+        """
+        duplicates.check_distance(max_distance)
+
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+
+            if image_id is None:
+                cursor.execute(
+                    """
+                    SELECT DISTINCT a.image_id, b.image_id
+                    FROM image_hash_bands a
+                    JOIN image_hash_bands b
+                        ON b.band = a.band AND b.value = a.value
+                        AND b.image_id > a.image_id
+                    JOIN images ia ON ia.id = a.image_id
+                    JOIN images ib ON ib.id = b.image_id
+                    WHERE hamming_distance(ia.phash, ib.phash) <= ?
+                """,
+                    (max_distance,),
+                )
+            else:
+                cursor.execute("SELECT phash FROM images WHERE id = ?", (image_id,))
+                row = cursor.fetchone()
+                if row is None or row["phash"] is None:
+                    return []
+                bands = duplicates.hash_bands(row["phash"])
+                cursor.execute(
+                    f"""
+                    SELECT DISTINCT ?, b.image_id
+                    FROM (VALUES {", ".join(["(?, ?)"] * len(bands))}) q
+                    JOIN image_hash_bands b
+                        ON b.band = q.column1 AND b.value = q.column2
+                    JOIN images i ON i.id = b.image_id
+                    WHERE b.image_id != ?
+                    AND hamming_distance(?, i.phash) <= ?
+                """,
+                    (
+                        image_id,
+                        *[value for band in bands for value in band],
+                        image_id,
+                        row["phash"],
+                        max_distance,
+                    ),
+                )
+            pairs = cursor.fetchall()
+
+            # Union-find over the matching pairs; the root of each group is
+            # its smallest image ID
+            parents: Dict[int, int] = {}
+
+            def find(i: int) -> int:
+                while parents.setdefault(i, i) != i:
+                    parents[i] = parents[parents[i]]
+                    i = parents[i]
+                return i
+
+            for a, b in pairs:
+                root_a, root_b = find(a), find(b)
+                if root_a != root_b:
+                    parents[max(root_a, root_b)] = min(root_a, root_b)
+
+            groups: Dict[int, List[int]] = {}
+            for i in sorted(parents):
+                groups.setdefault(find(i), []).append(i)
+
+            images = {
+                image["id"]: image
+                for image in self._fetch_images(cursor, sorted(parents))
+            }
+            results = []
+            for root in sorted(groups):
+                group = [images[i] for i in groups[root] if i in images]
+                for image in group:
+                    image["distance"] = duplicates.hamming_distance(
+                        group[0]["phash"], image["phash"]
+                    )
+                results.append(group)
+            return results
+
+        finally:
+            conn.close()
+
+    @_timed_query
     def get_stats(self) -> Dict[str, Any]:
         """
         Get database statistics.
@@ -622,7 +2140,7 @@ class ImageDatabase:
         Returns:
             Dictionary with statistics
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         try:
             cursor = conn.cursor()
 
@@ -631,9 +2149,7 @@ class ImageDatabase:
             total_images = cursor.fetchone()[0]
 
             # Get images with GPS data
-            cursor.execute(
-                "SELECT COUNT(*) FROM images WHERE gps_lat IS NOT NULL AND gps_lon IS NOT NULL"
-            )
+            cursor.execute("SELECT COUNT(*) FROM image_locations")
             gps_images = cursor.fetchone()[0]
 
             # Get images with VLM descriptions
@@ -671,6 +2187,152 @@ class ImageDatabase:
         finally:
             conn.close()
 
+    @staticmethod
+    def _embedding_row(
+        image_id: int, embedding_data: Dict[str, Any], embedding_array: np.ndarray
+    ) -> tuple:
+        """Build the parameters of an UPSERT_EMBEDDING statement."""
+        return (
+            image_id,
+            embedding_data.get("text", ""),
+            embedding_data.get("model", "unknown"),
+            len(embedding_array),
+            embedding_array.tobytes(),
+            datetime.now(timezone.utc).isoformat(),
+        )
+
+    @staticmethod
+    def _register_embedding_model(
+        cursor: sqlite3.Cursor, model_name: str, embedding_size: int
+    ) -> None:
+        """
+        Register an embedding model, checking its dimensionality.
+
+        The first model registered in a database becomes the default model.
+
+        Args:
+            cursor: Cursor of an open database connection
+            model_name: Name of the embedding model
+            embedding_size: Dimensionality of the model's embeddings
+
+        Raises:
+            ValueError: If the model is registered with a different dimensionality
+        """
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO embedding_models (
+                model_name, embedding_size, generation, added_date
+            ) VALUES (?, ?, 0, ?)
+        """,
+            (model_name, embedding_size, datetime.now(timezone.utc).isoformat()),
+        )
+        cursor.execute(
+            "SELECT embedding_size FROM embedding_models WHERE model_name = ?",
+            (model_name,),
+        )
+        registered_size = cursor.fetchone()[0]
+        if registered_size != embedding_size:
+            raise ValueError(
+                f"Model {model_name} produces {registered_size}-dimensional "
+                f"embeddings, got {embedding_size}"
+            )
+
+        cursor.execute(
+            "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
+            (DEFAULT_EMBEDDING_MODEL_KEY, model_name),
+        )
+
+    def _bump_embedding_generation(
+        self, cursor: sqlite3.Cursor, model_name: str, rewritten: bool = True
+    ) -> None:
+        """Mark the embeddings of a model as changed, or only added to."""
+        cursor.execute(
+            """
+            UPDATE embedding_models
+            SET generation = generation + 1, rewrites = rewrites + ?
+            WHERE model_name = ?
+        """,
+            (int(rewritten), model_name),
+        )
+        self._bump_data_generation(cursor)
+
+    def _bump_data_generation(self, cursor: sqlite3.Cursor) -> None:
+        """Mark the searchable data as changed."""
+        self.write_count += 1
+        cursor.execute(
+            """
+            INSERT INTO settings (key, value) VALUES (?, 1)
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+            """,
+            (DATA_GENERATION_KEY,),
+        )
+
+    @_timed_query
+    def get_data_generation(self) -> int:
+        """
+        Get the counter bumped by every write that can change search results.
+
+        Returns:
+            Current data generation
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT value FROM settings WHERE key = ?", (DATA_GENERATION_KEY,)
+            )
+            row = cursor.fetchone()
+            return int(row[0]) if row else 0
+        finally:
+            conn.close()
+
+    def _write_embedding(
+        self, cursor: sqlite3.Cursor, image_id: int, embedding_data: Dict[str, Any]
+    ) -> int:
+        """
+        Insert or update a text embedding using an existing cursor.
+
+        The caller is responsible for committing the transaction.
+
+        Args:
+            cursor: Cursor of an open database connection
+            image_id: ID of the image
+            embedding_data: Dictionary containing embedding data
+
+        Returns:
+            ID of the inserted or updated embedding
+        """
+        cursor.execute("SELECT id FROM images WHERE id = ?", (image_id,))
+        if not cursor.fetchone():
+            raise ValueError(f"Image ID {image_id} not found in database")
+
+        embedding_array = embedding_data.get("embedding")
+        if embedding_array is None:
+            raise ValueError("Embedding data must contain an 'embedding' field")
+
+        # Store embeddings as float32 to ensure consistent storage
+        embedding_array = np.asarray(embedding_array, dtype=np.float32).ravel()
+
+        row = self._embedding_row(image_id, embedding_data, embedding_array)
+        self._register_embedding_model(cursor, row[2], row[3])
+        last_id = self._last_embedding_id(cursor)
+        cursor.execute(UPSERT_EMBEDDING, row)
+
+        cursor.execute(
+            "SELECT id FROM text_embeddings WHERE image_id = ? AND model_name = ?",
+            (image_id, row[2]),
+        )
+        embedding_id = cursor.fetchone()[0]
+        self._bump_embedding_generation(cursor, row[2], embedding_id <= last_id)
+        return embedding_id
+
+    @staticmethod
+    def _last_embedding_id(cursor: sqlite3.Cursor) -> int:
+        """Get the highest embedding ID; updated embeddings keep their IDs."""
+        cursor.execute("SELECT MAX(id) FROM text_embeddings")
+        return cursor.fetchone()[0] or 0
+
+    @_timed_query
     def add_embedding(self, image_id: int, embedding_data: Dict[str, Any]) -> int:
         """
         Add or update a text embedding for an image.
@@ -686,116 +2348,223 @@ class ImageDatabase:
         Returns:
             ID of the inserted embedding
         """
-        # Check if image_id exists
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT id FROM images WHERE id = ?", (image_id,))
-            if not cursor.fetchone():
-                raise ValueError(f"Image ID {image_id} not found in database")
-
-            # Extract embedding data
-            text = embedding_data.get("text", "")
-            model_name = embedding_data.get("model", "unknown")
-            embedding_size = embedding_data.get("embedding_size", 0)
-            embedding_array = embedding_data.get("embedding")
-
-            if embedding_array is None:
-                raise ValueError("Embedding data must contain an 'embedding' field")
-
-            # Convert numpy array to bytes for storage - make sure it's float32
-            if hasattr(embedding_array, "tobytes"):
-                # Convert to float32 to ensure consistent storage
-                embedding_array = embedding_array.astype(np.float32)
-                embedding_blob = embedding_array.tobytes()
-            else:
-                # If it's not already a numpy array, convert it
-                embedding_array = np.array(embedding_array, dtype=np.float32)
-                embedding_blob = embedding_array.tobytes()
+            embedding_id = self._write_embedding(cursor, image_id, embedding_data)
+            conn.commit()
+            return embedding_id
 
-            # Update embedding size to match actual array size
-            embedding_size = len(embedding_array)
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error adding embedding to database: {str(e)}")
+            raise
+        finally:
+            conn.close()
 
-            now = datetime.now(timezone.utc).isoformat()
+    @_timed_query
+    def batch_add_embeddings(
+        self, embeddings_dict: Dict[int, Dict[str, Any]], progress_callback=None
+    ) -> Dict[int, int]:
+        """
+        Add or update multiple embeddings in a single transaction.
 
-            # Check if embedding for this image and model already exists
-            cursor.execute(
-                """
-                SELECT id FROM text_embeddings
-                WHERE image_id = ? AND model_name = ?
-            """,
-                (image_id, model_name),
-            )
-            existing_id = cursor.fetchone()
+        Embeddings are converted to float32 as stacked arrays and written
+        with one executemany upsert, so re-embedding a library is a single
+        pass over the table.
 
-            if existing_id:
-                # Update existing embedding
-                cursor.execute(
-                    """
-                    UPDATE text_embeddings SET
-                        text = ?,
-                        embedding_size = ?,
-                        embedding = ?,
-                        added_date = ?
-                    WHERE id = ?
-                """,
-                    (text, embedding_size, embedding_blob, now, existing_id[0]),
-                )
+        Args:
+            embeddings_dict: Dictionary with image IDs as keys and embedding data as values
+            progress_callback: Optional callback function to report progress
 
-                conn.commit()
-                return existing_id[0]
-            else:
-                # Insert new embedding
+        Returns:
+            Dictionary mapping image IDs to embedding IDs (None for failures)
+        """
+        results = {image_id: None for image_id in embeddings_dict}
+        total = len(embeddings_dict)
+        if not total:
+            return results
+
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+
+            # Look up which images exist with chunked IN queries
+            image_ids = list(embeddings_dict)
+            existing = set()
+            for i in range(0, len(image_ids), MAX_QUERY_PARAMS):
+                chunk = image_ids[i : i + MAX_QUERY_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
                 cursor.execute(
-                    """
-                    INSERT INTO text_embeddings (
-                        image_id, text, model_name, embedding_size, embedding, added_date
-                    ) VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                    (image_id, text, model_name, embedding_size, embedding_blob, now),
+                    f"SELECT id FROM images WHERE id IN ({placeholders})", chunk
                 )
+                existing.update(row[0] for row in cursor.fetchall())
+
+            # Group valid embeddings by model and dimensionality so each group
+            # can be converted to float32 in one vectorized operation
+            groups: Dict[tuple, List[int]] = {}
+            for image_id, embedding_data in embeddings_dict.items():
+                if image_id not in existing:
+                    logger.error(f"Image ID {image_id} not found in database")
+                    continue
+                if embedding_data.get("embedding") is None:
+                    logger.error(
+                        f"Embedding data for image {image_id} has no 'embedding' field"
+                    )
+                    continue
+                size = int(np.size(embedding_data["embedding"]))
+                model_name = embedding_data.get("model", "unknown")
+                groups.setdefault((model_name, size), []).append(image_id)
 
-                new_id = cursor.lastrowid
-                conn.commit()
-                return new_id
+            rows = []
+            for (model_name, size), group_ids in groups.items():
+                try:
+                    self._register_embedding_model(cursor, model_name, size)
+                except ValueError as e:
+                    logger.error(f"Skipping {len(group_ids)} embeddings: {str(e)}")
+                    continue
+
+                matrix = np.asarray(
+                    [embeddings_dict[image_id]["embedding"] for image_id in group_ids],
+                    dtype=np.float32,
+                ).reshape(len(group_ids), -1)
+                for image_id, embedding_array in zip(group_ids, matrix):
+                    rows.append(
+                        self._embedding_row(
+                            image_id, embeddings_dict[image_id], embedding_array
+                        )
+                    )
+
+            last_id = self._last_embedding_id(cursor)
+            cursor.executemany(UPSERT_EMBEDDING, rows)
+
+            # Resolve the embedding IDs of the written rows
+            by_model: Dict[str, List[int]] = {}
+            for row in rows:
+                by_model.setdefault(row[2], []).append(row[0])
+            for model_name, model_image_ids in by_model.items():
+                rewritten = False
+                for i in range(0, len(model_image_ids), MAX_QUERY_PARAMS):
+                    chunk = model_image_ids[i : i + MAX_QUERY_PARAMS]
+                    placeholders = ",".join("?" * len(chunk))
+                    cursor.execute(
+                        f"""
+                        SELECT image_id, id FROM text_embeddings
+                        WHERE model_name = ? AND image_id IN ({placeholders})
+                    """,
+                        [model_name, *chunk],
+                    )
+                    for image_id, embedding_id in cursor.fetchall():
+                        results[image_id] = embedding_id
+                        rewritten = rewritten or embedding_id <= last_id
+                self._bump_embedding_generation(cursor, model_name, rewritten)
+
+            conn.commit()
+
+            # Call progress callback if provided
+            if progress_callback and callable(progress_callback):
+                progress_callback(total, total)
+
+            return results
 
         except Exception as e:
             conn.rollback()
-            logger.error(f"Error adding embedding to database: {str(e)}")
+            logger.error(f"Error adding embeddings to database: {str(e)}")
             raise
         finally:
             conn.close()
 
-    def batch_add_embeddings(
-        self, embeddings_dict: Dict[int, Dict[str, Any]], progress_callback=None
-    ) -> Dict[int, int]:
+    @_timed_query
+    def get_cached_embeddings(
+        self, model_name: str, texts: List[str]
+    ) -> Dict[str, np.ndarray]:
         """
-        Add multiple embeddings to the database.
+        Look up previously generated embeddings for texts.
 
         Args:
-            embeddings_dict: Dictionary with image IDs as keys and embedding data as values
-            progress_callback: Optional callback function to report progress
+            model_name: Name of the embedding model
+            texts: Texts to look up
+
+        Returns:
+            Dictionary mapping each cached text to its embedding
+        """
+        hashes: Dict[str, List[str]] = {}
+        for text in texts:
+            hashes.setdefault(text_hash(text), []).append(text)
+
+        results = {}
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            hash_list = list(hashes)
+            for i in range(0, len(hash_list), MAX_QUERY_PARAMS):
+                chunk = hash_list[i : i + MAX_QUERY_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(
+                    f"""
+                    SELECT text_hash, embedding FROM embedding_cache
+                    WHERE model_name = ? AND text_hash IN ({placeholders})
+                """,
+                    [model_name, *chunk],
+                )
+                for hash_value, embedding_blob in cursor.fetchall():
+                    embedding = np.frombuffer(embedding_blob, dtype=np.float32)
+                    for text in hashes[hash_value]:
+                        results[text] = embedding
+
+            return results
+
+        finally:
+            conn.close()
+
+    @_timed_query
+    def cache_embeddings(
+        self, model_name: str, embeddings: Dict[str, np.ndarray]
+    ) -> None:
+        """
+        Store generated embeddings in the embedding cache.
 
-        Returns:
-            Dictionary mapping image IDs to embedding IDs
+        Args:
+            model_name: Name of the embedding model
+            embeddings: Dictionary mapping texts to their embeddings
         """
-        results = {}
-        total = len(embeddings_dict)
+        if not embeddings:
+            return
 
-        for i, (image_id, embedding_data) in enumerate(embeddings_dict.items()):
-            try:
-                embedding_id = self.add_embedding(image_id, embedding_data)
-                results[image_id] = embedding_id
-            except Exception as e:
-                logger.error(f"Error adding embedding for image {image_id}: {str(e)}")
-                results[image_id] = None
+        now = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for text, embedding in embeddings.items():
+            embedding_array = np.asarray(embedding, dtype=np.float32).ravel()
+            rows.append(
+                (
+                    model_name,
+                    text_hash(text),
+                    len(embedding_array),
+                    embedding_array.tobytes(),
+                    now,
+                )
+            )
 
-            # Call progress callback if provided
-            if progress_callback and callable(progress_callback):
-                progress_callback(i + 1, total)
+        conn = self._connect()
+        try:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO embedding_cache (
+                    model_name, text_hash, embedding_size, embedding, added_date
+                ) VALUES (?, ?, ?, ?, ?)
+            """,
+                rows,
+            )
+            conn.commit()
 
-        return results
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error caching embeddings: {str(e)}")
+            raise
+        finally:
+            conn.close()
 
+    @_timed_query
     def get_embedding(
         self, image_id: int, model_name: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
@@ -809,7 +2578,7 @@ class ImageDatabase:
         Returns:
             Dictionary with embedding data or None if not found
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         try:
             cursor = conn.cursor()
 
@@ -862,6 +2631,474 @@ class ImageDatabase:
         finally:
             conn.close()
 
+    @staticmethod
+    def _parse_image_row(image_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Decode the JSON columns of an image row in place."""
+        try:
+            with JSON_DECODE_SECONDS.time():
+                if image_data["metadata"]:
+                    metadata_obj = json.loads(image_data["metadata"])
+                    image_data["metadata"] = metadata_obj
+
+                    # Extract VLM description from metadata if available
+                    if "vlm_description" in metadata_obj:
+                        image_data["vlm_description"] = metadata_obj["vlm_description"]
+
+                if image_data["exif"]:
+                    image_data["exif"] = json.loads(image_data["exif"])
+        except json.JSONDecodeError:
+            logger.warning(f"Could not parse JSON for image ID {image_data['id']}")
+
+        return image_data
+
+    def _fetch_images(
+        self, cursor: sqlite3.Cursor, image_ids: List[int]
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch image rows by ID, preserving the requested order.
+
+        Args:
+            cursor: Cursor of a connection using sqlite3.Row
+            image_ids: IDs of the images to fetch
+
+        Returns:
+            List of parsed image data; missing IDs are skipped
+        """
+        rows = {}
+        for i in range(0, len(image_ids), MAX_QUERY_PARAMS):
+            chunk = image_ids[i : i + MAX_QUERY_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(f"SELECT * FROM images WHERE id IN ({placeholders})", chunk)
+            for row in cursor.fetchall():
+                rows[row["id"]] = row
+
+        return [
+            self._parse_image_row(dict(rows[image_id]))
+            for image_id in image_ids
+            if image_id in rows
+        ]
+
+    @_timed_query
+    def get_image(self, image_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get an image by ID with a single primary key lookup.
+
+        Args:
+            image_id: ID of the image to retrieve
+
+        Returns:
+            Image data or None if not found
+        """
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM images WHERE id = ?", (image_id,))
+            row = cursor.fetchone()
+            return self._parse_image_row(dict(row)) if row else None
+        finally:
+            conn.close()
+
+    @_timed_query
+    def get_images(self, image_ids: List[int]) -> List[Dict[str, Any]]:
+        """
+        Get images by ID, in the order requested.
+
+        Rows are read with one IN query per MAX_QUERY_PARAMS IDs.
+
+        Args:
+            image_ids: IDs of the images to retrieve
+
+        Returns:
+            List of image data; IDs that do not exist are skipped
+        """
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            return self._fetch_images(conn.cursor(), list(image_ids))
+        finally:
+            conn.close()
+
+    @_timed_query
+    def get_embedding_models(self) -> List[Dict[str, Any]]:
+        """
+        Get the registered embedding models.
+
+        Returns:
+            List of models with their dimensionality, embedding count and
+            whether they are the default model
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT value FROM settings WHERE key = ?",
+                (DEFAULT_EMBEDDING_MODEL_KEY,),
+            )
+            row = cursor.fetchone()
+            default_model = row[0] if row else None
+
+            cursor.execute(
+                """
+                SELECT m.model_name, m.embedding_size, m.added_date, COUNT(e.id)
+                FROM embedding_models m
+                LEFT JOIN text_embeddings e ON e.model_name = m.model_name
+                GROUP BY m.model_name
+                ORDER BY m.added_date
+            """
+            )
+            return [
+                {
+                    "model": row[0],
+                    "embedding_size": row[1],
+                    "added_date": row[2],
+                    "count": row[3],
+                    "default": row[0] == default_model,
+                }
+                for row in cursor.fetchall()
+            ]
+
+        finally:
+            conn.close()
+
+    @_timed_query
+    def get_default_embedding_model(self) -> Optional[str]:
+        """
+        Get the embedding model used when no model is requested.
+
+        Returns:
+            Name of the default model, or None if no embeddings were stored yet
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT value FROM settings WHERE key = ?",
+                (DEFAULT_EMBEDDING_MODEL_KEY,),
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+        finally:
+            conn.close()
+
+    @_timed_query
+    def set_default_embedding_model(self, model_name: str) -> None:
+        """
+        Set the embedding model used when no model is requested.
+
+        The switch is a single write, so searches move from the old model to
+        the new one atomically.
+
+        Args:
+            model_name: Name of a registered embedding model
+
+        Raises:
+            ValueError: If the model is not registered
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT 1 FROM embedding_models WHERE model_name = ?", (model_name,)
+            )
+            if not cursor.fetchone():
+                raise ValueError(f"Embedding model {model_name} is not registered")
+
+            cursor.execute(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                (DEFAULT_EMBEDDING_MODEL_KEY, model_name),
+            )
+            self._bump_data_generation(cursor)
+            conn.commit()
+            logger.info(f"Default embedding model set to {model_name}")
+
+        finally:
+            conn.close()
+
+    @_timed_query
+    def get_images_missing_embeddings(
+        self, model_name: str, after_id: int = 0, limit: int = 1000
+    ) -> List[tuple]:
+        """
+        Get described images without an up-to-date embedding for a model.
+
+        Images are returned in ID order, so callers can page through them by
+        passing the last ID seen as ``after_id``.
+
+        Args:
+            model_name: Name of the embedding model
+            after_id: Only return images with a greater ID
+            limit: Maximum number of images to return
+
+        Returns:
+            List of (image_id, description) tuples
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT i.id, i.description FROM images i
+                LEFT JOIN text_embeddings e
+                    ON e.image_id = i.id AND e.model_name = ?
+                WHERE i.description IS NOT NULL AND i.description != ''
+                    AND i.id > ?
+                    AND (e.id IS NULL OR e.text != i.description)
+                ORDER BY i.id
+                LIMIT ?
+            """,
+                (model_name, after_id, limit),
+            )
+            return cursor.fetchall()
+
+        finally:
+            conn.close()
+
+    def _get_vector_index(
+        self, cursor: sqlite3.Cursor, model_name: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the in-memory vector index of a model, reloading it if stale.
+
+        The index holds the image IDs and a matrix of L2-normalized
+        embeddings, so cosine similarity is a single matrix-vector product.
+        A stale index is rebuilt under the model's own lock and then
+        swapped in, so queries of other models are never held up. When
+        embeddings were only added since it was loaded, just the new rows
+        are read and appended.
+
+        Args:
+            cursor: Cursor of an open database connection
+            model_name: Name of the embedding model
+
+        Returns:
+            Dictionary with ``image_ids`` and ``matrix``, or None if the model
+            is not registered
+        """
+        cursor.execute(
+            """
+            SELECT embedding_size, generation, rewrites FROM embedding_models
+            WHERE model_name = ?
+        """,
+            (model_name,),
+        )
+        row = cursor.fetchone()
+        if not row:
+            return None
+        embedding_size, generation, rewrites = row
+
+        index = self._vector_indexes.get(model_name)
+        if index is not None and index["generation"] == generation:
+            return index
+
+        with self._vector_index_lock:
+            model_lock = self._vector_index_locks.setdefault(
+                model_name, threading.Lock()
+            )
+
+        with model_lock:
+            index = self._vector_indexes.get(model_name)
+            if index is not None and index["generation"] == generation:
+                return index
+
+            cursor.execute(
+                """
+                SELECT COUNT(*) FROM text_embeddings
+                WHERE model_name = ? AND embedding_size = ?
+            """,
+                (model_name, embedding_size),
+            )
+            count = cursor.fetchone()[0]
+
+            appended = None
+            if (
+                index is not None
+                and index["rewrites"] == rewrites
+                and index["matrix"].shape[1] == embedding_size
+            ):
+                # Without rewrites, the index is only missing the rows
+                # above its last ID, unless some were removed
+                image_ids, matrix, last_id = self._load_embeddings(
+                    cursor, model_name, embedding_size, 0, index["last_id"]
+                )
+                if len(index["image_ids"]) + len(image_ids) == count:
+                    appended = len(image_ids)
+                    image_ids = np.concatenate([index["image_ids"], image_ids])
+                    matrix = np.concatenate([index["matrix"], matrix])
+                    last_id = max(last_id, index["last_id"])
+
+            if appended is None:
+                image_ids, matrix, last_id = self._load_embeddings(
+                    cursor, model_name, embedding_size, count
+                )
+
+            index = {
+                "generation": generation,
+                "image_ids": image_ids,
+                "matrix": matrix,
+                "last_id": last_id,
+                "rewrites": rewrites,
+            }
+            with self._vector_index_lock:
+                self._vector_indexes[model_name] = index
+
+            if appended is None:
+                logger.info(
+                    f"Loaded {len(image_ids)} embeddings for model {model_name}"
+                )
+            else:
+                logger.info(f"Added {appended} embeddings for model {model_name}")
+            return index
+
+    @staticmethod
+    def _load_embeddings(
+        cursor: sqlite3.Cursor,
+        model_name: str,
+        embedding_size: int,
+        count: int,
+        after_id: int = 0,
+    ) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Read the embeddings of a model into L2-normalized float32 rows.
+
+        Rows are streamed into a preallocated matrix and normalized a batch
+        at a time, so loading needs little more memory than the index.
+
+        Args:
+            cursor: Cursor of an open database connection
+            model_name: Name of the embedding model
+            embedding_size: Dimension of the model's embeddings
+            count: Expected number of rows, used to size the matrix
+            after_id: Only read embeddings with a higher ID
+
+        Returns:
+            Tuple of the image IDs, the normalized matrix and the highest
+            embedding ID read (after_id if none)
+        """
+        image_ids = np.empty(count, dtype=np.int64)
+        matrix = np.empty((count, embedding_size), dtype=np.float32)
+        last_id = after_id
+        zero_norms = False
+        n = 0
+
+        cursor.execute(
+            """
+            SELECT id, image_id, embedding FROM text_embeddings
+            WHERE id > ? AND model_name = ? AND embedding_size = ?
+            ORDER BY id
+        """,
+            (after_id, model_name, embedding_size),
+        )
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+            if not rows:
+                break
+            # Embeddings written since the rows were counted
+            if n + len(rows) > len(matrix):
+                size = max(n + len(rows), 2 * len(matrix))
+                image_ids = np.resize(image_ids, size)
+                matrix = np.resize(matrix, (size, embedding_size))
+            block = matrix[n : n + len(rows)]
+            block[:] = np.frombuffer(
+                b"".join(r[2] for r in rows), dtype=np.float32
+            ).reshape(len(rows), embedding_size)
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            zero_norms = zero_norms or bool(np.any(norms == 0))
+            np.divide(block, norms, out=block, where=norms != 0)
+            image_ids[n : n + len(rows)] = [r[1] for r in rows]
+            last_id = rows[-1][0]
+            n += len(rows)
+
+        if zero_norms:
+            logger.warning(
+                f"Zero norm encountered for stored embeddings of {model_name}"
+            )
+        return image_ids[:n], matrix[:n], last_id
+
+    @_timed_query
+    def load_vector_index(self, model_name: Optional[str] = None) -> int:
+        """
+        Load the in-memory vector index of a model ahead of the first search.
+
+        Args:
+            model_name: Optional model name; defaults to the default model
+
+        Returns:
+            Number of embeddings in the index
+        """
+        model_name = model_name or self.get_default_embedding_model()
+        if not model_name:
+            return 0
+
+        conn = self._connect()
+        try:
+            index = self._get_vector_index(conn.cursor(), model_name)
+            return len(index["image_ids"]) if index else 0
+        finally:
+            conn.close()
+
+    def _semantic_top_k(
+        self,
+        cursor: sqlite3.Cursor,
+        query_embedding: np.ndarray,
+        limit: int,
+        model_name: Optional[str] = None,
+    ) -> Tuple[List[int], List[float], Optional[str]]:
+        """
+        Score the embeddings of a model against a query.
+
+        Args:
+            cursor: Cursor of an open database connection
+            query_embedding: Query embedding vector
+            limit: Maximum number of results to return
+            model_name: Optional model name; defaults to the default model
+
+        Returns:
+            Tuple of the best image IDs, their similarities (best first) and
+            the model used
+        """
+        if not model_name:
+            cursor.execute(
+                "SELECT value FROM settings WHERE key = ?",
+                (DEFAULT_EMBEDDING_MODEL_KEY,),
+            )
+            row = cursor.fetchone()
+            if not row:
+                return [], [], None
+            model_name = row[0]
+
+        index = self._get_vector_index(cursor, model_name)
+        if index is None or not len(index["image_ids"]):
+            return [], [], model_name
+
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        if len(query) != index["matrix"].shape[1]:
+            logger.error(
+                f"Query embedding size {len(query)} does not match model "
+                f"{model_name} ({index['matrix'].shape[1]})"
+            )
+            return [], [], model_name
+
+        with VECTOR_SCORING_SECONDS.time(model=model_name):
+            query_norm = np.linalg.norm(query)
+            if query_norm == 0:
+                logger.warning("Zero norm encountered for query embedding")
+                scores = np.zeros(len(index["image_ids"]), dtype=np.float32)
+            else:
+                scores = index["matrix"] @ (query / query_norm)
+
+            # Select the top results without sorting every score
+            if limit < len(scores):
+                top = np.argpartition(-scores, limit)[:limit]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+        image_ids = [int(i) for i in index["image_ids"][top]]
+        return image_ids, [float(score) for score in scores[top]], model_name
+
+    @_timed_query
     def semantic_search(
         self,
         query_embedding: np.ndarray,
@@ -871,111 +3108,32 @@ class ImageDatabase:
         """
         Search for images using vector similarity.
 
+        Only embeddings of a single model are compared with the query, since
+        vectors from different models live in unrelated spaces.
+
         Args:
             query_embedding: Query embedding vector
             limit: Maximum number of results to return
-            model_name: Optional model name to filter embeddings
+            model_name: Optional model name; defaults to the default model
 
         Returns:
             List of matching image data with similarity scores
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         try:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
-            # Get all embeddings, load into memory (more efficient for small-to-medium databases)
-            if model_name:
-                cursor.execute(
-                    """
-                    SELECT e.*, i.* FROM text_embeddings e
-                    JOIN images i ON e.image_id = i.id
-                    WHERE e.model_name = ?
-                """,
-                    (model_name,),
-                )
-            else:
-                cursor.execute(
-                    """
-                    SELECT e.*, i.* FROM text_embeddings e
-                    JOIN images i ON e.image_id = i.id
-                """
-                )
-
-            rows = cursor.fetchall()
-
-            # Convert embeddings and calculate similarity
-            import numpy as np
-            from numpy.linalg import norm
-
-            results = []
-            for row in rows:
-                # Convert embedding blob to numpy array
-                embedding_blob = row["embedding"]
-                # embedding_size = row["embedding_size"]
-                embedding = np.frombuffer(embedding_blob, dtype=np.float32)
-
-                # Ensure the embedding has the correct shape for comparison
-                if len(embedding) != len(query_embedding):
-                    logger.warning(
-                        f"Embedding size mismatch in search: {len(embedding)} vs "
-                        "{len(query_embedding)}"
-                    )
-                    if len(embedding) > len(query_embedding):
-                        embedding = embedding[: len(query_embedding)]
-                    else:
-                        # If the stored embedding is smaller, we need to skip it
-                        continue
-
-                # Calculate norms
-                embedding_norm = norm(embedding)
-                query_norm = norm(query_embedding)
-                norm_product = embedding_norm * query_norm
-
-                # Check for zero norms (which shouldn't happen with valid embeddings)
-                if norm_product == 0:
-                    if embedding_norm == 0:
-                        logger.warning(
-                            f"Zero norm encountered for stored embedding (image_id: {row['id']})"
-                        )
-                    if query_norm == 0:
-                        logger.warning("Zero norm encountered for query embedding")
-                    # Avoid division by zero, but mark as very dissimilar
-                    similarity = 0.0
-                else:
-                    # Calculate cosine similarity
-                    similarity = np.dot(embedding, query_embedding) / norm_product
-
-                # Create image data dictionary
-                image_data = dict(row)
-
-                # Parse JSON fields
-                try:
-                    if image_data["metadata"]:
-                        metadata_obj = json.loads(image_data["metadata"])
-                        image_data["metadata"] = metadata_obj
-
-                        # Extract VLM description from metadata if available
-                        if "vlm_description" in metadata_obj:
-                            image_data["vlm_description"] = metadata_obj[
-                                "vlm_description"
-                            ]
-
-                    if image_data["exif"]:
-                        image_data["exif"] = json.loads(image_data["exif"])
-                except json.JSONDecodeError:
-                    logger.warning(
-                        f"Could not parse JSON for image ID {image_data['id']}"
-                    )
-
-                # Add similarity score
-                image_data["similarity"] = float(similarity)
-
-                results.append(image_data)
+            image_ids, scores, model_name = self._semantic_top_k(
+                cursor, query_embedding, limit, model_name
+            )
+            results = self._fetch_images(cursor, image_ids)
+            similarities = dict(zip(image_ids, scores))
+            for image_data in results:
+                image_data["similarity"] = similarities[image_data["id"]]
+                image_data["embedding_model"] = model_name
 
-            # Sort by similarity (highest first) and limit results
-            results.sort(key=lambda x: x["similarity"], reverse=True)
-            return results[:limit]
+            return results
 
         except Exception as e:
             logger.error(f"Error in semantic search: {str(e)}")
@@ -983,6 +3141,7 @@ class ImageDatabase:
         finally:
             conn.close()
 
+    @_timed_query
     def hybrid_search(
         self,
         text_query: str,
@@ -1011,55 +3170,79 @@ class ImageDatabase:
 
         embedding_weight = 1.0 - text_weight
 
-        # Get results from both search methods
-        text_results = self.search(
-            text_query, limit=limit * 2
-        )  # Get more results for better merging
-        semantic_results = self.semantic_search(
-            query_embedding, limit=limit * 2, model_name=model_name
-        )
-
-        # Create dictionaries for faster lookup
-        text_dict = {item["id"]: item for item in text_results}
-        semantic_dict = {item["id"]: item for item in semantic_results}
-
-        # Combine results
-        combined_dict = {}
-
-        # Process text search results
-        for image_id, item in text_dict.items():
-            item["text_rank"] = text_results.index(item) + 1
-            item["combined_score"] = text_weight * (1.0 / item["text_rank"])
-            combined_dict[image_id] = item
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
 
-        # Process semantic search results
-        for image_id, item in semantic_dict.items():
-            similarity = item["similarity"]
+            # Rank both candidate lists by ID only; get more results than
+            # needed for better merging
+            cursor.execute(
+                """
+                SELECT rowid FROM image_search
+                WHERE image_search MATCH ?
+                ORDER BY rank
+                LIMIT ?
+            """,
+                (text_query, limit * 2),
+            )
+            text_ids = [row[0] for row in cursor.fetchall()]
 
-            if image_id in combined_dict:
-                # Item exists in both result sets
-                combined_dict[image_id]["similarity"] = similarity
-                combined_dict[image_id]["combined_score"] += (
-                    embedding_weight * similarity
+            try:
+                semantic_ids, similarities, model_name = self._semantic_top_k(
+                    cursor, query_embedding, limit * 2, model_name
                 )
-            else:
-                # Item only in semantic results
-                item["combined_score"] = embedding_weight * similarity
-                combined_dict[image_id] = item
+            except Exception as e:
+                logger.error(f"Error in semantic search: {str(e)}")
+                semantic_ids, similarities = [], []
+
+            # Combine the scores
+            scores: Dict[int, Dict[str, Any]] = {}
+            for text_rank, image_id in enumerate(text_ids, 1):
+                scores[image_id] = {
+                    "text_rank": text_rank,
+                    "combined_score": text_weight * (1.0 / text_rank),
+                }
+            for image_id, similarity in zip(semantic_ids, similarities):
+                item = scores.setdefault(image_id, {"combined_score": 0.0})
+                item["similarity"] = similarity
+                item["embedding_model"] = model_name
+                item["combined_score"] += embedding_weight * similarity
+
+            # Fetch only the images that make the cut, in score order
+            top_ids = sorted(
+                scores, key=lambda i: scores[i]["combined_score"], reverse=True
+            )[:limit]
+            results = self._fetch_images(cursor, top_ids)
+            for image_data in results:
+                image_data.update(scores[image_data["id"]])
 
-        # Convert to list and sort by combined score
-        results = list(combined_dict.values())
-        results.sort(key=lambda x: x.get("combined_score", 0), reverse=True)
+            return results
 
-        return results[:limit]
+        finally:
+            conn.close()
 
     def clear(self) -> None:
-        """Delete all data from the database."""
-        conn = sqlite3.connect(self.db_path)
+        """
+        Delete all images and embeddings from the database.
+
+        The embedding cache is kept, since its entries are keyed by text
+        and remain valid for a subsequent re-import.
+        """
+        conn = self._connect()
         try:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM text_embeddings")
+            cursor.execute("DELETE FROM location_clusters")
+            cursor.execute("DELETE FROM image_hash_bands")
             cursor.execute("DELETE FROM images")
+            cursor.execute("DELETE FROM camera_aliases")
+            cursor.execute("DELETE FROM cameras")
+            cursor.execute(
+                "UPDATE embedding_models SET generation = generation + 1, "
+                "rewrites = rewrites + 1"
+            )
+            self._bump_data_generation(cursor)
             conn.commit()
             logger.info("Database cleared")
         finally:
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Duplicate Detection Module
+
+This module finds duplicate and near-duplicate images (burst shots,
+re-uploads, resized or recompressed copies) by their perceptual hashes:
+- dhash() hashes an already decoded image
+- image_hash() hashes an image file, e.g. a thumbnail
+- hamming_distance() counts the bits two hashes differ in
+- hash_bands() splits a hash into the bands used for lookups
+- HashIndex finds near-duplicates among hashes held in memory
+- register_functions() makes hamming_distance callable from SQL
+
+Lookups use multi-index hashing: each 64-bit hash is split into HASH_BANDS
+bands of 16 bits, and two hashes at most HASH_BANDS - 1 bits apart must
+agree on at least one band. Only images sharing a band are compared in
+full. ImageDatabase keeps the bands of every image in an indexed table.
+"""
+
+import logging
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# dHash compares horizontally adjacent pixels of a HASH_SIZE x HASH_SIZE
+# grayscale image, giving HASH_SIZE^2 = 64 bits
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+HASH_MASK = (1 << HASH_BITS) - 1
+
+# Bands per hash for lookups; bands must be at least 16 bits wide to keep
+# the number of candidates sharing a band small
+HASH_BANDS = 4
+BAND_BITS = HASH_BITS // HASH_BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# Largest Hamming distance lookups find every match for
+MAX_DUPLICATE_DISTANCE = HASH_BANDS - 1
+
+
+def dhash(img: Image.Image) -> int:
+    """
+    Compute the difference hash of an image.
+
+    JPEG images that have not been loaded yet are decoded at a reduced
+    scale (see Image.draft), which changes their size and mode.
+
+    Args:
+        img: Image to hash
+
+    Returns:
+        64-bit hash as a signed integer, as stored by SQLite
+    """
+    img.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+    small = (
+        ImageOps.exif_transpose(img)
+        .convert("L")
+        .resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BOX)
+    )
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = np.packbits(pixels[:, 1:] > pixels[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big", signed=True)
+
+
+def image_hash(image_path: str) -> Optional[int]:
+    """
+    Compute the difference hash of an image file.
+
+    Args:
+        image_path: Path to the image, e.g. its thumbnail
+
+    Returns:
+        Hash as a signed integer, or None if the image cannot be read
+    """
+    try:
+        with Image.open(image_path) as img:
+            return dhash(img)
+    except (IOError, UnidentifiedImageError) as e:
+        logger.error(f"Error hashing {image_path}: {str(e)}")
+        return None
+
+
+def format_hash(value: int) -> str:
+    """Format a hash as 16 hexadecimal digits, e.g. for JSON metadata."""
+    return format(value & HASH_MASK, "016x")
+
+
+def parse_hash(value: Any) -> Optional[int]:
+    """
+    Parse a hash formatted by format_hash().
+
+    Args:
+        value: Hexadecimal string, or None
+
+    Returns:
+        Hash as a signed integer, or None if there is no valid hash
+    """
+    if not isinstance(value, str) or len(value) != HASH_BITS // 4:
+        return None
+    try:
+        return int.from_bytes(bytes.fromhex(value), "big", signed=True)
+    except ValueError:
+        return None
+
+
+def hamming_distance(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    """
+    Count the bits two hashes differ in.
+
+    Args:
+        a: First hash
+        b: Second hash
+
+    Returns:
+        Number of differing bits, or None if a hash is missing
+    """
+    if a is None or b is None:
+        return None
+    return ((a ^ b) & HASH_MASK).bit_count()
+
+
+def hash_bands(value: int) -> List[Tuple[int, int]]:
+    """
+    Split a hash into its lookup bands.
+
+    Args:
+        value: Hash
+
+    Returns:
+        List of (band, band value) pairs
+    """
+    return [
+        (band, (value >> (band * BAND_BITS)) & BAND_MASK) for band in range(HASH_BANDS)
+    ]
+
+
+def check_distance(max_distance: int) -> int:
+    """
+    Validate the maximum Hamming distance of a duplicate lookup.
+
+    Args:
+        max_distance: Maximum number of differing bits
+
+    Returns:
+        The distance
+
+    Raises:
+        ValueError: If lookups cannot find all matches at this distance
+    """
+    if not 0 <= max_distance <= MAX_DUPLICATE_DISTANCE:
+        raise ValueError(
+            f"Duplicate distance must be between 0 and {MAX_DUPLICATE_DISTANCE}"
+        )
+    return max_distance
+
+
+class HashIndex:
+    """Near-duplicate lookups among hashes added in memory."""
+
+    def __init__(self, max_distance: int = MAX_DUPLICATE_DISTANCE):
+        """
+        Initialize an empty index.
+
+        Args:
+            max_distance: Maximum Hamming distance of a near-duplicate
+        """
+        self.max_distance = check_distance(max_distance)
+        self._bands: List[Dict[int, List[Tuple[int, Any]]]] = [
+            {} for _ in range(HASH_BANDS)
+        ]
+
+    def add(self, value: int, item: Any) -> None:
+        """
+        Add a hash.
+
+        Args:
+            value: Hash
+            item: Object returned by lookups matching the hash
+        """
+        for band, band_value in hash_bands(value):
+            self._bands[band].setdefault(band_value, []).append((value, item))
+
+    def find(self, value: int) -> Optional[Any]:
+        """
+        Find the closest near-duplicate of a hash.
+
+        Args:
+            value: Hash
+
+        Returns:
+            Item of the closest hash within the maximum distance, or None
+        """
+        best = None
+        best_distance = self.max_distance + 1
+        for band, band_value in hash_bands(value):
+            for other, item in self._bands[band].get(band_value, ()):
+                distance = hamming_distance(value, other)
+                if distance < best_distance:
+                    best, best_distance = item, distance
+        return best
+
+
+def register_functions(conn: sqlite3.Connection) -> None:
+    """
+    Make the duplicate detection functions callable from SQL on a connection.
+
+    Args:
+        conn: Connection to register hamming_distance(a, b) on
+    """
+    conn.create_function("hamming_distance", 2, hamming_distance, deterministic=True)
@@ -0,0 +1,346 @@
+"""
+Catalogue Export - Write the image catalogue to files for analysis.
+
+This module exports all images, or a filtered subset, by reading the
+database with a single cursor in image ID order. Supported formats:
+- jsonl: One JSON object per image with all decoded metadata
+- csv: One row per image with the scalar columns
+- parquet: Scalar columns plus embeddings (requires pyarrow)
+- npz: Compact NumPy arrays of image IDs and embeddings, used instead of
+  parquet when pyarrow is not installed
+
+Text formats are produced incrementally, so they can be streamed to a
+client or stdout as rows are read.
+"""
+
+import io
+import csv
+import json
+import logging
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from wheresmy.core.database import ImageDatabase
+
+# Try to import pyarrow for Parquet export
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    PARQUET_SUPPORT = True
+except ImportError:
+    PARQUET_SUPPORT = False
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("jsonl", "csv", "parquet", "npz")
+TEXT_FORMATS = ("jsonl", "csv")
+
+MIMETYPES = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "npz": "application/octet-stream",
+}
+
+# Scalar image columns written to CSV and Parquet
+EXPORT_COLUMNS = (
+    "id",
+    "file_path",
+    "filename",
+    "format",
+    "width",
+    "height",
+    "gps_lat",
+    "gps_lon",
+    "capture_date",
+    "camera_make",
+    "camera_model",
+    "description",
+    "description_model",
+    "thumbnail",
+    "added_date",
+    "last_modified",
+)
+
+# Number of rows per Parquet record batch
+PARQUET_BATCH_SIZE = 1000
+
+
+def resolve_format(export_format: str) -> str:
+    """
+    Resolve the format actually written for a requested format.
+
+    Args:
+        export_format: Requested format
+
+    Returns:
+        The format, or "npz" for parquet when pyarrow is not installed
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    if export_format == "parquet" and not PARQUET_SUPPORT:
+        logger.warning("pyarrow is not installed; exporting embeddings as npz")
+        return "npz"
+    return export_format
+
+
+def iter_jsonl(images: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Serialize images as JSON lines.
+
+    Args:
+        images: Iterator of image data
+
+    Yields:
+        One JSON line per image
+    """
+    for image in images:
+        yield json.dumps(image, default=str) + "\n"
+
+
+def iter_csv(images: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Serialize the scalar columns of images as CSV.
+
+    Args:
+        images: Iterator of image data
+
+    Yields:
+        The header line, then one CSV line per image
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    writer.writerow(EXPORT_COLUMNS)
+    yield flush()
+    for image in images:
+        writer.writerow([image.get(column) for column in EXPORT_COLUMNS])
+        yield flush()
+
+
+def join_embeddings(
+    images: Iterator[Dict[str, Any]], embeddings: Iterator[Tuple[int, np.ndarray]]
+) -> Iterator[Tuple[Dict[str, Any], Optional[np.ndarray]]]:
+    """
+    Pair images with their embeddings.
+
+    Both iterators must be in increasing image ID order, so they are merged
+    without loading either into memory.
+
+    Args:
+        images: Iterator of image data
+        embeddings: Iterator of (image_id, embedding) tuples
+
+    Yields:
+        Tuples of image data and its embedding (None if it has none)
+    """
+    pending = next(embeddings, None)
+    for image in images:
+        while pending is not None and pending[0] < image["id"]:
+            pending = next(embeddings, None)
+        if pending is not None and pending[0] == image["id"]:
+            yield image, pending[1]
+        else:
+            yield image, None
+
+
+def write_parquet(
+    rows: Iterator[Tuple[Dict[str, Any], Optional[np.ndarray]]],
+    output: BinaryIO,
+    embedding_size: Optional[int] = None,
+) -> int:
+    """
+    Write images and embeddings to a Parquet file in record batches.
+
+    Args:
+        rows: Iterator of (image data, embedding or None) tuples
+        output: Binary file object to write to
+        embedding_size: Dimensionality of the embedding column, or None to
+                        omit embeddings
+
+    Returns:
+        Number of images written
+    """
+    fields = []
+    for column in EXPORT_COLUMNS:
+        if column in ("id", "width", "height"):
+            fields.append(pa.field(column, pa.int64()))
+        elif column in ("gps_lat", "gps_lon"):
+            fields.append(pa.field(column, pa.float64()))
+        else:
+            fields.append(pa.field(column, pa.string()))
+    if embedding_size:
+        fields.append(pa.field("embedding", pa.list_(pa.float32(), embedding_size)))
+    schema = pa.schema(fields)
+
+    count = 0
+    with pq.ParquetWriter(output, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= PARQUET_BATCH_SIZE:
+                writer.write_batch(_record_batch(batch, schema, embedding_size))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_batch(_record_batch(batch, schema, embedding_size))
+            count += len(batch)
+
+    return count
+
+
+def _record_batch(batch, schema, embedding_size):
+    """Build a Parquet record batch from (image, embedding) tuples."""
+    columns = {
+        column: [image.get(column) for image, _ in batch] for column in EXPORT_COLUMNS
+    }
+    if embedding_size:
+        columns["embedding"] = [
+            embedding.tolist() if embedding is not None else None
+            for _, embedding in batch
+        ]
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def write_npz(
+    rows: Iterator[Tuple[Dict[str, Any], Optional[np.ndarray]]],
+    output: BinaryIO,
+    model_name: Optional[str] = None,
+) -> int:
+    """
+    Write image IDs and embeddings as compressed NumPy arrays.
+
+    The archive holds ``ids`` (int64), ``embeddings`` (float32, one row
+    per ID) and ``model_name``. Images without an embedding are skipped;
+    join on ``ids`` with a JSONL or CSV export for the other columns.
+
+    Args:
+        rows: Iterator of (image data, embedding or None) tuples
+        output: Binary file object to write to
+        model_name: Name of the embedding model
+
+    Returns:
+        Number of embeddings written
+    """
+    ids = []
+    vectors = []
+    for image, embedding in rows:
+        if embedding is not None:
+            ids.append(image["id"])
+            vectors.append(embedding)
+
+    embeddings = np.vstack(vectors) if vectors else np.zeros((0, 0), np.float32)
+    np.savez_compressed(
+        output,
+        ids=np.asarray(ids, dtype=np.int64),
+        embeddings=embeddings.astype(np.float32, copy=False),
+        model_name=np.asarray(model_name or ""),
+    )
+    return len(ids)
+
+
+def iter_export(
+    db: ImageDatabase,
+    export_format: str,
+    after_id: int = 0,
+    **filters: Any,
+) -> Iterator[str]:
+    """
+    Export images in a text format incrementally.
+
+    Args:
+        db: ImageDatabase instance
+        export_format: "jsonl" or "csv"
+        after_id: Only export images with a greater ID
+        **filters: Filters of ImageDatabase.iter_images
+
+    Yields:
+        Chunks of the exported text
+    """
+    if export_format not in TEXT_FORMATS:
+        raise ValueError(f"{export_format} is not a text export format")
+    images = db.iter_images(after_id=after_id, **filters)
+    if export_format == "csv":
+        return iter_csv(images)
+    return iter_jsonl(images)
+
+
+def export_images(
+    db: ImageDatabase,
+    output: Any,
+    export_format: str = "jsonl",
+    embedding_model: Optional[str] = None,
+    include_embeddings: bool = True,
+    after_id: int = 0,
+    **filters: Any,
+) -> int:
+    """
+    Export images to a file.
+
+    Args:
+        db: ImageDatabase instance
+        output: Path or file object (text for jsonl/csv, binary otherwise)
+        export_format: One of EXPORT_FORMATS
+        embedding_model: Model of the exported embeddings (default: the
+                         database's default model)
+        include_embeddings: Whether parquet exports include embeddings
+        after_id: Only export images with a greater ID
+        **filters: Filters of ImageDatabase.iter_images
+
+    Returns:
+        Number of images (or embeddings, for npz) written
+    """
+    export_format = resolve_format(export_format)
+
+    if isinstance(output, str):
+        mode = "w" if export_format in TEXT_FORMATS else "wb"
+        newline = "" if export_format == "csv" else None
+        with open(output, mode, newline=newline) as f:
+            return export_images(
+                db,
+                f,
+                export_format,
+                embedding_model=embedding_model,
+                include_embeddings=include_embeddings,
+                after_id=after_id,
+                **filters,
+            )
+
+    if export_format in TEXT_FORMATS:
+        count = 0
+        for chunk in iter_export(db, export_format, after_id=after_id, **filters):
+            output.write(chunk)
+            count += 1
+        # Every chunk is one image, except the CSV header
+        return count - 1 if export_format == "csv" else count
+
+    model_name = embedding_model or db.get_default_embedding_model()
+    images = db.iter_images(after_id=after_id, **filters)
+
+    embedding_size = None
+    if model_name and (include_embeddings or export_format == "npz"):
+        models = {model["model"]: model for model in db.get_embedding_models()}
+        if model_name in models:
+            embedding_size = models[model_name]["embedding_size"]
+        else:
+            logger.warning(f"No embeddings of model {model_name}; exporting none")
+
+    if embedding_size:
+        rows = join_embeddings(images, db.iter_embeddings(model_name, after_id))
+    else:
+        rows = ((image, None) for image in images)
+
+    if export_format == "npz":
+        return write_npz(rows, output, model_name=model_name)
+    return write_parquet(rows, output, embedding_size=embedding_size)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Geospatial Module
+
+This module provides the geometry behind location searches:
+- haversine_km() gives the great-circle distance between two points
+- split_bbox() splits bounding boxes that cross the antimeridian
+- radius_bboxes() gives the bounding boxes enclosing a search radius
+- grid_cell() locates a point in the map clustering grid
+- register_functions() makes haversine_km callable from SQL
+
+ImageDatabase keeps the coordinates of geotagged images in an R*Tree
+index; location filters select candidates with bounding boxes and refine
+radius searches with haversine_km.
+"""
+
+import math
+import sqlite3
+from typing import List, Optional, Sequence, Tuple
+
+# Mean radius of the Earth
+EARTH_RADIUS_KM = 6371.0088
+
+# Length of a degree of latitude
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# (min_lat, min_lon, max_lat, max_lon), in degrees
+BBox = Tuple[float, float, float, float]
+
+# (lat, lon, radius_km) of a radius search
+Near = Tuple[float, float, float]
+
+# (city, region, country) names of a place, each None if unknown
+Place = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def haversine_km(
+    lat1: Optional[float],
+    lon1: Optional[float],
+    lat2: Optional[float],
+    lon2: Optional[float],
+) -> Optional[float]:
+    """
+    Get the great-circle distance between two points.
+
+    Args:
+        lat1: Latitude of the first point in degrees
+        lon1: Longitude of the first point in degrees
+        lat2: Latitude of the second point in degrees
+        lon2: Longitude of the second point in degrees
+
+    Returns:
+        Distance in kilometers, or None if a coordinate is missing
+    """
+    if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
+        return None
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def parse_bbox(value: Sequence[float]) -> BBox:
+    """
+    Validate a bounding box.
+
+    Args:
+        value: Sequence of min_lat, min_lon, max_lat, max_lon; min_lon may be
+               greater than max_lon for boxes crossing the antimeridian
+
+    Returns:
+        Bounding box tuple
+
+    Raises:
+        ValueError: If the box does not have four coordinates in range
+    """
+    if len(value) != 4:
+        raise ValueError("Bounding box must be min_lat,min_lon,max_lat,max_lon")
+    min_lat, min_lon, max_lat, max_lon = (float(v) for v in value)
+    if not -90 <= min_lat <= max_lat <= 90:
+        raise ValueError("Bounding box latitudes must satisfy -90 <= min <= max <= 90")
+    if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+        raise ValueError("Bounding box longitudes must be between -180 and 180")
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def parse_near(value: Sequence[float]) -> Near:
+    """
+    Validate a radius search.
+
+    Args:
+        value: Sequence of latitude, longitude and radius in kilometers
+
+    Returns:
+        Tuple of (lat, lon, radius_km)
+
+    Raises:
+        ValueError: If the center is out of range or the radius negative
+    """
+    if len(value) != 3:
+        raise ValueError("Radius search must be latitude,longitude,radius_km")
+    lat, lon, radius_km = (float(v) for v in value)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("Radius search center is out of range")
+    if radius_km < 0:
+        raise ValueError("Radius must not be negative")
+    return lat, lon, radius_km
+
+
+def split_bbox(bbox: BBox) -> List[BBox]:
+    """
+    Split a bounding box crossing the antimeridian in two.
+
+    Args:
+        bbox: Bounding box, with min_lon > max_lon if it crosses the antimeridian
+
+    Returns:
+        List of one or two boxes with min_lon <= max_lon
+    """
+    min_lat, min_lon, max_lat, max_lon = bbox
+    if min_lon <= max_lon:
+        return [bbox]
+    return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+
+
+def radius_bboxes(lat: float, lon: float, radius_km: float) -> List[BBox]:
+    """
+    Get bounding boxes enclosing all points within a radius.
+
+    Args:
+        lat: Latitude of the center in degrees
+        lon: Longitude of the center in degrees
+        radius_km: Radius in kilometers
+
+    Returns:
+        List of one or two boxes with min_lon <= max_lon
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat = max(-90.0, lat - dlat)
+    max_lat = min(90.0, lat + dlat)
+
+    # Boxes reaching a pole contain every longitude
+    if min_lat == -90.0 or max_lat == 90.0:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+
+    # Meridians converge away from the equator; the widest longitude span
+    # is at the edge of the radius nearest to the pole
+    dlon = math.degrees(
+        math.asin(min(1.0, math.sin(math.radians(dlat)) / math.cos(math.radians(lat))))
+    )
+    min_lon = lon - dlon
+    max_lon = lon + dlon
+    if min_lon < -180.0:
+        min_lon += 360.0
+    if max_lon > 180.0:
+        max_lon -= 360.0
+    return split_bbox((min_lat, min_lon, max_lat, max_lon))
+
+
+def grid_cell(lat: float, lon: float, level: int) -> Tuple[int, int]:
+    """
+    Get the cell of a point in a level of the clustering grid.
+
+    Level z splits the world into 2^z by 2^z cells of equal size in degrees,
+    numbered from the north-west corner; the same formula computes cells in
+    SQL (see database.py), so the two must agree.
+
+    Args:
+        lat: Latitude in degrees
+        lon: Longitude in degrees
+        level: Grid level
+
+    Returns:
+        Tuple of (cell_x, cell_y)
+    """
+    cells = 1 << level
+    cell_x = int((lon + 180.0) * cells / 360.0)
+    cell_y = int((90.0 - lat) * cells / 180.0)
+    return max(0, min(cell_x, cells - 1)), max(0, min(cell_y, cells - 1))
+
+
+def register_functions(conn: sqlite3.Connection) -> None:
+    """
+    Make the geospatial functions callable from SQL on a connection.
+
+    Args:
+        conn: Connection to register haversine_km(lat1, lon1, lat2, lon2) on
+    """
+    conn.create_function("haversine_km", 4, haversine_km, deterministic=True)
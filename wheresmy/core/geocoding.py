@@ -0,0 +1,283 @@
+"""
+Reverse Geocoding - Resolve image coordinates to place names offline.
+
+This module looks up the nearest populated place of each geotagged image
+in a local GeoNames gazetteer (e.g. cities1000.txt or cities1000.zip from
+https://download.geonames.org/export/dump/). Region and country names are
+read from admin1CodesASCII.txt and countryInfo.txt when they are found
+next to the gazetteer; otherwise places have no region and the ISO country
+code as their country.
+
+Lookups are batched: coordinates are rounded, de-duplicated against a
+cache, and the remaining ones are resolved together with a KD-tree (scipy)
+or, without scipy, blocked matrix products over the gazetteer.
+"""
+
+import io
+import os
+import csv
+import logging
+import zipfile
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from wheresmy.core import geo
+from wheresmy.core.database import ImageDatabase
+
+# Try to import scipy for KD-tree lookups
+try:
+    from scipy.spatial import cKDTree
+
+    SCIPY_SUPPORT = True
+except ImportError:
+    SCIPY_SUPPORT = False
+
+logger = logging.getLogger(__name__)
+
+# Places farther than this from an image are not assigned to it
+DEFAULT_MAX_DISTANCE_KM = 50.0
+
+# Decimal places coordinates are rounded to for caching (about 1 km)
+DEFAULT_PRECISION = 2
+
+# Coordinates resolved per database transaction
+GEOCODE_BATCH_SIZE = 10000
+
+# Queries per matrix product when scipy is not installed
+BLOCK_SIZE = 64
+
+# Columns of the GeoNames main table
+NAME_COLUMN = 1
+LATITUDE_COLUMN = 4
+LONGITUDE_COLUMN = 5
+FEATURE_CLASS_COLUMN = 6
+COUNTRY_COLUMN = 8
+ADMIN1_COLUMN = 10
+
+
+def _read_lines(path: str) -> Iterator[str]:
+    """Yield the lines of a text file, or of the first .txt file in a zip."""
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            name = next(n for n in archive.namelist() if n.endswith(".txt"))
+            with archive.open(name) as f:
+                yield from io.TextIOWrapper(f, encoding="utf-8")
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield from f
+
+
+def _read_table(path: str) -> Iterator[List[str]]:
+    """Yield the rows of a tab-separated GeoNames file, skipping comments."""
+    lines = (line for line in _read_lines(path) if not line.startswith("#"))
+    yield from csv.reader(lines, delimiter="\t", quoting=csv.QUOTE_NONE)
+
+
+def unit_vectors(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Convert coordinates to points on the unit sphere.
+
+    Args:
+        lats: Latitudes in degrees
+        lons: Longitudes in degrees
+
+    Returns:
+        Array of shape (n, 3)
+    """
+    phi = np.radians(lats)
+    lam = np.radians(lons)
+    return np.column_stack(
+        [np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)]
+    )
+
+
+class Gazetteer:
+    """Populated places with a spatial index for nearest-place lookups."""
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        lats: Sequence[float],
+        lons: Sequence[float],
+        regions: Sequence[Optional[str]],
+        countries: Sequence[Optional[str]],
+    ):
+        """
+        Index a list of places.
+
+        Args:
+            names: Place names
+            lats: Latitudes in degrees
+            lons: Longitudes in degrees
+            regions: Region (first-level division) names, or None
+            countries: Country names, or None
+        """
+        if not names:
+            raise ValueError("Gazetteer has no places")
+        self.names = list(names)
+        self.regions = list(regions)
+        self.countries = list(countries)
+        self.points = unit_vectors(np.asarray(lats), np.asarray(lons))
+        self._tree = cKDTree(self.points) if SCIPY_SUPPORT else None
+
+    @classmethod
+    def load(cls, path: str) -> "Gazetteer":
+        """
+        Load a GeoNames gazetteer.
+
+        Args:
+            path: Path to a GeoNames table (.txt or .zip) such as cities1000
+
+        Returns:
+            Gazetteer of the populated places (feature class P) in the file
+        """
+        directory = os.path.dirname(path)
+
+        admin1_names = {}
+        admin1_path = os.path.join(directory, "admin1CodesASCII.txt")
+        if os.path.exists(admin1_path):
+            admin1_names = {row[0]: row[1] for row in _read_table(admin1_path)}
+
+        country_names = {}
+        country_path = os.path.join(directory, "countryInfo.txt")
+        if os.path.exists(country_path):
+            country_names = {row[0]: row[4] for row in _read_table(country_path)}
+
+        names, lats, lons, regions, countries = [], [], [], [], []
+        for row in _read_table(path):
+            if len(row) <= ADMIN1_COLUMN or row[FEATURE_CLASS_COLUMN] != "P":
+                continue
+            country = row[COUNTRY_COLUMN]
+            names.append(row[NAME_COLUMN])
+            lats.append(float(row[LATITUDE_COLUMN]))
+            lons.append(float(row[LONGITUDE_COLUMN]))
+            regions.append(admin1_names.get(f"{country}.{row[ADMIN1_COLUMN]}"))
+            countries.append(country_names.get(country, country) or None)
+
+        logger.info(f"Loaded {len(names)} places from {path}")
+        return cls(names, lats, lons, regions, countries)
+
+    def nearest(
+        self, lats: np.ndarray, lons: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the nearest place to each of a batch of points.
+
+        Args:
+            lats: Latitudes in degrees
+            lons: Longitudes in degrees
+
+        Returns:
+            Tuple of place indices and great-circle distances in kilometers
+        """
+        queries = unit_vectors(lats, lons)
+        if self._tree is not None:
+            chords, indices = self._tree.query(queries)
+            angles = 2 * np.arcsin(np.clip(chords / 2, 0.0, 1.0))
+        else:
+            indices = np.empty(len(queries), dtype=np.int64)
+            cosines = np.empty(len(queries))
+            for start in range(0, len(queries), BLOCK_SIZE):
+                block = queries[start : start + BLOCK_SIZE] @ self.points.T
+                best = block.argmax(axis=1)
+                indices[start : start + BLOCK_SIZE] = best
+                cosines[start : start + BLOCK_SIZE] = block[np.arange(len(best)), best]
+            angles = np.arccos(np.clip(cosines, -1.0, 1.0))
+        return indices, angles * geo.EARTH_RADIUS_KM
+
+
+class ReverseGeocoder:
+    """Batched reverse geocoder with a cache keyed by rounded coordinates."""
+
+    def __init__(
+        self,
+        gazetteer: Gazetteer,
+        max_distance_km: float = DEFAULT_MAX_DISTANCE_KM,
+        precision: int = DEFAULT_PRECISION,
+    ):
+        """
+        Initialize the geocoder.
+
+        Args:
+            gazetteer: Places to resolve coordinates to
+            max_distance_km: Maximum distance of a place from a point
+            precision: Decimal places coordinates are rounded to
+        """
+        self.gazetteer = gazetteer
+        self.max_distance_km = max_distance_km
+        self.precision = precision
+        self._cache: Dict[Tuple[float, float], Optional[geo.Place]] = {}
+
+    def lookup(
+        self, lats: Sequence[float], lons: Sequence[float]
+    ) -> List[Optional[geo.Place]]:
+        """
+        Resolve a batch of coordinates to place names.
+
+        Args:
+            lats: Latitudes in degrees
+            lons: Longitudes in degrees
+
+        Returns:
+            (city, region, country) of each point, or None if no place is
+            within the maximum distance
+        """
+        keys = np.round(
+            np.column_stack([np.asarray(lats, float), np.asarray(lons, float)]),
+            self.precision,
+        )
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        unique_keys = [tuple(key) for key in unique.tolist()]
+
+        missing = [i for i, key in enumerate(unique_keys) if key not in self._cache]
+        if missing:
+            indices, distances = self.gazetteer.nearest(
+                unique[missing, 0], unique[missing, 1]
+            )
+            for i, index, distance in zip(missing, indices, distances):
+                place = None
+                if distance <= self.max_distance_km:
+                    place = (
+                        self.gazetteer.names[index],
+                        self.gazetteer.regions[index],
+                        self.gazetteer.countries[index],
+                    )
+                self._cache[unique_keys[i]] = place
+
+        places = [self._cache[key] for key in unique_keys]
+        return [places[i] for i in inverse]
+
+
+def geocode_images(
+    db: ImageDatabase,
+    geocoder: ReverseGeocoder,
+    overwrite: bool = False,
+    batch_size: int = GEOCODE_BATCH_SIZE,
+) -> int:
+    """
+    Store the place names of geotagged images.
+
+    Args:
+        db: ImageDatabase to update
+        geocoder: Geocoder resolving coordinates to places
+        overwrite: Whether to geocode images that already have a place
+        batch_size: Number of images resolved and written per transaction
+
+    Returns:
+        Number of images a place was found for
+    """
+    locations = db.get_locations_to_geocode(overwrite=overwrite)
+    found = 0
+    for start in range(0, len(locations), batch_size):
+        batch = locations[start : start + batch_size]
+        places = geocoder.lookup([row[1] for row in batch], [row[2] for row in batch])
+        db.set_places([(row[0], place) for row, place in zip(batch, places)])
+        found += sum(place is not None for place in places)
+        logger.info(f"Geocoded {start + len(batch)} of {len(locations)} images")
+
+    # Place names are in the full-text index, which every batch rewrote
+    if locations:
+        db.optimize_search_index()
+    return found
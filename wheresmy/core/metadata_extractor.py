@@ -30,7 +30,9 @@ from PIL import Image, ExifTags
 import piexif
 import argparse
 from wheresmy.utils.apple_makernote import decode_apple_makernote, create_clean_json
+from wheresmy.core import duplicates
 from wheresmy.core.vlm_describers import get_vlm_describer
+from wheresmy.utils import metrics
 
 try:
     import pyheif
@@ -40,6 +42,12 @@ except ImportError:
     HEIF_SUPPORT = False
     print("Warning: pyheif not installed. HEIC/HEIF images won't be processed.")
 
+# Images whose VLM description was copied from a near-duplicate
+DUPLICATE_DESCRIPTIONS = metrics.counter(
+    "duplicate_descriptions_total",
+    "VLM descriptions copied from near-duplicate images instead of generated",
+)
+
 
 def format_exif_date(date_str):
     """Convert EXIF date format to ISO format."""
@@ -232,6 +240,20 @@ def extract_heif_metadata(image_path):
         metadata["mode"] = heif_file.mode
         metadata["size"] = (heif_file.size[0], heif_file.size[1])
 
+        # The image data is already decoded, so hashing it is cheap
+        try:
+            img = Image.frombytes(
+                heif_file.mode,
+                heif_file.size,
+                heif_file.data,
+                "raw",
+                heif_file.mode,
+                heif_file.stride,
+            )
+            metadata["phash"] = duplicates.format_hash(duplicates.dhash(img))
+        except Exception as hash_e:
+            metadata["phash_error"] = f"Error hashing image: {str(hash_e)}"
+
         # Extract EXIF if available
         for metadata_type in heif_file.metadata or []:
             if metadata_type["type"] == "Exif":
@@ -298,7 +320,7 @@ def extract_heif_metadata(image_path):
         return {"error": f"Error extracting HEIF metadata: {str(e)}"}
 
 
-def extract_metadata(image_path, vlm_describer=None, vlm_prompt=None):
+def extract_metadata(image_path, vlm_describer=None, vlm_prompt=None, seen=None):
     """
     Extract metadata from an image file.
 
@@ -306,6 +328,9 @@ def extract_metadata(image_path, vlm_describer=None, vlm_prompt=None):
         image_path: Path to the image file
         vlm_describer: Optional VLM describer object for generating image descriptions
         vlm_prompt: Optional custom prompt for the VLM
+        seen: Optional duplicates.HashIndex of the descriptions of images
+              processed so far; near-duplicates get a copy of a description
+              instead of running the VLM, and new descriptions are added
 
     Returns:
         Dictionary containing the extracted metadata
@@ -385,14 +410,35 @@ def extract_metadata(image_path, vlm_describer=None, vlm_prompt=None):
                             f"Error extracting EXIF: {str(inner_e)}"
                         )
 
+            # Perceptual hash for duplicate detection; decodes JPEGs at a
+            # reduced scale, so it comes after everything else reading img
+            try:
+                metadata["phash"] = duplicates.format_hash(duplicates.dhash(img))
+            except Exception as hash_e:
+                metadata["phash_error"] = f"Error hashing image: {str(hash_e)}"
+
+        # Near-duplicates of an image described earlier reuse its description
+        phash = duplicates.parse_hash(metadata.get("phash"))
+        original = None
+        if vlm_describer is not None and seen is not None and phash is not None:
+            original = seen.find(phash)
+        if original is not None:
+            original_path, description_result = original
+            metadata["vlm_description"] = dict(
+                description_result, duplicate_of=original_path
+            )
+            DUPLICATE_DESCRIPTIONS.inc()
+
         # If VLM describer is provided, generate image description
-        if vlm_describer is not None:
+        elif vlm_describer is not None:
             try:
                 description_result = vlm_describer(image_path, prompt=vlm_prompt)
                 if "error" in description_result:
                     metadata["vlm_description_error"] = description_result["error"]
                 else:
                     metadata["vlm_description"] = description_result
+                    if seen is not None and phash is not None:
+                        seen.add(phash, (image_path, description_result))
             except Exception as vlm_e:
                 metadata["vlm_description_error"] = (
                     f"Error generating VLM description: {str(vlm_e)}"
@@ -421,7 +467,12 @@ def extract_metadata(image_path, vlm_describer=None, vlm_prompt=None):
 
 
 def process_directory(
-    directory, output_file=None, recursive=False, vlm_describer=None, vlm_prompt=None
+    directory,
+    output_file=None,
+    recursive=False,
+    vlm_describer=None,
+    vlm_prompt=None,
+    dedup=True,
 ):
     """
     Process all images in a directory.
@@ -432,6 +483,8 @@ def process_directory(
         recursive: Whether to process subdirectories recursively
         vlm_describer: Optional VLM describer object for generating image descriptions
         vlm_prompt: Optional custom prompt for the VLM
+        dedup: Whether near-duplicate images (e.g. burst shots) reuse the
+               VLM description of the first one instead of being described
 
     Returns:
         Dictionary containing metadata for all processed images
@@ -468,10 +521,11 @@ def process_directory(
         ]
 
     # Process each file
+    seen = duplicates.HashIndex() if dedup else None
     for file_path in files:
         print(f"Processing {file_path}...")
         results[file_path] = extract_metadata(
-            file_path, vlm_describer=vlm_describer, vlm_prompt=vlm_prompt
+            file_path, vlm_describer=vlm_describer, vlm_prompt=vlm_prompt, seen=seen
         )
 
     # Output results
@@ -503,9 +557,25 @@ def main():
         "--vlm-prompt", help="Custom prompt for VLM description generation"
     )
     parser.add_argument("--cache-dir", help="Directory to cache VLM models")
+    parser.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="Describe near-duplicate images instead of reusing a description",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a latency breakdown per stage to stderr",
+    )
 
     args = parser.parse_args()
 
+    with metrics.profiling(args.profile):
+        extract(args)
+
+
+def extract(args):
+    """Extract metadata for parsed command line arguments."""
     # Initialize VLM if needed
     vlm_describer = None
     if args.vlm != "none":
@@ -535,6 +605,7 @@ def main():
             args.recursive,
             vlm_describer=vlm_describer,
             vlm_prompt=args.vlm_prompt,
+            dedup=not args.no_dedup,
         )
         if not args.output:
             print(json.dumps(results, indent=4, default=str))
@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+Query Analysis Module
+
+This module gives visibility into how SQLite executes the queries of
+ImageDatabase:
+- SlowQueryLog records the SQL, parameters, duration and query plan of
+  queries slower than a threshold
+- TracingConnection times the statements run on a connection and reports
+  slow ones to a SlowQueryLog
+- analyze_database() runs ANALYZE, reports which indexes the search queries
+  use and suggests indexes for queries that scan whole tables
+"""
+
+import re
+import json
+import time
+import logging
+import sqlite3
+import threading
+import weakref
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+from wheresmy.core import duplicates, geo
+
+logger = logging.getLogger(__name__)
+
+# Number of slow queries kept in memory
+DEFAULT_MAX_ENTRIES = 200
+
+# Longest parameter string kept in a slow query record
+MAX_PARAM_LENGTH = 200
+
+# Statements that EXPLAIN QUERY PLAN can describe
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+# Comparisons in WHERE clauses, as "[alias.]column operator"
+COMPARISON_PATTERN = re.compile(
+    r"(?:\b(\w+)\.)?\b(\w+)\s*(=|==|>=|<=|<|>|\bIN\b|\bBETWEEN\b|\bLIKE\b|\bGLOB\b)",
+    re.IGNORECASE,
+)
+
+# Tables of FROM and JOIN clauses, with their optional alias
+TABLE_PATTERN = re.compile(
+    r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!(?:WHERE|JOIN|ON|ORDER|GROUP"
+    r"|LIMIT|LEFT|INNER|CROSS|USING)\b)(\w+))?",
+    re.IGNORECASE,
+)
+
+# Plan steps reading a whole table: "SCAN images", "SCAN i" (an alias) or
+# "SCAN i USING INDEX idx_capture_date" (a full scan in index order)
+SCAN_PATTERN = re.compile(
+    r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX \w+)?$"
+)
+
+# Indexes named in plan steps
+INDEX_PATTERN = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+
+def _sanitize_param(value: Any) -> Any:
+    """Make a query parameter JSON-serializable and short."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str) and len(value) > MAX_PARAM_LENGTH:
+        return value[:MAX_PARAM_LENGTH] + "..."
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+
+def sanitize_params(params: Any) -> Any:
+    """
+    Make query parameters JSON-serializable for a slow query record.
+
+    Args:
+        params: Sequence or mapping of parameters
+
+    Returns:
+        List or dictionary of parameters; blobs are replaced by their size
+    """
+    if isinstance(params, dict):
+        return {key: _sanitize_param(value) for key, value in params.items()}
+    return [_sanitize_param(value) for value in params or ()]
+
+
+def explain_query_plan(
+    conn: sqlite3.Connection, sql: str, params: Any = ()
+) -> List[str]:
+    """
+    Get the query plan of a statement.
+
+    Args:
+        conn: Connection to the database
+        sql: SQL statement
+        params: Parameters of the statement
+
+    Returns:
+        Plan steps, indented by depth, or [] when the statement cannot be
+        explained
+    """
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return []
+
+    # A plain cursor, so explaining a traced query is not traced itself
+    cursor = sqlite3.Cursor(conn)
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        rows = [tuple(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.debug(f"Cannot explain query: {str(e)}")
+        return []
+    finally:
+        cursor.close()
+
+    # Rows are (id, parent, unused, detail); children follow their parent
+    depths = {0: -1}
+    plan = []
+    for node_id, parent, _, detail in rows:
+        depths[node_id] = depths.get(parent, -1) + 1
+        plan.append("  " * depths[node_id] + detail)
+    return plan
+
+
+class SlowQueryLog:
+    """Record queries slower than a threshold."""
+
+    def __init__(
+        self,
+        threshold_ms: float = 100.0,
+        path: Optional[str] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        """
+        Initialize the log.
+
+        Args:
+            threshold_ms: Queries taking at least this long are recorded
+            path: Optional file that records are appended to as JSON lines
+            max_entries: Number of recent records kept in memory
+        """
+        self.threshold = threshold_ms / 1000.0
+        self.path = path
+        self._entries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        conn: sqlite3.Connection,
+        sql: str,
+        params: Any,
+        duration: float,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Record a query if it was slow.
+
+        Args:
+            conn: Open connection the query ran on, used to explain it
+            sql: SQL statement
+            params: Parameters of the statement
+            duration: Seconds spent executing the statement and fetching rows
+
+        Returns:
+            The record, or None when the query was not slow
+        """
+        if duration < self.threshold:
+            return None
+
+        entry = {
+            "time": time.time(),
+            "duration_ms": round(duration * 1000, 3),
+            "sql": " ".join(sql.split()),
+            "params": sanitize_params(params),
+            "plan": explain_query_plan(conn, sql, params),
+        }
+        logger.warning(
+            f"Slow query ({entry['duration_ms']:.1f} ms): {entry['sql'][:200]}"
+        )
+
+        with self._lock:
+            self._entries.append(entry)
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    logger.error(f"Error writing slow query log: {str(e)}")
+        return entry
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Get the recorded queries, oldest first."""
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        """Remove the recorded queries from memory."""
+        with self._lock:
+            self._entries.clear()
+
+
+def read_slow_query_log(path: str) -> List[Dict[str, Any]]:
+    """
+    Read the records of a slow query log file.
+
+    Args:
+        path: Path of a file written by SlowQueryLog
+
+    Returns:
+        Records, skipping lines that are not valid JSON
+    """
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+
+class TracingCursor(sqlite3.Cursor):
+    """Cursor timing each statement, including the fetching of its rows."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._pending = None
+
+    def _finish(self) -> None:
+        """Report the previous statement to the slow query log."""
+        pending, self._pending = self._pending, None
+        log = getattr(self.connection, "slow_query_log", None)
+        if pending is not None and log is not None:
+            sql, params, duration = pending
+            log.record(self.connection, sql, params, duration)
+
+    def _timed(self, method: Any, *args: Any) -> Any:
+        """Call a fetch method and add its duration to the pending statement."""
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if self._pending is not None:
+                sql, params, duration = self._pending
+                elapsed = time.perf_counter() - start
+                self._pending = (sql, params, duration + elapsed)
+
+    def execute(self, sql: str, parameters: Any = ()) -> "TracingCursor":
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._pending = (sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> "TracingCursor":
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            # Rows are not kept; the plan is the same for every row
+            self._pending = (sql, (), time.perf_counter() - start)
+
+    def fetchone(self) -> Any:
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Any]:
+        if size is None:
+            return self._timed(super().fetchmany)
+        return self._timed(super().fetchmany, size)
+
+    def fetchall(self) -> List[Any]:
+        return self._timed(super().fetchall)
+
+    def close(self) -> None:
+        self._finish()
+        super().close()
+
+
+class TracingConnection(sqlite3.Connection):
+    """
+    Connection reporting slow statements to a SlowQueryLog.
+
+    Set the ``slow_query_log`` attribute after connecting. A statement is
+    reported when the next statement runs on its cursor, or when the
+    cursor or connection is closed.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.slow_query_log: Optional[SlowQueryLog] = None
+        self._cursors = weakref.WeakSet()
+
+    def cursor(self, factory: Any = None) -> sqlite3.Cursor:
+        cursor = super().cursor(factory or TracingCursor)
+        self._cursors.add(cursor)
+        return cursor
+
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self) -> None:
+        for cursor in list(self._cursors):
+            if isinstance(cursor, TracingCursor):
+                cursor._finish()
+        super().close()
+
+
+def _table_aliases(sql: str) -> Dict[str, str]:
+    """Map the tables and aliases of a statement to table names."""
+    aliases = {}
+    for table, alias in TABLE_PATTERN.findall(sql):
+        aliases[table.lower()] = table
+        if alias:
+            aliases[alias.lower()] = table
+    return aliases
+
+
+def suggest_indexes(
+    sql: str,
+    plan: Sequence[str],
+    table_columns: Dict[str, List[str]],
+    indexes: Dict[str, List[List[str]]],
+) -> List[Dict[str, str]]:
+    """
+    Suggest indexes for the full table scans of a query.
+
+    A table scan is worth an index when the query compares columns of the
+    table with =, IN or a range. Columns compared with LIKE or GLOB are
+    reported instead, since patterns with a leading wildcard cannot use an
+    index.
+
+    Args:
+        sql: SQL statement
+        plan: Plan steps from explain_query_plan()
+        table_columns: Column names of each table
+        indexes: Column lists of the existing indexes of each table,
+                 including the primary key
+
+    Returns:
+        List of dictionaries with the table, a reason and either a
+        CREATE INDEX statement ("sql") or a note ("note")
+    """
+    aliases = _table_aliases(sql)
+    where = re.split(r"\bWHERE\b", sql, maxsplit=1, flags=re.IGNORECASE)
+    conditions = where[1] if len(where) > 1 else ""
+    conditions = re.split(
+        r"\b(?:ORDER\s+BY|GROUP\s+BY|LIMIT)\b", conditions, flags=re.IGNORECASE
+    )[0]
+
+    suggestions = []
+    for step in plan:
+        match = SCAN_PATTERN.match(step.strip())
+        if not match:
+            continue
+        table = aliases.get(match.group(1).lower())
+        if table not in table_columns:
+            continue
+        columns = {column.lower(): column for column in table_columns[table]}
+
+        equality, ranges, patterns = [], [], []
+        for qualifier, column, operator in COMPARISON_PATTERN.findall(conditions):
+            if qualifier and aliases.get(qualifier.lower()) != table:
+                continue
+            if column.lower() not in columns:
+                continue
+            column = columns[column.lower()]
+            operator = operator.upper()
+            if operator in ("LIKE", "GLOB"):
+                target = patterns
+            elif operator in ("=", "==", "IN"):
+                target = equality
+            else:
+                target = ranges
+            if column not in target:
+                target.append(column)
+
+        key = equality + [c for c in ranges[:1] if c not in equality]
+        leading = {cols[0] for cols in indexes.get(table, []) if cols}
+        if key and key[0] not in leading:
+            suggestions.append(
+                {
+                    "table": table,
+                    "reason": f"{step.strip()} filtering on {', '.join(key)}",
+                    "sql": f"CREATE INDEX IF NOT EXISTS idx_{table}_"
+                    f"{'_'.join(key)} ON {table}({', '.join(key)});",
+                }
+            )
+        for column in patterns:
+            if column in key:
+                continue
+            suggestions.append(
+                {
+                    "table": table,
+                    "reason": f"{step.strip()} matching {column} with a pattern",
+                    "note": f"LIKE/GLOB on {column} cannot use an index when the "
+                    "pattern starts with a wildcard; consider full-text search "
+                    "or an exact-match column",
+                }
+            )
+    return suggestions
+
+
+def _representative_queries(db: Any) -> List[Dict[str, Any]]:
+    """Get the SQL and parameters of the search queries ImageDatabase runs."""
+    filters = {
+        "text search": {"text_query": "beach"},
+        "camera filter": {"camera_ids": [1, 2]},
+        "date range": {"date_start": "2020-01-01", "date_end": "2020-12-31"},
+        "minimum size": {"min_width": 1000, "min_height": 1000},
+        "bounding box": {"bbox": (48.8, 2.2, 48.9, 2.5)},
+        "radius": {"near": (48.8584, 2.2945, 2.0)},
+        "combined filters": {
+            "text_query": "beach",
+            "camera_ids": [1],
+            "date_start": "2020-01-01",
+        },
+    }
+    queries = []
+    for name, params in filters.items():
+        sql, args = db._build_filter_query(**params)
+        queries.append({"name": f"filter_search: {name}", "sql": sql, "params": args})
+    queries.append(
+        {
+            "name": "camera statistics",
+            "sql": "SELECT camera_make, camera_model, COUNT(*) FROM images "
+            "WHERE camera_make IS NOT NULL GROUP BY camera_make, camera_model",
+            "params": [],
+        }
+    )
+    return queries
+
+
+def analyze_database(
+    db: Any, slow_queries: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Run ANALYZE and report how the database's queries use its indexes.
+
+    Args:
+        db: ImageDatabase to analyze
+        slow_queries: Optional slow query records whose plans are checked
+                      along with the search queries ImageDatabase runs
+
+    Returns:
+        Dictionary with the tables and their row counts, the indexes with
+        the number of checked queries using them, the checked queries with
+        their plans, and index suggestions
+    """
+    conn = sqlite3.connect(db.db_path)
+    try:
+        geo.register_functions(conn)
+        duplicates.register_functions(conn)
+        start = time.perf_counter()
+        conn.execute("ANALYZE")
+        conn.commit()
+        analyze_seconds = time.perf_counter() - start
+
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name NOT LIKE 'sqlite_%' AND sql NOT LIKE 'CREATE VIRTUAL%' "
+            "ORDER BY name"
+        )
+        # Skip the shadow tables of full-text indexes
+        virtual = {
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE sql LIKE 'CREATE VIRTUAL%'"
+            )
+        }
+        tables = [
+            row[0]
+            for row in cursor.fetchall()
+            if not any(row[0].startswith(f"{name}_") for name in virtual)
+        ]
+
+        stats = {}
+        for table, index, stat in conn.execute(
+            "SELECT tbl, idx, stat FROM sqlite_stat1"
+        ):
+            stats[(table, index)] = stat
+
+        table_columns = {}
+        table_rows = {}
+        indexes = {}
+        index_report = []
+        for table in tables:
+            info = list(conn.execute(f'PRAGMA table_info("{table}")'))
+            table_columns[table] = [row[1] for row in info]
+            table_rows[table] = conn.execute(
+                f'SELECT COUNT(*) FROM "{table}"'
+            ).fetchone()[0]
+            # The primary key counts as an index of the table
+            primary_key = [row[1] for row in sorted(info, key=lambda r: r[5]) if row[5]]
+            indexes[table] = [primary_key] if primary_key else []
+            for row in conn.execute(f'PRAGMA index_list("{table}")'):
+                name = row[1]
+                columns = [
+                    info[2] for info in conn.execute(f'PRAGMA index_info("{name}")')
+                ]
+                indexes[table].append(columns)
+                index_report.append(
+                    {
+                        "table": table,
+                        "name": name,
+                        "columns": columns,
+                        "unique": bool(row[2]),
+                        "stat": stats.get((table, name)),
+                        "used_by": 0,
+                    }
+                )
+
+        queries = _representative_queries(db)
+        for entry in slow_queries or []:
+            queries.append(
+                {
+                    "name": f"slow query ({entry.get('duration_ms', 0):.1f} ms)",
+                    "sql": entry["sql"],
+                    "params": entry.get("params") or [],
+                }
+            )
+
+        suggestions = []
+        for query in queries:
+            query["plan"] = explain_query_plan(conn, query["sql"], query["params"])
+            used = set()
+            for step in query["plan"]:
+                used.update(INDEX_PATTERN.findall(step))
+            for index in index_report:
+                if index["name"] in used:
+                    index["used_by"] += 1
+            for suggestion in suggest_indexes(
+                query["sql"], query["plan"], table_columns, indexes
+            ):
+                if suggestion not in suggestions:
+                    suggestions.append(suggestion)
+    finally:
+        conn.close()
+
+    return {
+        "analyze_seconds": analyze_seconds,
+        "tables": [{"name": t, "rows": table_rows[t]} for t in tables],
+        "indexes": index_report,
+        "queries": queries,
+        "suggestions": suggestions,
+    }
@@ -0,0 +1,150 @@
+"""
+Re-embedding Job - Fill the vectors of a new embedding model in the background.
+
+This module migrates an image library to a different text embedding model
+without downtime: the new model's embeddings are generated batch by batch
+while searches keep using the current default model, and the default is
+switched in a single write once every described image has been embedded.
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Optional
+
+from wheresmy.core.database import ImageDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class ReembeddingJob:
+    """Generate embeddings of a new model for all described images."""
+
+    # Default number of descriptions embedded and stored per batch
+    DEFAULT_BATCH_SIZE = 256
+
+    def __init__(
+        self,
+        db: ImageDatabase,
+        model_name: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        make_default: bool = True,
+        embedding_generator: Optional[Any] = None,
+    ):
+        """
+        Initialize the re-embedding job.
+
+        Args:
+            db: ImageDatabase instance
+            model_name: Name of the sentence-transformers model to embed with
+            batch_size: Number of descriptions embedded and stored per batch
+            make_default: Whether to make the model the default once complete
+            embedding_generator: Optional TextEmbeddingGenerator for the model;
+                                 created on first run if not provided
+        """
+        self.db = db
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.make_default = make_default
+        self.embedding_generator = embedding_generator
+
+        # Progress, readable while the job runs in the background
+        self.processed = 0
+        self.failed = 0
+        self.done = False
+        self.error: Optional[str] = None
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run(self) -> bool:
+        """
+        Run the job to completion in the calling thread.
+
+        Returns:
+            True if every described image now has an embedding for the model
+        """
+        try:
+            if self.embedding_generator is None:
+                from wheresmy.core.text_embeddings import TextEmbeddingGenerator
+
+                self.embedding_generator = TextEmbeddingGenerator(
+                    model_name=self.model_name
+                )
+
+            start_time = time.time()
+            logger.info(f"Re-embedding library with model {self.model_name}")
+
+            after_id = 0
+            while not self._stop_event.is_set():
+                batch = self.db.get_images_missing_embeddings(
+                    self.model_name, after_id=after_id, limit=self.batch_size
+                )
+                if not batch:
+                    break
+                after_id = batch[-1][0]
+                self._embed_batch(batch)
+
+            if self._stop_event.is_set():
+                logger.info(f"Re-embedding stopped after {self.processed} images")
+                return False
+
+            complete = self.failed == 0
+            if complete and self.make_default:
+                self.db.set_default_embedding_model(self.model_name)
+
+            logger.info(
+                f"Re-embedded {self.processed} images ({self.failed} failed) "
+                f"in {time.time() - start_time:.2f} seconds"
+            )
+            return complete
+
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Error re-embedding library: {str(e)}")
+            return False
+        finally:
+            self.done = True
+
+    def _embed_batch(self, batch) -> None:
+        """Embed and store one batch of (image_id, description) tuples."""
+        texts = [description for _, description in batch]
+        embedding_results = self.embedding_generator.generate_embeddings(
+            texts, cache=self.db
+        )
+
+        embeddings_dict = {}
+        for (image_id, _), embedding_result in zip(batch, embedding_results):
+            if "error" in embedding_result:
+                self.failed += 1
+                continue
+            embeddings_dict[image_id] = embedding_result
+
+        results = self.db.batch_add_embeddings(embeddings_dict)
+        stored = sum(1 for embedding_id in results.values() if embedding_id)
+        self.processed += stored
+        self.failed += len(embeddings_dict) - stored
+
+    def start(self) -> threading.Thread:
+        """
+        Run the job in a background daemon thread.
+
+        Returns:
+            The thread running the job
+        """
+        self._thread = threading.Thread(
+            target=self.run, name=f"reembed-{self.model_name}", daemon=True
+        )
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Ask a background job to stop after the current batch.
+
+        Args:
+            timeout: Optional number of seconds to wait for the thread
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -8,13 +8,45 @@ image descriptions for semantic search capabilities.
 
 import time
 import logging
+import statistics
+import importlib.util
 from typing import Dict, List, Any, Optional
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from wheresmy.utils import metrics
 
 logger = logging.getLogger(__name__)
 
+# Model loading and inference latency, labelled by model and by whether a
+# single text or a batch was encoded
+MODEL_LOAD_SECONDS = metrics.histogram(
+    "embedding_model_load_seconds",
+    "Time spent loading text embedding models in seconds",
+    ("model",),
+)
+INFERENCE_SECONDS = metrics.histogram(
+    "embedding_inference_seconds",
+    "Text embedding inference latency in seconds",
+    ("model", "mode"),
+)
+TEXTS_ENCODED = metrics.counter(
+    "embedding_texts_encoded_total",
+    "Number of texts encoded by text embedding models",
+    ("model",),
+)
+
+# sentence-transformers (and torch) is imported when the first model is
+# created, so importing this module for its constants or type stays cheap
+SentenceTransformer = None
+
+
+def _import_sentence_transformers() -> None:
+    """Import the SentenceTransformer class on first use."""
+    global SentenceTransformer
+    if SentenceTransformer is None:
+        from sentence_transformers import SentenceTransformer
+
 
 class TextEmbeddingGenerator:
     """Generate text embeddings for semantic search using Sentence Transformers."""
@@ -22,7 +54,21 @@ class TextEmbeddingGenerator:
     # Default model to use for embeddings (all-MiniLM-L6-v2 with 384 dimensions)
     DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
 
-    def __init__(self, model_name: Optional[str] = None, device: Optional[str] = None):
+    # Default number of texts encoded per forward pass in batch mode
+    DEFAULT_BATCH_SIZE = 64
+
+    # Inference backends supported by sentence-transformers
+    BACKENDS = ("torch", "onnx")
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        device: Optional[str] = None,
+        quantize: bool = False,
+        num_threads: Optional[int] = None,
+        max_seq_length: Optional[int] = None,
+        backend: str = "torch",
+    ):
         """
         Initialize the text embedding generator.
 
@@ -31,25 +77,72 @@ class TextEmbeddingGenerator:
                        (default: all-MiniLM-L6-v2)
             device: Device to run inference on ('cuda', 'cpu', etc.).
                    If None, will auto-detect.
+            quantize: Apply dynamic int8 quantization to the linear layers
+                      (CPU inference with the torch backend only)
+            num_threads: Number of intra-op threads used by torch on CPU
+            max_seq_length: Maximum number of tokens per text; longer texts
+                            are truncated
+            backend: 'torch', or 'onnx' to run an ONNX graph through
+                     onnxruntime when it is installed
         """
         self.model_name = model_name or self.DEFAULT_MODEL_NAME
         self.device = device
+        self.quantized = False
+
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unsupported backend: {backend}")
+        if backend == "onnx" and importlib.util.find_spec("onnxruntime") is None:
+            logger.warning("onnxruntime is not installed, using the torch backend")
+            backend = "torch"
+        self.backend = backend
 
         # Initialize the model
         logger.info(f"Initializing text embedding model: {self.model_name}")
         try:
-            start_time = time.time()
-            self.model = SentenceTransformer(self.model_name)
+            with MODEL_LOAD_SECONDS.time(model=self.model_name) as timer:
+                if num_threads:
+                    import torch
+
+                    torch.set_num_threads(num_threads)
+                    logger.info(f"Using {num_threads} intra-op threads")
+
+                _import_sentence_transformers()
+                if self.backend == "torch":
+                    self.model = SentenceTransformer(self.model_name)
+                else:
+                    self.model = SentenceTransformer(
+                        self.model_name, backend=self.backend
+                    )
+
+                # Move to specified device if provided
+                if self.device:
+                    self.model = self.model.to(self.device)
 
-            # Move to specified device if provided
-            if self.device:
-                self.model = self.model.to(self.device)
+                if max_seq_length:
+                    self.model.max_seq_length = max_seq_length
 
-            logger.info(f"Model initialized in {time.time() - start_time:.2f} seconds")
+                if quantize:
+                    self._quantize()
+
+            logger.info(f"Model initialized in {timer.elapsed:.2f} seconds")
         except Exception as e:
             logger.error(f"Error initializing embedding model: {str(e)}")
             raise
 
+    def _quantize(self) -> None:
+        """Apply dynamic int8 quantization to the model's linear layers."""
+        if self.backend != "torch" or (self.device and self.device != "cpu"):
+            logger.warning("Quantization is only supported for torch CPU inference")
+            return
+
+        import torch
+
+        self.model = torch.ao.quantization.quantize_dynamic(
+            self.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        self.quantized = True
+        logger.info("Applied dynamic int8 quantization to linear layers")
+
     def generate_embedding(self, text: str) -> Dict[str, Any]:
         """
         Generate an embedding for a single text string.
@@ -68,10 +161,11 @@ class TextEmbeddingGenerator:
 
         try:
             logger.debug(f"Generating embedding for text: {text[:50]}...")
-            start_time = time.time()
 
             # Generate the embedding
-            embedding = self.model.encode(text, convert_to_numpy=True)
+            with INFERENCE_SECONDS.time(model=self.model_name, mode="single") as timer:
+                embedding = self.model.encode(text, convert_to_numpy=True)
+            TEXTS_ENCODED.inc(model=self.model_name)
 
             # Ensure embedding is a numpy array
             if not isinstance(embedding, np.ndarray):
@@ -83,7 +177,7 @@ class TextEmbeddingGenerator:
                 "embedding_size": len(embedding),
                 "text": text,
                 "model": self.model_name,
-                "processing_time": time.time() - start_time,
+                "processing_time": timer.elapsed,
             }
 
             logger.debug(
@@ -99,12 +193,21 @@ class TextEmbeddingGenerator:
                 "text": text,
             }
 
-    def generate_embeddings(self, texts: List[str]) -> List[Dict[str, Any]]:
+    def generate_embeddings(
+        self,
+        texts: List[str],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        cache: Optional[Any] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Generate embeddings for multiple texts in batch.
 
         Args:
             texts: List of text strings to generate embeddings for
+            batch_size: Number of texts the model encodes per forward pass
+            cache: Optional embedding cache (e.g. an ImageDatabase) providing
+                   get_cached_embeddings() and cache_embeddings(); texts found
+                   in it are not re-encoded and new embeddings are added to it
 
         Returns:
             List of dictionaries containing the embedding vectors and metadata
@@ -113,23 +216,55 @@ class TextEmbeddingGenerator:
             return []
 
         try:
-            logger.info(f"Generating batch embeddings for {len(texts)} texts")
             start_time = time.time()
 
-            # Generate embeddings for all texts at once (more efficient)
-            embeddings = self.model.encode(texts, convert_to_numpy=True)
+            # Look up texts that were already embedded with this model
+            cached = {}
+            if cache is not None:
+                try:
+                    cached = cache.get_cached_embeddings(self.model_name, texts)
+                except Exception as e:
+                    logger.warning(f"Error reading embedding cache: {str(e)}")
+
+            # Encode each distinct uncached text once
+            to_encode = list(dict.fromkeys(t for t in texts if t not in cached))
+            logger.info(
+                f"Generating batch embeddings for {len(to_encode)} texts "
+                f"({len(texts) - len(to_encode)} cached or duplicate)"
+            )
+
+            encoded = {}
+            if to_encode:
+                # Generate embeddings for all texts in a single encode call. The
+                # sentence-transformers encoder sorts inputs by length before
+                # splitting them into batches, so padding is already minimised
+                # and the output is returned in input order.
+                with INFERENCE_SECONDS.time(model=self.model_name, mode="batch"):
+                    embeddings = self.model.encode(
+                        to_encode, batch_size=batch_size, convert_to_numpy=True
+                    )
+                TEXTS_ENCODED.inc(len(to_encode), model=self.model_name)
+                encoded = dict(zip(to_encode, embeddings))
+
+                if cache is not None:
+                    try:
+                        cache.cache_embeddings(self.model_name, encoded)
+                    except Exception as e:
+                        logger.warning(f"Error writing embedding cache: {str(e)}")
 
             # Create result dictionaries for each embedding
+            processing_time = (time.time() - start_time) / len(texts)
             results = []
-            for i, (text, embedding) in enumerate(zip(texts, embeddings)):
+            for text in texts:
+                embedding = cached[text] if text in cached else encoded[text]
                 results.append(
                     {
                         "embedding": embedding,
                         "embedding_size": len(embedding),
                         "text": text,
                         "model": self.model_name,
-                        "processing_time": (time.time() - start_time)
-                        / len(texts),  # Approximate per-item time
+                        "cached": text in cached,
+                        "processing_time": processing_time,  # Approximate per-item time
                     }
                 )
 
@@ -167,9 +302,65 @@ class TextEmbeddingGenerator:
         return self.generate_embedding(query)
 
 
+def compare_inference(
+    baseline: TextEmbeddingGenerator,
+    candidate: TextEmbeddingGenerator,
+    texts: List[str],
+    repeats: int = 5,
+) -> Dict[str, Any]:
+    """
+    Compare the query latency and embeddings of two generators.
+
+    Args:
+        baseline: Reference generator (e.g. float32 torch inference)
+        candidate: Generator to evaluate (e.g. quantized inference)
+        texts: Sample texts, each embedded as a single query
+        repeats: Number of timed passes over the texts
+
+    Returns:
+        Dictionary with median/p99 latencies in milliseconds, the speedup of
+        the candidate and the cosine similarity between their embeddings
+    """
+
+    def measure(generator):
+        # Warm up once so lazy initialization is not timed
+        generator.model.encode(texts[0], convert_to_numpy=True)
+        latencies = []
+        for _ in range(repeats):
+            for text in texts:
+                start_time = time.perf_counter()
+                generator.model.encode(text, convert_to_numpy=True)
+                latencies.append((time.perf_counter() - start_time) * 1000)
+        latencies.sort()
+        return {
+            "median_ms": statistics.median(latencies),
+            "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        }
+
+    baseline_latency = measure(baseline)
+    candidate_latency = measure(candidate)
+
+    a = np.asarray(baseline.model.encode(texts, convert_to_numpy=True))
+    b = np.asarray(candidate.model.encode(texts, convert_to_numpy=True))
+    cosine = np.sum(a * b, axis=1) / (
+        np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    )
+
+    return {
+        "texts": len(texts),
+        "baseline": baseline_latency,
+        "candidate": candidate_latency,
+        "speedup": baseline_latency["median_ms"] / candidate_latency["median_ms"],
+        "cosine_mean": float(np.mean(cosine)),
+        "cosine_min": float(np.min(cosine)),
+    }
+
+
 # Example usage
 if __name__ == "__main__":
     import sys
+    import json
+    import argparse
 
     # Configure logging
     logging.basicConfig(
@@ -178,18 +369,46 @@ if __name__ == "__main__":
     )
 
     # Parse command line arguments
-    if len(sys.argv) < 2:
-        print("Usage: python text_embeddings.py <text> [model_name]")
-        sys.exit(1)
-
-    text = sys.argv[1]
-    model_name = sys.argv[2] if len(sys.argv) > 2 else None
+    parser = argparse.ArgumentParser(description="Generate a text embedding")
+    parser.add_argument("text", help="Text to embed")
+    parser.add_argument("model_name", nargs="?", help="Sentence-transformers model")
+    parser.add_argument("--quantize", action="store_true", help="int8 quantization")
+    parser.add_argument("--threads", type=int, help="Number of intra-op threads")
+    parser.add_argument("--max-seq-length", type=int, help="Maximum tokens per text")
+    parser.add_argument(
+        "--backend", choices=TextEmbeddingGenerator.BACKENDS, default="torch"
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Compare these inference options against default float32 inference",
+    )
+    args = parser.parse_args()
 
     # Initialize generator
-    generator = TextEmbeddingGenerator(model_name)
+    generator = TextEmbeddingGenerator(
+        args.model_name,
+        quantize=args.quantize,
+        num_threads=args.threads,
+        max_seq_length=args.max_seq_length,
+        backend=args.backend,
+    )
+
+    if args.benchmark:
+        baseline = TextEmbeddingGenerator(args.model_name)
+        sample_texts = [args.text] + [
+            "a dog running on the beach at sunset",
+            "snow covered mountains above a lake",
+            "a birthday cake with candles on a kitchen table",
+            "city street at night with cars and neon signs",
+        ]
+        print(
+            json.dumps(compare_inference(baseline, generator, sample_texts), indent=2)
+        )
+        sys.exit(0)
 
     # Generate and print embedding
-    result = generator.generate_embedding(text)
+    result = generator.generate_embedding(args.text)
 
     if "error" in result:
         print(f"Error: {result['error']}")
@@ -14,9 +14,31 @@ import time
 from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any
 
-import torch
 from PIL import Image
-from transformers import AutoProcessor, AutoModelForVision2Seq
+
+from wheresmy.utils import metrics
+
+# torch and transformers are imported when a model is first used, so
+# extracting metadata without descriptions does not pay for loading them
+AutoProcessor = None
+AutoModelForVision2Seq = None
+
+
+def _import_transformers() -> None:
+    """Import the transformers model classes on first use."""
+    global AutoProcessor, AutoModelForVision2Seq
+    if AutoProcessor is None:
+        from transformers import AutoProcessor
+    if AutoModelForVision2Seq is None:
+        from transformers import AutoModelForVision2Seq
+
+
+# Latency of each stage of loading a model and describing an image
+STAGE_SECONDS = metrics.histogram(
+    "vlm_stage_seconds",
+    "Latency of vision-language model stages in seconds",
+    ("model", "stage"),
+)
 
 
 class BaseVLMDescriber(ABC):
@@ -30,7 +52,11 @@ class BaseVLMDescriber(ABC):
             device: Device to run inference on ('cuda', 'cpu', etc.). If None, will auto-detect.
             cache_dir: Directory to cache downloaded models. If None, uses default.
         """
-        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        if device is None:
+            import torch
+
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = device
         self.cache_dir = cache_dir
 
         # Set to True once the model is loaded
@@ -42,6 +68,19 @@ class BaseVLMDescriber(ABC):
             self.initialize_model()
             self._is_initialized = True
 
+    def stage(self, name: str):
+        """
+        Time a stage of loading the model or describing an image.
+
+        Args:
+            name: Stage name, e.g. "generate"
+
+        Returns:
+            Context manager whose ``elapsed`` attribute holds the duration
+        """
+        model = getattr(self, "MODEL_NAME", type(self).__name__)
+        return STAGE_SECONDS.time(model=model, stage=name)
+
     @abstractmethod
     def initialize_model(self):
         """Initialize the model and processor. To be implemented by subclasses."""
@@ -97,36 +136,36 @@ class SmolVLMDescriber(BaseVLMDescriber):
         start_time = time.time()
 
         try:
+            import torch
+
+            _import_transformers()
+
             # Initialize processor
             logger.info("Loading processor...")
-            processor_start = time.time()
-            self.processor = AutoProcessor.from_pretrained(
-                self.MODEL_NAME, cache_dir=self.cache_dir
-            )
-            logger.info(
-                f"Processor loaded in {time.time() - processor_start:.2f} seconds"
-            )
+            with self.stage("load_processor") as timer:
+                self.processor = AutoProcessor.from_pretrained(
+                    self.MODEL_NAME, cache_dir=self.cache_dir
+                )
+            logger.info(f"Processor loaded in {timer.elapsed:.2f} seconds")
 
             # Initialize model
             logger.info("Loading model...")
-            model_start = time.time()
-            self.model = AutoModelForVision2Seq.from_pretrained(
-                self.MODEL_NAME,
-                torch_dtype=torch.bfloat16,
-                _attn_implementation=(
-                    "flash_attention_2" if self.device == "cuda" else "eager"
-                ),
-                cache_dir=self.cache_dir,
-            )
-            logger.info(f"Model loaded in {time.time() - model_start:.2f} seconds")
+            with self.stage("load_model") as timer:
+                self.model = AutoModelForVision2Seq.from_pretrained(
+                    self.MODEL_NAME,
+                    torch_dtype=torch.bfloat16,
+                    _attn_implementation=(
+                        "flash_attention_2" if self.device == "cuda" else "eager"
+                    ),
+                    cache_dir=self.cache_dir,
+                )
+            logger.info(f"Model loaded in {timer.elapsed:.2f} seconds")
 
             # Move model to device
             logger.info(f"Moving model to {self.device}...")
-            device_start = time.time()
-            self.model = self.model.to(self.device)
-            logger.info(
-                f"Model moved to {self.device} in {time.time() - device_start:.2f} seconds"
-            )
+            with self.stage("move_to_device") as timer:
+                self.model = self.model.to(self.device)
+            logger.info(f"Model moved to {self.device} in {timer.elapsed:.2f} seconds")
 
             elapsed = time.time() - start_time
             logger.info(f"SmolVLM model fully initialized in {elapsed:.2f} seconds")
@@ -164,9 +203,9 @@ class SmolVLMDescriber(BaseVLMDescriber):
         try:
             # Load the image
             logger.info("Loading image...")
-            image_start = time.time()
-            image = Image.open(image_path).convert("RGB")
-            logger.info(f"Image loaded in {time.time() - image_start:.2f} seconds")
+            with self.stage("load_image") as timer:
+                image = Image.open(image_path).convert("RGB")
+            logger.info(f"Image loaded in {timer.elapsed:.2f} seconds")
 
             # Prepare the prompt
             text_prompt = prompt or self.DEFAULT_PROMPT
@@ -182,29 +221,32 @@ class SmolVLMDescriber(BaseVLMDescriber):
 
             # Apply chat template and prepare model inputs
             logger.info("Preparing inputs...")
-            prep_start = time.time()
-            prompt = self.processor.apply_chat_template(
-                messages, add_generation_prompt=True
-            )
-            inputs = self.processor(text=prompt, images=[image], return_tensors="pt")
-            inputs = inputs.to(self.device)
-            logger.info(f"Inputs prepared in {time.time() - prep_start:.2f} seconds")
+            with self.stage("preprocess") as timer:
+                prompt = self.processor.apply_chat_template(
+                    messages, add_generation_prompt=True
+                )
+                inputs = self.processor(
+                    text=prompt, images=[image], return_tensors="pt"
+                )
+                inputs = inputs.to(self.device)
+            logger.info(f"Inputs prepared in {timer.elapsed:.2f} seconds")
 
             # Generate description
+            import torch
+
             logger.info("Generating text...")
-            gen_start = time.time()
-            with torch.no_grad():
+            with self.stage("generate") as timer, torch.no_grad():
                 generated_ids = self.model.generate(**inputs, max_new_tokens=500)
-            logger.info(f"Text generation took {time.time() - gen_start:.2f} seconds")
+            logger.info(f"Text generation took {timer.elapsed:.2f} seconds")
 
             # Decode the generated text
             logger.info("Decoding text...")
-            decode_start = time.time()
-            generated_text = self.processor.batch_decode(
-                generated_ids,
-                skip_special_tokens=True,
-            )[0]
-            logger.info(f"Text decoded in {time.time() - decode_start:.2f} seconds")
+            with self.stage("decode") as timer:
+                generated_text = self.processor.batch_decode(
+                    generated_ids,
+                    skip_special_tokens=True,
+                )[0]
+            logger.info(f"Text decoded in {timer.elapsed:.2f} seconds")
 
             # Extract just the assistant's response
             if "Assistant:" in generated_text:
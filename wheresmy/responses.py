@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Response Encoding
+
+This module makes the web application's responses smaller and cheaper
+to produce:
+- JSON is serialized with orjson when it is installed, falling back to
+  Flask's standard encoder
+- Responses above a size threshold are compressed with Brotli or gzip,
+  as negotiated with the client's Accept-Encoding header
+- Static assets are served from precompressed .br/.gz files when present
+"""
+
+import os
+import gzip
+import logging
+import mimetypes
+from typing import Any, Iterable, Optional
+
+from flask import Flask, Response, current_app, request, send_from_directory
+from flask.json.provider import DefaultJSONProvider
+
+# Try to import orjson for faster JSON serialization
+try:
+    import orjson
+
+    ORJSON_SUPPORT = True
+except ImportError:
+    ORJSON_SUPPORT = False
+
+# Try to import brotli for Brotli compression
+try:
+    import brotli
+
+    BROTLI_SUPPORT = True
+except ImportError:
+    BROTLI_SUPPORT = False
+
+logger = logging.getLogger(__name__)
+
+# Responses smaller than this are not worth compressing (bytes)
+COMPRESSION_THRESHOLD = 1024
+GZIP_LEVEL = 6
+# Brotli quality for responses compressed on the fly; static assets are
+# precompressed once at the maximum quality
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = (
+    "application/json",
+    "application/javascript",
+    "application/x-ndjson",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+)
+
+# Static assets precompressed by precompress_static()
+PRECOMPRESSED_EXTENSIONS = (".js", ".css", ".html", ".svg")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider serializing with orjson."""
+
+    OPTIONS = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY if ORJSON_SUPPORT else 0
+    )
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """
+        Serialize an object to a JSON string.
+
+        sort_keys and an indent of 2 map to orjson options; other arguments
+        of json.dumps are handled by the standard encoder.
+        """
+        indent = kwargs.pop("indent", None)
+        if kwargs.keys() - {"sort_keys"} or indent not in (None, 2):
+            if indent is not None:
+                kwargs["indent"] = indent
+            return super().dumps(obj, **kwargs)
+
+        option = self.OPTIONS
+        if kwargs.get("sort_keys"):
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=str, option=option).decode("utf-8")
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        """Deserialize a JSON string or bytes."""
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        """Create a JSON response without an intermediate str."""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=str, option=self.OPTIONS),
+            mimetype=self.mimetype,
+        )
+
+
+def negotiate_encoding(accept_encoding: Optional[str] = None) -> Optional[str]:
+    """
+    Pick the best supported content coding accepted by the client.
+
+    Args:
+        accept_encoding: Accept-Encoding header (default: current request)
+
+    Returns:
+        "br", "gzip" or None
+    """
+    if accept_encoding is None:
+        accept_encoding = request.headers.get("Accept-Encoding", "")
+
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    for coding in ("br", "gzip") if BROTLI_SUPPORT else ("gzip",):
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """
+    Compress data with a content coding.
+
+    Args:
+        data: Data to compress
+        encoding: "br" or "gzip"
+
+    Returns:
+        Compressed data
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Compress a response if the client accepts it and it is large enough.
+
+    Streamed and file responses are left alone, so NDJSON streams keep
+    flushing and file responses keep Range support.
+
+    Args:
+        response: Response to compress
+
+    Returns:
+        The response, compressed in place when applicable
+    """
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    data = response.get_data()
+    if len(data) < COMPRESSION_THRESHOLD:
+        return response
+
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    etag, _ = response.get_etag()
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def send_static(filename: str) -> Response:
+    """
+    Serve a static file, using a precompressed copy when one is accepted.
+
+    Copies older than the original (e.g. after an upgrade replaced it
+    without precompressing again) are ignored.
+
+    Args:
+        filename: Path of the file within the static folder
+
+    Returns:
+        File response
+    """
+    static_folder = current_app.static_folder
+    encoding = negotiate_encoding()
+    if encoding:
+        suffix = ".br" if encoding == "br" else ".gz"
+        original = os.path.join(static_folder, filename)
+        if _is_fresh(original + suffix, original):
+            response = send_from_directory(
+                static_folder,
+                filename + suffix,
+                mimetype=_guess_mimetype(filename),
+                conditional=True,
+            )
+            response.headers["Content-Encoding"] = encoding
+            response.vary.add("Accept-Encoding")
+            return response
+
+    response = send_from_directory(static_folder, filename)
+    if filename.endswith(PRECOMPRESSED_EXTENSIONS):
+        response.vary.add("Accept-Encoding")
+    return response
+
+
+def _is_fresh(compressed: str, original: str) -> bool:
+    """Check that a compressed copy exists and is not older than its original."""
+    try:
+        return os.path.getmtime(compressed) >= os.path.getmtime(original)
+    except OSError:
+        return False
+
+
+def _guess_mimetype(filename: str) -> str:
+    """Guess the mimetype of a static file from its name."""
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+def precompress_static(
+    static_folder: str, extensions: Iterable[str] = PRECOMPRESSED_EXTENSIONS
+) -> int:
+    """
+    Write .gz (and .br, when brotli is installed) copies of static assets.
+
+    Copies that are newer than their source are kept.
+
+    Args:
+        static_folder: Directory of static assets
+        extensions: File extensions to precompress
+
+    Returns:
+        Number of compressed files written
+    """
+    extensions = tuple(extensions)
+    suffixes = [(".gz", "gzip")]
+    if BROTLI_SUPPORT:
+        suffixes.append((".br", "br"))
+
+    written = 0
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if not name.endswith(extensions):
+                continue
+            path = os.path.join(root, name)
+            for suffix, encoding in suffixes:
+                target = path + suffix
+                if os.path.exists(target) and os.path.getmtime(
+                    target
+                ) >= os.path.getmtime(path):
+                    continue
+                with open(path, "rb") as f:
+                    data = f.read()
+                if encoding == "br":
+                    compressed = brotli.compress(data, quality=11)
+                else:
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                with open(target, "wb") as f:
+                    f.write(compressed)
+                written += 1
+
+    if written:
+        logger.info(f"Precompressed {written} static files in {static_folder}")
+    return written
+
+
+def init_app(app: Flask, compress_responses: bool = True) -> None:
+    """
+    Install the JSON provider, response compression and static serving.
+
+    Args:
+        app: Flask application
+        compress_responses: Whether to compress dynamic responses and
+                            serve precompressed static assets
+    """
+    if ORJSON_SUPPORT:
+        app.json = OrjsonProvider(app)
+
+    if compress_responses:
+        app.after_request(compress_response)
+        if app.static_folder and "static" in app.view_functions:
+            app.view_functions["static"] = send_static
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Async Search Module
+
+This module provides an asyncio interface to the search utilities for
+servers handling many concurrent queries:
+- SQLite and vector scoring run on a bounded thread pool
+- Query embeddings of concurrent requests are micro-batched into a single
+  model.encode call on a dedicated inference thread
+- Every request has a deadline; requests that miss it are cancelled and,
+  if their query was not encoded yet, dropped from the next batch
+- The inference queue is bounded, so bursts are rejected quickly instead
+  of queueing behind slow requests
+"""
+
+import time
+import queue
+import asyncio
+import logging
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from wheresmy.core.database import ImageDatabase
+from wheresmy.search import search as search_utils
+
+logger = logging.getLogger(__name__)
+
+# Default number of threads running SQLite queries and vector scoring
+DEFAULT_DB_WORKERS = 4
+# Default maximum number of queries encoded together
+DEFAULT_MAX_BATCH_SIZE = 32
+# Default time the first query of a batch waits for others to join (seconds)
+DEFAULT_MAX_BATCH_WAIT = 0.005
+# Default maximum number of queries waiting for inference
+DEFAULT_MAX_PENDING = 256
+# Default per-request deadline (seconds)
+DEFAULT_TIMEOUT = 10.0
+
+
+class SearchOverloadedError(RuntimeError):
+    """Raised when the inference queue is full."""
+
+
+class SearchDeadlineExceeded(TimeoutError):
+    """Raised when a search does not finish before its deadline."""
+
+
+class QueryEmbeddingBatcher:
+    """Encode queries submitted from many threads in shared batches."""
+
+    def __init__(
+        self,
+        embedding_generator: Any,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_batch_wait: float = DEFAULT_MAX_BATCH_WAIT,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            embedding_generator: TextEmbeddingGenerator used to encode queries
+            max_batch_size: Maximum number of queries encoded together
+            max_batch_wait: Seconds the first query of a batch waits for
+                            more queries before the batch is encoded
+            max_pending: Maximum number of queries waiting to be encoded
+        """
+        self.embedding_generator = embedding_generator
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_wait = max(0.0, max_batch_wait)
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_pending))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, query: str) -> Future:
+        """
+        Queue a query for encoding.
+
+        Args:
+            query: Query text
+
+        Returns:
+            Future resolving to the embedding result dictionary
+
+        Raises:
+            SearchOverloadedError: If too many queries are already waiting
+        """
+        self._ensure_started()
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((query, future))
+        except queue.Full:
+            raise SearchOverloadedError("Too many queries waiting for inference")
+        return future
+
+    def _ensure_started(self) -> None:
+        """Start the inference thread on first use (after any fork)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name=f"embed-{self.embedding_generator.model_name}",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def close(self) -> None:
+        """Stop the inference thread after the queued queries."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._queue.put(None)
+                self._thread.join()
+            self._thread = None
+
+    def _next_batch(self) -> Optional[List]:
+        """Wait for a query, then collect others arriving within the wait."""
+        item = self._queue.get()
+        if item is None:
+            return None
+
+        batch = [item]
+        deadline = time.monotonic() + self.max_batch_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = (
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        """Encode batches until closed."""
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            # Skip queries whose request was cancelled while waiting
+            live = [
+                (query, future)
+                for query, future in batch
+                if future.set_running_or_notify_cancel()
+            ]
+            if not live:
+                continue
+
+            try:
+                results = self.embedding_generator.generate_embeddings(
+                    [query for query, _ in live]
+                )
+                for (_, future), result in zip(live, results):
+                    if "error" in result:
+                        future.set_exception(RuntimeError(result["error"]))
+                    else:
+                        future.set_result(result)
+            except Exception as e:
+                logger.error(f"Error encoding query batch: {str(e)}")
+                for _, future in live:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+class AsyncSearcher:
+    """Asyncio interface to image search with bounded executors."""
+
+    def __init__(
+        self,
+        db: ImageDatabase,
+        db_workers: int = DEFAULT_DB_WORKERS,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_batch_wait: float = DEFAULT_MAX_BATCH_WAIT,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        default_timeout: Optional[float] = DEFAULT_TIMEOUT,
+    ):
+        """
+        Initialize the searcher.
+
+        Threads are only started on first use, so a searcher created before
+        a server forks its workers is safe to use in each worker.
+
+        Args:
+            db: ImageDatabase instance
+            db_workers: Number of threads running SQLite work
+            max_batch_size: Maximum number of queries encoded together
+            max_batch_wait: Seconds a query waits for others to batch with
+            max_pending: Maximum number of queries waiting for inference
+            default_timeout: Deadline in seconds of requests without their
+                             own timeout, or None for no deadline
+        """
+        self.db = db
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait = max_batch_wait
+        self.max_pending = max_pending
+        self.default_timeout = default_timeout
+
+        self._db_executor = ThreadPoolExecutor(
+            max_workers=max(1, db_workers), thread_name_prefix="wheresmy-db"
+        )
+        self._batchers: Dict[str, QueryEmbeddingBatcher] = {}
+        self._batchers_lock = threading.Lock()
+
+    async def _run_db(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking call on the database thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._db_executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def _with_deadline(self, coro, timeout: Optional[float]) -> Any:
+        """Await a coroutine, cancelling it when the deadline passes."""
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            raise SearchDeadlineExceeded(f"Search exceeded its {timeout}s deadline")
+
+    def _get_batcher(self, embedding_generator: Any) -> QueryEmbeddingBatcher:
+        """Get the batcher of a loaded embedding generator."""
+        with self._batchers_lock:
+            batcher = self._batchers.get(embedding_generator.model_name)
+            if (
+                batcher is None
+                or batcher.embedding_generator is not embedding_generator
+            ):
+                batcher = QueryEmbeddingBatcher(
+                    embedding_generator,
+                    max_batch_size=self.max_batch_size,
+                    max_batch_wait=self.max_batch_wait,
+                    max_pending=self.max_pending,
+                )
+                self._batchers[embedding_generator.model_name] = batcher
+            return batcher
+
+    async def embed_query(
+        self, query: str, embedding_model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a query embedding, batched with concurrent queries.
+
+        Args:
+            query: Query text
+            embedding_model: Optional name of embedding model to use
+
+        Returns:
+            Embedding result dictionary
+
+        Raises:
+            SearchOverloadedError: If the inference queue is full
+        """
+        # Resolving the default model reads the database and may load the model
+        embedding_generator = await self._run_db(
+            search_utils.get_embedding_generator, self.db, embedding_model
+        )
+        future = self._get_batcher(embedding_generator).submit(query)
+        # Cancelling the awaiting task also cancels the queued query
+        return await asyncio.wrap_future(future)
+
+    async def search_images(
+        self, timeout: Optional[float] = None, **filters: Any
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for images with various filters.
+
+        Args:
+            timeout: Optional deadline in seconds
+            **filters: Keyword arguments of search.search_images
+
+        Returns:
+            List of matching image metadata
+        """
+        return await self._with_deadline(
+            self._run_db(search_utils.search_images, self.db, **filters), timeout
+        )
+
+    async def get_image_by_id(
+        self, image_id: int, timeout: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get information about a specific image by ID.
+
+        Args:
+            image_id: ID of the image to retrieve
+            timeout: Optional deadline in seconds
+
+        Returns:
+            Image metadata or None if not found
+        """
+        return await self._with_deadline(
+            self._run_db(search_utils.get_image_by_id, self.db, image_id), timeout
+        )
+
+    async def semantic_search(
+        self,
+        query: str,
+        embedding_model: Optional[str] = None,
+        limit: int = 20,
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for images using semantic similarity to the query text.
+
+        Args:
+            query: Text query to search for semantically similar images
+            embedding_model: Optional name of embedding model to use
+            limit: Maximum number of results to return
+            timeout: Optional deadline in seconds
+
+        Returns:
+            List of matching image metadata with similarity scores
+
+        Raises:
+            SearchDeadlineExceeded: If the deadline passes
+            SearchOverloadedError: If the inference queue is full
+        """
+        return await self._with_deadline(
+            self._semantic_search(query, embedding_model, limit), timeout
+        )
+
+    async def _semantic_search(
+        self, query: str, embedding_model: Optional[str], limit: int
+    ) -> List[Dict[str, Any]]:
+        try:
+            params = {
+                "query": query,
+                "embedding_model": embedding_model,
+                "limit": limit,
+            }
+            results, cache_token = await self._run_db(
+                search_utils.get_cached_results, self.db, "semantic", params
+            )
+            if results is not None:
+                return results
+
+            query_embedding_result = await self.embed_query(query, embedding_model)
+            results = await self._run_db(
+                self.db.semantic_search,
+                query_embedding_result["embedding"],
+                limit=limit,
+                model_name=query_embedding_result["model"],
+            )
+
+            search_utils.cache_results(cache_token, results)
+            return results
+        except (SearchOverloadedError, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            logger.error(f"Error in semantic_search: {str(e)}")
+            return []
+
+    async def hybrid_search(
+        self,
+        query: str,
+        embedding_model: Optional[str] = None,
+        text_weight: float = 0.5,
+        limit: int = 20,
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for images using both text search and semantic similarity.
+
+        Args:
+            query: Text query for both text search and semantic embedding
+            embedding_model: Optional name of embedding model to use
+            text_weight: Weight for text search results (0.0 to 1.0)
+            limit: Maximum number of results to return
+            timeout: Optional deadline in seconds
+
+        Returns:
+            List of matching image metadata with combined scores
+
+        Raises:
+            SearchDeadlineExceeded: If the deadline passes
+            SearchOverloadedError: If the inference queue is full
+        """
+        return await self._with_deadline(
+            self._hybrid_search(query, embedding_model, text_weight, limit), timeout
+        )
+
+    async def _hybrid_search(
+        self,
+        query: str,
+        embedding_model: Optional[str],
+        text_weight: float,
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        try:
+            params = {
+                "query": query,
+                "embedding_model": embedding_model,
+                "text_weight": text_weight,
+                "limit": limit,
+            }
+            results, cache_token = await self._run_db(
+                search_utils.get_cached_results, self.db, "hybrid", params
+            )
+            if results is not None:
+                return results
+
+            query_embedding_result = await self.embed_query(query, embedding_model)
+            results = await self._run_db(
+                self.db.hybrid_search,
+                query,
+                query_embedding_result["embedding"],
+                limit=limit,
+                model_name=query_embedding_result["model"],
+                text_weight=text_weight,
+            )
+
+            search_utils.cache_results(cache_token, results)
+            return results
+        except (SearchOverloadedError, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            logger.error(f"Error in hybrid_search: {str(e)}")
+            # Fallback to regular text search
+            logger.info("Falling back to regular text search due to error")
+            try:
+                return await self._run_db(
+                    search_utils.search_images, self.db, text_query=query, limit=limit
+                )
+            except Exception:
+                return []
+
+    def close(self) -> None:
+        """Stop the inference threads and the database thread pool."""
+        with self._batchers_lock:
+            batchers = list(self._batchers.values())
+            self._batchers.clear()
+        for batcher in batchers:
+            batcher.close()
+        self._db_executor.shutdown(wait=True)
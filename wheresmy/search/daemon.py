@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Search Daemon Module
+
+This module keeps the search stack warm in a long-running process, so
+command-line searches do not load the embedding model and vector index on
+every invocation:
+- SearchDaemon serves search requests over a local Unix socket
+- SearchClient sends requests to a running daemon
+
+Requests and responses are single JSON lines. The client side only uses
+the standard library, so talking to a daemon does not import the search
+stack (torch, sentence-transformers, numpy) into the calling process.
+"""
+
+import os
+import json
+import socket
+import hashlib
+import logging
+import tempfile
+import threading
+import socketserver
+from typing import Any, Dict, Optional
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Search functions a daemon serves; each takes the database as first argument
+METHODS = ("search_images", "semantic_search", "hybrid_search", "get_image_by_id")
+
+# Seconds a client waits for a response
+DEFAULT_TIMEOUT = 30.0
+
+
+class DaemonError(RuntimeError):
+    """Raised when the search daemon reports an error for a request."""
+
+
+def daemon_supported() -> bool:
+    """Whether this platform supports the Unix socket daemon."""
+    return hasattr(socket, "AF_UNIX")
+
+
+def default_socket_path(db_path: str) -> str:
+    """
+    Get the socket path of the daemon serving a database.
+
+    Each database gets its own socket, so a client only reaches a daemon
+    serving the database it was asked to search.
+
+    Args:
+        db_path: Path to the database file
+
+    Returns:
+        Path of the Unix socket
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    digest = hashlib.sha1(os.path.abspath(db_path).encode("utf-8")).hexdigest()
+    return os.path.join(runtime_dir, f"wheresmy-search-{digest[:12]}.sock")
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize NumPy scalars as numbers and anything else as a string."""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class SearchClient:
+    """Client of a running search daemon."""
+
+    def __init__(self, socket_path: str, timeout: float = DEFAULT_TIMEOUT):
+        """
+        Initialize the client.
+
+        Args:
+            socket_path: Path of the daemon's Unix socket
+            timeout: Seconds to wait for a response
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def call(self, method: str, **params: Any) -> Any:
+        """
+        Call a search function in the daemon.
+
+        Args:
+            method: "ping" or one of METHODS
+            **params: Keyword arguments of the search function
+
+        Returns:
+            The function's result
+
+        Raises:
+            OSError: If the daemon cannot be reached
+            DaemonError: If the daemon reports an error
+        """
+        request = json.dumps({"method": method, "params": params}) + "\n"
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(request.encode("utf-8"))
+            with sock.makefile("rb") as f:
+                line = f.readline()
+
+        if not line:
+            raise DaemonError("Search daemon closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise DaemonError(response["error"])
+        return response["result"]
+
+
+def connect(
+    db_path: str, socket_path: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT
+) -> Optional[SearchClient]:
+    """
+    Get a client of the daemon serving a database, if one is running.
+
+    This only checks that the socket exists; callers should fall back to
+    searching in-process when a call raises OSError, e.g. because the
+    daemon exited without removing its socket.
+
+    Args:
+        db_path: Path to the database file
+        socket_path: Optional socket path (default: default_socket_path)
+        timeout: Seconds to wait for a response
+
+    Returns:
+        SearchClient, or None when no daemon is running
+    """
+    if not daemon_supported():
+        return None
+    socket_path = socket_path or default_socket_path(db_path)
+    if not os.path.exists(socket_path):
+        return None
+    return SearchClient(socket_path, timeout=timeout)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handle JSON line requests on one connection."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = self.server.search_daemon.handle(
+                    request["method"], request.get("params") or {}
+                )
+            except (ValueError, KeyError, TypeError) as e:
+                response = {"error": f"Invalid request: {str(e)}"}
+            self.wfile.write(
+                json.dumps(response, default=_json_default).encode("utf-8") + b"\n"
+            )
+            self.wfile.flush()
+
+
+class SearchDaemon:
+    """Serve searches of one database from a warm process."""
+
+    def __init__(
+        self,
+        db_path: str,
+        socket_path: Optional[str] = None,
+        embedding_model: Optional[str] = None,
+        preload: bool = True,
+    ):
+        """
+        Initialize the daemon and load the search stack.
+
+        Args:
+            db_path: Path to the database file
+            socket_path: Optional socket path (default: default_socket_path)
+            embedding_model: Optional name of the embedding model to preload
+            preload: Load the embedding model and vector index up front
+        """
+        # The daemon process is the one that pays for the search stack
+        from wheresmy.core.database import ImageDatabase
+        from wheresmy.search import search as search_utils
+
+        self.search_utils = search_utils
+        self.db_path = db_path
+        self.db = ImageDatabase(db_path)
+        self.db.enable_wal()
+        self.socket_path = socket_path or default_socket_path(db_path)
+        self.server = None
+        self.ready = threading.Event()
+
+        if preload:
+            search_utils.preload(self.db, embedding_model)
+
+    def handle(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run one request.
+
+        Args:
+            method: "ping" or one of METHODS
+            params: Keyword arguments of the search function
+
+        Returns:
+            Response with a "result" or an "error"
+        """
+        if method == "ping":
+            return {"result": {"db_path": self.db_path, "pid": os.getpid()}}
+        if method not in METHODS:
+            return {"error": f"Unknown method: {method}"}
+
+        try:
+            return {"result": getattr(self.search_utils, method)(self.db, **params)}
+        except TypeError as e:
+            return {"error": f"Invalid parameters for {method}: {str(e)}"}
+        except Exception as e:
+            logger.error(f"Error in {method}: {str(e)}")
+            return {"error": str(e)}
+
+    def _remove_stale_socket(self) -> None:
+        """Remove a socket left behind by a daemon that did not exit cleanly."""
+        if not os.path.exists(self.socket_path):
+            return
+        try:
+            SearchClient(self.socket_path, timeout=1.0).call("ping")
+        except OSError:
+            os.unlink(self.socket_path)
+            return
+        raise RuntimeError(
+            f"A search daemon is already listening on {self.socket_path}"
+        )
+
+    def serve_forever(self) -> None:
+        """Serve requests until shutdown() is called or the process is interrupted."""
+        self._remove_stale_socket()
+
+        self.server = socketserver.ThreadingUnixStreamServer(
+            self.socket_path, _RequestHandler
+        )
+        self.server.daemon_threads = True
+        self.server.search_daemon = self
+        try:
+            # Only the daemon's user may query the catalogue
+            os.chmod(self.socket_path, 0o600)
+            logger.info(f"Search daemon for {self.db_path} on {self.socket_path}")
+            self.ready.set()
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self) -> None:
+        """Stop serving; call from another thread than serve_forever()."""
+        if self.server is not None:
+            self.server.shutdown()
@@ -8,15 +8,26 @@ from the web interface for reuse in other contexts, including:
 - Text-based search using full-text database capabilities
 - Semantic search using vector embeddings
 - Hybrid search combining text and semantic approaches
+
+Search results are cached by their normalized parameters and invalidated by
+the database's data generation, which every write bumps.
 """
 
+import os
+import json
+import time
+import pickle
 import logging
+import threading
+import weakref
+from collections import OrderedDict
 
 # import numpy as np
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any, Sequence, Tuple
 
 from wheresmy.core.database import ImageDatabase
 from wheresmy.core.text_embeddings import TextEmbeddingGenerator
+from wheresmy.utils import metrics
 
 # Configure logging
 logging.basicConfig(
@@ -24,7 +35,375 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Loaded embedding generators, keyed by model name
+_embedding_generators: Dict[str, TextEmbeddingGenerator] = {}
+_embedding_generators_lock = threading.Lock()
+
+# Inference options passed to every generator created for queries
+_inference_options: Dict[str, Any] = {}
+
+# Default number of result lists kept in memory
+DEFAULT_CACHE_ENTRIES = 1024
+# Default size limit of the on-disk result cache (bytes)
+DEFAULT_DISK_CACHE_SIZE = 256 * 1024 * 1024
+# Minimum time between reads of a database's data generation (seconds)
+DEFAULT_GENERATION_CHECK_INTERVAL = 1.0
+# Fields of search results that are scores rather than image columns
+SCORE_FIELDS = ("similarity", "embedding_model", "text_rank", "combined_score")
+
+# End-to-end search latency and result cache effectiveness, by search type
+SEARCH_SECONDS = metrics.histogram(
+    "search_seconds", "End-to-end search latency in seconds", ("kind",)
+)
+CACHE_LOOKUPS = metrics.counter(
+    "search_cache_lookups_total",
+    "Search result cache lookups by outcome",
+    ("kind", "result"),
+)
+
+
+class SearchResultCache:
+    """
+    Two-tier cache of search results.
+
+    The in-process tier keeps complete result lists in LRU order, pickled
+    so that callers never share nested metadata with the cache. The
+    optional on-disk tier (diskcache) stores only image IDs and scores, so
+    it can be shared by worker processes and survives restarts; its hits
+    are re-read from the database by primary key. Entries are tagged with
+    the database's data generation and ignored once it changes.
+
+    The generation is read at most once per check interval, and again
+    after any write through the same ImageDatabase, so most hits never
+    touch the database; writes by other processes are noticed within the
+    interval.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_CACHE_ENTRIES,
+        directory: Optional[str] = None,
+        disk_size_limit: int = DEFAULT_DISK_CACHE_SIZE,
+        generation_check_interval: float = DEFAULT_GENERATION_CHECK_INTERVAL,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of result lists kept in memory
+            directory: Optional directory of the on-disk tier
+            disk_size_limit: Size limit of the on-disk tier in bytes
+            generation_check_interval: Minimum time between reads of a
+                                       database's data generation (seconds)
+        """
+        self.max_entries = max(1, max_entries)
+        self.generation_check_interval = generation_check_interval
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Last generation read per database: (time read, write count, generation)
+        self._generations: (
+            "weakref.WeakKeyDictionary[ImageDatabase, Tuple[float, int, int]]"
+        ) = weakref.WeakKeyDictionary()
+
+        self._disk = None
+        if directory:
+            try:
+                import diskcache
+
+                self._disk = diskcache.Cache(directory, size_limit=disk_size_limit)
+            except ImportError:
+                logger.warning("diskcache is not installed; using memory cache only")
+
+    @staticmethod
+    def make_key(db: ImageDatabase, kind: str, params: Dict[str, Any]) -> str:
+        """
+        Build the cache key of a search.
+
+        Empty parameters are dropped and whitespace in strings is collapsed,
+        so equivalent queries share an entry.
+
+        Args:
+            db: ImageDatabase searched
+            kind: Search type ("text", "semantic" or "hybrid")
+            params: Search parameters
+
+        Returns:
+            Cache key
+        """
+        normalized = {}
+        for name, value in params.items():
+            if isinstance(value, str):
+                value = " ".join(value.split())
+            if value is None or value == "":
+                continue
+            normalized[name] = value
+        return json.dumps(
+            [os.path.abspath(db.db_path), kind, normalized], sort_keys=True
+        )
+
+    def _get_generation(self, db: ImageDatabase) -> int:
+        """Get the data generation of a database, re-reading it when due."""
+        now = time.monotonic()
+        with self._lock:
+            checked = self._generations.get(db)
+        if checked is not None:
+            checked_at, write_count, generation = checked
+            if (
+                write_count == db.write_count
+                and now - checked_at < self.generation_check_interval
+            ):
+                return generation
+
+        # Read the write count first, so a write during the query is
+        # noticed by the next lookup
+        write_count = db.write_count
+        generation = db.get_data_generation()
+        with self._lock:
+            self._generations[db] = (now, write_count, generation)
+        return generation
+
+    def get(
+        self, db: ImageDatabase, kind: str, params: Dict[str, Any]
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Tuple[str, int]]:
+        """
+        Look up the results of a search.
+
+        Args:
+            db: ImageDatabase searched
+            kind: Search type
+            params: Search parameters
+
+        Returns:
+            Tuple of the cached results (None on a miss) and a token to
+            pass to put() with the computed results
+        """
+        generation = self._get_generation(db)
+        key = self.make_key(db, kind, params)
+        token = (key, generation)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                entry = None
+        if entry is not None:
+            return pickle.loads(entry[1]), token
+
+        if self._disk is not None:
+            entry = self._disk.get(key)
+            if entry is not None and entry[0] == generation:
+                results = self._hydrate(db, entry[1])
+                if results is not None:
+                    self._remember(key, generation, results)
+                    with self._lock:
+                        self.hits += 1
+                    return results, token
+
+        with self._lock:
+            self.misses += 1
+        return None, token
+
+    def put(self, token: Tuple[str, int], results: List[Dict[str, Any]]) -> None:
+        """
+        Store the results of a search.
+
+        Args:
+            token: Token returned by get() before the search ran; results
+                   of a search that raced with a write are stored under the
+                   older generation and never served
+            results: Search results
+        """
+        key, generation = token
+        self._remember(key, generation, results)
+
+        if self._disk is not None:
+            ids_and_scores = [
+                (
+                    result["id"],
+                    {field: result[field] for field in SCORE_FIELDS if field in result},
+                )
+                for result in results
+            ]
+            self._disk.set(key, (generation, ids_and_scores))
+
+    def _remember(
+        self, key: str, generation: int, results: List[Dict[str, Any]]
+    ) -> None:
+        """Add results to the in-memory tier, evicting the oldest entries."""
+        data = pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._entries[key] = (generation, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _hydrate(
+        db: ImageDatabase, ids_and_scores: List[Tuple[int, Dict[str, Any]]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Rebuild results from image IDs and scores, or None if any is gone."""
+        results = db.get_images([image_id for image_id, _ in ids_and_scores])
+        if len(results) != len(ids_and_scores):
+            return None
+        for result, (_, scores) in zip(results, ids_and_scores):
+            result.update(scores)
+        return results
+
+    def clear(self) -> None:
+        """Remove all cached results."""
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+
+# Result cache shared by all searches in this process (None when disabled)
+_result_cache: Optional[SearchResultCache] = SearchResultCache()
+
+
+def configure_cache(
+    enabled: bool = True,
+    max_entries: int = DEFAULT_CACHE_ENTRIES,
+    directory: Optional[str] = None,
+) -> None:
+    """
+    Configure the search result cache.
+
+    Args:
+        enabled: Whether search results are cached
+        max_entries: Maximum number of result lists kept in memory
+        directory: Optional directory of an on-disk cache tier, shared by
+                   processes using the same directory
+    """
+    global _result_cache
+    _result_cache = (
+        SearchResultCache(max_entries=max_entries, directory=directory)
+        if enabled
+        else None
+    )
+
+
+def get_cached_results(
+    db: ImageDatabase, kind: str, params: Dict[str, Any]
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Tuple[str, int]]]:
+    """
+    Look up search results in the result cache.
+
+    Args:
+        db: ImageDatabase searched
+        kind: Search type ("text", "semantic" or "hybrid")
+        params: Search parameters
+
+    Returns:
+        Tuple of the cached results (None on a miss) and a token for
+        cache_results() (None when caching is disabled)
+    """
+    cache = _result_cache
+    if cache is None:
+        return None, None
+    try:
+        results, token = cache.get(db, kind, params)
+    except Exception as e:
+        logger.warning(f"Error reading search result cache: {str(e)}")
+        return None, None
+    CACHE_LOOKUPS.inc(kind=kind, result="miss" if results is None else "hit")
+    return results, token
+
+
+def cache_results(
+    token: Optional[Tuple[str, int]], results: List[Dict[str, Any]]
+) -> None:
+    """
+    Store search results in the result cache.
+
+    Args:
+        token: Token returned by get_cached_results()
+        results: Search results
+    """
+    cache = _result_cache
+    if cache is None or token is None:
+        return
+    try:
+        cache.put(token, results)
+    except Exception as e:
+        logger.warning(f"Error writing search result cache: {str(e)}")
+
+
+def configure_inference(**options: Any) -> None:
+    """
+    Set the inference options of query embedding generators.
+
+    Accepts the keyword arguments of TextEmbeddingGenerator, such as
+    ``quantize``, ``num_threads``, ``max_seq_length`` and ``backend``.
+    Generators that were already loaded are discarded.
+
+    Args:
+        **options: TextEmbeddingGenerator keyword arguments
+    """
+    with _embedding_generators_lock:
+        _inference_options.clear()
+        _inference_options.update(
+            {key: value for key, value in options.items() if value is not None}
+        )
+        _embedding_generators.clear()
+
+
+def get_embedding_generator(
+    db: ImageDatabase, embedding_model: Optional[str] = None
+) -> TextEmbeddingGenerator:
+    """
+    Get a loaded embedding generator for a model.
+
+    Generators are created once per model and reused, so queries do not
+    reload the model.
+
+    Args:
+        db: ImageDatabase instance, used to resolve the default model
+        embedding_model: Optional name of the embedding model
+
+    Returns:
+        TextEmbeddingGenerator for the model
+    """
+    model_name = (
+        embedding_model
+        or db.get_default_embedding_model()
+        or TextEmbeddingGenerator.DEFAULT_MODEL_NAME
+    )
+    with _embedding_generators_lock:
+        if model_name not in _embedding_generators:
+            _embedding_generators[model_name] = TextEmbeddingGenerator(
+                model_name=model_name, **_inference_options
+            )
+        return _embedding_generators[model_name]
+
+
+def preload(db: ImageDatabase, embedding_model: Optional[str] = None) -> None:
+    """
+    Load the embedding model and vector index before serving queries.
+
+    Calling this in a server's parent process lets forked workers share the
+    loaded model and vectors copy-on-write instead of loading their own.
+
+    Args:
+        db: ImageDatabase instance
+        embedding_model: Optional name of embedding model to load
+    """
+    try:
+        embedding_generator = get_embedding_generator(db, embedding_model)
+        count = db.load_vector_index(embedding_generator.model_name)
+        logger.info(
+            f"Preloaded {embedding_generator.model_name} with {count} embeddings"
+        )
+    except Exception as e:
+        logger.error(f"Error preloading semantic search: {str(e)}")
+
 
+@SEARCH_SECONDS.timed(kind="text")
 def search_images(
     db: ImageDatabase,
     text_query: Optional[str] = None,
@@ -34,6 +413,9 @@ def search_images(
     date_end: Optional[str] = None,
     min_width: Optional[int] = None,
     min_height: Optional[int] = None,
+    bbox: Optional[Sequence[float]] = None,
+    near: Optional[Sequence[float]] = None,
+    place: Optional[str] = None,
     limit: int = 100,
     offset: int = 0,
 ) -> List[Dict[str, Any]]:
@@ -49,6 +431,9 @@ def search_images(
         date_end: Optional end date (ISO format)
         min_width: Optional minimum image width
         min_height: Optional minimum image height
+        bbox: Optional bounding box (min_lat, min_lon, max_lat, max_lon)
+        near: Optional (lat, lon, radius_km) of a radius search
+        place: Optional city, region or country name
         limit: Maximum number of results to return
         offset: Number of results to skip
 
@@ -56,7 +441,74 @@ def search_images(
         List of matching image metadata
     """
     try:
-        results = db.filter_search(
+        params = {
+            "text_query": text_query,
+            "camera_make": camera_make,
+            "camera_model": camera_model,
+            "date_start": date_start,
+            "date_end": date_end,
+            "min_width": min_width,
+            "min_height": min_height,
+            "bbox": bbox,
+            "near": near,
+            "place": place,
+            "limit": limit,
+            "offset": offset,
+        }
+        results, cache_token = get_cached_results(db, "text", params)
+        if results is not None:
+            return results
+
+        results = db.filter_search(**params)
+
+        cache_results(cache_token, results)
+        return results
+    except Exception as e:
+        logger.error(f"Error in search_images: {str(e)}")
+        raise
+
+
+def iter_search_images(
+    db: ImageDatabase,
+    text_query: Optional[str] = None,
+    camera_make: Optional[str] = None,
+    camera_model: Optional[str] = None,
+    date_start: Optional[str] = None,
+    date_end: Optional[str] = None,
+    min_width: Optional[int] = None,
+    min_height: Optional[int] = None,
+    bbox: Optional[Sequence[float]] = None,
+    near: Optional[Sequence[float]] = None,
+    place: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Search for images with various filters, yielding results incrementally.
+
+    Unlike search_images(), results are streamed from the database cursor
+    and not cached, so arbitrarily large result sets use constant memory.
+
+    Args:
+        db: ImageDatabase instance
+        text_query: Optional text to search for
+        camera_make: Optional camera manufacturer
+        camera_model: Optional camera model
+        date_start: Optional start date (ISO format)
+        date_end: Optional end date (ISO format)
+        min_width: Optional minimum image width
+        min_height: Optional minimum image height
+        bbox: Optional bounding box (min_lat, min_lon, max_lat, max_lon)
+        near: Optional (lat, lon, radius_km) of a radius search
+        place: Optional city, region or country name
+        limit: Maximum number of results, or None for all matches
+        offset: Number of results to skip
+
+    Yields:
+        Matching image metadata
+    """
+    try:
+        yield from db.iter_filter_search(
             text_query=text_query,
             camera_make=camera_make,
             camera_model=camera_model,
@@ -64,13 +516,14 @@ def search_images(
             date_end=date_end,
             min_width=min_width,
             min_height=min_height,
+            bbox=bbox,
+            near=near,
+            place=place,
             limit=limit,
             offset=offset,
         )
-
-        return results
     except Exception as e:
-        logger.error(f"Error in search_images: {str(e)}")
+        logger.error(f"Error in iter_search_images: {str(e)}")
         raise
 
 
@@ -86,17 +539,13 @@ def get_image_by_id(db: ImageDatabase, image_id: int) -> Optional[Dict[str, Any]
         Image metadata or None if not found
     """
     try:
-        results = db.filter_search(f"id:{image_id}", limit=1)
-
-        if not results:
-            return None
-
-        return results[0]
+        return db.get_image(image_id)
     except Exception as e:
         logger.error(f"Error in get_image_by_id: {str(e)}")
         raise
 
 
+@SEARCH_SECONDS.timed(kind="semantic")
 def semantic_search(
     db: ImageDatabase,
     query: str,
@@ -116,8 +565,13 @@ def semantic_search(
         List of matching image metadata with similarity scores
     """
     try:
-        # Initialize embedding generator
-        embedding_generator = TextEmbeddingGenerator(model_name=embedding_model)
+        params = {"query": query, "embedding_model": embedding_model, "limit": limit}
+        results, cache_token = get_cached_results(db, "semantic", params)
+        if results is not None:
+            return results
+
+        # Get the embedding generator of the requested or default model
+        embedding_generator = get_embedding_generator(db, embedding_model)
 
         # Generate embedding for the query
         logger.info(f"Generating embedding for query: '{query}'")
@@ -136,14 +590,18 @@ def semantic_search(
         logger.info(
             f"Performing semantic search with query embedding size: {len(query_embedding)}"
         )
-        results = db.semantic_search(query_embedding, limit=limit)
+        results = db.semantic_search(
+            query_embedding, limit=limit, model_name=embedding_generator.model_name
+        )
 
+        cache_results(cache_token, results)
         return results
     except Exception as e:
         logger.error(f"Error in semantic_search: {str(e)}")
         return []
 
 
+@SEARCH_SECONDS.timed(kind="hybrid")
 def hybrid_search(
     db: ImageDatabase,
     query: str,
@@ -165,8 +623,18 @@ def hybrid_search(
         List of matching image metadata with combined scores
     """
     try:
-        # Initialize embedding generator
-        embedding_generator = TextEmbeddingGenerator(model_name=embedding_model)
+        params = {
+            "query": query,
+            "embedding_model": embedding_model,
+            "text_weight": text_weight,
+            "limit": limit,
+        }
+        results, cache_token = get_cached_results(db, "hybrid", params)
+        if results is not None:
+            return results
+
+        # Get the embedding generator of the requested or default model
+        embedding_generator = get_embedding_generator(db, embedding_model)
 
         # Generate embedding for the query
         logger.info(f"Generating embedding for hybrid query: '{query}'")
@@ -186,9 +654,14 @@ def hybrid_search(
         # Perform hybrid search
         logger.info(f"Performing hybrid search with text weight: {text_weight}")
         results = db.hybrid_search(
-            query, query_embedding, limit=limit, text_weight=text_weight
+            query,
+            query_embedding,
+            limit=limit,
+            model_name=embedding_generator.model_name,
+            text_weight=text_weight,
         )
 
+        cache_results(cache_token, results)
         return results
     except Exception as e:
         logger.error(f"Error in hybrid_search: {str(e)}")
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Suggestions Module
+
+This module completes partially typed search queries (type-ahead) from
+the words of image descriptions, camera names, place names and capture
+years in the database:
+- normalize() folds case and diacritics like the full-text index
+- SuggestionIndex answers prefix lookups from sorted keys in memory
+- Suggester keeps a SuggestionIndex of a database up to date for a
+  serving process
+
+The database keeps the description words in a full-text vocabulary that
+triggers update on every import; rebuilding the in-memory index reads
+only that vocabulary and index-backed counts, never the images.
+"""
+
+import time
+import bisect
+import heapq
+import logging
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from wheresmy.core import cameras
+from wheresmy.core.database import ImageDatabase
+
+logger = logging.getLogger(__name__)
+
+# Default and maximum number of suggestions returned
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 50
+
+# Minimum time between checks of the database for changes (seconds)
+DEFAULT_REFRESH_INTERVAL = 1.0
+
+# Description words too common to be worth suggesting
+STOPWORDS = frozenset(
+    """
+    a an and are as at be by for from has in into is it its of on or over
+    some the their there this to under with
+    """.split()
+)
+
+
+def normalize(text: str) -> str:
+    """
+    Normalize text for prefix matching.
+
+    Args:
+        text: Query or name
+
+    Returns:
+        Lowercase text without diacritics and with whitespace collapsed
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.split())
+
+
+class SuggestionIndex:
+    """Ranked prefix lookups over a fixed set of suggestions."""
+
+    def __init__(self, suggestions: List[Tuple[List[str], Dict[str, Any]]]):
+        """
+        Index suggestions by their keys.
+
+        Args:
+            suggestions: List of (keys, suggestion) pairs, where keys are the
+                         normalized names a suggestion is found by and each
+                         suggestion has "text", "kind" and "count" fields
+        """
+        self.suggestions = [suggestion for _, suggestion in suggestions]
+        entries = sorted(
+            {(key, i) for i, (keys, _) in enumerate(suggestions) for key in keys}
+        )
+        self._keys = [key for key, _ in entries]
+        self._ids = [i for _, i in entries]
+
+    @classmethod
+    def from_database(cls, db: ImageDatabase) -> "SuggestionIndex":
+        """
+        Build the index of a database.
+
+        Args:
+            db: ImageDatabase to read words and names from
+
+        Returns:
+            SuggestionIndex of the database
+        """
+        sources = db.get_suggestion_terms()
+        suggestions = []
+
+        for term, count in sources["terms"]:
+            if len(term) > 1 and term not in STOPWORDS:
+                suggestions.append(
+                    ([term], {"text": term, "kind": "term", "count": count})
+                )
+
+        for make, model, count in sources["cameras"]:
+            # Models usually repeat the make ("Canon EOS 5D")
+            make_name = cameras.canonical_make(make)
+            if make_name and cameras.normalize_name(model).startswith(make_name):
+                text = model
+            else:
+                text = f"{make} {model}"
+            keys = [
+                normalize(alias) for _, alias in cameras.camera_aliases(make, model)
+            ]
+            suggestion = {"text": text, "kind": "camera", "count": count}
+            suggestion.update(make=make, model=model)
+            suggestions.append((keys, suggestion))
+
+        # A name can be a city, a region and a country (e.g. Singapore)
+        places: Dict[str, int] = {}
+        for name, count in sources["places"]:
+            places[name] = max(count, places.get(name, 0))
+        for name, count in places.items():
+            suggestions.append(
+                ([normalize(name)], {"text": name, "kind": "place", "count": count})
+            )
+
+        for year, count in sources["years"]:
+            if year.isdigit():
+                suggestions.append(
+                    ([year], {"text": year, "kind": "year", "count": count})
+                )
+
+        return cls(suggestions)
+
+    def _matches(self, prefix: str) -> List[int]:
+        """Get the IDs of the suggestions with a key starting with a prefix."""
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + "\U0010ffff", start)
+        return self._ids[start:end]
+
+    def complete(self, query: str, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Complete a partially typed query.
+
+        The whole query is matched against every suggestion; the last word
+        of a query with several words is also completed to description
+        words, keeping the words before it.
+
+        Args:
+            query: Text typed so far
+            limit: Maximum number of suggestions
+
+        Returns:
+            Suggestions ordered by decreasing image count, each with the
+            completed query as its "text"
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        candidates = {i: None for i in self._matches(prefix)}
+        head, _, last = prefix.rpartition(" ")
+        if head and last:
+            for i in self._matches(last):
+                if self.suggestions[i]["kind"] == "term":
+                    candidates.setdefault(i, head)
+
+        best = heapq.nlargest(
+            limit,
+            candidates.items(),
+            key=lambda item: self.suggestions[item[0]]["count"],
+        )
+        results = []
+        for i, words in best:
+            suggestion = dict(self.suggestions[i])
+            if words:
+                suggestion["text"] = f"{words} {suggestion['text']}"
+            results.append(suggestion)
+        return results
+
+
+class Suggester:
+    """
+    Type-ahead suggestions of a database, kept in memory.
+
+    The index is rebuilt when the database's data generation, which every
+    import bumps, has changed; the database is checked at most once per
+    refresh interval, so most lookups never touch it.
+    """
+
+    def __init__(
+        self, db: ImageDatabase, refresh_interval: float = DEFAULT_REFRESH_INTERVAL
+    ):
+        """
+        Initialize the suggester; the index is built on first use.
+
+        Args:
+            db: ImageDatabase to suggest from
+            refresh_interval: Minimum time between checks for changes (seconds)
+        """
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self._index: Optional[SuggestionIndex] = None
+        self._generation: Optional[int] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def get_index(self) -> SuggestionIndex:
+        """
+        Get the index, rebuilding it if the database has changed.
+
+        Returns:
+            Current SuggestionIndex
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._index is None or now - self._checked >= self.refresh_interval:
+                self._checked = now
+                generation = self.db.get_data_generation()
+                if self._index is None or generation != self._generation:
+                    started = time.perf_counter()
+                    self._index = SuggestionIndex.from_database(self.db)
+                    self._generation = generation
+                    logger.info(
+                        f"Built suggestion index of {len(self._index.suggestions)} "
+                        f"entries in {time.perf_counter() - started:.3f}s"
+                    )
+            return self._index
+
+    def suggest(self, query: str, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Complete a partially typed query.
+
+        Args:
+            query: Text typed so far
+            limit: Maximum number of suggestions (at most MAX_LIMIT)
+
+        Returns:
+            Suggestions ordered by decreasing image count
+        """
+        return self.get_index().complete(query, max(0, min(limit, MAX_LIMIT)))
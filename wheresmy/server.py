@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Production Server Module
+
+This module serves the web application with a production WSGI server.
+It uses gunicorn (multi-process, multi-threaded workers) when installed,
+waitress (multi-threaded) as a portable alternative, and falls back to
+Flask's threaded development server when neither is available.
+"""
+
+import os
+import logging
+import importlib.util
+from typing import Optional
+
+from flask import Flask
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Supported servers, in order of preference for "auto"
+SERVERS = ("gunicorn", "waitress", "dev")
+
+# Defaults
+DEFAULT_THREADS = 8
+DEFAULT_TIMEOUT = 120
+
+
+def default_workers() -> int:
+    """Default number of worker processes: one per CPU, up to four."""
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def resolve_server(server: str = "auto") -> str:
+    """
+    Resolve the server to use.
+
+    Args:
+        server: 'auto' or one of SERVERS
+
+    Returns:
+        Name of an installed server
+    """
+    if server != "auto":
+        if server not in SERVERS:
+            raise ValueError(f"Unknown server: {server}")
+        return server
+
+    # gunicorn relies on fork, which is not available on Windows
+    if os.name != "nt" and importlib.util.find_spec("gunicorn") is not None:
+        return "gunicorn"
+    if importlib.util.find_spec("waitress") is not None:
+        return "waitress"
+
+    logger.warning(
+        "Neither gunicorn nor waitress is installed; "
+        "using the threaded development server"
+    )
+    return "dev"
+
+
+def serve(
+    app: Flask,
+    host: str = "0.0.0.0",
+    port: int = 5000,
+    server: str = "auto",
+    workers: Optional[int] = None,
+    threads: int = DEFAULT_THREADS,
+    timeout: int = DEFAULT_TIMEOUT,
+) -> None:
+    """
+    Serve an application until interrupted.
+
+    With gunicorn the application is loaded in the master process before
+    workers are forked (``preload_app``), so anything loaded by create_app()
+    such as the embedding model and vector index is shared copy-on-write.
+
+    Args:
+        app: Flask application, typically from create_app()
+        host: Host to bind to
+        port: Port to listen on
+        server: 'auto', 'gunicorn', 'waitress' or 'dev'
+        workers: Number of worker processes (gunicorn only)
+        threads: Number of request threads per worker
+        timeout: Seconds before a silent worker is restarted (gunicorn only)
+    """
+    server = resolve_server(server)
+    logger.info(f"Serving on {host}:{port} with {server}")
+
+    if server == "gunicorn":
+        from gunicorn.app.base import BaseApplication
+
+        class WheresmyApplication(BaseApplication):
+            """Gunicorn application serving an already loaded Flask app."""
+
+            def __init__(self, application, options):
+                self.application = application
+                self.options = options
+                super().__init__()
+
+            def load_config(self):
+                for key, value in self.options.items():
+                    self.cfg.set(key, value)
+
+            def load(self):
+                return self.application
+
+        WheresmyApplication(
+            app,
+            {
+                "bind": f"{host}:{port}",
+                "workers": workers or default_workers(),
+                "threads": threads,
+                "worker_class": "gthread",
+                "preload_app": True,
+                "timeout": timeout,
+            },
+        ).run()
+
+    elif server == "waitress":
+        import waitress
+
+        if workers and workers > 1:
+            logger.warning("waitress runs a single process; ignoring --workers")
+        waitress.serve(app, host=host, port=port, threads=threads)
+
+    else:
+        app.run(host=host, port=port, threaded=True)
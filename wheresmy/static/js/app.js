@@ -8,12 +8,18 @@ const state = {
     offset: 0,
     results: [],
     camerasData: [],
-    statsData: {}
+    statsData: {},
+    suggestions: {}
 };
 
+// Delay between the last keystroke and a suggestion request (ms)
+const SUGGEST_DELAY = 150;
+let suggestTimer = null;
+
 // DOM elements
 const searchForm = document.getElementById('searchForm');
 const searchQuery = document.getElementById('searchQuery');
+const searchSuggestions = document.getElementById('searchSuggestions');
 const cameraFilter = document.getElementById('cameraFilter');
 const dateStart = document.getElementById('dateStart');
 const dateEnd = document.getElementById('dateEnd');
@@ -64,6 +70,32 @@ function init() {
         search();
     });
     
+    searchQuery.addEventListener('input', () => {
+        clearTimeout(suggestTimer);
+        suggestTimer = setTimeout(loadSuggestions, SUGGEST_DELAY);
+    });
+    
+    // Camera and year suggestions set their filter instead of the query
+    searchQuery.addEventListener('change', () => {
+        const suggestion = state.suggestions[searchQuery.value];
+        if (!suggestion || (suggestion.kind !== 'camera' && suggestion.kind !== 'year')) {
+            return;
+        }
+        if (suggestion.kind === 'camera') {
+            state.cameraFilter = `${suggestion.make}|${suggestion.model}`;
+            cameraFilter.value = state.cameraFilter;
+        } else {
+            state.dateStart = `${suggestion.text}-01-01`;
+            state.dateEnd = `${suggestion.text}-12-31`;
+            dateStart.value = state.dateStart;
+            dateEnd.value = state.dateEnd;
+        }
+        searchQuery.value = '';
+        state.query = '';
+        state.offset = 0;
+        search();
+    });
+    
     cameraFilter.addEventListener('change', () => {
         state.cameraFilter = cameraFilter.value;
         state.offset = 0;
@@ -126,6 +158,31 @@ function init() {
 }
 
 // API functions
+async function loadSuggestions() {
+    const query = searchQuery.value.trim();
+    if (!query) {
+        searchSuggestions.innerHTML = '';
+        return;
+    }
+    
+    try {
+        const response = await fetch(`/api/suggest?q=${encodeURIComponent(query)}`);
+        const data = await response.json();
+        
+        state.suggestions = {};
+        searchSuggestions.innerHTML = '';
+        data.suggestions.forEach(suggestion => {
+            state.suggestions[suggestion.text] = suggestion;
+            const option = document.createElement('option');
+            option.value = suggestion.text;
+            option.label = `${suggestion.kind} (${suggestion.count})`;
+            searchSuggestions.appendChild(option);
+        });
+    } catch (error) {
+        console.error('Error loading suggestions:', error);
+    }
+}
+
 async function search() {
     loadingIndicator.style.display = 'block';
     resultsContainer.innerHTML = '';
@@ -226,7 +283,9 @@ async function viewImage(imageId) {
         
         // Set modal content
         modalTitle.textContent = imageData.filename;
-        modalImage.src = `/image/${imageId}`;
+        // Request a preview sized for the screen instead of the original
+        const previewSize = Math.ceil(Math.max(window.screen.width, window.screen.height) * (window.devicePixelRatio || 1));
+        modalImage.src = `/image/${imageId}?max=${previewSize}`;
         modalFilename.textContent = imageData.filename;
         modalDate.textContent = imageData.capture_date ? new Date(imageData.capture_date).toLocaleString() : 'Unknown';
         modalCamera.textContent = `${imageData.camera_make || ''} ${imageData.camera_model || ''}`.trim() || 'Unknown';
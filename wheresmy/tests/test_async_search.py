@@ -0,0 +1,166 @@
+"""
+Unit tests for the async search layer.
+"""
+
+import os
+import time
+import asyncio
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from wheresmy.core.database import ImageDatabase
+from wheresmy.search import search as search_utils
+from wheresmy.search.async_search import (
+    AsyncSearcher,
+    QueryEmbeddingBatcher,
+    SearchDeadlineExceeded,
+    SearchOverloadedError,
+)
+
+
+class RecordingGenerator:
+    """An embedding generator that records its batches."""
+
+    model_name = "test-model"
+
+    def __init__(self, delay=0.0):
+        """Initialize the generator with an optional encode delay."""
+        self.delay = delay
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def generate_embeddings(self, texts, **kwargs):
+        """Return one-hot embeddings after the configured delay."""
+        self.release.wait()
+        time.sleep(self.delay)
+        self.batches.append(list(texts))
+        results = []
+        for text in texts:
+            embedding = np.zeros(8)
+            embedding[int(text.split()[-1]) % 8] = 1.0
+            results.append(
+                {"embedding": embedding, "text": text, "model": self.model_name}
+            )
+        return results
+
+
+class TestQueryEmbeddingBatcher(unittest.TestCase):
+    """Test micro-batching of query embeddings."""
+
+    def test_concurrent_queries_share_a_batch(self):
+        """Test that queries submitted together are encoded in one call."""
+        generator = RecordingGenerator()
+        generator.release.clear()
+        batcher = QueryEmbeddingBatcher(generator, max_batch_wait=0.05)
+
+        # The first query occupies the inference thread while the rest queue
+        futures = [batcher.submit(f"query {i}") for i in range(5)]
+        generator.release.set()
+        results = [future.result(timeout=5) for future in futures]
+        batcher.close()
+
+        self.assertEqual([r["text"] for r in results], [f"query {i}" for i in range(5)])
+        self.assertLessEqual(len(generator.batches), 2)
+        self.assertEqual(sum(len(batch) for batch in generator.batches), 5)
+
+    def test_cancelled_queries_are_not_encoded(self):
+        """Test that queries cancelled while queued are dropped."""
+        generator = RecordingGenerator()
+        generator.release.clear()
+        batcher = QueryEmbeddingBatcher(generator, max_batch_wait=0)
+
+        first = batcher.submit("query 1")
+        time.sleep(0.05)
+        cancelled = batcher.submit("query 2")
+        self.assertTrue(cancelled.cancel())
+        generator.release.set()
+        first.result(timeout=5)
+        batcher.close()
+
+        self.assertNotIn("query 2", sum(generator.batches, []))
+
+    def test_full_queue_is_rejected(self):
+        """Test that submissions beyond max_pending fail fast."""
+        generator = RecordingGenerator()
+        generator.release.clear()
+        batcher = QueryEmbeddingBatcher(generator, max_batch_wait=0, max_pending=1)
+
+        batcher.submit("query 1")
+        time.sleep(0.05)
+        batcher.submit("query 2")
+        with self.assertRaises(SearchOverloadedError):
+            batcher.submit("query 3")
+
+        generator.release.set()
+        batcher.close()
+
+
+class TestAsyncSearcher(unittest.TestCase):
+    """Test the async search functions."""
+
+    def setUp(self):
+        """Create a database with embedded images."""
+        self.temp_db = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        self.temp_db.close()
+        self.db = ImageDatabase(self.temp_db.name)
+
+        for i in range(8):
+            image_id = self.db.add_image(
+                {
+                    "file_path": f"/path/to/test_{i}.jpg",
+                    "filename": f"test_{i}.jpg",
+                    "description": f"Test description {i}",
+                }
+            )
+            embedding = np.zeros(8)
+            embedding[i] = 1.0
+            self.db.add_embedding(
+                image_id,
+                {"text": f"Test {i}", "model": "test-model", "embedding": embedding},
+            )
+
+        self.generator = RecordingGenerator()
+        search_utils._embedding_generators["test-model"] = self.generator
+        self.searcher = AsyncSearcher(self.db, max_batch_wait=0.02)
+
+    def tearDown(self):
+        """Stop the searcher and remove the temporary database."""
+        self.searcher.close()
+        search_utils._embedding_generators.pop("test-model", None)
+        os.unlink(self.temp_db.name)
+
+    def test_concurrent_semantic_searches(self):
+        """Test that concurrent searches return their own results."""
+
+        async def run():
+            return await asyncio.gather(
+                *(
+                    self.searcher.semantic_search(f"query {i}", limit=1)
+                    for i in range(8)
+                )
+            )
+
+        results = asyncio.run(run())
+
+        for i, result in enumerate(results):
+            self.assertEqual(result[0]["filename"], f"test_{i}.jpg")
+        self.assertLess(len(self.generator.batches), 8)
+
+    def test_hybrid_search(self):
+        """Test the async hybrid search."""
+        results = asyncio.run(self.searcher.hybrid_search("description 3", limit=3))
+        self.assertEqual(results[0]["filename"], "test_3.jpg")
+
+    def test_deadline(self):
+        """Test that slow searches raise SearchDeadlineExceeded."""
+        self.generator.delay = 0.5
+        with self.assertRaises(SearchDeadlineExceeded):
+            asyncio.run(self.searcher.semantic_search("query 1", timeout=0.05))
+
+
+if __name__ == "__main__":
+    unittest.main()
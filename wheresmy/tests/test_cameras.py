@@ -0,0 +1,118 @@
+"""
+Unit tests for camera name normalization and camera filters.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from wheresmy.core import cameras
+from wheresmy.core.database import CREATE_TRIGGER_UPDATE, ImageDatabase
+
+CAMERAS = [
+    ("NIKON CORPORATION", "NIKON D750"),
+    ("Canon", "Canon EOS 5D Mark IV"),
+    ("Apple", "iPhone 12"),
+    ("Apple", "iPhone 15 Pro"),
+    ("OLYMPUS IMAGING CORP.", "E-M5"),
+]
+
+
+class TestCameras(unittest.TestCase):
+    """Test the cameras table and camera-filtered searches."""
+
+    def setUp(self):
+        """Create a database with an image from each camera."""
+        self.temp_dir = tempfile.mkdtemp(prefix="wheresmy_cameras_")
+        self.db_path = os.path.join(self.temp_dir, "test.db")
+        self.db = ImageDatabase(self.db_path)
+        for i, (make, model) in enumerate(CAMERAS * 2):
+            self.db.add_image(
+                {
+                    "file_path": f"/photos/{i}.jpg",
+                    "filename": f"{i}.jpg",
+                    "exif": {"Make": make, "Model": model},
+                }
+            )
+
+    def tearDown(self):
+        """Remove the temporary database."""
+        shutil.rmtree(self.temp_dir)
+
+    def search_models(self, **filters):
+        """Get the distinct camera models of a filtered search."""
+        return sorted(
+            {image["camera_model"] for image in self.db.filter_search(**filters)}
+        )
+
+    def test_normalization(self):
+        """Test canonical makes and models."""
+        self.assertEqual(cameras.canonical_make("NIKON CORPORATION"), "nikon")
+        self.assertEqual(cameras.canonical_make("OLYMPUS IMAGING CORP."), "olympus")
+        self.assertEqual(cameras.canonical_make("EASTMAN KODAK COMPANY"), "kodak")
+        self.assertEqual(cameras.canonical_model("Canon", "Canon EOS 5D"), "eos 5d")
+        self.assertEqual(
+            cameras.canonical_model("NIKON CORPORATION", "NIKON D750"), "d750"
+        )
+        self.assertIn(("model", "nikon d750"), cameras.camera_aliases("NIKON", "D750"))
+        self.assertEqual(cameras.camera_aliases(None, None), set())
+
+    def test_camera_filters(self):
+        """Test prefix, substring and fuzzy camera matches."""
+        self.assertEqual(self.search_models(camera_make="nikon corp"), ["NIKON D750"])
+        self.assertEqual(
+            self.search_models(camera_make="Apple", camera_model="iphone 1"),
+            ["iPhone 12", "iPhone 15 Pro"],
+        )
+        self.assertEqual(
+            self.search_models(camera_model="5d"), ["Canon EOS 5D Mark IV"]
+        )
+        self.assertEqual(self.search_models(camera_model="pro"), ["iPhone 15 Pro"])
+        self.assertEqual(self.search_models(camera_make="olympvs"), ["E-M5"])
+        self.assertEqual(
+            self.search_models(camera_make="Canon", camera_model="d750"), []
+        )
+        self.assertEqual(self.search_models(camera_make="Leica"), [])
+
+        # Close spellings never resolve to another model number
+        self.assertEqual(self.search_models(camera_model="iphnoe 12"), ["iPhone 12"])
+        self.assertEqual(self.search_models(camera_model="iPhone 13"), [])
+        self.assertEqual(self.search_models(camera_model="EOS 6D Mark IV"), [])
+
+        self.assertIsNone(self.db.resolve_cameras())
+        self.assertEqual(len(self.db.resolve_cameras(camera_make="apple")), 2)
+
+    def test_camera_filter_uses_index(self):
+        """Test that camera filters are index lookups."""
+        query, params = self.db._build_filter_query(
+            camera_ids=self.db.resolve_cameras(camera_make="Apple")
+        )
+        conn = sqlite3.connect(self.db_path)
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+        conn.close()
+        self.assertIn("SEARCH i USING INDEX idx_images_camera_id (camera_id=?)", plan)
+
+    def test_migration_adds_cameras(self):
+        """Test upgrading a version 5 database without camera IDs."""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DROP INDEX idx_images_camera_id")
+        conn.execute("DROP TABLE camera_aliases")
+        conn.execute("DROP TABLE cameras")
+        conn.execute("DROP TRIGGER image_update_trigger")
+        conn.execute("UPDATE images SET camera_id = NULL")
+        conn.execute(CREATE_TRIGGER_UPDATE)
+        conn.execute("UPDATE db_version SET version = 5")
+        conn.commit()
+        conn.close()
+
+        db = ImageDatabase(self.db_path)
+        images = db.filter_search(camera_make="Nikon")
+        self.assertEqual(len(images), 2)
+        self.assertEqual(images[0]["camera_id"], images[1]["camera_id"])
+        self.assertEqual(len(db.filter_search(text_query="nikon")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
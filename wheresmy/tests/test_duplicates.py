@@ -0,0 +1,163 @@
+"""
+Unit tests for perceptual hashes and duplicate detection.
+"""
+
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from wheresmy.core import duplicates
+from wheresmy.core.database import ImageDatabase
+
+
+def scene(seed):
+    """Draw a blurred image of random shapes."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (800, 600), (rng.randint(0, 255),) * 3)
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randint(0, 750), rng.randint(0, 550)
+        size = rng.randint(50, 300)
+        color = tuple(rng.randint(0, 255) for _ in range(3))
+        draw.ellipse([x, y, x + size, y + size], fill=color)
+    return img.filter(ImageFilter.GaussianBlur(4))
+
+
+class TestDuplicates(unittest.TestCase):
+    """Test hashing, hash lookups and duplicate groups."""
+
+    def setUp(self):
+        """Write test images and hash them."""
+        self.temp_dir = tempfile.mkdtemp(prefix="wheresmy_duplicates_")
+        original = scene(1)
+        images = {
+            "original.jpg": original,
+            "cropped.jpg": original.crop((20, 15, 800, 600)),
+            "copy.png": original,
+            "other.jpg": scene(2),
+        }
+        self.hashes = {}
+        for name, img in images.items():
+            path = os.path.join(self.temp_dir, name)
+            img.save(path)
+            self.hashes[name] = duplicates.image_hash(path)
+
+        self.db = ImageDatabase(os.path.join(self.temp_dir, "test.db"))
+        for name, phash in self.hashes.items():
+            self.db.add_image(
+                {
+                    "file_path": f"/photos/{name}",
+                    "filename": name,
+                    "phash": duplicates.format_hash(phash),
+                }
+            )
+
+    def tearDown(self):
+        """Remove the temporary files."""
+        shutil.rmtree(self.temp_dir)
+
+    def group_names(self, **kwargs):
+        """Get the filenames of each group of duplicates."""
+        return [
+            [image["filename"] for image in group]
+            for group in self.db.find_duplicates(**kwargs)
+        ]
+
+    def test_hashes(self):
+        """Test distances between copies and different images."""
+        original = self.hashes["original.jpg"]
+        self.assertLessEqual(
+            duplicates.hamming_distance(original, self.hashes["cropped.jpg"]), 3
+        )
+        self.assertEqual(
+            duplicates.hamming_distance(original, self.hashes["copy.png"]), 0
+        )
+        self.assertGreater(
+            duplicates.hamming_distance(original, self.hashes["other.jpg"]), 10
+        )
+        self.assertEqual(
+            duplicates.parse_hash(duplicates.format_hash(original)), original
+        )
+        self.assertIsNone(duplicates.parse_hash("not a hash"))
+        self.assertIsNone(
+            duplicates.image_hash(os.path.join(self.temp_dir, "none.jpg"))
+        )
+
+    def test_hash_index(self):
+        """Test in-memory near-duplicate lookups."""
+        index = duplicates.HashIndex()
+        index.add(self.hashes["other.jpg"], "other")
+        self.assertIsNone(index.find(self.hashes["original.jpg"]))
+        index.add(self.hashes["original.jpg"], "original")
+        self.assertEqual(index.find(self.hashes["cropped.jpg"]), "original")
+
+        # Every hash within the maximum distance is found
+        value = self.hashes["other.jpg"]
+        for bits in ((0, 20, 40), (1, 17, 33), (62, 63, 15)):
+            changed = value
+            for bit in bits:
+                changed ^= 1 << bit
+            self.assertEqual(index.find(changed), "other")
+
+        with self.assertRaises(ValueError):
+            duplicates.HashIndex(max_distance=duplicates.MAX_DUPLICATE_DISTANCE + 1)
+
+    def test_find_duplicates(self):
+        """Test duplicate groups of the whole library and of one image."""
+        self.assertEqual(
+            self.group_names(), [["original.jpg", "cropped.jpg", "copy.png"]]
+        )
+        self.assertEqual(
+            self.group_names(max_distance=0), [["original.jpg", "copy.png"]]
+        )
+        (group,) = self.db.find_duplicates(image_id=3)
+        self.assertEqual(group[2]["distance"], 0)
+        self.assertEqual(self.db.find_duplicates(image_id=4), [])
+
+        with self.assertRaises(ValueError):
+            self.db.find_duplicates(max_distance=10)
+
+    def test_hash_bands_follow_updates(self):
+        """Test that changed and deleted images leave the hash index."""
+        self.db.add_image(
+            {
+                "file_path": "/photos/copy.png",
+                "filename": "copy.png",
+                "phash": duplicates.format_hash(self.hashes["other.jpg"]),
+            }
+        )
+        self.assertEqual(
+            self.group_names(),
+            [["original.jpg", "cropped.jpg"], ["copy.png", "other.jpg"]],
+        )
+
+        conn = sqlite3.connect(self.db.db_path)
+        conn.execute("DELETE FROM images WHERE filename = 'cropped.jpg'")
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.group_names(), [["copy.png", "other.jpg"]])
+
+        self.db.clear()
+        self.assertEqual(self.db.find_duplicates(), [])
+
+    def test_migration_adds_hashes(self):
+        """Test upgrading a version 9 database without hash bands."""
+        conn = sqlite3.connect(self.db.db_path)
+        for trigger in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER image_hash_{trigger}_trigger")
+        conn.execute("DROP TABLE image_hash_bands")
+        conn.execute("UPDATE db_version SET version = 9")
+        conn.commit()
+        conn.close()
+
+        db = ImageDatabase(self.db.db_path)
+        self.assertEqual(len(db.find_duplicates()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -122,6 +122,64 @@ class TestEmbeddingsDatabase(unittest.TestCase):
             self.assertEqual(retrieved["image_id"], image_id)
             self.assertEqual(retrieved["model"], "all-MiniLM-L6-v2")
 
+    def test_batch_add_embeddings_upserts(self):
+        """Test that re-embedding an image updates its row in place."""
+        first = self.db.batch_add_embeddings({self.image_id: self.test_embedding})
+
+        updated = dict(self.test_embedding, text="Updated text")
+        updated["embedding"] = np.ones(384) * 0.3
+        second = self.db.batch_add_embeddings(
+            {self.image_id: updated, 999999: self.test_embedding}
+        )
+
+        # Same row is reused and the missing image is reported as a failure
+        self.assertEqual(first[self.image_id], second[self.image_id])
+        self.assertIsNone(second[999999])
+
+        retrieved = self.db.get_embedding(self.image_id)
+        self.assertEqual(retrieved["text"], "Updated text")
+        self.assertEqual(retrieved["embedding"].dtype, np.float32)
+        np.testing.assert_allclose(retrieved["embedding"], updated["embedding"])
+
+    def test_migration_deduplicates_embeddings(self):
+        """Test upgrading a version 2 database with duplicate embeddings."""
+        import sqlite3
+
+        conn = sqlite3.connect(self.temp_db.name)
+        conn.execute("DROP INDEX idx_embedding_image_model")
+        for value in (0.1, 0.2):
+            conn.execute(
+                """
+                INSERT INTO text_embeddings (
+                    image_id, text, model_name, embedding_size, embedding, added_date
+                ) VALUES (?, 'text', 'model', 384, ?, '2021-01-01')
+            """,
+                (self.image_id, (np.ones(384, dtype=np.float32) * value).tobytes()),
+            )
+        conn.execute("UPDATE db_version SET version = 2")
+        conn.commit()
+        conn.close()
+
+        db = ImageDatabase(self.temp_db.name)
+        retrieved = db.get_embedding(self.image_id, model_name="model")
+        np.testing.assert_allclose(retrieved["embedding"], np.ones(384) * 0.2)
+
+        conn = sqlite3.connect(self.temp_db.name)
+        count = conn.execute("SELECT COUNT(*) FROM text_embeddings").fetchone()[0]
+        conn.close()
+        self.assertEqual(count, 1)
+
+    def test_embedding_cache(self):
+        """Test storing and looking up embeddings by text."""
+        model = "all-MiniLM-L6-v2"
+        self.db.cache_embeddings(model, {"a red car": np.ones(384) * 0.5})
+
+        # Whitespace differences share an entry, other models do not
+        cached = self.db.get_cached_embeddings(model, ["a  red car ", "a blue car"])
+        self.assertEqual(list(cached), ["a  red car "])
+        np.testing.assert_allclose(cached["a  red car "], np.ones(384) * 0.5)
+        self.assertEqual(self.db.get_cached_embeddings("other", ["a red car"]), {})
+
     def test_semantic_search(self):
         """Test semantic search functionality."""
         # Add several test images with different embeddings
@@ -168,6 +226,79 @@ class TestEmbeddingsDatabase(unittest.TestCase):
                 results[i]["similarity"], results[i + 1]["similarity"]
             )
 
+    def test_semantic_search_per_model(self):
+        """Test that semantic search only ranks embeddings of one model."""
+        image2_id = self.db.add_image(
+            {"file_path": "/path/to/test_image2.jpg", "filename": "test_image2.jpg"}
+        )
+        self.db.add_embedding(self.image_id, self.test_embedding)
+        self.db.add_embedding(
+            image2_id,
+            {"text": "other", "model": "other-model", "embedding": np.ones(8)},
+        )
+
+        # The first registered model is the default
+        self.assertEqual(self.db.get_default_embedding_model(), "all-MiniLM-L6-v2")
+        results = self.db.semantic_search(np.ones(384), limit=10)
+        self.assertEqual([r["id"] for r in results], [self.image_id])
+
+        results = self.db.semantic_search(np.ones(8), model_name="other-model")
+        self.assertEqual([r["id"] for r in results], [image2_id])
+        self.assertAlmostEqual(results[0]["similarity"], 1.0, places=5)
+
+        self.db.set_default_embedding_model("other-model")
+        results = self.db.semantic_search(np.ones(8))
+        self.assertEqual([r["id"] for r in results], [image2_id])
+
+        # Mismatched query dimensions return no results
+        self.assertEqual(self.db.semantic_search(np.ones(384)), [])
+
+    def test_vector_index_appends(self):
+        """Test that added embeddings are appended to a loaded vector index."""
+        model = self.test_embedding["model"]
+
+        def embed(image_id, value):
+            vector = np.zeros(384)
+            vector[value] = 1.0
+            self.db.add_embedding(image_id, dict(self.test_embedding, embedding=vector))
+
+        def best_match(value):
+            query = np.zeros(384)
+            query[value] = 1.0
+            return self.db.semantic_search(query, limit=1)[0]["id"]
+
+        embed(self.image_id, 0)
+        self.assertEqual(self.db.load_vector_index(), 1)
+
+        image2_id = self.db.add_image({"file_path": "/path/to/test_image2.jpg"})
+        embed(image2_id, 1)
+        with self.assertLogs("wheresmy.core.database", level="INFO") as logs:
+            self.assertEqual(best_match(1), image2_id)
+        self.assertIn(f"Added 1 embeddings for model {model}", logs.output[0])
+
+        # Changed embeddings reload the whole index
+        embed(self.image_id, 2)
+        with self.assertLogs("wheresmy.core.database", level="INFO") as logs:
+            self.assertEqual(best_match(2), self.image_id)
+        self.assertIn(f"Loaded 2 embeddings for model {model}", logs.output[0])
+        self.assertEqual(best_match(1), image2_id)
+
+    def test_embedding_model_dimension_checked(self):
+        """Test that a model's embeddings must keep the same dimensionality."""
+        self.db.add_embedding(self.image_id, self.test_embedding)
+        wrong_size = dict(self.test_embedding, embedding=np.ones(100))
+
+        with self.assertRaises(ValueError):
+            self.db.add_embedding(self.image_id, wrong_size)
+        self.assertIsNone(
+            self.db.batch_add_embeddings({self.image_id: wrong_size})[self.image_id]
+        )
+
+        models = self.db.get_embedding_models()
+        self.assertEqual(len(models), 1)
+        self.assertEqual(models[0]["embedding_size"], 384)
+        self.assertTrue(models[0]["default"])
+
     def test_hybrid_search(self):
         """Test hybrid search functionality combining text and semantic search."""
         # Add several test images with different text and embeddings
@@ -220,6 +351,24 @@ class TestEmbeddingsDatabase(unittest.TestCase):
         for result in results:
             self.assertIn("combined_score", result)
 
+        # Results are hydrated in descending score order
+        scores = [r["combined_score"] for r in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertTrue(all(r["filename"] for r in results))
+
+    def test_get_images(self):
+        """Test primary key lookups of one or several images."""
+        image = self.db.get_image(self.image_id)
+        self.assertEqual(image["filename"], "test_image.jpg")
+        self.assertEqual(image["exif"]["Make"], "Test Camera")
+        self.assertIsNone(self.db.get_image(self.image_id + 100))
+
+        other_id = self.db.add_image(
+            {"file_path": "/path/to/other.jpg", "filename": "other.jpg"}
+        )
+        images = self.db.get_images([other_id, 999, self.image_id])
+        self.assertEqual([i["id"] for i in images], [other_id, self.image_id])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,179 @@
+"""
+Unit tests for the catalogue export.
+"""
+
+import io
+import os
+import csv
+import json
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from wheresmy.cli import search_cli
+from wheresmy.core import export
+from wheresmy.core.database import ImageDatabase
+from wheresmy.web_app import create_app
+
+
+class TestExport(unittest.TestCase):
+    """Test exporting the catalogue in each format."""
+
+    def setUp(self):
+        """Create a database with images, some of them embedded."""
+        self.temp_dir = tempfile.mkdtemp(prefix="wheresmy_export_")
+        self.db_path = os.path.join(self.temp_dir, "test.db")
+        self.db = ImageDatabase(self.db_path)
+
+        self.image_ids = []
+        for i in range(6):
+            image_id = self.db.add_image(
+                {
+                    "file_path": f"/path/to/test_{i}.jpg",
+                    "filename": f"test_{i}.jpg",
+                    "width": 100 * (i + 1),
+                    "height": 50,
+                    "description": "A beach" if i % 2 else "A mountain",
+                }
+            )
+            self.image_ids.append(image_id)
+            # Every other image has an embedding
+            if i % 2 == 0:
+                self.db.add_embedding(
+                    image_id,
+                    {"text": "x", "model": "test-model", "embedding": np.full(4, i)},
+                )
+
+    def tearDown(self):
+        """Remove the temporary files."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_iter_images_in_id_order(self):
+        """Test that the export cursor returns filtered images in ID order."""
+        ids = [image["id"] for image in self.db.iter_images(batch_size=2)]
+        self.assertEqual(ids, self.image_ids)
+
+        ids = [
+            image["id"]
+            for image in self.db.iter_images(
+                text_query="beach", after_id=self.image_ids[1]
+            )
+        ]
+        self.assertEqual(ids, [self.image_ids[3], self.image_ids[5]])
+
+    def test_jsonl(self):
+        """Test the JSONL export."""
+        path = os.path.join(self.temp_dir, "export.jsonl")
+        self.assertEqual(export.export_images(self.db, path, "jsonl"), 6)
+
+        with open(path) as f:
+            images = [json.loads(line) for line in f]
+        self.assertEqual([image["id"] for image in images], self.image_ids)
+        self.assertEqual(images[0]["filename"], "test_0.jpg")
+
+    def test_csv(self):
+        """Test the CSV export."""
+        output = io.StringIO()
+        count = export.export_images(self.db, output, "csv", text_query="beach")
+        self.assertEqual(count, 3)
+
+        rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["width"], "200")
+
+    def test_npz(self):
+        """Test the npz export of embeddings."""
+        path = os.path.join(self.temp_dir, "export.npz")
+        self.assertEqual(export.export_images(self.db, path, "npz"), 3)
+
+        with np.load(path) as archive:
+            np.testing.assert_array_equal(archive["ids"], self.image_ids[::2])
+            self.assertEqual(archive["embeddings"].shape, (3, 4))
+            self.assertEqual(archive["embeddings"][1, 0], 2)
+            self.assertEqual(str(archive["model_name"]), "test-model")
+
+    def test_parquet_falls_back_to_npz(self):
+        """Test that parquet exports use npz when pyarrow is missing."""
+        with patch.object(export, "PARQUET_SUPPORT", False):
+            self.assertEqual(export.resolve_format("parquet"), "npz")
+
+    @unittest.skipUnless(export.PARQUET_SUPPORT, "pyarrow is not installed")
+    def test_parquet(self):
+        """Test the Parquet export with embeddings."""
+        import pyarrow.parquet as pq
+
+        path = os.path.join(self.temp_dir, "export.parquet")
+        self.assertEqual(export.export_images(self.db, path, "parquet"), 6)
+
+        table = pq.read_table(path).to_pydict()
+        self.assertEqual(table["id"], self.image_ids)
+        self.assertEqual(table["embedding"][2], [2.0] * 4)
+        self.assertIsNone(table["embedding"][1])
+
+    def test_endpoint(self):
+        """Test the export endpoint."""
+        client = create_app(self.db_path).test_client()
+
+        response = client.get("/api/export?format=csv&q=mountain")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/csv")
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 4)
+
+        response = client.get("/api/export?format=npz")
+        self.assertEqual(response.status_code, 200)
+        with np.load(io.BytesIO(response.get_data())) as archive:
+            self.assertEqual(len(archive["ids"]), 3)
+
+        response = client.get("/api/export?format=xml")
+        self.assertEqual(response.status_code, 400)
+
+    def test_endpoint_filters_match_search(self):
+        """Test that exports accept the same filters as searches."""
+        self.db.add_image(
+            {
+                "file_path": "/path/to/eiffel.jpg",
+                "filename": "eiffel.jpg",
+                "width": 800,
+                "height": 600,
+                "exif": {
+                    "DateTimeOriginal": "2021:06:01 12:00:00",
+                    "GPS": {"latitude": 48.8584, "longitude": 2.2945},
+                },
+            }
+        )
+        client = create_app(self.db_path).test_client()
+        for params in (
+            "min_width=450",
+            "near=48.86,2.29,2",
+            "bbox=48,2,49,3&year=2021&month=6",
+        ):
+            searched = client.get(f"/api/search?{params}").get_json()["results"]
+            response = client.get(f"/api/export?format=jsonl&{params}")
+            exported = [
+                json.loads(line)
+                for line in response.get_data(as_text=True).splitlines()
+            ]
+            self.assertEqual(
+                sorted(r["id"] for r in searched), [r["id"] for r in exported], params
+            )
+
+        self.assertEqual(client.get("/api/export?near=1,2").status_code, 400)
+        self.assertEqual(client.get("/api/export?min_width=wide").status_code, 400)
+
+    def test_cli_filters(self):
+        """Test that the export command accepts the search filters."""
+        output = os.path.join(self.temp_dir, "export.jsonl")
+        argv = ["wheresmy_search", "--db", self.db_path, "export", output]
+        argv += ["--min-width", "450", "--query", "beach"]
+        with patch("sys.argv", argv):
+            self.assertEqual(search_cli.main(), 0)
+        with open(output) as f:
+            ids = [json.loads(line)["id"] for line in f]
+        self.assertEqual(ids, [self.image_ids[5]])
+
+
+if __name__ == "__main__":
+    unittest.main()
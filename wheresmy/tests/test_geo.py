@@ -0,0 +1,161 @@
+"""
+Unit tests for the location index and location searches.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from wheresmy.core import geo
+from wheresmy.core.database import ImageDatabase
+
+# Name, latitude and longitude of the test images
+PLACES = [
+    ("eiffel", 48.8584, 2.2945),
+    ("louvre", 48.8606, 2.3376),
+    ("versailles", 48.8049, 2.1204),
+    ("london", 51.5007, -0.1246),
+    ("fiji", -17.7134, 178.0650),
+    ("samoa", -13.7590, -172.1046),
+]
+
+
+class TestGeo(unittest.TestCase):
+    """Test the geometry helpers and location-filtered searches."""
+
+    def setUp(self):
+        """Create a database with geotagged images."""
+        self.temp_dir = tempfile.mkdtemp(prefix="wheresmy_geo_")
+        self.db_path = os.path.join(self.temp_dir, "test.db")
+        self.db = ImageDatabase(self.db_path)
+        for name, lat, lon in PLACES:
+            self.db.add_image(
+                {
+                    "file_path": f"/photos/{name}.jpg",
+                    "filename": f"{name}.jpg",
+                    "exif": {"GPS": {"latitude": lat, "longitude": lon}},
+                }
+            )
+        self.db.add_image({"file_path": "/photos/none.jpg", "filename": "none.jpg"})
+
+    def tearDown(self):
+        """Remove the temporary database."""
+        shutil.rmtree(self.temp_dir)
+
+    def search_names(self, **filters):
+        """Get the sorted names of the images of a filtered search."""
+        return sorted(
+            image["filename"][:-4] for image in self.db.filter_search(**filters)
+        )
+
+    def test_geometry(self):
+        """Test distances and the bounding boxes of radius searches."""
+        self.assertAlmostEqual(
+            geo.haversine_km(48.8584, 2.2945, 51.5007, -0.1246), 341.4, delta=1
+        )
+        self.assertIsNone(geo.haversine_km(None, 0, 0, 0))
+
+        (box,) = geo.radius_bboxes(60.0, 10.0, 111.195)
+        self.assertAlmostEqual(box[0], 59.0, places=3)
+        self.assertAlmostEqual(box[3], 12.0, delta=0.01)
+
+        # Radius searches crossing the antimeridian or reaching a pole
+        self.assertEqual(len(geo.radius_bboxes(0.0, 179.9, 50)), 2)
+        self.assertEqual(geo.radius_bboxes(89.9, 0.0, 50)[0][1:4:2], (-180.0, 180.0))
+
+        with self.assertRaises(ValueError):
+            geo.parse_bbox([10, 0, 5, 1])
+        with self.assertRaises(ValueError):
+            geo.parse_near([0, 0, -1])
+
+    def test_location_filters(self):
+        """Test bounding box and radius searches."""
+        self.assertEqual(
+            self.search_names(bbox=(48.0, 2.0, 49.0, 3.0)),
+            ["eiffel", "louvre", "versailles"],
+        )
+        self.assertEqual(
+            self.search_names(near=(48.8584, 2.2945, 5.0)), ["eiffel", "louvre"]
+        )
+        self.assertEqual(
+            self.search_names(near=(48.8584, 2.2945, 500.0))[-1], "versailles"
+        )
+        self.assertEqual(
+            self.search_names(bbox=(-20.0, 170.0, -10.0, -170.0)), ["fiji", "samoa"]
+        )
+        self.assertEqual(
+            self.search_names(near=(-15.0, 180.0, 900.0)), ["fiji", "samoa"]
+        )
+        self.assertEqual(self.db.get_stats()["with_gps"], len(PLACES))
+
+    def test_location_filter_uses_rtree(self):
+        """Test that location filters are answered from the R*Tree."""
+        query, params = self.db._build_filter_query(near=(48.8584, 2.2945, 5.0))
+        conn = self.db._connect()
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+        conn.close()
+        self.assertTrue(any("image_locations VIRTUAL TABLE" in step for step in plan))
+
+    def test_location_clusters(self):
+        """Test map clusters at different zoom levels and viewports."""
+        (world,) = self.db.get_location_clusters(-3)
+        self.assertEqual(world["count"], len(PLACES))
+
+        paris = self.db.get_location_clusters(4, bbox=(45.0, 0.0, 50.0, 5.0))
+        self.assertEqual([c["count"] for c in paris], [3])
+        self.assertAlmostEqual(paris[0]["lat"], sum(p[1] for p in PLACES[:3]) / 3)
+        self.assertEqual(len(self.db.get_location_clusters(9, bbox=(48, 2, 49, 3))), 2)
+
+        # Individual images when zoomed in beyond the grid
+        points = self.db.get_location_clusters(18, bbox=(48.85, 2.29, 48.87, 2.34))
+        self.assertEqual(sorted(p["image_id"] for p in points), [1, 2])
+
+        # Viewports crossing the antimeridian
+        pacific = self.db.get_location_clusters(2, bbox=(-30.0, 150.0, 0.0, -150.0))
+        self.assertEqual(sum(c["count"] for c in pacific), 2)
+
+    def test_location_clusters_follow_deletes(self):
+        """Test that removing images updates counts and representatives."""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DELETE FROM images WHERE filename = 'eiffel.jpg'")
+        conn.commit()
+        conn.close()
+
+        (paris,) = self.db.get_location_clusters(4, bbox=(45.0, 0.0, 50.0, 5.0))
+        self.assertEqual(paris["count"], 2)
+        self.assertIn(paris["image_id"], (2, 3))
+
+        self.db.clear()
+        self.assertEqual(self.db.get_location_clusters(0), [])
+
+    def test_migration_builds_location_index(self):
+        """Test upgrading a version 6 database without location indexes."""
+        conn = sqlite3.connect(self.db_path)
+        for trigger in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER image_location_{trigger}_trigger")
+        conn.execute("DROP TABLE image_locations")
+        for trigger in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER image_cluster_{trigger}_trigger")
+        conn.execute("DROP TABLE location_clusters")
+        conn.execute("UPDATE db_version SET version = 6")
+        conn.commit()
+        conn.close()
+
+        db = ImageDatabase(self.db_path)
+        self.assertEqual(len(db.filter_search(near=(51.5, -0.12, 1.0))), 1)
+        db.add_image(
+            {
+                "file_path": "/photos/tower.jpg",
+                "filename": "tower.jpg",
+                "exif": {"GPS": {"latitude": 51.5081, "longitude": -0.0759}},
+            }
+        )
+        self.assertEqual(len(db.filter_search(near=(51.5, -0.12, 5.0))), 2)
+        (london,) = db.get_location_clusters(5, bbox=(51.0, -1.0, 52.0, 0.0))
+        self.assertEqual(london["count"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+Unit tests for reverse geocoding and place filters.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import zipfile
+
+from wheresmy.core import geocoding
+from wheresmy.core.database import ImageDatabase
+
+# GeoNames rows: name, latitude, longitude, feature class, country, admin1
+CITIES = [
+    ("Paris", 48.85341, 2.3488, "P", "FR", "11"),
+    ("Versailles", 48.80359, 2.13424, "P", "FR", "11"),
+    ("London", 51.50853, -0.12574, "P", "GB", "ENG"),
+    ("Seine", 48.85, 2.35, "H", "FR", "11"),
+]
+
+ADMIN1 = [("FR.11", "Ile-de-France"), ("GB.ENG", "England")]
+
+COUNTRIES = [("FR", "France"), ("GB", "United Kingdom")]
+
+# Name, latitude and longitude of the test images
+IMAGES = [
+    ("eiffel", 48.8584, 2.2945),
+    ("palace", 48.8049, 2.1204),
+    ("parliament", 51.4995, -0.1248),
+    ("atlantic", 45.0, -30.0),
+]
+
+
+def geonames_row(index, name, lat, lon, feature_class, country, admin1):
+    """Format a row of the GeoNames main table."""
+    fields = [str(index), name, name, "", str(lat), str(lon), feature_class, "PPL"]
+    fields += [country, "", admin1, "", "", "", "1000", "", "35", "Europe/Paris"]
+    return "\t".join(fields + ["2024-01-01"]) + "\n"
+
+
+class TestGeocoding(unittest.TestCase):
+    """Test the gazetteer, the geocoder and place-filtered searches."""
+
+    def setUp(self):
+        """Write a small gazetteer and create a database with geotagged images."""
+        self.temp_dir = tempfile.mkdtemp(prefix="wheresmy_geocoding_")
+        self.gazetteer_path = os.path.join(self.temp_dir, "cities.txt")
+        with open(self.gazetteer_path, "w", encoding="utf-8") as f:
+            for i, city in enumerate(CITIES):
+                f.write(geonames_row(i, *city))
+        with open(os.path.join(self.temp_dir, "admin1CodesASCII.txt"), "w") as f:
+            f.writelines(f"{code}\t{name}\t{name}\t0\n" for code, name in ADMIN1)
+        with open(os.path.join(self.temp_dir, "countryInfo.txt"), "w") as f:
+            f.write("#ISO\tISO3\tISO-Numeric\tfips\tCountry\n")
+            f.writelines(f"{code}\t\t\t\t{name}\n" for code, name in COUNTRIES)
+
+        self.db = ImageDatabase(os.path.join(self.temp_dir, "test.db"))
+        for name, lat, lon in IMAGES:
+            self.db.add_image(
+                {
+                    "file_path": f"/photos/{name}.jpg",
+                    "filename": f"{name}.jpg",
+                    "exif": {"GPS": {"latitude": lat, "longitude": lon}},
+                }
+            )
+
+    def tearDown(self):
+        """Remove the temporary files."""
+        shutil.rmtree(self.temp_dir)
+
+    def search_names(self, **filters):
+        """Get the sorted names of the images of a filtered search."""
+        return sorted(
+            image["filename"][:-4] for image in self.db.filter_search(**filters)
+        )
+
+    def test_gazetteer(self):
+        """Test loading places and nearest-place lookups."""
+        gazetteer = geocoding.Gazetteer.load(self.gazetteer_path)
+        self.assertEqual(gazetteer.names, ["Paris", "Versailles", "London"])
+        self.assertEqual(gazetteer.regions[2], "England")
+        self.assertEqual(gazetteer.countries[0], "France")
+
+        lats = [image[1] for image in IMAGES]
+        lons = [image[2] for image in IMAGES]
+        indices, distances = gazetteer.nearest(lats, lons)
+        self.assertEqual(list(indices[:3]), [0, 1, 2])
+        self.assertAlmostEqual(distances[0], 4.1, delta=0.2)
+
+        # Blocked matrix products give the same places without scipy
+        gazetteer._tree = None
+        fallback_indices, fallback_distances = gazetteer.nearest(lats, lons)
+        self.assertEqual(list(fallback_indices), list(indices))
+        self.assertAlmostEqual(fallback_distances[0], distances[0], places=3)
+
+    def test_gazetteer_zip(self):
+        """Test loading a zipped gazetteer without name tables."""
+        zip_dir = os.path.join(self.temp_dir, "zip")
+        os.mkdir(zip_dir)
+        zip_path = os.path.join(zip_dir, "cities.zip")
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            archive.write(self.gazetteer_path, "cities.txt")
+
+        gazetteer = geocoding.Gazetteer.load(zip_path)
+        self.assertEqual(len(gazetteer.names), 3)
+        self.assertIsNone(gazetteer.regions[0])
+        self.assertEqual(gazetteer.countries[0], "FR")
+
+    def test_geocoder(self):
+        """Test the maximum distance and the coordinate cache."""
+        geocoder = geocoding.ReverseGeocoder(
+            geocoding.Gazetteer.load(self.gazetteer_path), max_distance_km=50
+        )
+        places = geocoder.lookup([48.8584, 48.8584, 45.0], [2.2945, 2.2945, -30.0])
+        self.assertEqual(places[0], ("Paris", "Ile-de-France", "France"))
+        self.assertEqual(places[1], places[0])
+        self.assertIsNone(places[2])
+        self.assertEqual(len(geocoder._cache), 2)
+
+        # Nearby points share cached places
+        self.assertEqual(geocoder.lookup([48.8581], [2.2948]), places[:1])
+        self.assertEqual(len(geocoder._cache), 2)
+
+    def test_geocode_images(self):
+        """Test storing places and searching by place name."""
+        geocoder = geocoding.ReverseGeocoder(
+            geocoding.Gazetteer.load(self.gazetteer_path)
+        )
+        self.assertEqual(geocoding.geocode_images(self.db, geocoder), 3)
+        self.assertEqual(len(self.db.get_locations_to_geocode()), 1)
+
+        self.assertEqual(self.search_names(place="paris"), ["eiffel"])
+        self.assertEqual(self.search_names(place="France"), ["eiffel", "palace"])
+        self.assertEqual(self.search_names(place="england"), ["parliament"])
+        self.assertEqual(self.search_names(text_query="versailles"), ["palace"])
+        self.assertEqual(self.search_names(text_query="kingdom"), ["parliament"])
+
+        # Re-adding an image keeps the full-text index consistent
+        self.db.add_image({"file_path": "/photos/eiffel.jpg", "filename": "eiffel.jpg"})
+        conn = self.db._connect()
+        conn.execute(
+            "INSERT INTO image_search(image_search) VALUES ('integrity-check')"
+        )
+        conn.close()
+        self.assertEqual(self.search_names(text_query="eiffel"), ["eiffel"])
+
+    def test_migration_adds_places(self):
+        """Test upgrading a version 8 database without place names."""
+        conn = sqlite3.connect(self.db.db_path)
+        for column in ("place_city", "place_region", "place_country"):
+            conn.execute(f"DROP INDEX idx_{column}")
+        conn.execute("DROP TABLE image_search")
+        conn.execute("UPDATE db_version SET version = 8")
+        conn.commit()
+        conn.close()
+
+        db = ImageDatabase(self.db.db_path)
+        self.assertEqual(len(db.filter_search(text_query="parliament")), 1)
+        geocoder = geocoding.ReverseGeocoder(
+            geocoding.Gazetteer.load(self.gazetteer_path)
+        )
+        geocoding.geocode_images(db, geocoder)
+        self.assertEqual(len(db.filter_search(text_query="london")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
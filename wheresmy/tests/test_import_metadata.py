@@ -0,0 +1,87 @@
+"""
+Unit tests for the metadata import CLI module.
+"""
+
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from wheresmy.core.database import ImageDatabase
+from wheresmy.tests.test_text_embeddings import MockEmbeddingModel
+
+
+class TestImportMetadata(unittest.TestCase):
+    """Test importing metadata with batched embedding generation."""
+
+    def setUp(self):
+        """Create a metadata file with several described images."""
+        self.temp_dir = tempfile.mkdtemp(prefix="wheresmy_import_")
+        self.db_path = os.path.join(self.temp_dir, "test.db")
+        self.json_path = os.path.join(self.temp_dir, "metadata.json")
+
+        metadata = {}
+        for i in range(5):
+            path = os.path.join(self.temp_dir, f"missing_{i}.jpg")
+            metadata[path] = {
+                "filename": f"missing_{i}.jpg",
+                "vlm_description": {
+                    "description": f"Description number {i}",
+                    "model": "TestVLM",
+                },
+            }
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+
+    def tearDown(self):
+        """Remove temporary files."""
+        for name in os.listdir(self.temp_dir):
+            os.unlink(os.path.join(self.temp_dir, name))
+        os.rmdir(self.temp_dir)
+
+    @patch("wheresmy.core.text_embeddings.SentenceTransformer")
+    def test_embeddings_are_batched(self, mock_sentence_transformer):
+        """Test that descriptions are encoded once per batch."""
+        from wheresmy.cli.import_metadata import import_metadata
+
+        model = MockEmbeddingModel()
+        mock_sentence_transformer.return_value = model
+
+        with patch.object(model, "encode", wraps=model.encode) as encode:
+            success = import_metadata(self.json_path, self.db_path, batch_size=2)
+
+        self.assertTrue(success)
+        # 5 descriptions in batches of 2 -> 3 encode calls
+        self.assertEqual(encode.call_count, 3)
+        for call in encode.call_args_list:
+            self.assertIsInstance(call.args[0], list)
+
+        db = ImageDatabase(self.db_path)
+        for image in db.filter_search(limit=10):
+            embedding = db.get_embedding(image["id"])
+            self.assertIsNotNone(embedding)
+            self.assertEqual(embedding["text"], image["description"])
+
+    @patch("wheresmy.core.text_embeddings.SentenceTransformer")
+    def test_reimport_uses_embedding_cache(self, mock_sentence_transformer):
+        """Test that re-importing unchanged descriptions skips inference."""
+        from wheresmy.cli.import_metadata import import_metadata
+
+        model = MockEmbeddingModel()
+        mock_sentence_transformer.return_value = model
+
+        self.assertTrue(import_metadata(self.json_path, self.db_path))
+        ImageDatabase(self.db_path).clear()
+
+        with patch.object(model, "encode", wraps=model.encode) as encode:
+            self.assertTrue(import_metadata(self.json_path, self.db_path))
+
+        encode.assert_not_called()
+        db = ImageDatabase(self.db_path)
+        for image in db.filter_search(limit=10):
+            self.assertIsNotNone(db.get_embedding(image["id"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
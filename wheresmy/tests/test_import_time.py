@@ -0,0 +1,81 @@
+"""
+Import-time regression tests.
+
+Entry points must not import the machine learning stack until a code path
+needs it; these tests import each module in a fresh interpreter with
+``python -X importtime`` and check what was loaded and how long it took.
+"""
+
+import os
+import sys
+import subprocess
+import unittest
+
+# Modules that take seconds to import and must only be loaded on demand
+HEAVY_MODULES = ("torch", "transformers", "sentence_transformers")
+
+# Entry points and the modules they import at start-up
+ENTRY_MODULES = (
+    "wheresmy.cli.search_cli",
+    "wheresmy.cli.import_metadata",
+    "wheresmy.cli.run_web",
+    "wheresmy.core.metadata_extractor",
+    "wheresmy.search.search",
+    "wheresmy.web_app",
+)
+
+# Generous cumulative import time budget per module (seconds); importing
+# torch alone takes several times this
+IMPORT_TIME_BUDGET = float(os.environ.get("WHERESMY_IMPORT_TIME_BUDGET", "2.0"))
+
+
+def import_profile(module):
+    """
+    Import a module in a fresh interpreter and parse -X importtime output.
+
+    Args:
+        module: Name of the module to import
+
+    Returns:
+        Tuple of the imported module names and the module's cumulative
+        import time in seconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    imported = set()
+    cumulative = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|", 2)
+        name = name.strip()
+        if not total.strip().isdigit():
+            # Header line
+            continue
+        imported.add(name)
+        if name == module:
+            cumulative = int(total) / 1e6
+    return imported, cumulative
+
+
+class TestImportTime(unittest.TestCase):
+    """Test that entry points import quickly."""
+
+    def test_entry_points_do_not_import_ml_stack(self):
+        """Test that importing an entry point does not load torch."""
+        for module in ENTRY_MODULES:
+            with self.subTest(module=module):
+                imported, cumulative = import_profile(module)
+                heavy = [name for name in HEAVY_MODULES if name in imported]
+                self.assertEqual(heavy, [], f"{module} imports {heavy}")
+                self.assertIsNotNone(cumulative)
+                self.assertLess(cumulative, IMPORT_TIME_BUDGET)
+
+
+if __name__ == "__main__":
+    unittest.main()
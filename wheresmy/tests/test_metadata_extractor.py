@@ -131,6 +131,26 @@ class TestMetadataExtractor(unittest.TestCase):
             self.assertIn("vlm_description", metadata)
             self.assertIn("description", metadata["vlm_description"])
 
+    def test_process_directory_reuses_duplicate_descriptions(self):
+        """Test that near-duplicates are not described by the VLM again."""
+        gradient = Image.linear_gradient("L").rotate(90)
+        gradient.save(os.path.join(self.temp_dir.name, "other.jpg"))
+        self.mock_vlm.generate_description = MagicMock(
+            return_value={"description": "A red square.", "model": "MockVLM"}
+        )
+
+        results = process_directory(self.temp_dir.name, vlm_describer=self.mock_vlm)
+
+        self.assertEqual(self.mock_vlm.generate_description.call_count, 2)
+        copies = [m for m in results.values() if "duplicate_of" in m["vlm_description"]]
+        self.assertEqual(len(copies), 2)
+        self.assertEqual(copies[0]["vlm_description"]["description"], "A red square.")
+        self.assertTrue(all(len(m["phash"]) == 16 for m in results.values()))
+
+        self.mock_vlm.generate_description.reset_mock()
+        process_directory(self.temp_dir.name, vlm_describer=self.mock_vlm, dedup=False)
+        self.assertEqual(self.mock_vlm.generate_description.call_count, 4)
+
     def test_vlm_error_handling(self):
         """Test error handling for VLM description generation."""
 
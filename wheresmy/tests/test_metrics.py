@@ -0,0 +1,113 @@
+"""
+Unit tests for the instrumentation layer.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from wheresmy.core.database import ImageDatabase
+from wheresmy.utils import metrics
+
+
+class TestMetrics(unittest.TestCase):
+    """Test counters, histograms and their Prometheus rendering."""
+
+    def setUp(self):
+        """Create an empty registry."""
+        self.registry = metrics.Registry()
+
+    def test_histogram(self):
+        """Test that histograms render cumulative buckets, sum and count."""
+        histogram = self.registry.histogram(
+            "stage_seconds", "Stage latency", ("stage",), buckets=(0.1, 1.0)
+        )
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value, stage="load")
+
+        text = self.registry.render()
+        self.assertIn("# HELP wheresmy_stage_seconds Stage latency\n", text)
+        self.assertIn("# TYPE wheresmy_stage_seconds histogram\n", text)
+        self.assertIn('wheresmy_stage_seconds_bucket{stage="load",le="0.1"} 2\n', text)
+        self.assertIn('wheresmy_stage_seconds_bucket{stage="load",le="1.0"} 3\n', text)
+        self.assertIn('wheresmy_stage_seconds_bucket{stage="load",le="+Inf"} 4\n', text)
+        self.assertIn('wheresmy_stage_seconds_sum{stage="load"} 2.65\n', text)
+        self.assertIn('wheresmy_stage_seconds_count{stage="load"} 4\n', text)
+
+        (summary,) = histogram.summary()
+        self.assertEqual(summary["labels"], {"stage": "load"})
+        self.assertEqual(summary["p50"], 0.1)
+        self.assertEqual(summary["p99"], 2.0)
+
+    def test_counter_and_labels(self):
+        """Test counters, label escaping and label validation."""
+        counter = self.registry.counter("lookups_total", "Lookups", ("result",))
+        counter.inc(result="hit")
+        counter.inc(2, result='a "b"')
+        self.assertEqual(counter.value(result="hit"), 1.0)
+        self.assertIn(
+            'wheresmy_lookups_total{result="a \\"b\\""} 2.0', counter.render()
+        )
+
+        with self.assertRaises(ValueError):
+            counter.inc(kind="hit")
+        with self.assertRaises(ValueError):
+            self.registry.histogram("lookups_total", "Lookups")
+        self.assertIs(self.registry.counter("lookups_total", "Lookups"), counter)
+
+    def test_timers(self):
+        """Test that timers record durations, including of failed calls."""
+        histogram = self.registry.histogram("call_seconds", "Calls", ("name",))
+
+        with histogram.time(name="block") as timer:
+            pass
+        self.assertGreaterEqual(timer.elapsed, 0)
+
+        @histogram.timed(name="failing")
+        def failing():
+            raise KeyError("missing")
+
+        with self.assertRaises(KeyError):
+            failing()
+        counts = {s["labels"]["name"]: s["count"] for s in histogram.summary()}
+        self.assertEqual(counts, {"block": 1, "failing": 1})
+
+    def test_quantile(self):
+        """Test nearest-rank quantiles."""
+        samples = list(range(1, 101))
+        self.assertEqual(metrics.quantile(samples, 0.5), 50)
+        self.assertEqual(metrics.quantile(samples, 0.99), 99)
+        self.assertEqual(metrics.quantile([3.0], 0.99), 3.0)
+        self.assertIsNone(metrics.quantile([], 0.5))
+
+    def test_profiling(self):
+        """Test that profiling prints the p50 and p99 of each stage."""
+        temp_dir = tempfile.mkdtemp(prefix="wheresmy_metrics_")
+        try:
+            db = ImageDatabase(os.path.join(temp_dir, "test.db"))
+            image_id = db.add_image({"file_path": "/a.jpg", "filename": "a.jpg"})
+            db.add_embedding(
+                image_id, {"embedding": np.ones(4), "model": "test", "text": "a"}
+            )
+
+            output = io.StringIO()
+            with metrics.profiling(stream=output):
+                db.get_image(image_id)
+                db.semantic_search(np.ones(4), model_name="test")
+        finally:
+            shutil.rmtree(temp_dir)
+
+        summary = output.getvalue()
+        self.assertIn("p50 (ms)", summary)
+        self.assertIn('db_query_seconds{method="get_image"}', summary)
+        self.assertIn('vector_scoring_seconds{model="test"}', summary)
+        # Samples recorded before profiling started are not reported
+        self.assertNotIn('db_query_seconds{method="add_image"}', summary)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Unit tests for the slow query log and database analysis.
+"""
+
+import io
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from wheresmy.cli import search_cli
+from wheresmy.core import query_analysis
+from wheresmy.core.database import ImageDatabase
+
+
+class TestQueryAnalysis(unittest.TestCase):
+    """Test slow query logging, query plans and index suggestions."""
+
+    def setUp(self):
+        """Create a database with a few images."""
+        self.temp_dir = tempfile.mkdtemp(prefix="wheresmy_query_")
+        self.db_path = os.path.join(self.temp_dir, "test.db")
+        self.db = ImageDatabase(self.db_path)
+        for i in range(20):
+            self.db.add_image(
+                {
+                    "file_path": f"/photos/{i}.jpg",
+                    "filename": f"{i}.jpg",
+                    "width": 1000 + i * 100,
+                    "height": 800,
+                    "exif": {"Make": "Apple", "DateTimeOriginal": "2020:01:01"},
+                    "description": "A sandy beach" if i % 2 else "A mountain",
+                }
+            )
+
+    def tearDown(self):
+        """Remove the temporary database."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_slow_query_log(self):
+        """Test that slow queries are recorded with parameters and plans."""
+        log_path = os.path.join(self.temp_dir, "slow.jsonl")
+        self.db.enable_slow_query_log(0, log_path=log_path)
+
+        results = self.db.filter_search(min_width=2000, limit=5)
+        self.assertEqual(len(results), 5)
+
+        entries = self.db.get_slow_queries()
+        query = [e for e in entries if "i.width >= ?" in e["sql"]][-1]
+        self.assertEqual(query["params"], [2000, 5, 0])
+        self.assertGreaterEqual(query["duration_ms"], 0)
+        self.assertTrue(any(step.startswith("SCAN") for step in query["plan"]))
+        self.assertEqual(query_analysis.read_slow_query_log(log_path), entries)
+
+        # Queries under the threshold are not recorded
+        self.db.enable_slow_query_log(60_000)
+        self.db.filter_search(min_width=2000)
+        self.assertEqual(self.db.get_slow_queries(), [])
+
+        self.db.disable_slow_query_log()
+        self.assertEqual(self.db.get_slow_queries(), [])
+
+    def test_blob_parameters_are_summarized(self):
+        """Test that blobs are recorded by size only."""
+        self.assertEqual(
+            query_analysis.sanitize_params([b"\x00" * 16, "x" * 300, 1.5]),
+            ["<16 bytes>", "x" * query_analysis.MAX_PARAM_LENGTH + "...", 1.5],
+        )
+
+    def test_suggest_indexes(self):
+        """Test index suggestions for full table scans."""
+        sql = "SELECT * FROM images i WHERE i.width >= ? AND i.camera_make LIKE ?"
+        suggestions = query_analysis.suggest_indexes(
+            sql,
+            ["SCAN i USING INDEX idx_capture_date"],
+            {"images": ["id", "width", "camera_make"]},
+            {"images": [["id"], ["capture_date"]]},
+        )
+        self.assertEqual(
+            suggestions[0]["sql"],
+            "CREATE INDEX IF NOT EXISTS idx_images_width ON images(width);",
+        )
+        self.assertIn("camera_make", suggestions[1]["note"])
+
+        # Nothing to suggest when the column is indexed or the table searched
+        self.assertEqual(
+            query_analysis.suggest_indexes(
+                sql,
+                ["SEARCH i USING INDEX idx_width (width>?)"],
+                {"images": ["id", "width"]},
+                {"images": [["width"]]},
+            ),
+            [],
+        )
+
+    def test_db_analyze_command(self):
+        """Test the db-analyze command."""
+        argv = ["wheresmy_search", "--db", self.db_path, "db-analyze", "--json"]
+        output = io.StringIO()
+        with patch("sys.argv", argv), redirect_stdout(output):
+            self.assertEqual(search_cli.main(), 0)
+
+        report = json.loads(output.getvalue())
+        self.assertIn({"name": "images", "rows": 20}, report["tables"])
+        indexes = {index["name"]: index for index in report["indexes"]}
+        self.assertGreater(indexes["idx_capture_date"]["used_by"], 0)
+        self.assertIsNotNone(indexes["idx_capture_date"]["stat"])
+        self.assertIn(
+            "CREATE INDEX IF NOT EXISTS idx_images_width ON images(width);",
+            [s.get("sql") for s in report["suggestions"]],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
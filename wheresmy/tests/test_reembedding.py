@@ -0,0 +1,81 @@
+"""
+Unit tests for the background re-embedding job.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from wheresmy.core.database import ImageDatabase
+from wheresmy.core.reembedding import ReembeddingJob
+from wheresmy.tests.test_text_embeddings import MockEmbeddingModel
+
+
+class TestReembeddingJob(unittest.TestCase):
+    """Test migrating a library to a new embedding model."""
+
+    def setUp(self):
+        """Create a database with embeddings of an old model."""
+        self.temp_db = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        self.temp_db.close()
+        self.db = ImageDatabase(self.temp_db.name)
+
+        self.image_ids = []
+        for i in range(5):
+            image_id = self.db.add_image(
+                {
+                    "file_path": f"/path/to/test_{i}.jpg",
+                    "filename": f"test_{i}.jpg",
+                    "description": f"Test description {i}",
+                }
+            )
+            self.db.add_embedding(
+                image_id,
+                {
+                    "text": f"Test description {i}",
+                    "model": "old-model",
+                    "embedding": np.ones(16),
+                },
+            )
+            self.image_ids.append(image_id)
+
+    def tearDown(self):
+        """Remove the temporary database."""
+        os.unlink(self.temp_db.name)
+
+    @patch(
+        "wheresmy.core.text_embeddings.SentenceTransformer",
+        return_value=MockEmbeddingModel(),
+    )
+    def test_reembed_switches_default(self, mock_sentence_transformer):
+        """Test that the default model switches once all images are embedded."""
+        job = ReembeddingJob(self.db, "new-model", batch_size=2)
+        thread = job.start()
+        thread.join(timeout=30)
+
+        self.assertTrue(job.done)
+        self.assertEqual(job.processed, 5)
+        self.assertEqual(self.db.get_default_embedding_model(), "new-model")
+        self.assertEqual(self.db.get_images_missing_embeddings("new-model"), [])
+
+        for image_id in self.image_ids:
+            embedding = self.db.get_embedding(image_id, model_name="new-model")
+            self.assertEqual(embedding["embedding_size"], 384)
+            self.assertIsNotNone(self.db.get_embedding(image_id, "old-model"))
+
+    @patch(
+        "wheresmy.core.text_embeddings.SentenceTransformer",
+        return_value=MockEmbeddingModel(),
+    )
+    def test_reembed_without_switch(self, mock_sentence_transformer):
+        """Test that the default model can be kept."""
+        job = ReembeddingJob(self.db, "new-model", make_default=False)
+        self.assertTrue(job.run())
+        self.assertEqual(self.db.get_default_embedding_model(), "old-model")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Unit tests for the search result cache.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from wheresmy.core.database import ImageDatabase
+from wheresmy.search import search as search_utils
+
+
+class TestSearchResultCache(unittest.TestCase):
+    """Test caching and invalidation of search results."""
+
+    def setUp(self):
+        """Create a database and a fresh memory cache."""
+        self.temp_dir = tempfile.mkdtemp(prefix="wheresmy_cache_")
+        self.db_path = os.path.join(self.temp_dir, "test.db")
+        self.db = ImageDatabase(self.db_path)
+        self.add_image("beach", "A sandy beach with palm trees")
+        search_utils.configure_cache()
+
+    def tearDown(self):
+        """Restore the default cache and remove the temporary files."""
+        search_utils.configure_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def add_image(self, name, description):
+        """Add an image with a description."""
+        return self.db.add_image(
+            {
+                "file_path": f"/path/to/{name}.jpg",
+                "filename": f"{name}.jpg",
+                "description": description,
+            }
+        )
+
+    def test_repeated_search_is_cached(self):
+        """Test that equivalent queries are served from the cache."""
+        first = search_utils.search_images(self.db, text_query="beach")
+
+        with patch.object(self.db, "filter_search") as mock_filter_search:
+            second = search_utils.search_images(self.db, text_query="  beach ")
+            mock_filter_search.assert_not_called()
+
+        self.assertEqual(second, first)
+        self.assertEqual(search_utils._result_cache.hits, 1)
+
+    def test_results_are_copies(self):
+        """Test that changing returned results leaves cached results intact."""
+        self.db.add_image(
+            {
+                "file_path": "/path/to/beach.jpg",
+                "filename": "beach.jpg",
+                "description": "A sandy beach with palm trees",
+                "exif": {"GPS": {"latitude": 38.7, "longitude": -9.1}},
+            }
+        )
+        first = search_utils.search_images(self.db, text_query="beach")
+        first[0]["exif"]["GPS"]["latitude"] = 0.0
+        second = search_utils.search_images(self.db, text_query="beach")
+        second[0]["exif"].clear()
+
+        third = search_utils.search_images(self.db, text_query="beach")
+        self.assertEqual(search_utils._result_cache.hits, 2)
+        self.assertEqual(third[0]["exif"]["GPS"]["latitude"], 38.7)
+
+    def test_writes_invalidate(self):
+        """Test that adding images and clearing invalidate cached results."""
+        generation = self.db.get_data_generation()
+        self.assertEqual(
+            len(search_utils.search_images(self.db, text_query="beach")), 1
+        )
+
+        self.add_image("beach2", "Another beach at sunset")
+        self.assertGreater(self.db.get_data_generation(), generation)
+        self.assertEqual(
+            len(search_utils.search_images(self.db, text_query="beach")), 2
+        )
+
+        self.db.clear()
+        self.assertEqual(search_utils.search_images(self.db, text_query="beach"), [])
+
+    def test_generation_checks(self):
+        """Test that hits reuse the generation until writes or the interval."""
+        search_utils.search_images(self.db, text_query="beach")
+        with patch.object(self.db, "get_data_generation") as mock_generation:
+            search_utils.search_images(self.db, text_query="beach")
+            mock_generation.assert_not_called()
+
+        # Writes by another process are noticed once the interval has passed
+        ImageDatabase(self.db_path).add_image(
+            {"file_path": "/path/to/beach2.jpg", "description": "Another beach"}
+        )
+        self.assertEqual(
+            len(search_utils.search_images(self.db, text_query="beach")), 1
+        )
+        search_utils._result_cache.generation_check_interval = 0
+        self.assertEqual(
+            len(search_utils.search_images(self.db, text_query="beach")), 2
+        )
+
+    def test_add_embedding_invalidates(self):
+        """Test that adding an embedding bumps the data generation."""
+        generation = self.db.get_data_generation()
+        self.db.add_embedding(
+            1, {"text": "beach", "model": "test-model", "embedding": np.ones(8)}
+        )
+        self.assertGreater(self.db.get_data_generation(), generation)
+
+    def test_recreated_database_is_not_served_stale_results(self):
+        """Test that a new database at the same path starts a new generation."""
+        self.assertEqual(
+            len(search_utils.search_images(self.db, text_query="beach")), 1
+        )
+
+        os.unlink(self.db_path)
+        self.db = ImageDatabase(self.db_path)
+        self.assertEqual(search_utils.search_images(self.db, text_query="beach"), [])
+
+    def test_disk_tier(self):
+        """Test that the disk tier stores IDs and scores across processes."""
+        cache_dir = os.path.join(self.temp_dir, "cache")
+        search_utils.configure_cache(directory=cache_dir)
+        params = {"query": "beach", "limit": 5}
+        _, token = search_utils.get_cached_results(self.db, "semantic", params)
+        search_utils.cache_results(
+            token, [dict(self.db.get_images([1])[0], similarity=0.75)]
+        )
+
+        # A new cache (e.g. in another worker) has an empty memory tier
+        search_utils.configure_cache(directory=cache_dir)
+        results, _ = search_utils.get_cached_results(self.db, "semantic", params)
+        self.assertEqual(results[0]["filename"], "beach.jpg")
+        self.assertEqual(results[0]["similarity"], 0.75)
+
+    def test_disabled(self):
+        """Test that a disabled cache always runs the search."""
+        search_utils.configure_cache(enabled=False)
+        search_utils.search_images(self.db, text_query="beach")
+        with patch.object(
+            self.db, "filter_search", return_value=[]
+        ) as mock_filter_search:
+            search_utils.search_images(self.db, text_query="beach")
+            mock_filter_search.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Unit tests for the search daemon.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from wheresmy.cli import search_cli
+from wheresmy.core.database import ImageDatabase
+from wheresmy.search import daemon
+from wheresmy.search import search as search_utils
+
+
+@unittest.skipUnless(daemon.daemon_supported(), "Unix sockets are not supported")
+class TestSearchDaemon(unittest.TestCase):
+    """Test searching through a daemon over a Unix socket."""
+
+    def setUp(self):
+        """Start a daemon serving a small database."""
+        self.temp_dir = tempfile.mkdtemp(prefix="wheresmy_daemon_")
+        self.db_path = os.path.join(self.temp_dir, "test.db")
+        self.socket_path = os.path.join(self.temp_dir, "search.sock")
+        self.db = ImageDatabase(self.db_path)
+        self.image_id = self.db.add_image(
+            {
+                "file_path": "/path/to/beach.jpg",
+                "filename": "beach.jpg",
+                "description": "A sandy beach with palm trees",
+            }
+        )
+
+        self.daemon = daemon.SearchDaemon(
+            self.db_path, socket_path=self.socket_path, preload=False
+        )
+        self.thread = threading.Thread(target=self.daemon.serve_forever, daemon=True)
+        self.thread.start()
+        self.assertTrue(self.daemon.ready.wait(5))
+
+    def tearDown(self):
+        """Stop the daemon and remove the temporary files."""
+        self.daemon.shutdown()
+        self.thread.join(5)
+        shutil.rmtree(self.temp_dir)
+
+    def test_search_matches_in_process(self):
+        """Test that the daemon returns the same results as an in-process search."""
+        client = daemon.connect(self.db_path, socket_path=self.socket_path)
+        self.assertIsNotNone(client)
+
+        results = client.call("search_images", text_query="beach", limit=5)
+        expected = search_utils.search_images(self.db, text_query="beach", limit=5)
+        self.assertEqual([r["id"] for r in results], [r["id"] for r in expected])
+
+        image = client.call("get_image_by_id", image_id=self.image_id)
+        self.assertEqual(image["filename"], "beach.jpg")
+        self.assertIsNone(client.call("get_image_by_id", image_id=self.image_id + 1))
+
+    def test_errors(self):
+        """Test that invalid requests are reported as daemon errors."""
+        client = daemon.SearchClient(self.socket_path)
+        with self.assertRaises(daemon.DaemonError):
+            client.call("clear")
+        with self.assertRaises(daemon.DaemonError):
+            client.call("search_images", unknown=1)
+
+    def test_stale_socket_is_replaced(self):
+        """Test that a running daemon is not replaced, but a stale socket is."""
+        other = daemon.SearchDaemon(
+            self.db_path, socket_path=self.socket_path, preload=False
+        )
+        with self.assertRaises(RuntimeError):
+            other.serve_forever()
+
+        self.daemon.shutdown()
+        self.thread.join(5)
+        # Leave a socket file behind, as a killed daemon would
+        open(self.socket_path, "w").close()
+        client = daemon.connect(self.db_path, socket_path=self.socket_path)
+        with self.assertRaises(OSError):
+            client.call("ping")
+
+        self.daemon = other
+        self.thread = threading.Thread(target=other.serve_forever, daemon=True)
+        self.thread.start()
+        self.assertTrue(other.ready.wait(5))
+        self.assertEqual(client.call("ping")["db_path"], self.db_path)
+
+    def test_cli_uses_daemon(self):
+        """Test that the CLI searches through a running daemon."""
+        argv = ["wheresmy_search", "--db", self.db_path, "image", str(self.image_id)]
+        argv += ["--json", "--socket", self.socket_path]
+        with patch("sys.argv", argv), patch.object(
+            self.daemon, "handle", wraps=self.daemon.handle
+        ) as handle:
+            self.assertEqual(search_cli.main(), 0)
+        handle.assert_called_once_with("get_image_by_id", {"image_id": self.image_id})
+
+    def test_cli_options_skip_daemon(self):
+        """Test that searches with their own cache or inference options run in-process."""
+        argv = ["wheresmy_search", "--db", self.db_path, "search", "-q", "beach"]
+        argv += ["--socket", self.socket_path, "--json", "--no-cache"]
+        with patch("sys.argv", argv), patch.object(self.daemon, "handle") as handle:
+            self.assertEqual(search_cli.main(), 0)
+        handle.assert_not_called()
+
+    def test_cli_falls_back_without_daemon(self):
+        """Test that the CLI searches in-process when no daemon is running."""
+        self.assertIsNone(
+            daemon.connect(
+                self.db_path, socket_path=os.path.join(self.temp_dir, "none.sock")
+            )
+        )
+
+        argv = ["wheresmy_search", "--db", self.db_path, "search", "-q", "beach"]
+        argv += ["--socket", os.path.join(self.temp_dir, "none.sock"), "--json"]
+        with patch("sys.argv", argv), patch.object(self.daemon, "handle") as handle:
+            self.assertEqual(search_cli.main(), 0)
+        handle.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Unit tests for the full-text search index.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from wheresmy.core.database import ImageDatabase
+
+# Filename, description and camera make of the test images
+IMAGES = [
+    ("beach.jpg", "A city street at night", "Canon"),
+    ("street.jpg", "Waves on a sandy beach", "Canon"),
+    ("dog.jpg", "A dog asleep in the garden", "Beach Optics"),
+    ("garden.jpg", "A golden gate in the garden", "Nikon"),
+]
+
+
+class TestSearchIndex(unittest.TestCase):
+    """Test ranking, prefix queries and maintenance of the search index."""
+
+    def setUp(self):
+        """Create a database with a few described images."""
+        self.temp_dir = tempfile.mkdtemp(prefix="wheresmy_search_index_")
+        self.db = ImageDatabase(os.path.join(self.temp_dir, "test.db"))
+        for filename, description, make in IMAGES:
+            self.db.add_image(
+                {
+                    "file_path": f"/photos/{filename}",
+                    "filename": filename,
+                    "description": description,
+                    "exif": {"Make": make},
+                }
+            )
+
+    def tearDown(self):
+        """Remove the temporary files."""
+        shutil.rmtree(self.temp_dir)
+
+    def search_names(self, query):
+        """Get the filenames of the ranked results of a query."""
+        return [image["filename"] for image in self.db.search(query)]
+
+    def check_integrity(self, db_path):
+        """Check that the index matches the images table."""
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "INSERT INTO image_search(image_search) VALUES ('integrity-check')"
+        )
+        conn.close()
+
+    def test_column_weights(self):
+        """Test that description matches outrank filename and camera matches."""
+        self.assertEqual(
+            self.search_names("beach"), ["street.jpg", "beach.jpg", "dog.jpg"]
+        )
+
+    def test_queries(self):
+        """Test prefix, phrase and column queries."""
+        self.assertEqual(self.search_names("gard*"), ["garden.jpg", "dog.jpg"])
+        self.assertEqual(len(self.search_names("ga*")), 2)
+        self.assertEqual(self.search_names('"golden gate"'), ["garden.jpg"])
+        self.assertEqual(self.search_names("camera_make:nikon"), ["garden.jpg"])
+
+    def test_optimize(self):
+        """Test that the index stays consistent through updates and optimizing."""
+        self.db.add_image(
+            {
+                "file_path": "/photos/dog.jpg",
+                "filename": "dog.jpg",
+                "description": "A cat on the sofa",
+            }
+        )
+        self.db.optimize_search_index()
+        self.check_integrity(self.db.db_path)
+        self.assertEqual(self.search_names("dog"), ["dog.jpg"])
+        self.assertEqual(self.search_names("cat"), ["dog.jpg"])
+        self.assertEqual(self.search_names("optics"), [])
+
+    def test_migration_rebuilds_index(self):
+        """Test upgrading a version 10 database with an indexed id column."""
+        conn = sqlite3.connect(self.db.db_path)
+        conn.execute("DROP TRIGGER image_insert_trigger")
+        conn.execute("DROP TABLE image_search")
+        conn.execute(
+            """
+            CREATE VIRTUAL TABLE image_search USING fts5(
+                id, filename, description, camera_make, camera_model,
+                place_city, place_region, place_country,
+                content='images', content_rowid='id', tokenize='porter unicode61'
+            )
+            """
+        )
+        conn.execute("UPDATE db_version SET version = 10")
+        conn.commit()
+        conn.close()
+
+        db = ImageDatabase(self.db.db_path)
+        self.check_integrity(db.db_path)
+        self.assertEqual(
+            [image["filename"] for image in db.search("beach")],
+            ["street.jpg", "beach.jpg", "dog.jpg"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Unit tests for streamed search results.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from wheresmy.core.database import ImageDatabase
+from wheresmy.web_app import create_app
+
+
+class TestStreamingSearch(unittest.TestCase):
+    """Test the cursor-backed search generator and NDJSON output."""
+
+    def setUp(self):
+        """Create a database with a few dated images."""
+        self.temp_dir = tempfile.mkdtemp(prefix="wheresmy_stream_")
+        self.db_path = os.path.join(self.temp_dir, "test.db")
+        self.db = ImageDatabase(self.db_path)
+        for i in range(12):
+            self.db.add_image(
+                {
+                    "file_path": f"/path/to/test_{i}.jpg",
+                    "filename": f"test_{i}.jpg",
+                    "description": f"A beach photo number {i}",
+                    "exif": {"DateTimeOriginal": f"2020:01:{i + 1:02d} 12:00:00"},
+                }
+            )
+
+    def tearDown(self):
+        """Remove the temporary database."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_iter_matches_filter_search(self):
+        """Test that streamed results match the list-based search."""
+        expected = self.db.filter_search(text_query="beach", limit=5, offset=2)
+        streamed = list(
+            self.db.iter_filter_search(
+                text_query="beach", limit=5, offset=2, batch_size=2
+            )
+        )
+        self.assertEqual(streamed, expected)
+
+    def test_iter_without_limit(self):
+        """Test that streaming without a limit returns every match."""
+        results = self.db.iter_filter_search(text_query="beach", batch_size=5)
+        self.assertEqual(len(list(results)), 12)
+
+    def test_ndjson_endpoint(self):
+        """Test that /api/search streams one JSON object per line."""
+        client = create_app(self.db_path).test_client()
+
+        response = client.get("/api/search?q=beach&format=ndjson")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(len(lines), 12)
+        self.assertIn("filename", json.loads(lines[0]))
+
+        response = client.get(
+            "/api/search?q=beach&limit=3", headers={"Accept": "application/x-ndjson"}
+        )
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Unit tests for type-ahead suggestions.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from wheresmy.core.database import ImageDatabase
+from wheresmy.search import suggest
+
+# Filename, description, camera make and model, city and capture year
+IMAGES = [
+    ("1.jpg", "Waves on a sandy beach", "Canon", "Canon EOS R5", "Lisbon", "2019"),
+    ("2.jpg", "Beach umbrellas in the sun", "Canon", "Canon EOS R5", "Lisbon", "2019"),
+    ("3.jpg", "A café on a busy street", "NIKON CORPORATION", "D750", "Berlin", "2021"),
+]
+
+
+class TestSuggest(unittest.TestCase):
+    """Test suggestion lookups and keeping them up to date."""
+
+    def setUp(self):
+        """Create a database with a few described and geocoded images."""
+        self.temp_dir = tempfile.mkdtemp(prefix="wheresmy_suggest_")
+        self.db = ImageDatabase(os.path.join(self.temp_dir, "test.db"))
+        for i, (filename, description, make, model, city, year) in enumerate(IMAGES):
+            image_id = self.db.add_image(
+                {
+                    "file_path": f"/photos/{filename}",
+                    "filename": filename,
+                    "description": description,
+                    "exif": {
+                        "Make": make,
+                        "Model": model,
+                        "DateTimeOriginal": f"{year}:06:0{i + 1} 12:00:00",
+                    },
+                }
+            )
+            self.db.set_places([(image_id, (city, None, "Somewhere"))])
+        self.suggester = suggest.Suggester(self.db, refresh_interval=0)
+
+    def tearDown(self):
+        """Remove the temporary files."""
+        shutil.rmtree(self.temp_dir)
+
+    def texts(self, query, **kwargs):
+        """Get the texts of the suggestions for a query."""
+        return [s["text"] for s in self.suggester.suggest(query, **kwargs)]
+
+    def test_complete(self):
+        """Test completions of each kind and their ranking."""
+        self.assertEqual(self.texts("b"), ["beach", "Berlin", "busy"])
+        self.assertEqual(self.texts("CAFE"), ["cafe"])
+        self.assertEqual(self.texts("lis"), ["Lisbon"])
+        self.assertEqual(self.texts("20"), ["2019", "2021"])
+        self.assertEqual(self.texts("20", limit=1), ["2019"])
+        self.assertEqual(self.texts("nikon"), ["NIKON CORPORATION D750"])
+        self.assertEqual(self.texts("eos"), ["Canon EOS R5"])
+        self.assertEqual(self.texts("sandy be"), ["sandy beach"])
+        self.assertEqual(self.texts("the"), [])
+        self.assertEqual(self.texts("  "), [])
+
+        (camera,) = self.suggester.suggest("d75")
+        self.assertEqual((camera["kind"], camera["count"]), ("camera", 1))
+        self.assertEqual(
+            (camera["make"], camera["model"]), ("NIKON CORPORATION", "D750")
+        )
+
+    def test_refresh(self):
+        """Test that changed descriptions replace their words."""
+        self.assertEqual(self.texts("umb"), ["umbrellas"])
+        self.db.add_image(
+            {
+                "file_path": "/photos/2.jpg",
+                "filename": "2.jpg",
+                "description": "Deck chairs in the shade",
+            }
+        )
+        self.assertEqual(self.texts("umb"), [])
+        self.assertEqual(self.texts("dec"), ["deck"])
+
+        # Lookups between checks use the index already built
+        self.suggester.refresh_interval = 3600
+        self.db.clear()
+        self.assertEqual(self.texts("dec"), ["deck"])
+
+    def test_migration_adds_terms(self):
+        """Test upgrading a version 11 database without suggestion terms."""
+        conn = sqlite3.connect(self.db.db_path)
+        for trigger in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER image_terms_{trigger}_trigger")
+        conn.execute("DROP TABLE image_terms_vocab")
+        conn.execute("DROP TABLE image_terms")
+        conn.execute("UPDATE db_version SET version = 11")
+        conn.commit()
+        conn.close()
+
+        db = ImageDatabase(self.db.db_path)
+        self.assertEqual(
+            [s["text"] for s in suggest.Suggester(db).suggest("beach")], ["beach"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -133,6 +133,23 @@ class TestTextEmbeddingGenerator(unittest.TestCase):
                     np.array_equal(result["embedding"], results[0]["embedding"])
                 )
 
+    @patch(
+        "wheresmy.core.text_embeddings.SentenceTransformer", return_value=MagicMock()
+    )
+    def test_generate_embeddings_single_encode_call(self, mock_sentence_transformer):
+        """Test that a batch is encoded with one model call and a batch size."""
+        from wheresmy.core.text_embeddings import TextEmbeddingGenerator
+
+        mock_model = mock_sentence_transformer.return_value
+        mock_model.encode.return_value = np.ones((3, 384))
+
+        generator = TextEmbeddingGenerator()
+        results = generator.generate_embeddings(["a", "bb", "ccc"], batch_size=2)
+
+        self.assertEqual(len(results), 3)
+        mock_model.encode.assert_called_once()
+        self.assertEqual(mock_model.encode.call_args.kwargs["batch_size"], 2)
+
     @patch(
         "wheresmy.core.text_embeddings.SentenceTransformer",
         return_value=MockEmbeddingModel(),
@@ -197,6 +214,34 @@ class TestTextEmbeddingGenerator(unittest.TestCase):
         # Check model was stored
         self.assertEqual(generator.model_name, custom_model)
 
+    @patch("wheresmy.core.text_embeddings.SentenceTransformer")
+    def test_cpu_inference_options(self, mock_sentence_transformer):
+        """Test quantization, thread count and sequence length options."""
+        import torch
+        from wheresmy.core.text_embeddings import TextEmbeddingGenerator
+
+        mock_sentence_transformer.return_value = torch.nn.Sequential(
+            torch.nn.Linear(8, 4)
+        )
+        previous_threads = torch.get_num_threads()
+        try:
+            generator = TextEmbeddingGenerator(
+                quantize=True, num_threads=1, max_seq_length=64
+            )
+            self.assertEqual(torch.get_num_threads(), 1)
+        finally:
+            torch.set_num_threads(previous_threads)
+
+        mock_sentence_transformer.assert_called_once_with(
+            TextEmbeddingGenerator.DEFAULT_MODEL_NAME
+        )
+        self.assertTrue(generator.quantized)
+        self.assertEqual(generator.model.max_seq_length, 64)
+        self.assertNotIsInstance(generator.model[0], torch.nn.Linear)
+
+        with self.assertRaises(ValueError):
+            TextEmbeddingGenerator(backend="tensorrt")
+
     @patch(
         "wheresmy.core.text_embeddings.SentenceTransformer",
         return_value=MockEmbeddingModel(),
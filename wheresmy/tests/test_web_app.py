@@ -0,0 +1,321 @@
+"""
+Unit tests for the web application.
+"""
+
+import os
+import shutil
+import tempfile
+import io
+import gzip
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from wheresmy import responses
+from wheresmy.search import search as search_utils
+from wheresmy.tests.test_async_search import RecordingGenerator
+from wheresmy.web_app import create_app, get_db
+
+
+class TestWebApp(unittest.TestCase):
+    """Test the web application created by create_app."""
+
+    def setUp(self):
+        """Create an application with a small database."""
+        self.temp_dir = tempfile.mkdtemp(prefix="wheresmy_web_")
+        self.app = create_app(os.path.join(self.temp_dir, "test.db"))
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            self.image_id = get_db().add_image(
+                {
+                    "file_path": "/path/to/beach.jpg",
+                    "filename": "beach.jpg",
+                    "format": "JPEG",
+                    "width": 800,
+                    "height": 600,
+                    "exif": {"Make": "Apple", "Model": "iPhone 12"},
+                    "vlm_description": {
+                        "description": "A sandy beach with palm trees",
+                        "model": "TestVLM",
+                    },
+                }
+            )
+
+    def tearDown(self):
+        """Remove the temporary database."""
+        self.app.config["ASYNC_SEARCHER"].close()
+        search_utils._embedding_generators.pop(RecordingGenerator.model_name, None)
+        shutil.rmtree(self.temp_dir)
+
+    def test_search(self):
+        """Test the search endpoint."""
+        response = self.client.get("/api/search?q=beach")
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data["total"], 1)
+        self.assertEqual(data["results"][0]["id"], self.image_id)
+
+    def test_suggest(self):
+        """Test the type-ahead suggestion endpoint."""
+        response = self.client.get("/api/suggest?q=pal")
+        self.assertEqual(response.status_code, 200)
+        (suggestion,) = response.get_json()["suggestions"]
+        self.assertEqual((suggestion["text"], suggestion["kind"]), ("palm", "term"))
+
+        response = self.client.get("/api/suggest?q=iph")
+        (suggestion,) = response.get_json()["suggestions"]
+        self.assertEqual(suggestion["model"], "iPhone 12")
+        self.assertEqual(self.client.get("/api/suggest").get_json()["suggestions"], [])
+
+    def test_location_search(self):
+        """Test the bbox and near parameters of the search endpoint."""
+        with self.app.app_context():
+            image_id = get_db().add_image(
+                {
+                    "file_path": "/path/to/eiffel.jpg",
+                    "filename": "eiffel.jpg",
+                    "exif": {"GPS": {"latitude": 48.8584, "longitude": 2.2945}},
+                }
+            )
+
+        response = self.client.get("/api/search?near=48.86,2.29,2")
+        self.assertEqual([r["id"] for r in response.get_json()["results"]], [image_id])
+        response = self.client.get("/api/search?bbox=48,2,49,3&format=ndjson")
+        self.assertEqual(response.get_data(as_text=True).count("\n"), 1)
+
+        response = self.client.get("/api/search?near=48.86,2.29")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get("/api/clusters?zoom=3&bbox=40,-10,60,10")
+        (cluster,) = response.get_json()["clusters"]
+        self.assertEqual((cluster["count"], cluster["image_id"]), (1, image_id))
+
+    def test_image_detail(self):
+        """Test the image detail endpoint."""
+        response = self.client.get(f"/api/image/{self.image_id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["filename"], "beach.jpg")
+
+        response = self.client.get(f"/api/image/{self.image_id + 1}")
+        self.assertEqual(response.status_code, 404)
+
+    def add_image_file(self, size):
+        """Add an image backed by a real JPEG file of the given size."""
+        path = os.path.join(self.temp_dir, f"photo_{size[0]}.jpg")
+        Image.new("RGB", size, color="#336699").save(path, "JPEG")
+        with self.app.app_context():
+            return get_db().add_image({"file_path": path, "filename": "photo.jpg"})
+
+    def test_serve_image_conditional_and_range(self):
+        """Test ETag/304 and Range handling of original images."""
+        image_id = self.add_image_file((400, 300))
+
+        response = self.client.get(f"/image/{image_id}")
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+        self.assertIn("Last-Modified", response.headers)
+        length = len(response.get_data())
+        response.close()
+
+        response = self.client.get(
+            f"/image/{image_id}", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(f"/image/{image_id}", headers={"Range": "bytes=0-9"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(len(response.get_data()), 10)
+        self.assertEqual(response.headers["Content-Range"], f"bytes 0-9/{length}")
+        response.close()
+
+        # Originals removed after import are not found
+        os.remove(os.path.join(self.temp_dir, "photo_400.jpg"))
+        self.assertEqual(self.client.get(f"/image/{image_id}").status_code, 404)
+        self.assertEqual(self.client.get(f"/image/{image_id}?max=300").status_code, 404)
+
+    def test_serve_image_preview(self):
+        """Test downscaled, cached preview renditions."""
+        image_id = self.add_image_file((3000, 2000))
+
+        response = self.client.get(f"/image/{image_id}?max=300")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "image/jpeg")
+        preview = Image.open(io.BytesIO(response.get_data()))
+        self.assertEqual(max(preview.size), 320)
+        response.close()
+
+        previews = os.listdir(self.app.config["PREVIEW_CACHE_DIR"])
+        self.assertEqual(len(previews), 1)
+
+        # Originals smaller than the requested size are served as is, and
+        # are not counted as renders
+        def preview_renders():
+            text = self.client.get("/metrics").get_data(as_text=True)
+            prefix = 'wheresmy_thumbnail_seconds_count{kind="preview"} '
+            (line,) = [line for line in text.splitlines() if line.startswith(prefix)]
+            return line
+
+        renders = preview_renders()
+        small_id = self.add_image_file((200, 100))
+        response = self.client.get(f"/image/{small_id}?max=1024")
+        self.assertEqual(Image.open(io.BytesIO(response.get_data())).size, (200, 100))
+        response.close()
+        self.assertEqual(preview_renders(), renders)
+
+    def test_semantic_search(self):
+        """Test the async semantic search endpoint."""
+        embedding = np.zeros(8)
+        embedding[1] = 1.0
+        with self.app.app_context():
+            get_db().add_embedding(
+                self.image_id,
+                {"text": "beach", "model": "test-model", "embedding": embedding},
+            )
+        search_utils._embedding_generators["test-model"] = RecordingGenerator()
+
+        response = self.client.get("/api/semantic_search?q=query 1")
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data["results"][0]["id"], self.image_id)
+        self.assertAlmostEqual(data["results"][0]["similarity"], 1.0)
+
+        response = self.client.get("/api/semantic_search?q=")
+        self.assertEqual(response.status_code, 400)
+
+    def test_semantic_search_invalid_parameters(self):
+        """Test that invalid limits and text weights are rejected."""
+        for params in (
+            "limit=abc",
+            "limit=0",
+            "limit=-5",
+            "mode=hybrid&text_weight=x",
+            "mode=hybrid&text_weight=1.5",
+        ):
+            response = self.client.get(f"/api/semantic_search?q=beach&{params}")
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn("error", response.get_json())
+
+    def test_apps_have_separate_databases(self):
+        """Test that each application gets its own database."""
+        other_app = create_app(os.path.join(self.temp_dir, "other.db"))
+        response = other_app.test_client().get("/api/stats")
+        self.assertEqual(response.get_json()["stats"]["total_images"], 0)
+
+    def test_response_compression(self):
+        """Test that large responses are compressed as negotiated."""
+        with self.app.app_context():
+            for i in range(20):
+                get_db().add_image(
+                    {
+                        "file_path": f"/path/to/beach_{i}.jpg",
+                        "filename": f"beach_{i}.jpg",
+                        "description": "Another sandy beach",
+                    }
+                )
+
+        response = self.client.get(
+            "/api/search?q=beach", headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        data = gzip.decompress(response.get_data())
+        self.assertIn(b'"total":21', data)
+
+        if responses.BROTLI_SUPPORT:
+            response = self.client.get(
+                "/api/search?q=beach", headers={"Accept-Encoding": "gzip, br"}
+            )
+            self.assertEqual(response.headers["Content-Encoding"], "br")
+
+        # Identity when not accepted, and below the size threshold
+        response = self.client.get("/api/search?q=beach")
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(response.get_json()["total"], 21)
+        response = self.client.get(
+            f"/api/image/{self.image_id}", headers={"Accept-Encoding": "gzip;q=0"}
+        )
+        self.assertNotIn("Content-Encoding", response.headers)
+
+        # Streamed responses are not buffered for compression
+        response = self.client.get(
+            "/api/search?q=beach&format=ndjson", headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertNotIn("Content-Encoding", response.headers)
+
+    @unittest.skipUnless(responses.ORJSON_SUPPORT, "orjson is not installed")
+    def test_json_provider_options(self):
+        """Test that json.dumps options are honored by the orjson provider."""
+        provider = responses.OrjsonProvider(self.app)
+        obj = {"b": 1, "a": [1]}
+        self.assertEqual(provider.dumps(obj), '{"b":1,"a":[1]}')
+        self.assertEqual(provider.dumps(obj, sort_keys=True), '{"a":[1],"b":1}')
+        self.assertEqual(
+            provider.dumps(obj, indent=2), '{\n  "b": 1,\n  "a": [\n    1\n  ]\n}'
+        )
+        self.assertEqual(
+            provider.dumps(obj, separators=(",", "="), sort_keys=False),
+            '{"b"=1,"a"=[1]}',
+        )
+
+    def test_precompressed_static(self):
+        """Test that precompressed static assets are served when accepted."""
+        static_dir = os.path.join(self.temp_dir, "static")
+        os.makedirs(os.path.join(static_dir, "css"))
+        css = b"body { margin: 0; }\n" * 100
+        with open(os.path.join(static_dir, "css", "styles.css"), "wb") as f:
+            f.write(css)
+        self.app.static_folder = static_dir
+
+        written = responses.precompress_static(static_dir)
+        self.assertEqual(written, 2 if responses.BROTLI_SUPPORT else 1)
+        self.assertEqual(responses.precompress_static(static_dir), 0)
+
+        response = self.client.get(
+            "/static/css/styles.css", headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.mimetype, "text/css")
+        self.assertEqual(gzip.decompress(response.get_data()), css)
+        response.close()
+
+        response = self.client.get("/static/css/styles.css")
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(response.get_data(), css)
+        response.close()
+
+        # Stale copies, and apps without compression, serve the original
+        os.utime(os.path.join(static_dir, "css", "styles.css.gz"), (0, 0))
+        response = self.client.get(
+            "/static/css/styles.css", headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertNotIn("Content-Encoding", response.headers)
+        response.close()
+
+        other_app = create_app(
+            os.path.join(self.temp_dir, "other.db"), compress_responses=False
+        )
+        self.assertNotEqual(other_app.view_functions["static"], responses.send_static)
+
+    def test_metrics(self):
+        """Test that request and query timings are exposed for Prometheus."""
+        self.client.get("/api/search?q=beach")
+        self.client.get(f"/api/image/{self.image_id}")
+
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/plain")
+        text = response.get_data(as_text=True)
+        self.assertIn("# TYPE wheresmy_http_request_seconds histogram", text)
+        self.assertIn(
+            'wheresmy_http_request_seconds_count{endpoint="wheresmy.search",'
+            'status="200"}',
+            text,
+        )
+        self.assertIn('wheresmy_db_query_seconds_count{method="get_image"}', text)
+        self.assertIn("wheresmy_json_decode_seconds_count", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
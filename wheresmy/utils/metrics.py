@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Instrumentation Utility
+
+This module provides a small, dependency-free instrumentation layer for
+the hot paths of the application:
+- Counter counts events, e.g. cache hits
+- Histogram records durations in buckets, plus a window of recent samples
+  for p50/p99 summaries
+- Registry holds the metrics of a process and renders them in the
+  Prometheus text exposition format
+
+Hot paths register their metrics on the module-level REGISTRY at import
+time and time blocks with ``with HISTOGRAM.time(stage=...)`` or the
+``HISTOGRAM.timed(...)`` decorator. Recording a sample costs a clock read
+and a lock acquisition, so metrics are always on.
+"""
+
+import sys
+import time
+import bisect
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, TextIO
+
+# Prefix of every exported metric name
+METRIC_PREFIX = "wheresmy_"
+
+# Histogram bucket upper bounds in seconds, from sub-millisecond database
+# lookups to VLM generation
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+# Number of recent samples kept per series for quantile summaries
+SAMPLE_WINDOW = 2048
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value for the text exposition format."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Format a label set as {name="value",...}, or "" when empty."""
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape_label(value)}"' for name, value in labels.items()
+    )
+    return "{" + pairs + "}"
+
+
+def quantile(samples: Sequence[float], q: float) -> Optional[float]:
+    """
+    Get a quantile of samples with the nearest-rank method.
+
+    Args:
+        samples: Sample values
+        q: Quantile between 0 and 1
+
+    Returns:
+        The quantile, or None without samples
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class _Metric:
+    """Base class of metrics with a fixed set of label names."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        """
+        Initialize the metric.
+
+        Args:
+            name: Metric name without the wheresmy_ prefix
+            documentation: Help text
+            label_names: Names of the labels every sample must set
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._series: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> tuple:
+        """Get the series key of a label set."""
+        if len(labels) == len(self.label_names):
+            try:
+                return tuple([str(labels[name]) for name in self.label_names])
+            except KeyError:
+                pass
+        raise ValueError(
+            f"{self.name} expects labels {self.label_names}, got {tuple(labels)}"
+        )
+
+    def _labels(self, key: tuple) -> Dict[str, str]:
+        """Get the label set of a series key."""
+        return dict(zip(self.label_names, key))
+
+    def reset(self) -> None:
+        """Remove all recorded samples."""
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(_Metric):
+    """A monotonically increasing count."""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """
+        Increase the count of a series.
+
+        Args:
+            amount: Amount to add
+            **labels: Label values of the series
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        """Get the count of a series."""
+        with self._lock:
+            return self._series.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        """Render the samples of all series."""
+        with self._lock:
+            series = sorted(self._series.items())
+        return [
+            f"{METRIC_PREFIX}{self.name}{_format_labels(self._labels(key))} "
+            f"{_format_value(value)}"
+            for key, value in series
+        ]
+
+
+class _HistogramSeries:
+    """Bucket counts, sum and recent samples of one label set."""
+
+    __slots__ = ("counts", "total", "count", "recent")
+
+    def __init__(self, bucket_count: int):
+        self.counts = [0] * bucket_count
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=SAMPLE_WINDOW)
+
+
+class _Timer:
+    """Context manager recording the duration of a block in a histogram."""
+
+    __slots__ = ("histogram", "key", "start", "elapsed")
+
+    def __init__(self, histogram: "Histogram", key: tuple):
+        self.histogram = histogram
+        self.key = key
+        self.start = 0.0
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> bool:
+        self.elapsed = time.perf_counter() - self.start
+        self.histogram._observe(self.key, self.elapsed)
+        return False
+
+
+class Histogram(_Metric):
+    """A distribution of durations in seconds."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        """
+        Initialize the histogram.
+
+        Args:
+            name: Metric name without the wheresmy_ prefix
+            documentation: Help text
+            label_names: Names of the labels every sample must set
+            buckets: Increasing bucket upper bounds; +Inf is implied
+        """
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """
+        Record a sample.
+
+        Args:
+            value: Sample value, e.g. a duration in seconds
+            **labels: Label values of the series
+        """
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key: tuple, value: float) -> None:
+        """Record a sample in the series of a validated key."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets) + 1)
+            series.counts[index] += 1
+            series.total += value
+            series.count += 1
+            series.recent.append(value)
+
+    def time(self, **labels: Any) -> _Timer:
+        """
+        Time a block; the timer's ``elapsed`` attribute holds the duration.
+
+        Args:
+            **labels: Label values of the series
+
+        Returns:
+            Context manager recording the block's duration
+        """
+        return _Timer(self, self._key(labels))
+
+    def timed(self, **labels: Any) -> Callable:
+        """
+        Decorate a function to record the duration of each call.
+
+        Args:
+            **labels: Label values of the series
+
+        Returns:
+            Decorator
+        """
+
+        key = self._key(labels)
+
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Timer(self, key):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Summarize each series.
+
+        Returns:
+            List of dictionaries with the labels, count, total and the p50
+            and p99 of the recent samples, sorted by label values
+        """
+        with self._lock:
+            series = [
+                (key, s.count, s.total, list(s.recent))
+                for key, s in sorted(self._series.items())
+            ]
+        return [
+            {
+                "labels": self._labels(key),
+                "count": count,
+                "total": total,
+                "p50": quantile(recent, 0.50),
+                "p99": quantile(recent, 0.99),
+            }
+            for key, count, total, recent in series
+        ]
+
+    def render(self) -> List[str]:
+        """Render the buckets, sum and count of all series."""
+        with self._lock:
+            series = [
+                (key, list(s.counts), s.total, s.count)
+                for key, s in sorted(self._series.items())
+            ]
+
+        name = METRIC_PREFIX + self.name
+        lines = []
+        for key, counts, total, count in series:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                bucket_labels = dict(labels, le=_format_value(bound))
+                lines.append(
+                    f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}"
+                )
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Registry:
+    """The metrics of a process."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls: type, name: str, *args: Any, **kwargs: Any) -> Any:
+        """Get a registered metric, or register a new one."""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {cls}")
+            return metric
+
+    def counter(
+        self, name: str, documentation: str, label_names: Sequence[str] = ()
+    ) -> Counter:
+        """
+        Get or register a counter.
+
+        Args:
+            name: Metric name without the wheresmy_ prefix, ending in _total
+            documentation: Help text
+            label_names: Names of the labels every sample must set
+
+        Returns:
+            The counter
+        """
+        return self._register(Counter, name, documentation, label_names)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """
+        Get or register a histogram.
+
+        Args:
+            name: Metric name without the wheresmy_ prefix, ending in a unit
+            documentation: Help text
+            label_names: Names of the labels every sample must set
+            buckets: Increasing bucket upper bounds
+
+        Returns:
+            The histogram
+        """
+        return self._register(Histogram, name, documentation, label_names, buckets)
+
+    def metrics(self) -> List[_Metric]:
+        """Get the registered metrics sorted by name."""
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def reset(self) -> None:
+        """Remove the recorded samples of all metrics."""
+        for metric in self.metrics():
+            metric.reset()
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text (version 0.0.4)
+        """
+        lines = []
+        for metric in self.metrics():
+            name = METRIC_PREFIX + metric.name
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type_name}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def format_summary(self) -> str:
+        """
+        Format a table of the recorded timings and counts.
+
+        Returns:
+            One line per histogram series with its count, total, p50 and p99,
+            followed by one line per counter series
+        """
+        rows = []
+        counts = []
+        for metric in self.metrics():
+            if isinstance(metric, Histogram):
+                for series in metric.summary():
+                    rows.append(
+                        (
+                            metric.name + _format_labels(series["labels"]),
+                            str(series["count"]),
+                            f"{series['total']:.3f}",
+                            f"{series['p50'] * 1000:.2f}",
+                            f"{series['p99'] * 1000:.2f}",
+                        )
+                    )
+            else:
+                for line in metric.render():
+                    counts.append(line[len(METRIC_PREFIX) :])
+
+        if not rows and not counts:
+            return "No metrics recorded"
+
+        header = ("Stage", "Count", "Total (s)", "p50 (ms)", "p99 (ms)")
+        widths = [max(len(row[i]) for row in rows + [header]) for i in range(5)]
+        lines = [
+            "  ".join(
+                cell.ljust(widths[i]) if i == 0 else cell.rjust(widths[i])
+                for i, cell in enumerate(row)
+            )
+            for row in [header] + rows
+        ]
+        if counts:
+            lines += ["", "Counters:"] + [f"  {line}" for line in counts]
+        return "\n".join(lines)
+
+
+# Metrics of this process
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+    """Get or register a counter on the process registry."""
+    return REGISTRY.counter(name, documentation, label_names)
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    label_names: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    """Get or register a histogram on the process registry."""
+    return REGISTRY.histogram(name, documentation, label_names, buckets)
+
+
+@contextmanager
+def profiling(enabled: bool = True, stream: Optional[TextIO] = None) -> Iterator[None]:
+    """
+    Print a summary of the metrics recorded in a block, for --profile options.
+
+    Args:
+        enabled: Whether to record and print the summary
+        stream: Output stream (default: stderr)
+    """
+    if not enabled:
+        yield
+        return
+
+    REGISTRY.reset()
+    try:
+        yield
+    finally:
+        print("\nProfile:", file=stream or sys.stderr)
+        print(REGISTRY.format_summary(), file=stream or sys.stderr)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Preview Rendition Utility
+
+This module provides functions for generating downscaled JPEG previews of
+original images, cached on disk, so viewers do not transfer full-size
+originals.
+"""
+
+import os
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from wheresmy.utils.thumbnail import THUMBNAIL_SECONDS
+
+# Try to import pyheif for HEIC/HEIF originals
+try:
+    import pyheif
+
+    HEIF_SUPPORT = True
+except ImportError:
+    HEIF_SUPPORT = False
+
+logger = logging.getLogger(__name__)
+
+# Preview sizes (longest side in pixels); requests are rounded up to one of
+# these so the cache holds a bounded number of renditions per image
+PREVIEW_SIZES = (320, 640, 1024, 1600, 2048)
+PREVIEW_QUALITY = 85
+
+
+def preview_size(max_dimension: int) -> int:
+    """
+    Round a requested maximum dimension up to a preview size.
+
+    Args:
+        max_dimension: Requested longest side in pixels
+
+    Returns:
+        The smallest preview size at least as large, or the largest size
+    """
+    for size in PREVIEW_SIZES:
+        if max_dimension <= size:
+            return size
+    return PREVIEW_SIZES[-1]
+
+
+def open_image(image_path: str) -> Image.Image:
+    """
+    Open an image, including HEIC/HEIF files when pyheif is installed.
+
+    Args:
+        image_path: Path to the image
+
+    Returns:
+        PIL image
+    """
+    if HEIF_SUPPORT and image_path.lower().endswith((".heic", ".heif")):
+        heif_file = pyheif.read(image_path)
+        return Image.frombytes(
+            heif_file.mode,
+            heif_file.size,
+            heif_file.data,
+            "raw",
+            heif_file.mode,
+            heif_file.stride,
+        )
+    return Image.open(image_path)
+
+
+def create_preview(
+    image_path: str, cache_dir: str, max_dimension: int
+) -> Optional[str]:
+    """
+    Get a cached JPEG preview of an image, creating it if needed.
+
+    Previews are keyed by the original's path, size and modification time,
+    so an edited original gets a new preview. Returns None when the
+    original is already no larger than the preview and can be served as is.
+
+    Args:
+        image_path: Path to the original image
+        cache_dir: Directory of cached previews
+        max_dimension: Requested longest side in pixels
+
+    Returns:
+        Path to the preview, or None to serve the original
+
+    Raises:
+        OSError: If the original cannot be read or decoded
+    """
+    size = preview_size(max_dimension)
+    stat = os.stat(image_path)
+    key = f"{os.path.abspath(image_path)}:{stat.st_size}:{stat.st_mtime_ns}:{size}"
+    preview_path = os.path.join(
+        cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".jpg"
+    )
+
+    if os.path.exists(preview_path):
+        return preview_path
+
+    try:
+        with open_image(image_path) as img:
+            if max(img.size) <= size and img.format == "JPEG":
+                return None
+
+            with THUMBNAIL_SECONDS.time(kind="preview"):
+                # Let the JPEG decoder downscale while decoding
+                img.draft("RGB", (size, size))
+                preview = ImageOps.exif_transpose(img)
+                preview.thumbnail((size, size))
+                if preview.mode != "RGB":
+                    preview = preview.convert("RGB")
+
+                # Write to a temporary file first, so concurrent workers never
+                # serve a partially written preview
+                Path(cache_dir).mkdir(parents=True, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(suffix=".jpg", dir=cache_dir)
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        preview.save(f, "JPEG", quality=PREVIEW_QUALITY, optimize=True)
+                    os.replace(temp_path, preview_path)
+                except BaseException:
+                    os.unlink(temp_path)
+                    raise
+
+        logger.info(f"Created {size}px preview of {image_path}")
+        return preview_path
+    except UnidentifiedImageError as e:
+        raise OSError(f"Cannot decode {image_path}: {str(e)}")
@@ -10,12 +10,20 @@ import logging
 from pathlib import Path
 from PIL import Image, UnidentifiedImageError
 
+from wheresmy.utils import metrics
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+# Time spent rendering thumbnails and previews; cached renditions and
+# originals small enough to serve as is are not counted
+THUMBNAIL_SECONDS = metrics.histogram(
+    "thumbnail_seconds", "Time spent rendering image renditions in seconds", ("kind",)
+)
+
 
 def create_thumbnail(image_path, output_dir, size=(300, 300), format="JPEG"):
     """
@@ -54,20 +62,21 @@ def create_thumbnail(image_path, output_dir, size=(300, 300), format="JPEG"):
         abs_image_path = image_path
 
     try:
-        # Open and create thumbnail
-        img = Image.open(abs_image_path)
-        img.thumbnail(size)
-
-        # Convert RGBA to RGB if saving as JPEG
-        if format.upper() == "JPEG" and img.mode == "RGBA":
-            # Create a white background image
-            background = Image.new("RGB", img.size, (255, 255, 255))
-            # Composite the image with the background
-            background.paste(img, mask=img.split()[3])  # 3 is the alpha channel
-            img = background
-
-        # Save thumbnail
-        img.save(thumbnail_path, format)
+        with THUMBNAIL_SECONDS.time(kind="thumbnail"):
+            # Open and create thumbnail
+            img = Image.open(abs_image_path)
+            img.thumbnail(size)
+
+            # Convert RGBA to RGB if saving as JPEG
+            if format.upper() == "JPEG" and img.mode == "RGBA":
+                # Create a white background image
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                # Composite the image with the background
+                background.paste(img, mask=img.split()[3])  # 3 is the alpha channel
+                img = background
+
+            # Save thumbnail
+            img.save(thumbnail_path, format)
         logger.info(f"Created thumbnail: {thumbnail_path}")
 
         # Return relative path from output_dir
@@ -8,28 +8,43 @@ using text queries, date ranges, and other filters.
 """
 
 import os
+import sys
+import calendar
+import time
+import tempfile
+import itertools
 
-# import json
 # import base64
 import logging
 
 # from datetime import datetime
-# from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, Optional, Any, Tuple
 from pathlib import Path
 
 from flask import (
+    Blueprint,
     Flask,
+    Response,
+    current_app,
+    g,
     request,
     jsonify,
     send_file,
     render_template,
     abort,
-)  # , Response
+    stream_with_context,
+)
 from flask_cors import CORS
 
+from wheresmy.core import geo
 from wheresmy.core.database import ImageDatabase
 from wheresmy.search import search as search_utils
+from wheresmy.search import async_search
 from wheresmy.search import stats as stats_utils
+from wheresmy.search import suggest
+from wheresmy import responses
+from wheresmy.utils import metrics
+from wheresmy.utils.preview import create_preview
 
 # Configure logging
 logging.basicConfig(
@@ -37,17 +52,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create Flask application
-app = Flask(__name__, static_folder="static", template_folder="templates")
-CORS(app)  # Enable CORS for all routes
-
-# Initialize database
-db = ImageDatabase()
+# Routes are registered on a blueprint so each app created by create_app()
+# gets its own database
+bp = Blueprint("wheresmy", __name__)
 
 # Constants
+DEFAULT_DB_PATH = "image_metadata.db"
 THUMBNAIL_SIZE = (300, 300)
+NDJSON_MIMETYPE = "application/x-ndjson"
+# Seconds browsers may reuse an image before revalidating it
+IMAGE_MAX_AGE = 24 * 60 * 60
 # We no longer need this, as thumbnails are generated during import
 # THUMBNAIL_CACHE_DIR = ".image_cache/thumbnails"
+PREVIEW_CACHE_DIR = os.path.join(".image_cache", "previews")
+# Content type of the Prometheus text exposition format
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency of web requests until the response is returned, by endpoint
+REQUEST_SECONDS = metrics.histogram(
+    "http_request_seconds", "Web request latency in seconds", ("endpoint", "status")
+)
 
 
 def ensure_dir_exists(directory: str) -> None:
@@ -55,14 +79,246 @@ def ensure_dir_exists(directory: str) -> None:
     Path(directory).mkdir(parents=True, exist_ok=True)
 
 
+def get_db() -> ImageDatabase:
+    """Get the database of the current application."""
+    return current_app.config["IMAGE_DB"]
+
+
+def get_searcher() -> async_search.AsyncSearcher:
+    """Get the async searcher of the current application."""
+    return current_app.config["ASYNC_SEARCHER"]
+
+
+def get_suggester() -> suggest.Suggester:
+    """Get the type-ahead suggester of the current application."""
+    return current_app.config["SUGGESTER"]
+
+
+def create_app(
+    db_path: Optional[str] = None,
+    preload: bool = False,
+    embedding_model: Optional[str] = None,
+    inference_options: Optional[Dict[str, Any]] = None,
+    cache_options: Optional[Dict[str, Any]] = None,
+    compress_responses: bool = True,
+) -> Flask:
+    """
+    Create the web application.
+
+    This is the entry point for WSGI servers, e.g.
+    ``gunicorn --preload "wheresmy.web_app:create_app(preload=True)"``.
+
+    Args:
+        db_path: Path to the database file (default: $WHERESMY_DB or
+                 image_metadata.db)
+        preload: Load the embedding model and vector index up front, so
+                 workers forked afterwards share them copy-on-write
+        embedding_model: Optional name of the embedding model to preload
+        inference_options: Optional TextEmbeddingGenerator options for
+                           query embedding (e.g. quantize, num_threads)
+        cache_options: Optional search result cache options (enabled,
+                       max_entries, directory)
+        compress_responses: Compress large responses with Brotli or gzip;
+                            disable when a reverse proxy already does
+
+    Returns:
+        Configured Flask application
+    """
+    app = Flask(__name__, static_folder="static", template_folder="templates")
+    CORS(app)  # Enable CORS for all routes
+
+    db_path = db_path or os.environ.get("WHERESMY_DB", DEFAULT_DB_PATH)
+    app.config["IMAGE_DB"] = ImageDatabase(db_path)
+    # Downscaled previews are cached next to the database
+    app.config["PREVIEW_CACHE_DIR"] = os.environ.get(
+        "WHERESMY_PREVIEW_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(db_path)), PREVIEW_CACHE_DIR),
+    )
+    # Threads are started on first use, so this is safe to share with forked workers
+    app.config["ASYNC_SEARCHER"] = async_search.AsyncSearcher(app.config["IMAGE_DB"])
+    # Each process builds its suggestion index on the first request
+    app.config["SUGGESTER"] = suggest.Suggester(app.config["IMAGE_DB"])
+    app.register_blueprint(bp)
+    # orjson serialization, compressed responses and precompressed assets
+    responses.init_app(app, compress_responses=compress_responses)
+
+    # Let concurrent workers read while imports or re-embedding write
+    app.config["IMAGE_DB"].enable_wal()
+
+    if inference_options:
+        search_utils.configure_inference(**inference_options)
+    if cache_options:
+        search_utils.configure_cache(**cache_options)
+    if preload:
+        search_utils.preload(app.config["IMAGE_DB"], embedding_model)
+
+    return app
+
+
+def summarize_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Select the fields of a search result returned by the API."""
+    # The thumbnail should be pre-generated during import
+    # If it exists in the metadata, use it directly
+    processed_result = {
+        "id": result["id"],
+        "filename": result["filename"],
+        "file_path": result["file_path"],
+        # If thumbnail exists in the result, use it, otherwise use a placeholder
+        "thumbnail": result.get("thumbnail", "/static/placeholder.jpg"),
+        "width": result["width"],
+        "height": result["height"],
+        "format": result["format"],
+        "capture_date": result["capture_date"],
+        "camera_make": result["camera_make"],
+        "camera_model": result["camera_model"],
+        "description": result["description"],
+        "gps_lat": result["gps_lat"],
+        "gps_lon": result["gps_lon"],
+    }
+
+    # Scores of semantic and hybrid searches
+    for key in ("similarity", "combined_score"):
+        if key in result:
+            processed_result[key] = result[key]
+
+    return processed_result
+
+
+def wants_ndjson() -> bool:
+    """Check whether the request asks for a streamed NDJSON response."""
+    if request.args.get("format") == "ndjson":
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def ndjson_response(results: Iterator[Dict[str, Any]]) -> Response:
+    """
+    Stream search results as newline-delimited JSON.
+
+    The first result is read before the response starts, so errors such as
+    invalid queries still produce an error status instead of a cut-off
+    stream.
+
+    Args:
+        results: Iterator of search results
+
+    Returns:
+        Chunked response with one summarized result per line
+    """
+    first = next(results, None)
+    dumps = current_app.json.dumps
+
+    def generate():
+        try:
+            if first is None:
+                return
+            for result in itertools.chain([first], results):
+                yield dumps(summarize_result(result), default=str) + "\n"
+        finally:
+            # Release the database cursor if the client disconnects early
+            close = getattr(results, "close", None)
+            if close:
+                close()
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
 # Routes
-@app.route("/")
+@bp.before_app_request
+def start_request_timer():
+    """Record when a request started."""
+    g.request_start = time.perf_counter()
+
+
+@bp.after_app_request
+def record_request_time(response: Response) -> Response:
+    """Record the latency of a request; streamed bodies are not included."""
+    start = g.pop("request_start", None)
+    if start is not None:
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            endpoint=request.endpoint or "unknown",
+            status=response.status_code,
+        )
+    return response
+
+
+@bp.route("/metrics")
+def prometheus_metrics():
+    """Expose the metrics of this process in the Prometheus text format."""
+    return Response(metrics.REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+@bp.route("/")
 def home():
     """Render the home page."""
     return render_template("index.html")
 
 
-@app.route("/api/search")
+def parse_location_filters() -> Tuple[Optional[geo.BBox], Optional[geo.Near]]:
+    """
+    Parse the location filters of a search request.
+
+    Returns:
+        Tuple of the bounding box and radius search, each None if not given
+
+    Raises:
+        ValueError: If a filter is malformed
+    """
+    bbox = request.args.get("bbox")
+    near = request.args.get("near")
+    return (
+        geo.parse_bbox(bbox.split(",")) if bbox else None,
+        geo.parse_near(near.split(",")) if near else None,
+    )
+
+
+def parse_search_filters() -> Dict[str, Any]:
+    """
+    Parse the filters of a search or export request.
+
+    Returns:
+        Keyword arguments of search_utils.search_images and
+        ImageDatabase.iter_images
+
+    Raises:
+        ValueError: If a filter is malformed
+    """
+    date_start = request.args.get("date_start")
+    date_end = request.args.get("date_end")
+    year = request.args.get("year")
+    month = request.args.get("month")
+    if year:
+        year = int(year)
+        if month:
+            month = int(month)
+            if not 1 <= month <= 12:
+                raise ValueError("Month must be between 1 and 12")
+            last_day = calendar.monthrange(year, month)[1]
+            date_start = f"{year}-{month:02d}-01"
+            date_end = f"{year}-{month:02d}-{last_day}"
+        else:
+            date_start = date_start or f"{year}-01-01"
+            date_end = date_end or f"{year}-12-31"
+
+    min_width = request.args.get("min_width")
+    min_height = request.args.get("min_height")
+    bbox, near = parse_location_filters()
+    return {
+        "text_query": request.args.get("q") or None,
+        "camera_make": request.args.get("camera_make"),
+        "camera_model": request.args.get("camera_model"),
+        "date_start": date_start,
+        "date_end": date_end,
+        "min_width": int(min_width) if min_width else None,
+        "min_height": int(min_height) if min_height else None,
+        "bbox": bbox,
+        "near": near,
+        "place": request.args.get("place"),
+    }
+
+
+@bp.route("/api/search")
 def search():
     """
     Search for images.
@@ -73,102 +329,246 @@ def search():
     - camera_model: Camera model
     - date_start: Start date (ISO format)
     - date_end: End date (ISO format)
+    - year: Capture year, unless date_start/date_end are given
+    - month: Capture month (1-12) of the year
     - min_width: Minimum image width
     - min_height: Minimum image height
-    - limit: Maximum number of results (default: 100)
+    - bbox: Bounding box "min_lat,min_lon,max_lat,max_lon"
+    - near: Radius search "lat,lon,radius_km"
+    - place: City, region or country name
+    - limit: Maximum number of results (default: 100, or all when streaming)
     - offset: Number of results to skip (default: 0)
+    - format: "ndjson" to stream one result per line (also selected by
+      an Accept: application/x-ndjson header)
     """
-    # Parse query parameters
-    query = request.args.get("q", "")
-    camera_make = request.args.get("camera_make")
-    camera_model = request.args.get("camera_model")
-    date_start = request.args.get("date_start")
-    date_end = request.args.get("date_end")
-    min_width = request.args.get("min_width")
-    min_height = request.args.get("min_height")
+    try:
+        filters = parse_search_filters()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    limit = int(request.args.get("limit", 100))
+    stream = wants_ndjson()
+    limit = request.args.get("limit", None if stream else 100, type=int)
     offset = int(request.args.get("offset", 0))
 
-    # Convert numeric parameters
-    if min_width:
-        min_width = int(min_width)
-    if min_height:
-        min_height = int(min_height)
+    if stream:
+        # Stream rows from a database cursor instead of building the list
+        return ndjson_response(
+            search_utils.iter_search_images(
+                get_db(), limit=limit, offset=offset, **filters
+            )
+        )
 
     # Perform search using the utility module
     results = search_utils.search_images(
-        db,
-        text_query=query,
-        camera_make=camera_make,
-        camera_model=camera_model,
-        date_start=date_start,
-        date_end=date_end,
-        min_width=min_width,
-        min_height=min_height,
-        limit=limit,
-        offset=offset,
+        get_db(), limit=limit, offset=offset, **filters
     )
 
     # Process results
-    processed_results = []
-    for result in results:
-        # The thumbnail should be pre-generated during import
-        # If it exists in the metadata, use it directly
-
-        # Add thumbnail URL to result
-        processed_result = {
-            "id": result["id"],
-            "filename": result["filename"],
-            "file_path": result["file_path"],
-            # If thumbnail exists in the result, use it, otherwise use a placeholder
-            "thumbnail": result.get("thumbnail", "/static/placeholder.jpg"),
-            "width": result["width"],
-            "height": result["height"],
-            "format": result["format"],
-            "capture_date": result["capture_date"],
-            "camera_make": result["camera_make"],
-            "camera_model": result["camera_model"],
-            "description": result["description"],
-            "gps_lat": result["gps_lat"],
-            "gps_lon": result["gps_lon"],
+    processed_results = [summarize_result(result) for result in results]
+
+    return jsonify(
+        {
+            "results": processed_results,
+            "total": len(processed_results),
+            "offset": offset,
+            "limit": limit,
         }
+    )
+
+
+@bp.route("/api/semantic_search")
+async def semantic_search():
+    """
+    Search for images by meaning, without blocking on model inference.
+
+    Concurrent queries are embedded together in micro-batches. Requests that
+    miss their deadline get a 504 and requests arriving while the inference
+    queue is full get a 503, so bursts do not queue behind slow requests.
+
+    Query parameters:
+    - q: Text query (required)
+    - mode: "semantic" or "hybrid" (default: semantic)
+    - model: Embedding model (default: the database's default model)
+    - text_weight: Weight of text matches in hybrid mode (default: 0.5)
+    - limit: Maximum number of results (default: 20)
+    - timeout: Deadline in seconds (default: 10)
+    """
+    query = request.args.get("q", "").strip()
+    mode = request.args.get("mode", "semantic")
+    embedding_model = request.args.get("model")
+    timeout = request.args.get("timeout", type=float)
+    # Invalid values parse to None rather than falling back to the default
+    limit = request.args.get("limit", type=int) if "limit" in request.args else 20
+    text_weight = (
+        request.args.get("text_weight", type=float)
+        if "text_weight" in request.args
+        else 0.5
+    )
 
-        processed_results.append(processed_result)
+    if not query:
+        return jsonify({"error": "Missing query parameter 'q'"}), 400
+    if mode not in ("semantic", "hybrid"):
+        return jsonify({"error": f"Unknown search mode: {mode}"}), 400
+    if limit is None or limit <= 0:
+        return jsonify({"error": "'limit' must be a positive integer"}), 400
+    if text_weight is None or not 0.0 <= text_weight <= 1.0:
+        return jsonify({"error": "'text_weight' must be between 0 and 1"}), 400
+
+    searcher = get_searcher()
+    try:
+        if mode == "hybrid":
+            results = await searcher.hybrid_search(
+                query,
+                embedding_model=embedding_model,
+                text_weight=text_weight,
+                limit=limit,
+                timeout=timeout,
+            )
+        else:
+            results = await searcher.semantic_search(
+                query, embedding_model=embedding_model, limit=limit, timeout=timeout
+            )
+    except async_search.SearchDeadlineExceeded as e:
+        return jsonify({"error": str(e)}), 504
+    except async_search.SearchOverloadedError as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+
+    # Process results
+    processed_results = [summarize_result(result) for result in results]
 
     return jsonify(
         {
             "results": processed_results,
             "total": len(processed_results),
-            "offset": offset,
+            "mode": mode,
             "limit": limit,
         }
     )
 
 
-@app.route("/api/stats")
+@bp.route("/api/export")
+def export_catalogue():
+    """
+    Export the catalogue, or a filtered subset, in image ID order.
+
+    JSONL and CSV are streamed as rows are read; Parquet and npz are
+    written to a temporary file first.
+
+    Query parameters:
+    - format: jsonl, csv, parquet or npz (default: jsonl)
+    - q, camera_make, camera_model, date_start, date_end, year, month,
+      min_width, min_height, bbox, near, place: Filters, as in /api/search
+    - after_id: Only export images with a greater ID (default: 0)
+    - model: Embedding model of Parquet/npz exports (default: default model)
+    - embeddings: 0 to leave embeddings out of Parquet exports
+    """
+    from wheresmy.core import export
+
+    try:
+        export_format = export.resolve_format(request.args.get("format", "jsonl"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        filters = parse_search_filters()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    after_id = request.args.get("after_id", 0, type=int)
+    download_name = f"wheresmy_export.{export_format}"
+
+    if export_format in export.TEXT_FORMATS:
+        chunks = export.iter_export(get_db(), export_format, after_id, **filters)
+        return Response(
+            stream_with_context(chunks),
+            mimetype=export.MIMETYPES[export_format],
+            headers={"Content-Disposition": f"attachment; filename={download_name}"},
+        )
+
+    # Columnar formats need a seekable file; it is deleted once sent
+    output = tempfile.TemporaryFile()
+    try:
+        export.export_images(
+            get_db(),
+            output,
+            export_format,
+            embedding_model=request.args.get("model"),
+            include_embeddings=request.args.get("embeddings", "1") != "0",
+            after_id=after_id,
+            **filters,
+        )
+    except Exception as e:
+        output.close()
+        logger.error(f"Error exporting catalogue: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    output.seek(0)
+
+    return send_file(
+        output,
+        mimetype=export.MIMETYPES[export_format],
+        as_attachment=True,
+        download_name=download_name,
+    )
+
+
+@bp.route("/api/stats")
 def get_stats():
     """Get database statistics."""
     date_interval = request.args.get("date_interval", "month")
 
     # Get all statistics using the utility module
-    statistics = stats_utils.get_all_statistics(db, date_interval=date_interval)
+    statistics = stats_utils.get_all_statistics(get_db(), date_interval=date_interval)
 
     return jsonify(statistics)
 
 
+@bp.route("/api/suggest")
+def get_suggestions():
+    """
+    Complete a partially typed search query.
+
+    Query parameters:
+    - q: Text typed so far
+    - limit: Maximum number of suggestions (default: 8, at most 50)
+    """
+    query = request.args.get("q", "")
+    limit = request.args.get("limit", suggest.DEFAULT_LIMIT, type=int)
+    return jsonify(
+        {"query": query, "suggestions": get_suggester().suggest(query, limit)}
+    )
+
+
+@bp.route("/api/clusters")
+def get_clusters():
+    """
+    Get clusters of geotagged images for a map view.
+
+    Query parameters:
+    - zoom: Map zoom level (default: 0)
+    - bbox: Viewport "min_lat,min_lon,max_lat,max_lon" (default: whole world)
+    """
+    zoom = request.args.get("zoom", 0, type=int)
+    try:
+        bbox, _ = parse_location_filters()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    clusters = get_db().get_location_clusters(zoom, bbox=bbox)
+    return jsonify({"zoom": zoom, "clusters": clusters})
+
+
 # We no longer need this route as thumbnails are served from static
-# @app.route('/thumbnails/<filename>')
+# @bp.route('/thumbnails/<filename>')
 # def serve_thumbnail(filename):
 #     """Serve a thumbnail file."""
 #     abort(404)
 
 
-@app.route("/api/image/<int:image_id>")
+@bp.route("/api/image/<int:image_id>")
 def get_image(image_id):
     """Get detailed information about an image."""
     # Use the utility module to get the image by ID
-    image_data = search_utils.get_image_by_id(db, image_id)
+    image_data = search_utils.get_image_by_id(get_db(), image_id)
 
     if not image_data:
         abort(404)
@@ -177,21 +577,56 @@ def get_image(image_id):
     return jsonify(image_data)
 
 
-@app.route("/image/<int:image_id>")
+@bp.route("/image/<int:image_id>")
 def serve_image(image_id):
-    """Serve an image file."""
+    """
+    Serve an image file.
+
+    Responses carry an ETag and Last-Modified derived from the file's size
+    and modification time, answer conditional requests with 304 and
+    support Range requests. The file is stat'ed when it is sent rather
+    than validated against stats stored at import: the database does not
+    record them, and stale validators would let clients combine ranges
+    of an edited file with cached ranges of the old one. The file is sent
+    with the server's sendfile support (wsgi.file_wrapper, or X-Sendfile
+    when USE_X_SENDFILE is set).
+
+    Query parameters:
+    - max: Longest side in pixels; serves a cached JPEG preview instead of
+      the original when the original is larger
+    """
     # Get image data using the utility module
-    image_data = search_utils.get_image_by_id(db, image_id)
+    image_data = search_utils.get_image_by_id(get_db(), image_id)
 
     if not image_data:
         abort(404)
 
     image_path = image_data.get("file_path")
-
-    if not image_path or not os.path.exists(image_path):
+    if not image_path:
         abort(404)
 
-    return send_file(image_path)
+    max_dimension = request.args.get("max", type=int)
+    if max_dimension and max_dimension > 0:
+        try:
+            preview_path = create_preview(
+                image_path, current_app.config["PREVIEW_CACHE_DIR"], max_dimension
+            )
+        except OSError as e:
+            logger.warning(f"Could not create preview of {image_path}: {str(e)}")
+            preview_path = None
+        if preview_path:
+            return send_file(
+                preview_path,
+                mimetype="image/jpeg",
+                conditional=True,
+                max_age=IMAGE_MAX_AGE,
+            )
+
+    # send_file stats the file once for its validators and its length
+    try:
+        return send_file(image_path, conditional=True, max_age=IMAGE_MAX_AGE)
+    except OSError:
+        abort(404)
 
 
 def create_placeholder_image():
@@ -221,49 +656,10 @@ def create_placeholder_image():
 
 def main():
     """Main function to start the web application."""
-    parser = argparse.ArgumentParser(
-        description="Start the image search web application"
-    )
-    parser.add_argument(
-        "--port", type=int, default=5000, help="Port to run the server on"
-    )
-    parser.add_argument("--host", default="0.0.0.0", help="Host to bind the server to")
-    parser.add_argument(
-        "--db", default="image_metadata.db", help="Path to database file"
-    )
-    parser.add_argument("--debug", action="store_true", help="Run in debug mode")
-
-    args = parser.parse_args()
-
-    # Set database path
-    global db
-    db = ImageDatabase(args.db)
-
-    # Ensure static and templates directories
-    # Now these directories are relative to the package
-    static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
-    templates_dir = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)), "templates"
-    )
+    from wheresmy.cli.run_web import main as run_web_main
 
-    ensure_dir_exists(static_dir)
-    ensure_dir_exists(templates_dir)
-    ensure_dir_exists(os.path.join(static_dir, "js"))
-    ensure_dir_exists(os.path.join(static_dir, "css"))
-    ensure_dir_exists(os.path.join(static_dir, "images", "thumbnails"))
-
-    # Create placeholder image
-    create_placeholder_image()
-
-    # Log database stats
-    stats = db.get_stats()
-    logger.info(f"Starting web app with {stats['total_images']} images in database")
-
-    # Run the application
-    app.run(host=args.host, port=args.port, debug=args.debug)
+    return run_web_main()
 
 
 if __name__ == "__main__":
-    import argparse
-
-    main()
+    sys.exit(main())